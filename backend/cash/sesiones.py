@@ -0,0 +1,109 @@
+"""
+Resolución de la sesión de caja ABIERTA de un usuario en una sucursal.
+
+Ventas consulta la sesión abierta varias veces por request (save del detalle,
+save de la venta, clean, registrar_pago). El resultado se guarda en dos niveles:
+- por request: diccionario en un ContextVar que reinicia SesionCajaMiddleware
+- por proceso: caché de Django con TTL corto (CAJA_SESION_CACHE_TTL)
+
+Abrir o cerrar caja debe llamar a invalidar_sesion_abierta(), pero la caché es
+por proceso: otro worker puede seguir viendo una sesión ya cerrada durante el
+TTL. Por eso el código cacheado es solo una sugerencia para lecturas; las
+escrituras (ventas y pagos) usan confirmar_sesion_abierta(), que verifica en la
+base que la sesión siga ABIERTA para ese usuario y sucursal.
+Solo se cachea el código de la apertura, nunca la instancia.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import CashOpening
+
+_sesiones_request = ContextVar('sesiones_caja_request', default=None)
+
+
+def _clave(usuario_id, sucursal_id):
+    return f'caja_sesion_abierta:{usuario_id}:{sucursal_id}'
+
+
+def obtener_sesion_abierta_id(usuario_id, sucursal_id):
+    """Retorna el cajaAperCod de la sesión abierta para (usuario, sucursal) o None"""
+    if not usuario_id or not sucursal_id:
+        return None
+
+    clave = _clave(usuario_id, sucursal_id)
+    por_request = _sesiones_request.get()
+    if por_request is not None and clave in por_request:
+        return por_request[clave]
+
+    sesion_id = cache.get(clave)
+    if sesion_id is None:
+        sesion_id = CashOpening.objects.filter(
+            usuCod_id=usuario_id,
+            cajCod__sucurCod_id=sucursal_id,
+            cajaAperEstado='ABIERTA'
+        ).values_list('cajaAperCod', flat=True).first()
+        # No se cachea la ausencia de sesión: abrir caja debe verse de inmediato
+        if sesion_id is not None:
+            cache.set(clave, sesion_id, getattr(settings, 'CAJA_SESION_CACHE_TTL', 10))
+
+    if por_request is not None:
+        por_request[clave] = sesion_id
+    return sesion_id
+
+
+def invalidar_sesion_abierta(usuario_id, sucursal_id):
+    """Descarta la sesión cacheada tras abrir o cerrar una caja"""
+    clave = _clave(usuario_id, sucursal_id)
+    cache.delete(clave)
+    por_request = _sesiones_request.get()
+    if por_request is not None:
+        por_request.pop(clave, None)
+
+
+def sesion_abierta_vigente(sesion_id, usuario_id, sucursal_id, bloquear=False):
+    """
+    True si la sesión sigue ABIERTA en la base para (usuario, sucursal). Con
+    bloquear=True (dentro de una transacción) la fila queda bloqueada: un
+    cierre concurrente espera a que la escritura termine.
+    """
+    filas = CashOpening.objects.filter(
+        pk=sesion_id,
+        usuCod_id=usuario_id,
+        cajCod__sucurCod_id=sucursal_id,
+        cajaAperEstado='ABIERTA'
+    )
+    if bloquear:
+        filas = filas.select_for_update(of=('self',))
+    return filas.values_list('pk', flat=True).first() is not None
+
+
+def confirmar_sesion_abierta(usuario_id, sucursal_id, bloquear=False):
+    """
+    Código de la sesión abierta confirmado en la base, para escrituras. Si la
+    sesión sugerida por la caché ya no está abierta se descarta y se busca de nuevo.
+    """
+    sesion_id = obtener_sesion_abierta_id(usuario_id, sucursal_id)
+    if sesion_id is None or sesion_abierta_vigente(sesion_id, usuario_id, sucursal_id, bloquear):
+        return sesion_id
+
+    invalidar_sesion_abierta(usuario_id, sucursal_id)
+    sesion_id = obtener_sesion_abierta_id(usuario_id, sucursal_id)
+    if sesion_id is not None and bloquear and not sesion_abierta_vigente(sesion_id, usuario_id, sucursal_id, True):
+        return None
+    return sesion_id
+
+
+class SesionCajaMiddleware:
+    """Abre una caché de sesiones de caja limpia para cada request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _sesiones_request.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _sesiones_request.reset(token)
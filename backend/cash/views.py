@@ -3,12 +3,13 @@ from rest_framework.exceptions import ValidationError
 from rest_framework import viewsets, permissions
 from .models import Cash
 from .serializers import CashSerializer, CashOpeningSerializer
-from django.db.models import Q
+from django.db.models import Q, Sum, Count
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Cash, CashOpening
+from .sesiones import invalidar_sesion_abierta
 from decimal import Decimal
-from sales.models import Venta 
+from sales.models import Venta, Pago
 
         
 
@@ -120,6 +121,7 @@ class CashOpeningViewSet(viewsets.ModelViewSet):
             raise ValidationError("Ya tienes una apertura abierta. Ciérrala antes de abrir otra.")
         
         serializer.save(usuCod=user)
+        invalidar_sesion_abierta(user.pk, caja.sucurCod_id)
     
     def perform_close(self, apertura, user, monto_cierre, observaciones=""):
         """Cierra una apertura de caja"""
@@ -139,6 +141,7 @@ class CashOpeningViewSet(viewsets.ModelViewSet):
         apertura.cajaAperEstado = "CERRADA"
         apertura.cajaAperObservacio = observaciones  # Guardar observaciones error de escritura pero lo dejamos asi
         apertura.save()
+        invalidar_sesion_abierta(apertura.usuCod_id, apertura.cajCod.sucurCod_id)
 
     @action(detail=False, methods=['post'], url_path='close')
     def cerrar_caja(self, request):
@@ -244,34 +247,24 @@ class CashOpeningViewSet(viewsets.ModelViewSet):
             return Response({'error': 'No hay caja abierta'}, status=400)
         
 
-        # Obtener ventas de esta sesión (relacionadas con esta apertura)
-        ventas = Venta.objects.filter(
+        # Totales de ventas de esta sesión (relacionadas con esta apertura)
+        totales = Venta.objects.filter(
             cajaAperCod=apertura,
             ventAnulada=False
-        )
-        
-        # Calcular totales por forma de pago
-        ventas_por_forma = {
-            'EFECTIVO': Decimal('0.00'),
-            'TARJETA': Decimal('0.00'),
-            'TRANSFERENCIA': Decimal('0.00'),
-            'YAPE': Decimal('0.00'),
-            'PLIN': Decimal('0.00'),
-            'MIXTO': Decimal('0.00'),
-        }
+        ).aggregate(total=Sum('ventTotal'), cantidad=Count('ventCod'))
         
-        total_ventas = Decimal('0.00')
+        # Dinero cobrado en la sesión por forma de pago (libro de pagos)
+        ventas_por_forma = {forma: Decimal('0.00') for forma, _ in Venta.FORMA_PAGO}
+        cobrado = Pago.objects.filter(
+            cajaAperCod=apertura,
+            ventCod__ventAnulada=False
+        ).values('pagFormaPago').annotate(total=Sum('pagMonto')).order_by()
         
-        for venta in ventas:
-            forma = venta.ventFormaPago
-            monto = Decimal(str(venta.ventTotal))
-            total_ventas += monto
-            
-            if forma in ventas_por_forma:
-                ventas_por_forma[forma] += monto
+        for fila in cobrado:
+            ventas_por_forma[fila['pagFormaPago']] = fila['total']
         
         return Response({
-            'total_ventas': float(total_ventas),
-            'cantidad_ventas': ventas.count(),
+            'total_ventas': float(totales['total'] or 0),
+            'cantidad_ventas': totales['cantidad'],
             'ventas_por_forma_pago': {k: float(v) for k, v in ventas_por_forma.items()}
         })
\ No newline at end of file
@@ -254,24 +254,26 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         }
     
     def _get_sales_stats(self, sales_filter, date_filter, user_role_level):
-        """Obtener estadísticas de ventas"""
-        from sales.models import Venta
-        
-        base_query = Venta.objects.filter(
-            ventFecha__gte=date_filter['start'],
-            ventFecha__lte=date_filter['end'],
-            ventAnulada=False,
-            **sales_filter
-        )
-        
-        total_sales = base_query.count()
-        total_revenue = base_query.aggregate(Sum('ventTotal'))['ventTotal__sum'] or 0
-        total_profit = base_query.aggregate(Sum('ventTotal'))['ventTotal__sum'] or 0
+        """Obtener estadísticas de ventas (desde el resumen diario de ventas)"""
+        from sales.hechos import resumen_diario
+        
+        base_query = resumen_diario(date_filter['start'], date_filter['end']).filter(**sales_filter)
+        
+        # Totales y ventas por estado de pago en una sola consulta
+        por_estado = {
+            item['vresEstado']: item
+            for item in base_query.values('vresEstado').annotate(
+                cantidad=Sum('vresCantidad'),
+                total=Sum('vresTotal')
+            ).order_by()
+        }
+        total_sales = sum(item['cantidad'] for item in por_estado.values())
+        total_revenue = sum(item['total'] or 0 for item in por_estado.values())
+        total_profit = total_revenue
         
-        # Ventas por estado de pago
-        paid_sales = base_query.filter(ventEstado='PAGADO').count()
-        pending_sales = base_query.filter(ventEstado='PENDIENTE').count()
-        partial_sales = base_query.filter(ventEstado='PARCIAL').count()
+        paid_sales = por_estado.get('PAGADO', {}).get('cantidad', 0)
+        pending_sales = por_estado.get('PENDIENTE', {}).get('cantidad', 0)
+        partial_sales = por_estado.get('PARCIAL', {}).get('cantidad', 0)
         
         # Ventas agrupadas por período (para gráfico de líneas)
         daily_sales = []
@@ -280,16 +282,12 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         # Determinar el agrupamiento según el rango
         if date_range == 'today':
             # Día: Agrupar por DÍAS de la semana actual (Lun, Mar, Mié... Dom)
-            from django.db.models.functions import TruncDate
-            
-            sales_by_period = base_query.annotate(
-                period=TruncDate('ventFecha')
-            ).values('period').annotate(
-                total=Sum('ventTotal')
-            )
+            sales_by_period = base_query.values('vresFecha').annotate(
+                total=Sum('vresTotal')
+            ).order_by()
             
             # Crear diccionario con ventas
-            sales_dict = {item['period']: float(item['total'] or 0) for item in sales_by_period}
+            sales_dict = {item['vresFecha']: float(item['total'] or 0) for item in sales_by_period}
             
             # Llenar todos los días de la semana (7 días)
             today = datetime.now().date()
@@ -306,17 +304,14 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                 
         elif date_range == 'week':
             # Semana: Agrupar por DÍAS del mes actual (1, 2, 3... 30/31)
-            from django.db.models.functions import TruncDate
             import calendar
             
-            sales_by_period = base_query.annotate(
-                period=TruncDate('ventFecha')
-            ).values('period').annotate(
-                total=Sum('ventTotal')
-            )
+            sales_by_period = base_query.values('vresFecha').annotate(
+                total=Sum('vresTotal')
+            ).order_by()
             
             # Crear diccionario con ventas
-            sales_dict = {item['period']: float(item['total'] or 0) for item in sales_by_period}
+            sales_dict = {item['vresFecha']: float(item['total'] or 0) for item in sales_by_period}
             
             # Llenar TODOS los días del mes actual
             today = datetime.now().date()
@@ -333,24 +328,20 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                 
         elif date_range == 'month':
             # Mes: Agrupar por MESES del año actual (Enero, Febrero... Diciembre)
-            from django.db.models.functions import TruncMonth
+            from django.db.models.functions import ExtractMonth
             
             # Obtener ventas del año actual
             current_year = datetime.now().year
-            year_sales = Venta.objects.filter(
-                ventFecha__year=current_year,
-                ventAnulada=False,
-                **sales_filter
-            )
+            year_sales = resumen_diario().filter(vresFecha__year=current_year, **sales_filter)
             
             sales_by_period = year_sales.annotate(
-                period=TruncMonth('ventFecha')
+                period=ExtractMonth('vresFecha')
             ).values('period').annotate(
-                total=Sum('ventTotal')
-            )
+                total=Sum('vresTotal')
+            ).order_by()
             
             # Crear diccionario con ventas por mes
-            sales_dict = {item['period'].month: float(item['total'] or 0) for item in sales_by_period}
+            sales_dict = {item['period']: float(item['total'] or 0) for item in sales_by_period}
             
             # Nombres de meses en español
             meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
@@ -365,36 +356,30 @@ class DashboardConsumer(AsyncWebsocketConsumer):
                 
         elif date_range == 'year':
             # Año: Agrupar por AÑOS (2020, 2021, 2022... 2025)
-            from django.db.models.functions import TruncYear
+            from django.db.models.functions import ExtractYear
             
             # Obtener todas las ventas históricas
-            all_sales = Venta.objects.filter(
-                ventAnulada=False,
-                **sales_filter
-            )
+            all_sales = resumen_diario().filter(**sales_filter)
             
             sales_by_period = all_sales.annotate(
-                period=TruncYear('ventFecha')
+                period=ExtractYear('vresFecha')
             ).values('period').annotate(
-                total=Sum('ventTotal')
+                total=Sum('vresTotal')
             ).order_by('period')
             
             # Extraer años con ventas
             for item in sales_by_period:
                 daily_sales.append({
-                    'date': str(item['period'].year),
+                    'date': str(item['period']),
                     'total': float(item['total'] or 0)
                 })
         else:
             # Por defecto: últimos 7 días
-            from django.db.models.functions import TruncDate
-            sales_by_period = base_query.annotate(
-                period=TruncDate('ventFecha')
-            ).values('period').annotate(
-                total=Sum('ventTotal')
-            )
+            sales_by_period = base_query.values('vresFecha').annotate(
+                total=Sum('vresTotal')
+            ).order_by()
             
-            sales_dict = {item['period']: float(item['total'] or 0) for item in sales_by_period}
+            sales_dict = {item['vresFecha']: float(item['total'] or 0) for item in sales_by_period}
             
             today = datetime.now().date()
             for i in range(7):
@@ -594,34 +579,33 @@ class DashboardConsumer(AsyncWebsocketConsumer):
         return alerts
     
     def _get_earnings_stats(self, sales_filter, date_filter):
-        """Obtener estadísticas de ganancias"""
-        from sales.models import Venta
+        """Obtener estadísticas de ganancias (desde el resumen diario de ventas)"""
+        from sales.hechos import resumen_diario
         
-        base_query = Venta.objects.filter(
-            ventFecha__gte=date_filter['start'],
-            ventFecha__lte=date_filter['end'],
-            ventAnulada=False,
-            ventEstado='PAGADO',
-            **sales_filter
+        pagadas = resumen_diario().filter(vresEstado='PAGADO', **sales_filter)
+        base_query = pagadas.filter(
+            vresFecha__gte=date_filter['start'].date(),
+            vresFecha__lte=date_filter['end'].date()
         )
         
-        total_earnings = base_query.aggregate(Sum('ventTotal'))['ventTotal__sum'] or 0
-        total_profit = base_query.aggregate(Sum('ventTotal'))['ventTotal__sum'] or 0
-        count = base_query.count()
+        totales = base_query.aggregate(total=Sum('vresTotal'), count=Sum('vresCantidad'))
+        total_earnings = totales['total'] or 0
+        total_profit = total_earnings
+        count = totales['count'] or 0
         
-        # Ganancias por día
+        # Ganancias por día (últimos 7 días en una sola consulta)
+        today = datetime.now().date()
+        por_dia = {
+            item['vresFecha']: item['total']
+            for item in pagadas.filter(vresFecha__gte=today - timedelta(days=6), vresFecha__lte=today)
+            .values('vresFecha').annotate(total=Sum('vresTotal')).order_by()
+        }
         daily_earnings = []
         for i in range(7):
-            day = datetime.now().date() - timedelta(days=6-i)
-            earnings = Venta.objects.filter(
-                ventFecha__date=day,
-                ventAnulada=False,
-                ventEstado='PAGADO',
-                **sales_filter
-            ).aggregate(Sum('ventTotal'))['ventTotal__sum'] or 0
+            day = today - timedelta(days=6-i)
             daily_earnings.append({
                 'date': day.strftime('%Y-%m-%d'),
-                'amount': float(earnings)
+                'amount': float(por_dia.get(day) or 0)
             })
         
         return {
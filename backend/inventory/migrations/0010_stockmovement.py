@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('inventory', '0009_load_sample_products'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('movCod', models.AutoField(primary_key=True, serialize=False)),
+                ('movCantidad', models.IntegerField(help_text='Positivo = ingreso, negativo = salida', verbose_name='Cantidad')),
+                ('movMotivo', models.CharField(choices=[('VENTA', 'Venta'), ('MODIFICACION', 'Modificación de venta'), ('ANULACION', 'Anulación de venta'), ('AJUSTE', 'Ajuste manual')], max_length=20, verbose_name='Motivo')),
+                ('movDocumento', models.CharField(blank=True, help_text='Ej: VENTA-125', max_length=50, verbose_name='Documento origen')),
+                ('movFecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+                ('prodCod', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='inventory.product', verbose_name='Producto')),
+                ('sucurCod', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='Branch.branch', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Stock',
+                'verbose_name_plural': 'Movimientos de Stock',
+                'db_table': 'stock_movement',
+                'ordering': ['-movFecha', '-movCod'],
+                'indexes': [models.Index(fields=['sucurCod', 'prodCod', '-movFecha'], name='stock_movem_sucurCo_cbc507_idx'), models.Index(fields=['movDocumento'], name='stock_movem_movDocu_d8d2e4_idx')],
+            },
+        ),
+    ]
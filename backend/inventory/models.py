@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.core.exceptions import ValidationError
 
 # Categoria_Producto
@@ -414,6 +415,73 @@ class BranchInventory (models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def _sumar_stock(cls, sucurCod_id, prodCod_id, cantidad, descripcion=None):
+        """
+        invStock = invStock + cantidad WHERE invStock >= -cantidad, en un único
+        UPDATE condicional. Lanza ValidationError si no hay fila o no alcanza.
+        """
+        inventario = cls.objects.filter(sucurCod_id=sucurCod_id, prodCod_id=prodCod_id)
+        if cantidad < 0:
+            inventario = inventario.filter(invStock__gte=-cantidad)
+
+        if not inventario.update(invStock=F('invStock') + cantidad):
+            disponible = cls.objects.filter(
+                sucurCod_id=sucurCod_id, prodCod_id=prodCod_id
+            ).values_list('invStock', flat=True).first()
+            if disponible is None:
+                raise ValidationError(
+                    f"Producto no disponible en esta sucursal: {descripcion}" if descripcion
+                    else "Producto no disponible en esta sucursal"
+                )
+            raise ValidationError(
+                f"Stock insuficiente para {descripcion}. Disponible: {disponible}" if descripcion
+                else f"Stock insuficiente. Disponible: {disponible}"
+            )
+
+    @classmethod
+    def mover_stock(cls, sucurCod_id, prodCod_id, cantidad, motivo, documento=''):
+        """
+        Aplica un movimiento de stock con un único UPDATE condicional y lo
+        registra en el kardex, ambos en la misma transacción. Cantidad negativa = salida.
+        """
+        if not cantidad:
+            return
+
+        with transaction.atomic():
+            cls._sumar_stock(sucurCod_id, prodCod_id, cantidad)
+            StockMovement.objects.create(
+                sucurCod_id=sucurCod_id,
+                prodCod_id=prodCod_id,
+                movCantidad=cantidad,
+                movMotivo=motivo,
+                movDocumento=documento
+            )
+
+    @classmethod
+    def mover_stock_lote(cls, sucurCod_id, cantidades, motivo, documento='', descripciones=None):
+        """
+        Varios movimientos en una sucursal ({prodCod_id: cantidad}): un UPDATE
+        condicional por producto, en orden de código para que dos lotes no se
+        bloqueen mutuamente, y el kardex con bulk_create. Todo o nada.
+        """
+        descripciones = descripciones or {}
+        with transaction.atomic():
+            movimientos = []
+            for prodCod_id in sorted(cantidades):
+                cantidad = cantidades[prodCod_id]
+                if not cantidad:
+                    continue
+                cls._sumar_stock(sucurCod_id, prodCod_id, cantidad, descripciones.get(prodCod_id))
+                movimientos.append(StockMovement(
+                    sucurCod_id=sucurCod_id,
+                    prodCod_id=prodCod_id,
+                    movCantidad=cantidad,
+                    movMotivo=motivo,
+                    movDocumento=documento
+                ))
+            StockMovement.objects.bulk_create(movimientos)
+
     @property
     def valorTotalStock(self):
         """Valor total del stock en esta sucursal"""
@@ -429,4 +497,63 @@ class BranchInventory (models.Model):
         """Calcula cuántas unidades faltan para el stock mínimo"""
         if self.invStock < self.invStockMin:
             return self.invStockMin - self.invStock
-        return 0
\ No newline at end of file
+        return 0
+
+
+# Kardex (movimientos de stock)
+
+class StockMovement(models.Model):
+
+    MOTIVO_CHOICES = [
+        ('VENTA', 'Venta'),
+        ('MODIFICACION', 'Modificación de venta'),
+        ('ANULACION', 'Anulación de venta'),
+        ('AJUSTE', 'Ajuste manual'),
+    ]
+
+    movCod = models.AutoField(primary_key=True)
+
+    sucurCod = models.ForeignKey(
+        Branch,
+        on_delete=models.PROTECT,
+        verbose_name="Sucursal"
+    )
+
+    prodCod = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        verbose_name="Producto"
+    )
+
+    movCantidad = models.IntegerField(
+        verbose_name="Cantidad",
+        help_text="Positivo = ingreso, negativo = salida"
+    )
+
+    movMotivo = models.CharField(
+        max_length=20,
+        choices=MOTIVO_CHOICES,
+        verbose_name="Motivo"
+    )
+
+    movDocumento = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name="Documento origen",
+        help_text="Ej: VENTA-125"
+    )
+
+    movFecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
+
+    class Meta:
+        db_table = 'stock_movement'
+        verbose_name = 'Movimiento de Stock'
+        verbose_name_plural = 'Movimientos de Stock'
+        ordering = ['-movFecha', '-movCod']
+        indexes = [
+            models.Index(fields=['sucurCod', 'prodCod', '-movFecha']),
+            models.Index(fields=['movDocumento']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_movMotivo_display()} {self.movCantidad:+d} - {self.prodCod_id} @ {self.sucurCod_id}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import ProductCategory, Product, BranchInventory
+from .models import ProductCategory, Product, BranchInventory, StockMovement
 from Branch.models import Branch
 from django.db import transaction
 from django.core.exceptions import ValidationError as DjangoValidationError
@@ -279,4 +279,16 @@ class BranchInventorySummarySerializer(serializers.Serializer):
     total_productos = serializers.IntegerField()
     total_stock = serializers.IntegerField()
     productos_bajo_stock = serializers.IntegerField()
-    valor_total_inventario = serializers.DecimalField(max_digits=15, decimal_places=2)
\ No newline at end of file
+    valor_total_inventario = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    motivo_display = serializers.CharField(source='get_movMotivo_display', read_only=True)
+
+    class Meta:
+        model = StockMovement
+        fields = [
+            'movCod', 'sucurCod', 'prodCod', 'movCantidad',
+            'movMotivo', 'motivo_display', 'movDocumento', 'movFecha'
+        ]
+        read_only_fields = fields
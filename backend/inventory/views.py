@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import ProductCategory, Product, BranchInventory
+from .models import ProductCategory, Product, BranchInventory, StockMovement
 from .serializers import (
     BranchInventorySummarySerializer, 
     BranchInventorySerializer,
@@ -10,6 +10,7 @@ from .serializers import (
     ProductWithInventorySerializer,
     ProductSerializer,
     ProductCategorySerializer,
+    StockMovementSerializer,
 )
 from django_filters.rest_framework import DjangoFilterBackend
 from .filters import ProductFilter
@@ -343,10 +344,42 @@ class BranchInventoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        inventario.invStock = int(nuevo)
-        inventario.save()
+        with transaction.atomic():
+            inventario = BranchInventory.objects.select_for_update().get(pk=inventario.pk)
+            BranchInventory.mover_stock(
+                inventario.sucurCod_id, inventario.prodCod_id,
+                int(nuevo) - inventario.invStock,
+                motivo='AJUSTE',
+                documento=f"AJUSTE-USR-{request.user.pk}" if request.user.is_authenticated else "AJUSTE"
+            )
+        inventario.refresh_from_db()
 
         return Response({
             "success": True,
             "data": self.get_serializer(inventario).data
-        })
\ No newline at end of file
+        })
+
+    @action(detail=True, methods=['get'], url_path='movements')
+    def movements(self, request, pk=None):
+        """Kardex del producto en esta sucursal (más recientes primero)."""
+        inventario = self.get_object()
+        try:
+            limite = int(request.query_params.get('limit', 100))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "limit debe ser un número entero"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limite < 1:
+            return Response(
+                {"error": "limit debe ser mayor a cero"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limite = min(limite, 1000)
+
+        movimientos = StockMovement.objects.filter(
+            sucurCod_id=inventario.sucurCod_id,
+            prodCod_id=inventario.prodCod_id
+        )[:limite]
+
+        return Response(StockMovementSerializer(movimientos, many=True).data)
@@ -68,6 +68,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'cash.sesiones.SesionCajaMiddleware',
 ]
 
 # CORS Configuration
@@ -86,8 +87,18 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
+CORS_EXPOSE_HEADERS = [
+    'idempotent-replayed',
+]
+
+# Reintentos con la misma Idempotency-Key reciben la respuesta guardada durante este tiempo
+IDEMPOTENCIA_TTL_HORAS = int(os.getenv('IDEMPOTENCIA_TTL_HORAS', '24'))
+# Segundos que un intento en curso retiene la clave; vencidos, un reintento lo retoma (worker caído o timeout)
+IDEMPOTENCIA_PROCESANDO_SEGUNDOS = int(os.getenv('IDEMPOTENCIA_PROCESANDO_SEGUNDOS', '120'))
+
 CORS_ALLOW_METHODS = [
     'DELETE',
     'GET',
@@ -249,6 +260,17 @@ SIMPLE_JWT = {
 # Configuración SUNAT
 SUNAT_SERVICE_URL = os.getenv('SUNAT_SERVICE_URL', 'http://localhost:8001/public')
 SUNAT_TIMEOUT = 30
+# Descarga de XML/CDR desde el microservicio cuando no están en el almacén local
+SUNAT_STORAGE_URL = os.getenv('SUNAT_STORAGE_URL', 'http://localhost:8001/storage')
+# Almacén local (direccionado por contenido) de XML y CDR
+SUNAT_ARTIFACTS_DIR = os.getenv('SUNAT_ARTIFACTS_DIR', str(MEDIA_ROOT / 'comprobantes'))
+# Cliente HTTP: pool keep-alive, reintentos con jitter y circuit breaker
+SUNAT_POOL_SIZE = int(os.getenv('SUNAT_POOL_SIZE', '10'))
+SUNAT_REINTENTOS = int(os.getenv('SUNAT_REINTENTOS', '2'))
+SUNAT_REINTENTO_BASE = float(os.getenv('SUNAT_REINTENTO_BASE', '0.5'))  # segundos
+SUNAT_CIRCUITO_UMBRAL = int(os.getenv('SUNAT_CIRCUITO_UMBRAL', '5'))  # fallos seguidos para abrir
+SUNAT_CIRCUITO_ESPERA = int(os.getenv('SUNAT_CIRCUITO_ESPERA', '30'))  # segundos abierto
+SUNAT_SALUD_TTL = int(os.getenv('SUNAT_SALUD_TTL', '60'))  # segundos que vale un chequeo de salud
 SUNAT_COMPANY_RUC = '20123456789'
 SUNAT_COMPANY_RAZON_SOCIAL = 'MI EMPRESA SAC'
 SUNAT_COMPANY_DIRECCION = 'AV. EJEMPLO 123 LIMA LIMA LIMA'
@@ -256,7 +278,40 @@ SUNAT_NOMBRE_COMERCIAL = 'MI EMPRESA'
 SUNAT_DEPARTAMENTO = 'LIMA'
 SUNAT_PROVINCIA = 'LIMA'
 SUNAT_DISTRITO = 'LIMA'
-
+# Series por sucursal (F00N/B00N según código de sucursal) en lugar de F001/B001 compartidas
+SUNAT_SERIES_POR_SUCURSAL = os.getenv('SUNAT_SERIES_POR_SUCURSAL', 'False') == 'True'
+# Boletas (serie B) por resumen diario en lugar de una por una (manage.py enviar_resumenes).
+# Al desactivarlo, una corrida más de enviar_resumenes pasa al outbox las boletas que quedaron pendientes
+SUNAT_RESUMEN_DIARIO = os.getenv('SUNAT_RESUMEN_DIARIO', 'False') == 'True'
+SUNAT_RESUMEN_MAX_COMPROBANTES = int(os.getenv('SUNAT_RESUMEN_MAX_COMPROBANTES', '500'))  # por resumen
+
+# Worker del outbox (manage.py procesar_outbox)
+OUTBOX_MAX_INTENTOS = int(os.getenv('OUTBOX_MAX_INTENTOS', '8'))
+OUTBOX_BACKOFF_BASE = int(os.getenv('OUTBOX_BACKOFF_BASE', '30'))  # segundos
+OUTBOX_BACKOFF_MAX = int(os.getenv('OUTBOX_BACKOFF_MAX', '3600'))  # segundos
+OUTBOX_BLOQUEO_SEGUNDOS = int(os.getenv('OUTBOX_BLOQUEO_SEGUNDOS', '300'))
+
+
+# Segundos que se reutiliza la sesión de caja abierta resuelta por (usuario, sucursal)
+CAJA_SESION_CACHE_TTL = int(os.getenv('CAJA_SESION_CACHE_TTL', '10'))
+
+# Segundos que se reutiliza la comparativa de sucursales (se invalida en todos los workers al escribir ventas o stock)
+COMPARATIVA_CACHE_TTL = int(os.getenv('COMPARATIVA_CACHE_TTL', '300'))
+
+# Trabajos de reportes (manage.py procesar_trabajos_reportes)
+REPORTE_TRABAJO_TTL = int(os.getenv('REPORTE_TRABAJO_TTL', '600'))  # segundos que se reutiliza un resultado
+REPORTE_TRABAJO_BLOQUEO_SEGUNDOS = int(os.getenv('REPORTE_TRABAJO_BLOQUEO_SEGUNDOS', '300'))
+REPORTE_TRABAJO_MAX_INTENTOS = int(os.getenv('REPORTE_TRABAJO_MAX_INTENTOS', '3'))
+REPORTE_TRABAJO_AVANCE_SEGUNDOS = float(os.getenv('REPORTE_TRABAJO_AVANCE_SEGUNDOS', '1'))
+
+# Paginación por cursor de listados de ventas (sales/paginacion.py)
+PAGINACION_TAMANIO_MAXIMO = int(os.getenv('PAGINACION_TAMANIO_MAXIMO', '200'))
+PAGINACION_CONTEO_MAXIMO = int(os.getenv('PAGINACION_CONTEO_MAXIMO', '10000'))  # filas contadas con exactitud
+
+# Antigüedad de deuda de clientes (sales/antiguedad.py): (clave, días máximos), el último sin tope
+DEUDA_TRAMOS = [('current', 30), ('30_60', 60), ('60_90', 90), ('over_90', None)]
+# 'vivo' (ventas pendientes) o 'snapshot' (foto de manage.py generar_antiguedad_deuda); ?fuente= lo cambia
+DEUDA_ANTIGUEDAD_FUENTE = os.getenv('DEUDA_ANTIGUEDAD_FUENTE', 'vivo')
 
 CACHES = {
     'default': {
@@ -0,0 +1,274 @@
+"""
+Almacén local de XML y CDR de comprobantes, direccionado por contenido.
+
+Los archivos se guardan una sola vez (cuando SUNAT responde) en
+<SUNAT_ARTIFACTS_DIR>/objetos/<sha256[:2]>/<sha256> y un índice por nombre
+(<SUNAT_ARTIFACTS_DIR>/<tipo>/<nombre>) apunta al hash, opcionalmente con una
+etiqueta de versión ("<sha256> <etiqueta>"). Contenidos iguales se guardan una vez. Si un archivo no está, se descarga una vez del microservicio
+(SUNAT_STORAGE_URL) y queda guardado.
+
+servir_artefacto() entrega el archivo en streaming con ETag (el sha256),
+If-None-Match, Range e If-Range. zip_en_flujo() arma un ZIP sobre la marcha
+(memoria constante) para exportar muchos artefactos en una sola descarga.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import zipfile
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+
+TIPOS = {
+    'xml': 'application/xml',
+    'cdr': 'application/zip',
+    'pdf': 'application/pdf',  # representación impresa, nombrada por la clave de sales/pdf.py
+    'reporte': 'application/octet-stream',  # exportaciones de sales/trabajos.py (el tipo real va en el trabajo)
+}
+
+BLOQUE = 64 * 1024
+
+
+def nombre_xml(comprobante):
+    return f"{comprobante.comprSerie}-{comprobante.comprCorrelativo}.xml"
+
+
+def nombre_cdr(comprobante):
+    return f"R-{comprobante.comprSerie}-{comprobante.comprCorrelativo}.zip"
+
+
+def ubicacion_objeto(sha256):
+    """Ruta relativa (a SUNAT_ARTIFACTS_DIR) del objeto con ese hash"""
+    return f"objetos/{sha256[:2]}/{sha256}"
+
+
+class AlmacenArtefactos:
+
+    def __init__(self, raiz=None):
+        self.raiz = Path(raiz or settings.SUNAT_ARTIFACTS_DIR)
+
+    def _ruta_objeto(self, sha256):
+        return self.raiz / ubicacion_objeto(sha256)
+
+    def resolver(self, ubicacion):
+        """Ruta absoluta a partir de la ubicación guardada en el comprobante"""
+        return self.raiz / ubicacion
+
+    def _ruta_indice(self, tipo, nombre):
+        if tipo not in TIPOS or not nombre or '/' in nombre or nombre.startswith('.'):
+            raise ValueError(f"Artefacto inválido: {tipo}/{nombre}")
+        return self.raiz / tipo / nombre
+
+    def _escribir_atomico(self, destino, escribir):
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(dir=destino.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                escribir(f)
+            os.replace(temporal, destino)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+            raise
+
+    def guardar(self, tipo, nombre, contenido, etiqueta=''):
+        """
+        Guarda el contenido (bytes) y lo registra bajo su nombre, con `etiqueta` como
+        versión si se indica (ver ubicar()). Retorna el sha256
+        """
+        return self.guardar_flujo(tipo, nombre, [contenido], etiqueta)
+
+    def guardar_flujo(self, tipo, nombre, bloques, etiqueta=''):
+        """Igual que guardar() pero recibe un iterable de bloques (no carga todo en memoria)"""
+        indice = self._ruta_indice(tipo, nombre)
+        recibido = self.raiz / 'objetos' / '.entrantes'
+        recibido.mkdir(parents=True, exist_ok=True)
+
+        sha = hashlib.sha256()
+        fd, temporal = tempfile.mkstemp(dir=recibido)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for bloque in bloques:
+                    sha.update(bloque)
+                    f.write(bloque)
+            digest = sha.hexdigest()
+            objeto = self._ruta_objeto(digest)
+            if objeto.exists():
+                os.unlink(temporal)
+            else:
+                objeto.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temporal, objeto)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+            raise
+
+        entrada = f'{digest} {etiqueta}' if etiqueta else digest
+        self._escribir_atomico(indice, lambda f: f.write(entrada.encode('ascii')))
+        return digest
+
+    def eliminar_objeto(self, sha256):
+        """Borra el objeto con ese hash; solo para contenidos que ningún otro nombre comparte"""
+        self._ruta_objeto(sha256).unlink(missing_ok=True)
+
+    def indice(self, tipo):
+        """Itera (nombre, sha256, tamaño) de los artefactos de un tipo que existen en disco"""
+        carpeta = self.raiz / tipo
+        if not carpeta.is_dir():
+            return
+        with os.scandir(carpeta) as entradas:
+            for entrada in entradas:
+                if entrada.name.startswith('.') or not entrada.is_file():
+                    continue
+                with open(entrada.path) as f:
+                    digest = f.read().split(' ', 1)[0].strip()
+                if len(digest) != 64:
+                    continue
+                try:
+                    tamanio = self._ruta_objeto(digest).stat().st_size
+                except FileNotFoundError:
+                    continue
+                yield entrada.name, digest, tamanio
+
+    def ubicar(self, tipo, nombre, etiqueta=None):
+        """
+        Retorna (ruta, sha256) si el artefacto está guardado, o None. Con `etiqueta`
+        solo lo retorna si se guardó con esa versión
+        """
+        try:
+            digest, _, guardada = self._ruta_indice(tipo, nombre).read_text().strip().partition(' ')
+        except (FileNotFoundError, ValueError):
+            return None
+        if etiqueta is not None and guardada != etiqueta:
+            return None
+        objeto = self._ruta_objeto(digest)
+        return (objeto, digest) if objeto.exists() else None
+
+    def obtener(self, tipo, nombre):
+        """Como ubicar(), pero ante un fallo descarga el archivo del microservicio y lo guarda"""
+        encontrado = self.ubicar(tipo, nombre)
+        if encontrado:
+            return encontrado
+
+        from .sunat_client import SunatClient
+
+        with SunatClient().descargar_artefacto(tipo, nombre) as response:
+            if response.status_code != 200:
+                return None
+            self.guardar_flujo(tipo, nombre, response.iter_content(BLOQUE))
+        return self.ubicar(tipo, nombre)
+
+
+def almacen():
+    return AlmacenArtefactos()
+
+
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _leer_rango(ruta, inicio, largo):
+    with open(ruta, 'rb') as f:
+        f.seek(inicio)
+        restante = largo
+        while restante > 0:
+            bloque = f.read(min(BLOQUE, restante))
+            if not bloque:
+                break
+            restante -= len(bloque)
+            yield bloque
+
+
+def servir_artefacto(request, ruta, sha256, nombre, tipo):
+    """Respuesta en streaming con soporte de ETag, If-None-Match, Range e If-Range"""
+    etag = f'"{sha256}"'
+    content_type = TIPOS[tipo]
+
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [e.strip() for e in if_none_match.split(',')] or if_none_match.strip() == '*':
+        respuesta = HttpResponseNotModified()
+        respuesta['ETag'] = etag
+        return respuesta
+
+    tamanio = os.path.getsize(ruta)
+    rango = request.headers.get('Range', '')
+    if_range = request.headers.get('If-Range')
+    coincidencia = _RANGO.match(rango.strip()) if rango and (not if_range or if_range == etag) else None
+    if coincidencia:
+        desde, hasta = coincidencia.groups()
+        # Un rango mal formado (vacío o bytes=5-3) se ignora y va el archivo completo (RFC 7233)
+        if not (desde or hasta) or (desde and hasta and int(desde) > int(hasta)):
+            coincidencia = None
+
+    if coincidencia:
+        if desde:
+            inicio = int(desde)
+            fin = min(int(hasta), tamanio - 1) if hasta else tamanio - 1
+        else:
+            # bytes=-N: los últimos N bytes
+            inicio = max(tamanio - int(hasta), 0)
+            fin = tamanio - 1
+        if inicio >= tamanio or inicio > fin:
+            # Rango válido pero fuera del archivo
+            respuesta = HttpResponse(status=416)
+            respuesta['Content-Range'] = f'bytes */{tamanio}'
+            return respuesta
+
+        largo = fin - inicio + 1
+        respuesta = StreamingHttpResponse(_leer_rango(ruta, inicio, largo), status=206, content_type=content_type)
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamanio}'
+        respuesta['Content-Length'] = str(largo)
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    else:
+        respuesta = FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre, content_type=content_type)
+
+    respuesta['ETag'] = etag
+    respuesta['Accept-Ranges'] = 'bytes'
+    respuesta['Cache-Control'] = 'private, max-age=86400'
+    return respuesta
+
+
+class _SalidaZip(io.RawIOBase):
+    """Destino no posicionable para ZipFile: acumula lo escrito hasta que se vacía"""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def zip_en_flujo(entradas):
+    """
+    Generador de bytes de un ZIP. `entradas` produce (nombre, fecha, fuente, comprimir),
+    donde fuente es una ruta o un iterable de bloques de bytes. Nunca hay más de un
+    bloque en memoria.
+    """
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, 'w') as archivo:
+        for nombre, fecha, fuente, comprimir in entradas:
+            info = zipfile.ZipInfo(nombre, date_time=fecha.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED if comprimir else zipfile.ZIP_STORED
+            bloques = _leer_rango(fuente, 0, os.path.getsize(fuente)) if isinstance(fuente, Path) else fuente
+            with archivo.open(info, 'w') as destino:
+                for bloque in bloques:
+                    destino.write(bloque)
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+            datos = salida.vaciar()
+            if datos:
+                yield datos
+    # Directorio central
+    yield salida.vaciar()
@@ -0,0 +1,201 @@
+"""
+Antigüedad de la deuda de clientes (ventas PENDIENTE o PARCIAL con saldo).
+
+Los tramos se configuran en DEUDA_TRAMOS como (clave, días máximos) en orden
+creciente; el último lleva None (sin tope). Cada tramo cubre las ventas con
+más días que el tramo anterior y hasta sus días máximos.
+
+antiguedad_deuda() calcula todos los tramos, el total y la cantidad en una
+sola consulta con Sum(..., filter=Q(...)); antiguedad_por_cliente() hace lo
+mismo agrupado por cliente y sucursal (exportación de deudas).
+
+Ambas trabajan sobre un Origen:
+- origen_vivo(): las ventas pendientes, envejecidas al momento actual
+- origen_snapshot(): la foto AntiguedadDeuda del día, que el comando
+  `manage.py generar_antiguedad_deuda` arma cada noche agrupando la deuda por
+  (sucursal, cliente, día de venta). Envejece por días completos al día de
+  corte y no recorre el histórico de ventas.
+origen_deuda() elige según el parámetro `fuente` ('vivo' o 'snapshot'); si no
+hay foto del día se usa la deuda en vivo. filtro_sucursal() arma el alcance
+por sucursal de los reportes.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AntiguedadDeuda, Venta
+
+ESTADOS_DEUDA = ['PENDIENTE', 'PARCIAL']
+
+FUENTES = ('vivo', 'snapshot')
+
+TRAMOS_POR_DEFECTO = [('current', 30), ('30_60', 60), ('60_90', 90), ('over_90', None)]
+
+# Origen de la deuda: queryset, campo con la fecha de venta, momento al que se
+# envejece, campos de saldo y total, agregado de cantidad y día de corte (foto)
+Origen = namedtuple('Origen', 'filas campo_fecha referencia campo_saldo campo_total cantidad corte')
+
+
+def tramos_configurados():
+    """DEUDA_TRAMOS validado: días crecientes y el último tramo sin tope"""
+    tramos = [tuple(tramo) for tramo in getattr(settings, 'DEUDA_TRAMOS', TRAMOS_POR_DEFECTO)]
+    dias = [maximo for _, maximo in tramos]
+    if not tramos or dias[-1] is not None or None in dias[:-1] or dias[:-1] != sorted(set(dias[:-1])):
+        raise ImproperlyConfigured('DEUDA_TRAMOS debe tener días máximos crecientes y terminar en None')
+    return tramos
+
+
+def etiqueta(tramos, clave):
+    """Texto del tramo para encabezados: '0-30 días', '31-60 días', 'Más de 90 días'"""
+    anterior = None
+    for actual, maximo in tramos:
+        if actual == clave:
+            if maximo is None:
+                return f'Más de {anterior} días' if anterior is not None else 'Todos'
+            return f'{0 if anterior is None else anterior + 1}-{maximo} días'
+        anterior = maximo
+    raise KeyError(clave)
+
+
+def condiciones(tramos, campo, referencia):
+    """[(clave, Q)] de cada tramo sobre `campo` según la antigüedad a `referencia`"""
+    resultado = []
+    anterior = None
+    for clave, maximo in tramos:
+        condicion = Q()
+        if maximo is not None:
+            condicion &= Q(**{f'{campo}__gte': referencia - timedelta(days=maximo)})
+        if anterior is not None:
+            condicion &= Q(**{f'{campo}__lt': referencia - timedelta(days=anterior)})
+        resultado.append((clave, condicion))
+        anterior = maximo
+    return resultado
+
+
+################################################################################### ORIGEN
+
+def origen_vivo(ventas=None, ahora=None):
+    """Ventas pendientes de `ventas` (por defecto todas) envejecidas a `ahora`"""
+    ventas = Venta.objects.all() if ventas is None else ventas
+    return Origen(
+        ventas.filter(ventEstado__in=ESTADOS_DEUDA), 'ventFecha', ahora or timezone.now(),
+        'ventSaldo', 'ventTotal', Count('ventCod'), None
+    )
+
+
+def origen_snapshot(corte=None):
+    """Foto del día `corte` (por defecto hoy), o None si no se generó"""
+    corte = corte or timezone.localdate()
+    filas = AntiguedadDeuda.objects.filter(adeuCorte=corte)
+    if not filas.exists():
+        return None
+    return Origen(filas, 'adeuDiaVenta', corte, 'adeuSaldo', 'adeuTotal', Sum('adeuCantidad'), corte)
+
+
+def filtro_sucursal(usuario, es_gerente, sucursal=None):
+    """
+    Q del alcance por sucursal: el gerente ve todas o la `sucursal` pedida y el
+    resto solo la suya. Un usuario sin sucursal filtra por sucursal nula (no ve nada
+    de otras sucursales)
+    """
+    if es_gerente:
+        return Q(sucurCod_id=sucursal) if sucursal else Q()
+    return Q(sucurCod_id=usuario.sucurCod_id)
+
+
+def origen_deuda(fuente=None, filtro=None):
+    """
+    Origen según `fuente` ('vivo' o 'snapshot', por defecto DEUDA_ANTIGUEDAD_FUENTE)
+    limitado por `filtro` (ver filtro_sucursal()) si se indica. Lanza ValueError si
+    la fuente no existe.
+    """
+    fuente = fuente or getattr(settings, 'DEUDA_ANTIGUEDAD_FUENTE', 'vivo')
+    if fuente not in FUENTES:
+        raise ValueError(f"Fuente no soportada. Use: {', '.join(FUENTES)}")
+
+    origen = origen_snapshot() if fuente == 'snapshot' else None
+    if origen is None:
+        origen = origen_vivo()
+    if filtro is not None:
+        origen = origen._replace(filas=origen.filas.filter(filtro))
+    return origen
+
+
+################################################################################### CÁLCULO
+
+def _agregados(origen, tramos, prefijo=''):
+    agregados = {
+        f'{prefijo}{clave}': Sum(origen.campo_saldo, filter=condicion, default=0)
+        for clave, condicion in condiciones(tramos, origen.campo_fecha, origen.referencia)
+    }
+    agregados['total_deuda'] = Sum(origen.campo_saldo, default=0)
+    return agregados
+
+
+def antiguedad_deuda(origen, tramos=None):
+    """
+    {'total', 'count', 'tramos': {clave: monto}} de la deuda del origen,
+    en una sola consulta
+    """
+    tramos = tramos or tramos_configurados()
+    fila = origen.filas.order_by().aggregate(cantidad=origen.cantidad, **_agregados(origen, tramos))
+    return {
+        'total': float(fila['total_deuda'] or 0),
+        'count': fila['cantidad'] or 0,
+        'tramos': {clave: float(fila[clave] or 0) for clave, _ in tramos},
+    }
+
+
+def antiguedad_por_cliente(origen, tramos=None):
+    """
+    values() por (cliente, documento, sucursal) con total_compras, cantidad_ventas,
+    total_deuda y deuda_<clave> por tramo, ordenado por la deuda mayor
+    """
+    tramos = tramos or tramos_configurados()
+    return origen.filas.values('cliNombreCom', 'cliDocNum', 'sucurCod__sucurNom').annotate(
+        total_compras=Sum(origen.campo_total),
+        cantidad_ventas=origen.cantidad,
+        **_agregados(origen, tramos, prefijo='deuda_')
+    ).order_by('-total_deuda', 'cliNombreCom')
+
+
+################################################################################### FOTO
+
+def generar_snapshot(corte=None, tamanio_lote=1000):
+    """
+    Rearma la foto del día `corte` (por defecto hoy) con la deuda pendiente
+    agrupada por (sucursal, cliente, día de venta). Retorna las filas creadas.
+    """
+    corte = corte or timezone.localdate()
+    grupos = (
+        Venta.objects.filter(ventEstado__in=ESTADOS_DEUDA)
+        .annotate(dia=TruncDate('ventFecha'))
+        .values('sucurCod_id', 'cliNombreCom', 'cliDocNum', 'dia')
+        .annotate(cantidad=Count('ventCod'), total=Sum('ventTotal'), saldo=Sum('ventSaldo'))
+        .order_by()
+    )
+
+    creadas = 0
+    with transaction.atomic():
+        AntiguedadDeuda.objects.filter(adeuCorte=corte).delete()
+        lote = []
+        for grupo in grupos.iterator(chunk_size=tamanio_lote):
+            lote.append(AntiguedadDeuda(
+                adeuCorte=corte, sucurCod_id=grupo['sucurCod_id'],
+                cliNombreCom=grupo['cliNombreCom'], cliDocNum=grupo['cliDocNum'],
+                adeuDiaVenta=grupo['dia'], adeuCantidad=grupo['cantidad'],
+                adeuTotal=grupo['total'] or 0, adeuSaldo=grupo['saldo'] or 0
+            ))
+            if len(lote) >= tamanio_lote:
+                AntiguedadDeuda.objects.bulk_create(lote)
+                creadas += len(lote)
+                lote = []
+        AntiguedadDeuda.objects.bulk_create(lote)
+        creadas += len(lote)
+    return creadas
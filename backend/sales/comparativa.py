@@ -0,0 +1,159 @@
+"""
+Comparativa entre sucursales: ventas del rango y valor de inventario de cada una.
+
+comparar_sucursales() resuelve todas las sucursales con dos consultas agrupadas,
+sin importar cuántas haya:
+- sucursales con su valor de inventario (subconsulta agrupada por sucursal)
+- totales de ventas por sucursal desde el resumen diario (VentaResumenDiario)
+
+El resultado se cachea por (rango de fechas, alcance) con COMPARATIVA_CACHE_TTL.
+La clave lleva la suma de las versiones guardadas en la base (VersionCache), no en
+la caché: así la comparten todos los workers aunque cada uno tenga su LocMemCache.
+Hay una versión general (sucursales y precios) y una por sucursal (sus ventas y
+su stock); el alcance suma la general y las de sus sucursales, así que una venta
+en una sucursal no descarta lo cacheado para otra.
+
+programar_invalidacion() anota la sucursal afectada y, al confirmar la
+transacción, incrementa sus versiones con un solo UPDATE por transacción aunque
+se guarden muchas filas. La llaman sales/signals.py y el resumen diario de ventas
+(sales/hechos.py) cuando cambia lo que muestra la comparativa.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+
+from Branch.models import Branch
+from inventory.models import BranchInventory
+
+from .hechos import como_fecha, resumen_diario
+from .models import VersionCache
+
+CLAVE_VERSION = 'comparativa_sucursales:version'
+
+
+def _clave_version(sucursal=None):
+    return f'{CLAVE_VERSION}:{sucursal}' if sucursal else CLAVE_VERSION
+
+
+def _version(sucursales):
+    """Suma de las versiones que afectan al alcance (crece con cualquier invalidación)"""
+    versiones = VersionCache.objects.filter(vcacClave__startswith=CLAVE_VERSION)
+    if sucursales:
+        versiones = versiones.filter(vcacClave__in=[_clave_version()] + [_clave_version(s) for s in sucursales])
+    return sum(versiones.values_list('vcacVersion', flat=True))
+
+
+def _clave(desde, hasta, sucursales):
+    alcance = ','.join(str(s) for s in sorted(sucursales)) if sucursales else 'todas'
+    return f'comparativa_sucursales:{_version(sucursales)}:{desde or ""}:{hasta or ""}:{alcance}'
+
+
+def invalidar_comparativa(sucursales=None):
+    """
+    Descarta las comparativas cacheadas que incluyen `sucursales` (por defecto
+    todas). Llamar tras confirmar la escritura; ver programar_invalidacion().
+    """
+    claves = [_clave_version(s) for s in sucursales] if sucursales else [_clave_version()]
+    actualizadas = VersionCache.objects.filter(vcacClave__in=claves).update(vcacVersion=F('vcacVersion') + 1)
+    if actualizadas < len(claves):
+        # Aún no existen: al crearlas la suma ya cambia
+        existentes = set(VersionCache.objects.filter(vcacClave__in=claves).values_list('vcacClave', flat=True))
+        VersionCache.objects.bulk_create(
+            [VersionCache(vcacClave=clave, vcacVersion=1) for clave in claves if clave not in existentes],
+            ignore_conflicts=True
+        )
+
+
+class _InvalidacionPendiente:
+    """Sucursales a invalidar al confirmar la transacción (None en el conjunto = todas)"""
+
+    def __init__(self):
+        self.sucursales = set()
+        self.ejecutada = False
+
+    def __call__(self):
+        self.ejecutada = True
+        invalidar_comparativa(None if None in self.sucursales else sorted(self.sucursales))
+
+
+def programar_invalidacion(sucursal=None):
+    """
+    Invalida la comparativa de `sucursal` (None = todas) al confirmar la
+    transacción en curso, o al instante fuera de una. Las llamadas de la misma
+    transacción se juntan en una sola invalidación.
+    """
+    conexion = transaction.get_connection()
+    pendiente = getattr(conexion, 'comparativa_pendiente', None)
+    # Si la transacción se deshizo, su callback ya no está en la cola
+    if pendiente is None or pendiente.ejecutada or not any(
+        funcion is pendiente for _, funcion, _ in conexion.run_on_commit
+    ):
+        pendiente = conexion.comparativa_pendiente = _InvalidacionPendiente()
+        pendiente.sucursales.add(sucursal)
+        transaction.on_commit(pendiente)
+    else:
+        pendiente.sucursales.add(sucursal)
+
+
+def _calcular(desde, hasta, sucursales):
+    valor_inventario = BranchInventory.objects.filter(sucurCod=OuterRef('pk')).order_by().values(
+        'sucurCod'
+    ).annotate(
+        total=Sum(F('invStock') * F('prodCod__prodValorUni'))
+    ).values('total')
+
+    filas = Branch.objects.annotate(
+        valor_inventario=Subquery(valor_inventario, output_field=DecimalField(max_digits=14, decimal_places=2))
+    ).values('sucurCod', 'sucurNom', 'valor_inventario').order_by('sucurCod')
+
+    resumen = resumen_diario(desde, hasta)
+    if sucursales:
+        filas = filas.filter(sucurCod__in=sucursales)
+        resumen = resumen.filter(sucurCod_id__in=sucursales)
+
+    ventas = {
+        fila['sucurCod_id']: fila
+        for fila in resumen.values('sucurCod_id').annotate(
+            total_ventas=Sum('vresTotal'),
+            cantidad_ventas=Sum('vresCantidad'),
+            total_por_cobrar=Sum('vresSaldo')
+        ).order_by()
+    }
+
+    comparativa = []
+    for sucursal in filas:
+        stats = ventas.get(sucursal['sucurCod'], {})
+        cantidad = stats.get('cantidad_ventas') or 0
+        total = stats.get('total_ventas') or 0
+        comparativa.append({
+            'branch_id': sucursal['sucurCod'],
+            'branch_name': sucursal['sucurNom'],
+            'total_ventas': float(total),
+            'cantidad_ventas': cantidad,
+            'promedio_venta': float(total / cantidad) if cantidad else 0.0,
+            'total_por_cobrar': float(stats.get('total_por_cobrar') or 0),
+            'valor_inventario': float(sucursal['valor_inventario'] or 0),
+        })
+    return comparativa
+
+
+def comparar_sucursales(desde=None, hasta=None, sucursales=None):
+    """
+    Lista de dicts por sucursal (branch_id, branch_name, total_ventas, cantidad_ventas,
+    promedio_venta, total_por_cobrar, valor_inventario). `desde`/`hasta` son días
+    inclusive; `sucursales` limita el alcance a esos códigos (None = todas).
+    Lanza ValueError si algún código no es numérico.
+    """
+    desde, hasta = como_fecha(desde), como_fecha(hasta)
+    try:
+        sucursales = [int(s) for s in sucursales] if sucursales else None
+    except (TypeError, ValueError):
+        raise ValueError('branch_id debe ser un número')
+
+    clave = _clave(desde, hasta, sucursales)
+    comparativa = cache.get(clave)
+    if comparativa is None:
+        comparativa = _calcular(desde, hasta, sucursales)
+        cache.set(clave, comparativa, getattr(settings, 'COMPARATIVA_CACHE_TTL', 300))
+    return comparativa
@@ -0,0 +1,113 @@
+"""
+Conciliación del estado SUNAT de comprobantes enviados de forma asíncrona.
+
+Los comprobantes con ticket y sin respuesta final (ENVIADO/OBSERVADO/RECHAZADO)
+se recorren por lotes acotados usando el índice compr_por_conciliar_idx. Cada
+ticket distinto se consulta una vez (un resumen diario agrupa muchas boletas;
+su resultado también queda en ResumenDiario), las consultas HTTP van en un pool
+de hilos y los resultados se escriben con un solo bulk_update por lote.
+"""
+import base64
+from concurrent.futures import ThreadPoolExecutor
+
+from django.utils import timezone
+
+from .almacen import almacen, nombre_cdr
+from .models import Comprobante, ResumenDiario
+
+ESTADOS_POR_CONCILIAR = ['ENVIADO', 'OBSERVADO', 'RECHAZADO']
+
+CAMPOS_CONCILIACION = [
+    'comprEstadoSUNAT', 'comprMensajeSUNAT', 'comprCodigoRespuesta', 'comprFechaRespuesta',
+] + Comprobante.campos_artefacto('cdr')
+
+
+def por_conciliar():
+    return Comprobante.objects.filter(
+        comprEstadoSUNAT__in=ESTADOS_POR_CONCILIAR,
+        comprFechaRespuesta__isnull=True,
+    ).exclude(comprTicket='')
+
+
+def siguiente_lote(desde, limite):
+    """Comprobantes por conciliar con comprCod > desde (recorrido por clave, sin OFFSET)"""
+    return list(
+        por_conciliar()
+        .filter(comprCod__gt=desde)
+        .order_by('comprCod')
+        .only('comprCod', 'comprSerie', 'comprCorrelativo', 'comprTicket', *CAMPOS_CONCILIACION)[:limite]
+    )
+
+
+def _consultar(cliente, ticket):
+    try:
+        return ticket, cliente.interpretar_ticket(cliente.consultar_ticket(ticket)), None
+    except Exception as e:
+        return ticket, None, str(e)
+
+
+def conciliar_lote(comprobantes, concurrencia=4, cliente=None):
+    """
+    Consulta los tickets del lote y guarda los resultados finales.
+    Retorna un dict {estado: cantidad} con 'EN_PROCESO' y 'ERROR' para los que siguen igual.
+    """
+    from .sunat_client import SunatClient
+
+    cliente = cliente or SunatClient()
+    por_ticket = {}
+    for comprobante in comprobantes:
+        por_ticket.setdefault(comprobante.comprTicket, []).append(comprobante)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrencia)) as pool:
+        respuestas = list(pool.map(lambda ticket: _consultar(cliente, ticket), por_ticket))
+
+    ahora = timezone.now()
+    conteo = {}
+    actualizados = []
+    finales = {}
+    for ticket, resultado, error in respuestas:
+        grupo = por_ticket[ticket]
+        if resultado is None:
+            clave = 'ERROR' if error else 'EN_PROCESO'
+            conteo[clave] = conteo.get(clave, 0) + len(grupo)
+            if error:
+                print(f"⚠️ Ticket {ticket}: {error}")
+            continue
+
+        finales[ticket] = resultado
+        cdr = base64.b64decode(resultado['cdr_base64']) if resultado['cdr_base64'] else None
+        for comprobante in grupo:
+            comprobante.comprEstadoSUNAT = resultado['estado']
+            comprobante.comprMensajeSUNAT = resultado['mensaje']
+            comprobante.comprCodigoRespuesta = resultado['codigo_respuesta']
+            comprobante.comprFechaRespuesta = ahora
+            if cdr:
+                # Contenido igual para todo el ticket: el almacén lo guarda una vez
+                sha256 = almacen().guardar('cdr', nombre_cdr(comprobante), cdr)
+                comprobante.registrar_artefacto('cdr', sha256, len(cdr))
+            actualizados.append(comprobante)
+        conteo[resultado['estado']] = conteo.get(resultado['estado'], 0) + len(grupo)
+
+    if actualizados:
+        Comprobante.objects.bulk_update(actualizados, CAMPOS_CONCILIACION, batch_size=500)
+        _cerrar_resumenes(finales, ahora)
+    return conteo
+
+
+def _cerrar_resumenes(finales, ahora):
+    """
+    El resultado de un ticket de resumen diario también queda en el resumen.
+    Las boletas de un resumen rechazado se desvinculan: quedan RECHAZADO y se
+    pueden reenviar (reenviar_sunat) sin que el resumen lo impida.
+    """
+    resumenes = list(ResumenDiario.objects.filter(resTicket__in=finales, resEstado='ENVIADO'))
+    for resumen in resumenes:
+        resultado = finales[resumen.resTicket]
+        resumen.resEstado = resultado['estado']
+        resumen.resMensaje = resultado['mensaje']
+        resumen.resFechaRespuesta = ahora
+    if resumenes:
+        ResumenDiario.objects.bulk_update(resumenes, ['resEstado', 'resMensaje', 'resFechaRespuesta'])
+        rechazados = [resumen.pk for resumen in resumenes if resumen.resEstado == 'RECHAZADO']
+        if rechazados:
+            Comprobante.objects.filter(resCod__in=rechazados).update(resCod=None)
@@ -0,0 +1,216 @@
+"""
+Exportación de reportes en streaming: CSV, CSV comprimido (gzip), JSON Lines y XLSX.
+
+- Las filas se leen con values_list().iterator(chunk_size): en PostgreSQL es un
+  cursor del lado del servidor, nunca se cargan instancias ni el resultado entero.
+- Cada escritor es un generador de bloques de bytes (unas BLOQUE_FILAS filas
+  por bloque) que se entrega a un StreamingHttpResponse.
+- El XLSX se escribe a mano (hoja con cadenas en línea, sin tabla de cadenas
+  compartidas) dentro de zip_en_flujo, así tampoco depende del número de filas.
+- Dentro de un trabajo (sales/trabajos.py) se informa el avance en filas.
+
+Una exportación se describe con columnas (título, campo) o (título, campo, convertir):
+`campo` va a values_list() y `convertir` (opcional) transforma el valor leído.
+"""
+import csv
+import io
+import json
+import re
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .almacen import zip_en_flujo
+from .trabajos import progreso_actual
+
+BLOQUE_FILAS = 500
+FILAS_POR_CONSULTA = 2000
+
+
+def filas_exportacion(queryset, columnas, chunk_size=FILAS_POR_CONSULTA):
+    """Tuplas ya convertidas, leídas por bloques de chunk_size (informa el avance si corre en un trabajo)"""
+    convertidores = [(i, columna[2]) for i, columna in enumerate(columnas) if len(columna) > 2 and columna[2]]
+    progreso = progreso_actual()
+    if progreso:
+        progreso.iniciar(queryset.count())
+
+    procesadas = 0
+    for fila in queryset.values_list(*[columna[1] for columna in columnas]).iterator(chunk_size=chunk_size):
+        if convertidores:
+            fila = list(fila)
+            for i, convertir in convertidores:
+                fila[i] = convertir(fila[i])
+        yield fila
+        procesadas += 1
+        if progreso:
+            progreso.avanzar(procesadas)
+    if progreso:
+        progreso.avanzar(procesadas, forzar=True)
+
+
+def fecha_local(formato):
+    """Convertidor de datetime a texto en la hora local"""
+    return lambda valor: timezone.localtime(valor).strftime(formato) if valor else ''
+
+
+def por_defecto(texto):
+    """Convertidor que reemplaza vacíos por `texto`"""
+    return lambda valor: valor if valor not in (None, '') else texto
+
+
+################################################################################### ESCRITORES
+
+def escribir_csv(titulos, filas):
+    """Bloques de texto CSV (UTF-8 con BOM para Excel)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(titulos)
+    for i, fila in enumerate(filas, start=1):
+        writer.writerow(fila)
+        if i % BLOQUE_FILAS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def escribir_csv_gz(titulos, filas):
+    """El mismo CSV comprimido en formato gzip a medida que se genera"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in escribir_csv(titulos, filas):
+        datos = compresor.compress(bloque)
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def escribir_jsonl(titulos, filas, claves=None):
+    """Un objeto JSON por línea; las claves son los campos (o los títulos si no se indican)"""
+    claves = claves or titulos
+    lineas = []
+    for fila in filas:
+        lineas.append(json.dumps(dict(zip(claves, fila)), cls=DjangoJSONEncoder, ensure_ascii=False))
+        if len(lineas) == BLOQUE_FILAS:
+            yield ('\n'.join(lineas) + '\n').encode('utf-8')
+            lineas.clear()
+    if lineas:
+        yield ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_TIPOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_LIBRO_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _celda_xlsx(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor).strftime('%Y-%m-%d %H:%M') if timezone.is_aware(valor) else valor.isoformat()
+    elif isinstance(valor, date):
+        valor = valor.isoformat()
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _hoja_xlsx(titulos, filas):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row>' + ''.join(_celda_xlsx(t) for t in titulos) + '</row>'
+    ).encode('utf-8')
+    partes = []
+    for fila in filas:
+        partes.append('<row>' + ''.join(_celda_xlsx(v) for v in fila) + '</row>')
+        if len(partes) == BLOQUE_FILAS:
+            yield ''.join(partes).encode('utf-8')
+            partes.clear()
+    partes.append('</sheetData></worksheet>')
+    yield ''.join(partes).encode('utf-8')
+
+
+def escribir_xlsx(titulos, filas, hoja='Reporte'):
+    """Libro XLSX de una hoja escrito en streaming (solo escritura, sin estilos)"""
+    ahora = timezone.localtime()
+    entradas = [
+        ('[Content_Types].xml', ahora, [_XLSX_TIPOS.encode('utf-8')], True),
+        ('_rels/.rels', ahora, [_XLSX_RELS.encode('utf-8')], True),
+        ('xl/workbook.xml', ahora, [_XLSX_LIBRO.format(hoja=escape(hoja[:31])).encode('utf-8')], True),
+        ('xl/_rels/workbook.xml.rels', ahora, [_XLSX_LIBRO_RELS.encode('utf-8')], True),
+        ('xl/worksheets/sheet1.xml', ahora, _hoja_xlsx(titulos, filas), True),
+    ]
+    return zip_en_flujo(entradas)
+
+
+# formato -> (escritor, content_type, extensión)
+FORMATOS = {
+    'csv': (escribir_csv, 'text/csv; charset=utf-8', 'csv'),
+    'csv.gz': (escribir_csv_gz, 'application/gzip', 'csv.gz'),
+    'jsonl': (escribir_jsonl, 'application/x-ndjson; charset=utf-8', 'jsonl'),
+    'xlsx': (escribir_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+def respuesta_exportacion(queryset, columnas, formato, nombre):
+    """
+    StreamingHttpResponse con la exportación de `queryset` en `formato`
+    (ver FORMATOS). `nombre` es el nombre del archivo sin extensión.
+    Lanza ValueError si el formato no existe.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado. Use: {', '.join(FORMATOS)}")
+    escritor, content_type, extension = FORMATOS[formato]
+
+    titulos = [columna[0] for columna in columnas]
+    filas = filas_exportacion(queryset, columnas)
+    if escritor is escribir_jsonl:
+        bloques = escritor(titulos, filas, claves=[columna[1] for columna in columnas])
+    else:
+        bloques = escritor(titulos, filas)
+
+    respuesta = StreamingHttpResponse(bloques, content_type=content_type)
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{extension}"'
+    return respuesta
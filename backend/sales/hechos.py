@@ -0,0 +1,305 @@
+"""
+Tablas de hechos para reportes.
+
+VentaResumenDiario guarda, por (día, sucursal, vendedor, forma de pago, estado),
+la cantidad de ventas y sus totales. Venta.save() llama a registrar_venta() con
+los valores anteriores de la fila (leídos con bloqueo) y los nuevos: se resta el
+aporte anterior y se suma el nuevo en la misma transacción. Si ambos caen en la
+misma clave basta un UPDATE con la diferencia.
+
+VentaProductoDiario guarda, por (día, sucursal, producto), unidades, importes y
+costo. El costo sale de VentaDetalle.ventDetCostoUni (copiado del producto al
+vender), así que al anular o modificar un detalle se resta exactamente lo que
+sumó; solo los detalles antiguos sin costo usan el costo promedio de la fila.
+
+reconstruir_resumen_diario() y reconstruir_resumen_productos() rearman un rango
+de días desde la tabla venta (histórico previo a las tablas o cambios hechos con
+QuerySet.update()).
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Venta, VentaDetalle, VentaProductoDiario, VentaResumenDiario
+
+# Campos de la venta que definen su aporte al resumen
+CAMPOS_VENTA = [
+    'ventFecha', 'sucurCod_id', 'usuCod_id', 'ventFormaPago', 'ventEstado',
+    'ventSubTotal', 'ventIGV', 'ventTotal', 'ventAdelanto', 'ventSaldo',
+]
+
+# Columna del resumen <- campo de la venta
+MEDIDAS = {
+    'vresSubTotal': 'ventSubTotal',
+    'vresIGV': 'ventIGV',
+    'vresTotal': 'ventTotal',
+    'vresAdelanto': 'ventAdelanto',
+    'vresSaldo': 'ventSaldo',
+}
+
+
+def aporte(valores):
+    """(clave, medidas) con que una venta (dict con CAMPOS_VENTA) entra al resumen"""
+    clave = {
+        'vresFecha': timezone.localdate(valores['ventFecha']),
+        'sucurCod_id': valores['sucurCod_id'],
+        'usuCod_id': valores['usuCod_id'],
+        'vresFormaPago': valores['ventFormaPago'],
+        'vresEstado': valores['ventEstado'],
+    }
+    medidas = {'vresCantidad': 1}
+    medidas.update({columna: Decimal(valores[campo] or 0) for columna, campo in MEDIDAS.items()})
+    return clave, medidas
+
+
+def _sumar(clave, medidas, modelo=VentaResumenDiario):
+    """Suma `medidas` a la fila de `clave`, creándola si no existe"""
+    incrementos = {columna: F(columna) + valor for columna, valor in medidas.items() if valor}
+    if not incrementos:
+        return
+    if modelo.objects.filter(**clave).update(**incrementos):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**clave, **medidas)
+    except IntegrityError:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        modelo.objects.filter(**clave).update(**incrementos)
+
+
+def registrar_venta(anterior, nuevo):
+    """
+    Aplica al resumen el cambio de una venta. `anterior` y `nuevo` son dicts con
+    CAMPOS_VENTA (None si la venta no existía o se eliminó). Llamar dentro de la
+    transacción que guarda la venta.
+    """
+    clave_anterior, medidas_anteriores = aporte(anterior) if anterior else (None, {})
+    clave_nueva, medidas_nuevas = aporte(nuevo) if nuevo else (None, {})
+
+    if clave_anterior == clave_nueva:
+        _sumar(clave_nueva, {c: v - medidas_anteriores[c] for c, v in medidas_nuevas.items()})
+    else:
+        if clave_anterior:
+            _sumar(clave_anterior, {c: -v for c, v in medidas_anteriores.items()})
+        if clave_nueva:
+            _sumar(clave_nueva, medidas_nuevas)
+
+    # Solo si cambió lo que muestra la comparativa entre sucursales
+    antes, despues = _aporte_comparativa(anterior), _aporte_comparativa(nuevo)
+    if antes != despues:
+        from .comparativa import programar_invalidacion
+        for sucursal in {valores[0] for valores in (antes, despues) if valores}:
+            programar_invalidacion(sucursal)
+
+
+def _aporte_comparativa(valores):
+    """(sucursal, día, total, saldo) que la venta suma a la comparativa; None si no suma"""
+    if not valores:
+        return None
+    clave, medidas = aporte(valores)
+    if clave['vresEstado'] == 'ANULADO':
+        return None
+    return clave['sucurCod_id'], clave['vresFecha'], medidas['vresTotal'], medidas['vresSaldo']
+
+
+def valores_venta(venta):
+    return {campo: getattr(venta, campo) for campo in CAMPOS_VENTA}
+
+
+def reconstruir_resumen_diario(desde, hasta):
+    """
+    Rearma el resumen de los días [desde, hasta] (fechas locales) desde la tabla venta.
+    Reemplaza las filas del rango en una transacción; retorna la cantidad de filas creadas.
+    """
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+    grupos = (
+        Venta.objects.filter(ventFecha__gte=inicio, ventFecha__lt=fin)
+        .annotate(dia=TruncDate('ventFecha'))
+        .values('dia', 'sucurCod_id', 'usuCod_id', 'ventFormaPago', 'ventEstado')
+        .annotate(
+            cantidad=Count('ventCod'),
+            **{columna: Sum(campo) for columna, campo in MEDIDAS.items()}
+        )
+        .order_by()
+    )
+    filas = [
+        VentaResumenDiario(
+            vresFecha=grupo['dia'],
+            sucurCod_id=grupo['sucurCod_id'],
+            usuCod_id=grupo['usuCod_id'],
+            vresFormaPago=grupo['ventFormaPago'],
+            vresEstado=grupo['ventEstado'],
+            vresCantidad=grupo['cantidad'],
+            **{columna: grupo[columna] or 0 for columna in MEDIDAS},
+        )
+        for grupo in grupos
+    ]
+
+    with transaction.atomic():
+        VentaResumenDiario.objects.filter(vresFecha__gte=desde, vresFecha__lte=hasta).delete()
+        VentaResumenDiario.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+################################################################################### PRODUCTOS
+
+def _clave_producto(venta, producto_id):
+    return {
+        'vprodFecha': timezone.localdate(venta.ventFecha),
+        'sucurCod_id': venta.sucurCod_id,
+        'prodCod_id': producto_id,
+    }
+
+
+def _por_producto(detalles):
+    """
+    Medidas agrupadas por producto de los detalles no anulados. 'vprodCosto' queda
+    en None si algún detalle del grupo no tiene costo guardado (ventas antiguas).
+    """
+    grupos = {}
+    for detalle in detalles:
+        if detalle.ventDetAnulado:
+            continue
+        medidas = grupos.setdefault(detalle.prodCod_id, {
+            'vprodCantidad': 0, 'vprodSubTotal': Decimal('0'), 'vprodIGV': Decimal('0'),
+            'vprodTotal': Decimal('0'), 'vprodCosto': Decimal('0'),
+        })
+        medidas['vprodCantidad'] += detalle.ventDetCantidad
+        medidas['vprodSubTotal'] += detalle.ventDetSubtotal
+        medidas['vprodIGV'] += detalle.ventDetIGV
+        medidas['vprodTotal'] += detalle.ventDetTotal
+        if detalle.ventDetCostoUni is None or medidas['vprodCosto'] is None:
+            medidas['vprodCosto'] = None
+        else:
+            medidas['vprodCosto'] += detalle.ventDetCantidad * Decimal(detalle.ventDetCostoUni)
+    return grupos
+
+
+def sumar_detalles(venta, detalles):
+    """Suma detalles nuevos al resumen por producto (un UPDATE o INSERT por producto)"""
+    for producto_id, medidas in _por_producto(detalles).items():
+        medidas['vprodCosto'] = (medidas['vprodCosto'] or Decimal('0')).quantize(Decimal('0.01'))
+        _sumar(_clave_producto(venta, producto_id), medidas, VentaProductoDiario)
+
+
+def restar_detalles(venta, detalles):
+    """Quita detalles anulados o modificados del resumen por producto"""
+    for producto_id, medidas in _por_producto(detalles).items():
+        clave = _clave_producto(venta, producto_id)
+        if medidas['vprodCosto'] is None:
+            # Detalle sin costo guardado: se resta su parte del costo promedio de la fila
+            fila = VentaProductoDiario.objects.select_for_update().filter(**clave).values(
+                'vprodCantidad', 'vprodCosto'
+            ).first()
+            medidas['vprodCosto'] = Decimal('0')
+            if fila and fila['vprodCantidad'] > 0:
+                unidades = min(medidas['vprodCantidad'], fila['vprodCantidad'])
+                medidas['vprodCosto'] = fila['vprodCosto'] * unidades / fila['vprodCantidad']
+        medidas['vprodCosto'] = medidas['vprodCosto'].quantize(Decimal('0.01'))
+        _sumar(clave, {columna: -valor for columna, valor in medidas.items()}, VentaProductoDiario)
+
+
+def reconstruir_resumen_productos(desde, hasta):
+    """
+    Rearma el resumen por producto de los días [desde, hasta] desde venta_detalle,
+    con el costo guardado en cada detalle (ver completar_costo_detalles).
+    """
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+
+    grupos = (
+        VentaDetalle.objects.filter(
+            ventCod__ventFecha__gte=inicio, ventCod__ventFecha__lt=fin, ventDetAnulado=False
+        )
+        .annotate(dia=TruncDate('ventCod__ventFecha'))
+        .values('dia', 'ventCod__sucurCod_id', 'prodCod_id')
+        .annotate(
+            cantidad=Sum('ventDetCantidad'),
+            subtotal=Sum('ventDetSubtotal'),
+            igv=Sum('ventDetIGV'),
+            total=Sum('ventDetTotal'),
+            costo=Sum(F('ventDetCantidad') * F('ventDetCostoUni')),
+        )
+        .order_by()
+    )
+    filas = [
+        VentaProductoDiario(
+            vprodFecha=grupo['dia'],
+            sucurCod_id=grupo['ventCod__sucurCod_id'],
+            prodCod_id=grupo['prodCod_id'],
+            vprodCantidad=grupo['cantidad'],
+            vprodSubTotal=grupo['subtotal'] or 0,
+            vprodIGV=grupo['igv'] or 0,
+            vprodTotal=grupo['total'] or 0,
+            vprodCosto=Decimal(grupo['costo'] or 0).quantize(Decimal('0.01')),
+        )
+        for grupo in grupos
+    ]
+
+    with transaction.atomic():
+        VentaProductoDiario.objects.filter(vprodFecha__gte=desde, vprodFecha__lte=hasta).delete()
+        VentaProductoDiario.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+################################################################################### CONSULTAS
+
+def como_fecha(valor):
+    """date a partir de date/datetime o texto 'AAAA-MM-DD[...]'; None si no se puede leer"""
+    if isinstance(valor, datetime):
+        return timezone.localdate(valor) if timezone.is_aware(valor) else valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return parse_date(str(valor)[:10]) if valor else None
+    except ValueError:
+        return None
+
+
+def resumen_diario(desde=None, hasta=None, incluir_anuladas=False):
+    """Filas del resumen en el rango de días (ambos inclusive), sin ventas anuladas por defecto"""
+    filas = VentaResumenDiario.objects.all()
+    desde, hasta = como_fecha(desde), como_fecha(hasta)
+    if desde:
+        filas = filas.filter(vresFecha__gte=desde)
+    if hasta:
+        filas = filas.filter(vresFecha__lte=hasta)
+    if not incluir_anuladas:
+        filas = filas.exclude(vresEstado='ANULADO')
+    return filas
+
+
+def resumen_productos(desde=None, hasta=None):
+    """Filas del resumen por producto en el rango de días (ambos inclusive)"""
+    filas = VentaProductoDiario.objects.all()
+    desde, hasta = como_fecha(desde), como_fecha(hasta)
+    if desde:
+        filas = filas.filter(vprodFecha__gte=desde)
+    if hasta:
+        filas = filas.filter(vprodFecha__lte=hasta)
+    return filas
+
+
+def clasificar_abc(filas, campo='ingresos', corte_a=80, corte_b=95):
+    """
+    Clasificación ABC de filas (dicts) por `campo`: A hasta el corte_a % acumulado,
+    B hasta corte_b %, el resto C. Agrega 'participacion', 'acumulado' y 'clase'.
+    """
+    filas = sorted(filas, key=lambda fila: float(fila[campo] or 0), reverse=True)
+    total = sum(float(fila[campo] or 0) for fila in filas)
+    acumulado = 0.0
+    for fila in filas:
+        participacion = float(fila[campo] or 0) * 100 / total if total else 0.0
+        # La clase se decide por el acumulado antes de sumar el producto
+        fila['clase'] = 'A' if acumulado < corte_a else 'B' if acumulado < corte_b else 'C'
+        acumulado += participacion
+        fila['participacion'] = round(participacion, 2)
+        fila['acumulado'] = round(acumulado, 2)
+    return filas
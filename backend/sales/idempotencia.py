@@ -0,0 +1,137 @@
+"""
+Soporte de la cabecera Idempotency-Key para los POST de ventas.
+
+Los terminales reintentan cuando la respuesta tarda. Con la cabecera, el primer
+intento guarda su respuesta y los reintentos la reciben tal cual:
+- misma clave y misma petición ya completada -> respuesta guardada (Idempotent-Replayed: true)
+- misma clave mientras el primer intento sigue en curso -> 409
+- misma clave y el intento en curso superó IDEMPOTENCIA_PROCESANDO_SEGUNDOS
+  (worker caído o timeout) -> el reintento retoma la clave y ejecuta la operación
+- misma clave con otra petición (cuerpo o ruta distintos) -> 422
+Solo se guardan respuestas 2xx; un error deja la clave libre para reintentar.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import RespuestaIdempotente
+
+CABECERA = 'Idempotency-Key'
+
+
+def _huella(request):
+    datos = request.data
+    if hasattr(datos, 'lists'):
+        datos = dict(datos.lists())
+    contenido = json.dumps(
+        [request.method, request.path, datos], sort_keys=True, default=str
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def idempotente(vista):
+    """Decorador para acciones POST de un ViewSet"""
+
+    @wraps(vista)
+    def envoltura(self, request, *args, **kwargs):
+        clave = request.headers.get(CABECERA)
+        if not clave or not request.user.is_authenticated:
+            return vista(self, request, *args, **kwargs)
+
+        if len(clave) > 255:
+            return Response(
+                {'error': f'{CABECERA} no puede superar 255 caracteres.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        huella = _huella(request)
+        ahora = timezone.now()
+        horas = getattr(settings, 'IDEMPOTENCIA_TTL_HORAS', 24)
+        # El plazo propio identifica al dueño del intento: si otro lo retoma, este ya no escribe
+        plazo = ahora + timedelta(seconds=getattr(settings, 'IDEMPOTENCIA_PROCESANDO_SEGUNDOS', 120))
+
+        RespuestaIdempotente.objects.filter(
+            usuCod=request.user, idemClave=clave, idemExpira__lte=ahora
+        ).delete()
+
+        try:
+            with transaction.atomic():
+                registro = RespuestaIdempotente.objects.create(
+                    usuCod=request.user,
+                    idemClave=clave,
+                    idemHuella=huella,
+                    idemExpira=ahora + timedelta(hours=horas),
+                    idemProcesandoHasta=plazo
+                )
+        except IntegrityError:
+            registro = _retomar_abandonado(request.user, clave, huella, ahora, plazo)
+            if registro is None:
+                return _responder_existente(request.user, clave, huella)
+
+        propio = RespuestaIdempotente.objects.filter(pk=registro.pk, idemProcesandoHasta=plazo)
+        try:
+            respuesta = vista(self, request, *args, **kwargs)
+        except Exception:
+            propio.delete()
+            raise
+
+        if 200 <= respuesta.status_code < 300:
+            propio.update(
+                idemEstado='COMPLETADO',
+                idemCodigoHttp=respuesta.status_code,
+                idemRespuesta=respuesta.data,
+                idemProcesandoHasta=None
+            )
+        else:
+            propio.delete()
+        return respuesta
+
+    return envoltura
+
+
+def _retomar_abandonado(usuario, clave, huella, ahora, plazo):
+    """
+    Toma la clave de un intento con la misma petición que sigue PROCESANDO con
+    el plazo vencido. Un solo reintento la obtiene (UPDATE condicional).
+    """
+    tomados = RespuestaIdempotente.objects.filter(
+        Q(idemProcesandoHasta__lte=ahora) | Q(idemProcesandoHasta__isnull=True),
+        usuCod=usuario, idemClave=clave, idemHuella=huella, idemEstado='PROCESANDO'
+    ).update(idemProcesandoHasta=plazo)
+    if not tomados:
+        return None
+    return RespuestaIdempotente.objects.get(usuCod=usuario, idemClave=clave)
+
+
+def _responder_existente(usuario, clave, huella):
+    registro = RespuestaIdempotente.objects.filter(usuCod=usuario, idemClave=clave).first()
+    if registro is None:
+        # El primer intento falló y liberó la clave justo ahora
+        return Response(
+            {'error': 'La petición original no se completó. Reintente.'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    if registro.idemHuella != huella:
+        return Response(
+            {'error': f'{CABECERA} ya fue usada con una petición distinta.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    if registro.idemEstado == 'PROCESANDO':
+        return Response(
+            {'error': 'La petición original aún se está procesando.'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    respuesta = Response(registro.idemRespuesta, status=registro.idemCodigoHttp)
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
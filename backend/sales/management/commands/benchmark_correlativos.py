@@ -0,0 +1,70 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from sales.models import SerieComprobante
+
+
+class Command(BaseCommand):
+    help = 'Emite correlativos desde muchos hilos en paralelo y verifica que no haya duplicados ni huecos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emisores', type=int, default=50, help='Hilos emisores en paralelo')
+        parser.add_argument('--por-emisor', type=int, default=10, help='Correlativos que pide cada emisor')
+        parser.add_argument('--serie', default='Z999', help='Serie temporal usada para la prueba')
+
+    def handle(self, *args, **options):
+        serie = options['serie']
+        emisores = options['emisores']
+        por_emisor = options['por_emisor']
+
+        for nombre, funcion in (('max+1 (anterior)', self._emitir_max_mas_uno),
+                                ('contador de serie', self._emitir_contador)):
+            SerieComprobante.objects.filter(comprSerie=serie).delete()
+            SerieComprobante.objects.create(comprTipo='03', comprSerie=serie)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=emisores) as pool:
+                resultados = list(pool.map(lambda _: self._emisor(funcion, serie, por_emisor), range(emisores)))
+            segundos = time.perf_counter() - inicio
+
+            numeros = [n for emitidos, _ in resultados for n in emitidos]
+            errores = sum(err for _, err in resultados)
+            duplicados = sum(c - 1 for c in Counter(numeros).values() if c > 1)
+            huecos = (max(numeros) - len(set(numeros))) if numeros else 0
+
+            estilo = self.style.SUCCESS if not duplicados and not huecos else self.style.ERROR
+            self.stdout.write(estilo(
+                f"{nombre:<18} emitidos={len(numeros):>5} duplicados={duplicados:>4} "
+                f"huecos={huecos:>4} errores={errores:>3} "
+                f"throughput={len(numeros) / segundos:>8.1f}/s"
+            ))
+
+        SerieComprobante.objects.filter(comprSerie=serie).delete()
+
+    def _emisor(self, funcion, serie, cantidad):
+        emitidos, errores = [], 0
+        try:
+            for _ in range(cantidad):
+                try:
+                    with transaction.atomic():
+                        emitidos.append(funcion(serie))
+                except Exception:
+                    errores += 1
+        finally:
+            connection.close()
+        return emitidos, errores
+
+    def _emitir_contador(self, serie):
+        return SerieComprobante.asignar_correlativos('03', serie)
+
+    def _emitir_max_mas_uno(self, serie):
+        """Reproduce el patrón anterior: leer el último, sumar uno y escribir."""
+        fila = SerieComprobante.objects.get(comprTipo='03', comprSerie=serie, sucurCod__isnull=True)
+        siguiente = fila.serUltimoCorrelativo + 1
+        time.sleep(0.001)  # ventana entre lectura y escritura, como el INSERT del comprobante
+        SerieComprobante.objects.filter(pk=fila.pk).update(serUltimoCorrelativo=siguiente)
+        return siguiente
@@ -0,0 +1,159 @@
+import io
+import statistics
+import tempfile
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from Branch.models import Branch
+from User.models import User, Role
+from cash.models import Cash, CashOpening
+from inventory.models import ProductCategory, Product, BranchInventory
+from suppliers.models import Supplier
+from sales.models import Venta, Comprobante, EventoOutbox
+from sales.outbox import procesar_evento, reclamar_lote
+from sales.simulador_sunat import ConfiguracionSimulador, iniciar_en_hilo
+from sales.sunat_client import SunatClient, MetricasSunat
+
+
+class _Rollback(Exception):
+    """Se lanza al final para descartar los datos del benchmark."""
+
+
+class Command(BaseCommand):
+    help = 'Mide el throughput de emisión (pago -> comprobante -> envío SUNAT) contra el simulador'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ventas', type=int, default=100, help='Ventas a emitir')
+        parser.add_argument('--url', default=None,
+                            help='Servicio a usar; por defecto se levanta un simulador local')
+        parser.add_argument('--latencia-ms', type=int, default=50)
+        parser.add_argument('--jitter-ms', type=int, default=20)
+        parser.add_argument('--tasa-error', type=float, default=0.0)
+        parser.add_argument('--tasa-rechazo', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        servidor = None
+        url = options['url']
+        if not url:
+            servidor, url = iniciar_en_hilo(configuracion=ConfiguracionSimulador(
+                latencia_ms=options['latencia_ms'],
+                jitter_ms=options['jitter_ms'],
+                tasa_error=options['tasa_error'],
+                tasa_rechazo=options['tasa_rechazo'],
+                semilla=1,
+            ))
+
+        MetricasSunat.reiniciar()
+        resultado = {}
+        try:
+            # Los XML/CDR recibidos se escriben en un directorio temporal
+            with tempfile.TemporaryDirectory() as temporal, \
+                    override_settings(SUNAT_SERVICE_URL=url, SUNAT_ARTIFACTS_DIR=temporal):
+                with redirect_stdout(io.StringIO()), transaction.atomic():
+                    resultado = self._medir(options['ventas'])
+                    raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            if servidor:
+                servidor.shutdown()
+                servidor.server_close()
+
+        ventas = options['ventas']
+        self.stdout.write(f"Servicio: {url}")
+        self.stdout.write(
+            f"Emisión (pago + comprobante + outbox): {resultado['emision_s']:.2f}s "
+            f"-> {ventas / resultado['emision_s']:.1f} comprobantes/s"
+        )
+        self.stdout.write(
+            f"Envío SUNAT (worker outbox):           {resultado['envio_s']:.2f}s "
+            f"-> {ventas / resultado['envio_s']:.1f} comprobantes/s"
+        )
+        latencias = resultado['latencias_ms']
+        if latencias:
+            p95 = statistics.quantiles(latencias, n=20)[-1] if len(latencias) > 1 else latencias[0]
+            self.stdout.write(
+                f"Latencia por envío: p50={statistics.median(latencias):.1f}ms p95={p95:.1f}ms"
+            )
+        self.stdout.write(f"Estados SUNAT: {dict(resultado['estados_sunat'])}")
+        self.stdout.write(f"Eventos outbox: {dict(resultado['estados_outbox'])}")
+        for operacion, m in SunatClient.metricas().items():
+            self.stdout.write(
+                f"HTTP {operacion:<26} llamadas={m['llamadas']:>5} errores={m['errores']:>4} "
+                f"promedio={m['promedio_ms']:.1f}ms"
+            )
+        if servidor:
+            self.stdout.write(f"Simulador: {servidor.RequestHandlerClass.estado.contadores}")
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark finalizado (datos descartados)'))
+
+    def _medir(self, cantidad):
+        datos = self._crear_datos()
+        ventas = []
+        for _ in range(cantidad):
+            venta = Venta.objects.create(
+                usuCod=datos['usuario'], sucurCod=datos['sucursal'],
+                cliNombreCom='CLIENTE BENCHMARK', cliDocTipo='DNI', cliDocNum='12345678'
+            )
+            venta.agregar_detalles([{'prodCod': datos['producto'], 'ventDetCantidad': 1}])
+            ventas.append(venta)
+
+        inicio = time.perf_counter()
+        for venta in ventas:
+            venta.registrar_pago(venta.ventSaldo, 'EFECTIVO')
+        emision_s = time.perf_counter() - inicio
+
+        latencias_ms = []
+        inicio = time.perf_counter()
+        while True:
+            eventos = reclamar_lote(50)
+            if not eventos:
+                break
+            for evento in eventos:
+                t0 = time.perf_counter()
+                procesar_evento(evento)
+                latencias_ms.append((time.perf_counter() - t0) * 1000)
+        envio_s = time.perf_counter() - inicio
+
+        ids = [v.pk for v in ventas]
+        return {
+            'emision_s': emision_s,
+            'envio_s': envio_s,
+            'latencias_ms': latencias_ms,
+            'estados_sunat': Counter(
+                Comprobante.objects.filter(ventCod_id__in=ids).values_list('comprEstadoSUNAT', flat=True)
+            ),
+            'estados_outbox': Counter(EventoOutbox.objects.values_list('outEstado', flat=True)),
+        }
+
+    def _crear_datos(self):
+        sucursal = Branch.objects.create(
+            sucurNom='Sucursal Benchmark Emision', sucurDep='AREQUIPA', sucurCiu='Arequipa',
+            sucurDis='Cercado', sucurDir='Av. Benchmark 456', sucurTel='999888777'
+        )
+        rol, _ = Role.objects.get_or_create(rolNom='VENDEDOR', defaults={'rolDes': 'Vendedor', 'rolNivel': 3})
+        usuario = User.objects.create_user(
+            'bench_emision', 'bench2025', 'bench_emision@example.com',
+            usuNombreCom='Vendedor Emisión', usuDNI='87654321', usuTel='999888777',
+            sucurCod=sucursal
+        )
+        usuario.roles.add(rol)
+        caja = Cash.objects.create(sucurCod=sucursal, usuCod=usuario, cajNom='CAJA-BENCH-EMISION')
+        CashOpening.objects.create(cajCod=caja, usuCod=usuario, cajaAperMontInicial=Decimal('0'))
+
+        categoria = ProductCategory.objects.create(catproNom='Benchmark Emision')
+        proveedor = Supplier.objects.create(
+            provRuc='20999999995', provRazSocial='Proveedor Emisión', provDirec='Av. Benchmark 456',
+            provTele='999888777', provEmail='bench_emision@example.com', provCiu='Arequipa'
+        )
+        producto = Product.objects.create(
+            catproCod=categoria, provCod=proveedor, prodDescr='Producto emisión', prodMarca='BENCH',
+            prodCostoInv=Decimal('10.00'), prodValorUni=Decimal('20.00')
+        )
+        BranchInventory.objects.filter(sucurCod=sucursal, prodCod=producto).update(invStock=1_000_000)
+        return {'sucursal': sucursal, 'usuario': usuario, 'producto': producto}
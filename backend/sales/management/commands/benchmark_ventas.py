@@ -0,0 +1,127 @@
+import io
+import time
+from contextlib import redirect_stdout
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from Branch.models import Branch
+from User.models import User, Role
+from cash.models import Cash, CashOpening
+from inventory.models import ProductCategory, Product, BranchInventory
+from suppliers.models import Supplier
+from sales.models import Venta, VentaDetalle
+
+
+class _Rollback(Exception):
+    """Se lanza al final para descartar los datos del benchmark."""
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas y latencia por venta entre el registro línea a línea y el registro en lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', type=int, nargs='+', default=[1, 10, 50],
+                            help='Cantidad de líneas por venta a medir')
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Ventas registradas por cada combinación de tamaño y método')
+
+    def handle(self, *args, **options):
+        resultados = []
+        try:
+            with transaction.atomic():
+                datos = self._crear_datos(max(options['lineas']))
+                for lineas in options['lineas']:
+                    for metodo, funcion in (('linea_a_linea', self._registrar_linea_a_linea),
+                                            ('lote', self._registrar_en_lote)):
+                        resultados.append(
+                            self._medir(metodo, funcion, datos, lineas, options['repeticiones'])
+                        )
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'Líneas':>7} {'Método':<14} {'Consultas/venta':>16} {'ms/venta':>10}")
+        for r in resultados:
+            self.stdout.write(
+                f"{r['lineas']:>7} {r['metodo']:<14} {r['consultas']:>16.1f} {r['ms']:>10.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark finalizado (datos descartados)'))
+
+    def _medir(self, metodo, funcion, datos, lineas, repeticiones):
+        total_consultas = 0
+        total_segundos = 0.0
+        for _ in range(repeticiones):
+            # Los modelos imprimen trazas de depuración; no las mezclamos con el reporte
+            with redirect_stdout(io.StringIO()), CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                funcion(datos, lineas)
+                total_segundos += time.perf_counter() - inicio
+            total_consultas += len(ctx.captured_queries)
+        return {
+            'metodo': metodo,
+            'lineas': lineas,
+            'consultas': total_consultas / repeticiones,
+            'ms': total_segundos * 1000 / repeticiones,
+        }
+
+    def _nueva_venta(self, datos):
+        return Venta.objects.create(
+            usuCod=datos['usuario'],
+            sucurCod=datos['sucursal'],
+            cliNombreCom='CLIENTE BENCHMARK',
+            cliDocTipo='DNI',
+            cliDocNum='12345678',
+        )
+
+    def _registrar_linea_a_linea(self, datos, lineas):
+        """Ruta anterior: un VentaDetalle.save() por línea y recálculo final."""
+        venta = self._nueva_venta(datos)
+        for producto in datos['productos'][:lineas]:
+            VentaDetalle(ventCod=venta, prodCod=producto, ventDetCantidad=1).save()
+        venta.calcular_totales()
+        venta.save()
+
+    def _registrar_en_lote(self, datos, lineas):
+        venta = self._nueva_venta(datos)
+        venta.agregar_detalles([
+            {'prodCod': producto, 'ventDetCantidad': 1}
+            for producto in datos['productos'][:lineas]
+        ])
+
+    def _crear_datos(self, cantidad_productos):
+        with redirect_stdout(io.StringIO()):
+            sucursal = Branch.objects.create(
+                sucurNom='Sucursal Benchmark', sucurDep='AREQUIPA', sucurCiu='Arequipa',
+                sucurDis='Cercado', sucurDir='Av. Benchmark 123', sucurTel='999888777'
+            )
+            rol, _ = Role.objects.get_or_create(
+                rolNom='VENDEDOR', defaults={'rolDes': 'Vendedor', 'rolNivel': 3}
+            )
+            usuario = User.objects.create_user(
+                'bench_vendedor', 'bench2025', 'bench_vendedor@example.com',
+                usuNombreCom='Vendedor Benchmark', usuDNI='12345678', usuTel='999888777',
+                sucurCod=sucursal
+            )
+            usuario.roles.add(rol)
+            caja = Cash.objects.create(sucurCod=sucursal, usuCod=usuario, cajNom='CAJA-BENCHMARK')
+            CashOpening.objects.create(cajCod=caja, usuCod=usuario, cajaAperMontInicial=Decimal('0'))
+
+            categoria = ProductCategory.objects.create(catproNom='Benchmark')
+            proveedor = Supplier.objects.create(
+                provRuc='20999999991', provRazSocial='Proveedor Benchmark', provDirec='Av. Benchmark 123',
+                provTele='999888777', provEmail='bench@example.com', provCiu='Arequipa'
+            )
+            productos = [
+                Product.objects.create(
+                    catproCod=categoria, provCod=proveedor,
+                    prodDescr=f'Producto benchmark {i}', prodMarca='BENCH',
+                    prodCostoInv=Decimal('10.00'), prodValorUni=Decimal('20.00')
+                )
+                for i in range(cantidad_productos)
+            ]
+            BranchInventory.objects.filter(sucurCod=sucursal, prodCod__in=productos).update(invStock=1_000_000)
+
+        return {'sucursal': sucursal, 'usuario': usuario, 'productos': productos}
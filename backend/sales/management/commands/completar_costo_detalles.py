@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from inventory.models import Product
+from sales.models import VentaDetalle
+
+
+class Command(BaseCommand):
+    help = ('Completa ventDetCostoUni en los detalles de venta anteriores al campo, '
+            'con el costo actual de cada producto (por lotes)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000, help='Detalles por UPDATE')
+
+    def handle(self, *args, **options):
+        costo_producto = Subquery(
+            Product.objects.filter(pk=OuterRef('prodCod_id')).values('prodCostoInv')[:1]
+        )
+        pendientes = VentaDetalle.objects.filter(ventDetCostoUni__isnull=True).order_by('ventDetCod')
+
+        total = 0
+        desde = 0
+        while True:
+            ids = list(pendientes.filter(ventDetCod__gt=desde).values_list('ventDetCod', flat=True)[:options['lote']])
+            if not ids:
+                break
+            total += VentaDetalle.objects.filter(ventDetCod__in=ids).update(ventDetCostoUni=costo_producto)
+            desde = ids[-1]
+            self.stdout.write(f"💾 {total} detalles completados (hasta #{desde})")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Costo al vender completado en {total} detalles"))
+        if total:
+            self.stdout.write('ℹ️ Ejecute reconstruir_resumen_ventas para recalcular el costo en el resumen por producto')
@@ -0,0 +1,43 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from sales.conciliacion import conciliar_lote, siguiente_lote
+
+
+class Command(BaseCommand):
+    help = 'Concilia con consultar_ticket el estado SUNAT de los comprobantes enviados sin respuesta final'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help='Tickets consultados en paralelo')
+        parser.add_argument('--lote', type=int, default=200, help='Comprobantes por lote')
+        parser.add_argument('--intervalo', type=float, default=300.0, help='Segundos entre pasadas')
+        parser.add_argument('--una-vez', action='store_true', help='Hace una pasada completa y termina')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"🚀 Conciliación SUNAT iniciada (concurrencia={options['concurrencia']})")
+        try:
+            while True:
+                total = self._pasada(options['lote'], options['concurrencia'])
+                self.stdout.write(
+                    "📦 Pasada: " + (", ".join(f"{estado}={n}" for estado, n in sorted(total.items())) or 'sin pendientes')
+                )
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("⏹️ Conciliación detenida")
+
+        self.stdout.write(self.style.SUCCESS('✅ Conciliación SUNAT finalizada'))
+
+    def _pasada(self, lote, concurrencia):
+        """Recorre una vez todos los pendientes; lo que sigue en proceso queda para la próxima"""
+        total = Counter()
+        desde = 0
+        while True:
+            comprobantes = siguiente_lote(desde, lote)
+            if not comprobantes:
+                return total
+            total.update(conciliar_lote(comprobantes, concurrencia))
+            desde = comprobantes[-1].comprCod
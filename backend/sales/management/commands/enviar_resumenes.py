@@ -0,0 +1,50 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sales.resumen import armar_resumenes, encolar_boletas_pendientes, enviar_resumen, por_enviar
+
+
+class Command(BaseCommand):
+    help = 'Agrupa las boletas de días cerrados en resúmenes diarios y los envía a SUNAT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasta', default=None,
+                            help='Incluye boletas emitidas antes de esta fecha (AAAA-MM-DD, por defecto hoy)')
+        parser.add_argument('--incluir-hoy', action='store_true', help='Incluye también las boletas de hoy')
+        parser.add_argument('--maximo', type=int, default=None,
+                            help='Boletas por resumen (por defecto SUNAT_RESUMEN_MAX_COMPROBANTES)')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'SUNAT_RESUMEN_DIARIO', False):
+            self.stdout.write(self.style.WARNING(
+                '⚠️ SUNAT_RESUMEN_DIARIO está desactivado: las boletas se envían una por una por el outbox'
+            ))
+            # Las boletas que quedaron esperando un resumen pasan al outbox; los
+            # resúmenes ya armados se terminan de enviar
+            encoladas = encolar_boletas_pendientes()
+            self.stdout.write(f"📤 {encoladas} boletas pendientes encoladas en el outbox")
+            self._enviar()
+            return
+
+        hasta = timezone.localdate()
+        if options['hasta']:
+            try:
+                hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--hasta debe tener el formato AAAA-MM-DD')
+        if options['incluir_hoy']:
+            hasta = max(hasta, timezone.localdate() + timedelta(days=1))
+
+        creados = armar_resumenes(hasta=hasta, maximo=options['maximo'])
+        self.stdout.write(f"📋 {len(creados)} resúmenes nuevos")
+        self._enviar()
+
+    def _enviar(self):
+        resultados = Counter(enviar_resumen(resumen) for resumen in por_enviar())
+        self.stdout.write(self.style.SUCCESS(
+            "✅ Resúmenes enviados: " + (", ".join(f"{e}={n}" for e, n in sorted(resultados.items())) or 'ninguno')
+        ))
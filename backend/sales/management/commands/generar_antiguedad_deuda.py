@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sales.antiguedad import generar_snapshot
+from sales.models import AntiguedadDeuda
+
+
+class Command(BaseCommand):
+    help = ('Arma la foto del día de la deuda pendiente por cliente (deuda_antiguedad) '
+            'para el reporte de clientes y la exportación de deudas. Programar cada noche')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conservar', type=int, default=7, help='Días de fotos anteriores que se conservan')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por INSERT')
+
+    def handle(self, *args, **options):
+        corte = timezone.localdate()
+        filas = generar_snapshot(corte, tamanio_lote=max(1, options['lote']))
+
+        limite = corte - timedelta(days=max(0, options['conservar']))
+        eliminadas, _ = AntiguedadDeuda.objects.filter(adeuCorte__lt=limite).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Foto de deuda al {corte}: {filas} filas ({eliminadas} filas de fotos anteriores eliminadas)"
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from sales.models import RespuestaIdempotente
+
+
+class Command(BaseCommand):
+    help = 'Elimina las respuestas idempotentes vencidas'
+
+    def handle(self, *args, **options):
+        eliminadas, _ = RespuestaIdempotente.objects.filter(idemExpira__lte=timezone.now()).delete()
+        self.stdout.write(self.style.SUCCESS(f'✅ {eliminadas} respuestas idempotentes eliminadas'))
@@ -0,0 +1,54 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from sales.models import EventoOutbox
+from sales.outbox import procesar_evento, reclamar_lote
+
+
+class Command(BaseCommand):
+    help = 'Procesa los eventos pendientes del outbox de ventas (envío de comprobantes a SUNAT)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=4, help='Eventos procesados en paralelo')
+        parser.add_argument('--lote', type=int, default=20, help='Eventos reclamados por vuelta')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera sin trabajo')
+        parser.add_argument('--una-vez', action='store_true', help='Vacía la cola disponible y termina')
+        parser.add_argument('--reintentar-fallidos', action='store_true',
+                            help='Devuelve los eventos FALLIDO a PENDIENTE antes de empezar')
+
+    def handle(self, *args, **options):
+        if options['reintentar_fallidos']:
+            reabiertos = EventoOutbox.objects.filter(outEstado='FALLIDO').update(
+                outEstado='PENDIENTE', outIntentos=0
+            )
+            self.stdout.write(f"🔄 {reabiertos} eventos fallidos devueltos a la cola")
+
+        self.stdout.write(f"🚀 Worker outbox iniciado (concurrencia={options['concurrencia']})")
+        with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+            try:
+                while True:
+                    eventos = reclamar_lote(options['lote'])
+                    if eventos:
+                        resultados = Counter(pool.map(self._procesar, eventos))
+                        self.stdout.write(
+                            f"📦 {len(eventos)} eventos: "
+                            + ", ".join(f"{estado}={n}" for estado, n in sorted(resultados.items()))
+                        )
+                        continue
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+            except KeyboardInterrupt:
+                self.stdout.write("⏹️ Worker detenido")
+
+        self.stdout.write(self.style.SUCCESS('✅ Worker outbox finalizado'))
+
+    def _procesar(self, evento):
+        try:
+            return procesar_evento(evento)
+        finally:
+            connection.close()
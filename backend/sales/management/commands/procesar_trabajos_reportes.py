@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sales.models import TrabajoReporte
+from sales.trabajos import ejecutar_trabajo, reclamar_trabajo
+
+
+class Command(BaseCommand):
+    help = 'Procesa los reportes y exportaciones encolados (sales/trabajos.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera sin trabajo')
+        parser.add_argument('--una-vez', action='store_true', help='Vacía la cola disponible y termina')
+        parser.add_argument('--reintentar-fallidos', action='store_true',
+                            help='Devuelve los trabajos FALLIDO a PENDIENTE antes de empezar')
+
+    def handle(self, *args, **options):
+        if options['reintentar_fallidos']:
+            reabiertos = 0
+            for trabajo in TrabajoReporte.objects.filter(trabEstado='FALLIDO').order_by('trabCod'):
+                # Solo si no hay otro igual en curso (restricción única por huella)
+                if not TrabajoReporte.objects.filter(
+                    trabHuella=trabajo.trabHuella, trabEstado__in=['PENDIENTE', 'PROCESANDO']
+                ).exists():
+                    reabiertos += TrabajoReporte.objects.filter(pk=trabajo.pk).update(
+                        trabEstado='PENDIENTE', trabIntentos=0, trabFechaFin=None
+                    )
+            self.stdout.write(f"🔄 {reabiertos} trabajos fallidos devueltos a la cola")
+
+        self.stdout.write("🚀 Worker de reportes iniciado")
+        try:
+            while True:
+                trabajo = reclamar_trabajo()
+                if trabajo:
+                    inicio = time.monotonic()
+                    estado = ejecutar_trabajo(trabajo)
+                    self.stdout.write(
+                        f"📄 {trabajo.trabTipo} #{trabajo.trabCod}: {estado} ({time.monotonic() - inicio:.1f}s)"
+                    )
+                    continue
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("⏹️ Worker detenido")
+
+        self.stdout.write(self.style.SUCCESS('✅ Worker de reportes finalizado'))
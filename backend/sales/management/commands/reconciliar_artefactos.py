@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+
+from sales.almacen import almacen, nombre_cdr, nombre_xml, ubicacion_objeto
+from sales.models import Comprobante
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de XML/CDR de los comprobantes a partir del almacén en disco'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por bulk_update')
+        parser.add_argument('--simular', action='store_true', help='Solo informa, no escribe')
+
+    def handle(self, *args, **options):
+        # Un solo recorrido del disco por tipo: nombre -> (sha256, tamaño)
+        disco = {tipo: {nombre: (sha, tamanio) for nombre, sha, tamanio in almacen().indice(tipo)}
+                 for tipo in ('xml', 'cdr')}
+        self.stdout.write(f"📂 En disco: {len(disco['xml'])} XML, {len(disco['cdr'])} CDR")
+
+        campos = Comprobante.campos_artefacto('xml') + Comprobante.campos_artefacto('cdr')
+        pendientes = []
+        revisados = actualizados = 0
+
+        comprobantes = Comprobante.objects.only('comprCod', 'comprSerie', 'comprCorrelativo', *campos)
+        for comprobante in comprobantes.iterator(chunk_size=options['lote']):
+            revisados += 1
+            cambio = False
+            for tipo, nombre in (('xml', nombre_xml(comprobante)), ('cdr', nombre_cdr(comprobante))):
+                sha, tamanio = disco[tipo].get(nombre, (None, None))
+                prefijo = tipo.upper()
+                actual = (
+                    getattr(comprobante, f'comprTiene{prefijo}'),
+                    getattr(comprobante, f'compr{prefijo}Tamanio'),
+                    getattr(comprobante, f'compr{prefijo}Sha256'),
+                    getattr(comprobante, f'compr{prefijo}Ubicacion'),
+                )
+                esperado = (sha is not None, tamanio, sha or '', ubicacion_objeto(sha) if sha else '')
+                if actual != esperado:
+                    comprobante.registrar_artefacto(tipo, sha, tamanio)
+                    cambio = True
+            if cambio:
+                pendientes.append(comprobante)
+            if len(pendientes) >= options['lote']:
+                actualizados += self._guardar(pendientes, campos, options['simular'])
+                pendientes = []
+
+        actualizados += self._guardar(pendientes, campos, options['simular'])
+
+        prefijo = '🔎 (simulación) ' if options['simular'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {prefijo}{revisados} comprobantes revisados, {actualizados} actualizados"
+        ))
+
+    def _guardar(self, comprobantes, campos, simular):
+        if comprobantes and not simular:
+            Comprobante.objects.bulk_update(comprobantes, campos)
+        return len(comprobantes)
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from sales.comparativa import invalidar_comparativa
+from sales.hechos import reconstruir_resumen_diario, reconstruir_resumen_productos
+from sales.models import Venta, VentaDetalle
+
+
+class Command(BaseCommand):
+    help = ('Rearma los resúmenes de ventas (sales_daily_summary) y por producto (sales_product_daily) '
+            'desde venta y venta_detalle')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', default=None, help='Primer día (AAAA-MM-DD, por defecto la venta más antigua)')
+        parser.add_argument('--hasta', default=None, help='Último día (AAAA-MM-DD, por defecto la venta más reciente)')
+        parser.add_argument('--dias', type=int, default=31, help='Días por transacción')
+
+    def _fecha(self, valor, opcion):
+        try:
+            return datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'--{opcion} debe tener el formato AAAA-MM-DD')
+
+    def handle(self, *args, **options):
+        extremos = Venta.objects.aggregate(primera=Min('ventFecha'), ultima=Max('ventFecha'))
+        if not extremos['primera']:
+            self.stdout.write('📭 No hay ventas')
+            return
+
+        desde = (self._fecha(options['desde'], 'desde') if options['desde']
+                 else timezone.localdate(extremos['primera']))
+        hasta = (self._fecha(options['hasta'], 'hasta') if options['hasta']
+                 else timezone.localdate(extremos['ultima']))
+        paso = timedelta(days=max(1, options['dias']))
+
+        sin_costo = VentaDetalle.objects.filter(ventDetCostoUni__isnull=True).count()
+        if sin_costo:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ {sin_costo} detalles sin costo al vender: ejecute antes completar_costo_detalles"
+            ))
+
+        filas = productos = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + paso - timedelta(days=1), hasta)
+            creadas = reconstruir_resumen_diario(inicio, fin)
+            por_producto = reconstruir_resumen_productos(inicio, fin)
+            filas += creadas
+            productos += por_producto
+            self.stdout.write(f"📊 {inicio} a {fin}: {creadas} filas de ventas, {por_producto} de productos")
+            inicio = fin + timedelta(days=1)
+
+        invalidar_comparativa()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Resúmenes rearmados ({desde} a {hasta}): {filas} filas de ventas, {productos} de productos"
+        ))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from sales.simulador_sunat import ConfiguracionSimulador, crear_simulador
+
+
+class Command(BaseCommand):
+    help = 'Levanta un simulador del microservicio de comprobantes SUNAT para pruebas de carga y fallos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--puerto', type=int, default=8001)
+        parser.add_argument('--latencia-ms', type=int, default=0, help='Latencia fija por petición')
+        parser.add_argument('--jitter-ms', type=int, default=0, help='Latencia aleatoria adicional (0..jitter)')
+        parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de respuestas HTTP 500')
+        parser.add_argument('--tasa-rechazo', type=float, default=0.0, help='Fracción de boletas rechazadas')
+        parser.add_argument('--codigos-rechazo', nargs='+', default=['2017', '3105'],
+                            help='Códigos SUNAT usados en los rechazos')
+        parser.add_argument('--semilla', type=int, default=None, help='Semilla para resultados reproducibles')
+        parser.add_argument('--asincrono', action='store_true',
+                            help='Las boletas devuelven un ticket que se resuelve con consultar_ticket')
+        parser.add_argument('--consultas-en-proceso', type=int, default=0,
+                            help='Consultas de ticket que responden "en proceso" antes del resultado')
+
+    def handle(self, *args, **options):
+        configuracion = ConfiguracionSimulador(
+            latencia_ms=options['latencia_ms'],
+            jitter_ms=options['jitter_ms'],
+            tasa_error=options['tasa_error'],
+            tasa_rechazo=options['tasa_rechazo'],
+            codigos_rechazo=options['codigos_rechazo'],
+            semilla=options['semilla'],
+            asincrono=options['asincrono'],
+            consultas_en_proceso=options['consultas_en_proceso'],
+        )
+        servidor = crear_simulador(options['host'], options['puerto'], configuracion)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Simulador SUNAT escuchando en http://{options['host']}:{options['puerto']} "
+            f"(latencia={options['latencia_ms']}±{options['jitter_ms']}ms, "
+            f"error={options['tasa_error']:.0%}, rechazo={options['tasa_rechazo']:.0%})"
+        ))
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("⏹️ Simulador detenido")
+        finally:
+            servidor.server_close()
+            self.stdout.write(f"📊 {servidor.RequestHandlerClass.estado.contadores}")
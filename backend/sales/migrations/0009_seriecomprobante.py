@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def inicializar_series(apps, schema_editor):
+    """Crea los contadores de las series ya emitidas con su último correlativo"""
+    Comprobante = apps.get_model('sales', 'Comprobante')
+    SerieComprobante = apps.get_model('sales', 'SerieComprobante')
+
+    ultimos = Comprobante.objects.values('comprTipo', 'comprSerie').annotate(ultimo=Max('comprCorrelativo'))
+    SerieComprobante.objects.bulk_create([
+        SerieComprobante(
+            comprTipo=fila['comprTipo'],
+            comprSerie=fila['comprSerie'],
+            serUltimoCorrelativo=fila['ultimo'] or 0
+        )
+        for fila in ultimos
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('sales', '0008_comprobante_comprcodigorespuesta_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieComprobante',
+            fields=[
+                ('serCod', models.AutoField(primary_key=True, serialize=False)),
+                ('comprTipo', models.CharField(choices=[('01', 'Factura'), ('03', 'Boleta de Venta'), ('07', 'Nota de Crédito'), ('08', 'Nota de Débito')], max_length=2, verbose_name='Tipo de Comprobante')),
+                ('comprSerie', models.CharField(max_length=4, verbose_name='Serie')),
+                ('serUltimoCorrelativo', models.IntegerField(default=0, verbose_name='Último correlativo')),
+                ('sucurCod', models.ForeignKey(blank=True, help_text='Vacío = serie compartida por todas las sucursales', null=True, on_delete=django.db.models.deletion.PROTECT, to='Branch.branch', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Serie de Comprobante',
+                'verbose_name_plural': 'Series de Comprobante',
+                'db_table': 'serie_comprobante',
+                'constraints': [models.UniqueConstraint(fields=('comprTipo', 'comprSerie', 'sucurCod'), name='unique_serie_por_sucursal'), models.UniqueConstraint(condition=models.Q(('sucurCod__isnull', True)), fields=('comprTipo', 'comprSerie'), name='unique_serie_compartida')],
+            },
+        ),
+        migrations.RunPython(inicializar_series, migrations.RunPython.noop),
+    ]
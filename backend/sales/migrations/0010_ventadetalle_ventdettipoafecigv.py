@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:24
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_tipo_afectacion(apps, schema_editor):
+    """Copia a los detalles existentes el tipo de afectación de su producto"""
+    VentaDetalle = apps.get_model('sales', 'VentaDetalle')
+    Product = apps.get_model('inventory', 'Product')
+
+    VentaDetalle.objects.update(
+        ventDetTipoAfecIGV=Subquery(
+            Product.objects.filter(pk=OuterRef('prodCod_id')).values('prodTipoAfecIGV')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_stockmovement'),
+        ('sales', '0009_seriecomprobante'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventadetalle',
+            name='ventDetTipoAfecIGV',
+            field=models.CharField(choices=[('10', 'Gravado - Operación Onerosa'), ('20', 'Exonerado - Operación Onerosa'), ('30', 'Inafecto - Operación Onerosa'), ('40', 'Exportación'), ('31', 'Gratuita')], default='10', max_length=2, verbose_name='Tipo de Afectación IGV'),
+        ),
+        migrations.RunPython(copiar_tipo_afectacion, migrations.RunPython.noop),
+    ]
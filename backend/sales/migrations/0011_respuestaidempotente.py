@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:27
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0010_ventadetalle_ventdettipoafecigv'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaIdempotente',
+            fields=[
+                ('idemCod', models.AutoField(primary_key=True, serialize=False)),
+                ('idemClave', models.CharField(max_length=255, verbose_name='Idempotency-Key')),
+                ('idemHuella', models.CharField(max_length=64, verbose_name='Huella de la petición')),
+                ('idemEstado', models.CharField(choices=[('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado')], default='PROCESANDO', max_length=10)),
+                ('idemCodigoHttp', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('idemRespuesta', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('idemFechaCreacion', models.DateTimeField(auto_now_add=True)),
+                ('idemExpira', models.DateTimeField(db_index=True)),
+                ('usuCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Respuesta Idempotente',
+                'verbose_name_plural': 'Respuestas Idempotentes',
+                'db_table': 'respuesta_idempotente',
+                'constraints': [models.UniqueConstraint(fields=('usuCod', 'idemClave'), name='unique_clave_idempotencia_usuario')],
+            },
+        ),
+    ]
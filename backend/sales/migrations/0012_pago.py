@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def registrar_pagos_existentes(apps, schema_editor):
+    """
+    Crea un pago por cada venta con adelanto. El desglose de pagos parciales
+    anteriores no se guardaba, así que se atribuye al último método usado.
+    """
+    Venta = apps.get_model('sales', 'Venta')
+    Pago = apps.get_model('sales', 'Pago')
+
+    ventas = Venta.objects.filter(ventAdelanto__gt=0).values_list(
+        'ventCod', 'cajaAperCod_id', 'ventAdelanto', 'ventFormaPago',
+        'ventReferenciaPago', 'ventTarjetaTipo', 'ventFecha'
+    ).iterator(chunk_size=2000)
+
+    lote = []
+    for ventCod, cajaAperCod, monto, forma, referencia, tarjeta, fecha in ventas:
+        lote.append(Pago(
+            ventCod_id=ventCod, cajaAperCod_id=cajaAperCod, pagMonto=monto,
+            pagFormaPago=forma, pagReferencia=referencia or '',
+            pagTarjetaTipo=tarjeta or '', pagFecha=fecha
+        ))
+        if len(lote) >= 2000:
+            Pago.objects.bulk_create(lote)
+            lote = []
+    Pago.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cash', '0003_load_sample_cash_data'),
+        ('sales', '0011_respuestaidempotente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pago',
+            fields=[
+                ('pagCod', models.AutoField(primary_key=True, serialize=False, verbose_name='Código Pago')),
+                ('pagMonto', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto')),
+                ('pagFormaPago', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TARJETA', 'Tarjeta'), ('TRANSFERENCIA', 'Transferencia'), ('YAPE', 'Yape'), ('PLIN', 'Plin'), ('MIXTO', 'Pago Mixto')], max_length=15, verbose_name='Forma de Pago')),
+                ('pagReferencia', models.CharField(blank=True, max_length=50, verbose_name='Referencia de Pago')),
+                ('pagTarjetaTipo', models.CharField(blank=True, choices=[('DEBITO', 'Débito'), ('CREDITO', 'Crédito'), ('', 'No Aplica')], default='', max_length=10, verbose_name='Tipo de Tarjeta')),
+                ('pagFecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de Pago')),
+                ('cajaAperCod', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='pagos', to='cash.cashopening', verbose_name='Sesión de caja')),
+                ('ventCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='sales.venta', verbose_name='Venta')),
+            ],
+            options={
+                'verbose_name': 'Pago',
+                'verbose_name_plural': 'Pagos',
+                'db_table': 'pago',
+                'ordering': ['pagCod'],
+                'indexes': [models.Index(fields=['cajaAperCod', 'pagFormaPago'], name='pago_caja_forma_idx'), models.Index(fields=['pagFecha'], name='pago_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_pagos_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:29
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0012_pago'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoOutbox',
+            fields=[
+                ('outCod', models.BigAutoField(primary_key=True, serialize=False)),
+                ('outTipo', models.CharField(choices=[('ENVIAR_SUNAT', 'Enviar comprobante a SUNAT')], max_length=30, verbose_name='Tipo de evento')),
+                ('outReferencia', models.BigIntegerField(verbose_name='Código del objeto afectado')),
+                ('outPayload', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('outEstado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=10)),
+                ('outIntentos', models.PositiveIntegerField(default=0)),
+                ('outProximoIntento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('outBloqueadoHasta', models.DateTimeField(blank=True, null=True)),
+                ('outUltimoError', models.TextField(blank=True)),
+                ('outFechaCreacion', models.DateTimeField(auto_now_add=True)),
+                ('outFechaProcesado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento Outbox',
+                'verbose_name_plural': 'Eventos Outbox',
+                'db_table': 'evento_outbox',
+                'ordering': ['outCod'],
+                'indexes': [models.Index(fields=['outEstado', 'outProximoIntento'], name='outbox_pendientes_idx'), models.Index(fields=['outTipo', 'outReferencia'], name='outbox_referencia_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0013_eventooutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprCDRSha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256 CDR'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprCDRTamanio',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamaño CDR (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprCDRUbicacion',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Ubicación CDR en el almacén'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprTieneCDR',
+            field=models.BooleanField(default=False, verbose_name='Tiene CDR'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprTieneXML',
+            field=models.BooleanField(default=False, verbose_name='Tiene XML'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprXMLSha256',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256 XML'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprXMLTamanio',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Tamaño XML (bytes)'),
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprXMLUbicacion',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Ubicación XML en el almacén'),
+        ),
+    ]
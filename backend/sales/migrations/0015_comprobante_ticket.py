@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0014_comprobante_indice_artefactos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comprobante',
+            name='comprTicket',
+            field=models.CharField(blank=True, help_text='Envíos asíncronos: el estado final se concilia con consultar_ticket', max_length=50, verbose_name='Ticket SUNAT'),
+        ),
+        migrations.AddIndex(
+            model_name='comprobante',
+            index=models.Index(condition=models.Q(models.Q(('comprTicket', ''), _negated=True), ('comprFechaRespuesta__isnull', True)), fields=['comprEstadoSUNAT', 'comprCod'], name='compr_por_conciliar_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0015_comprobante_ticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('resCod', models.AutoField(primary_key=True, serialize=False)),
+                ('resFechaEmision', models.DateField(verbose_name='Fecha de emisión de las boletas')),
+                ('resNumero', models.PositiveIntegerField(verbose_name='Número del resumen en el día')),
+                ('resEstado', models.CharField(choices=[('PENDIENTE', 'Pendiente de envío'), ('ENVIADO', 'Enviado (ticket en proceso)'), ('ACEPTADO', 'Aceptado por SUNAT'), ('OBSERVADO', 'Observado por SUNAT'), ('RECHAZADO', 'Rechazado por SUNAT'), ('ERROR', 'Error de envío')], default='PENDIENTE', max_length=10)),
+                ('resCantidad', models.PositiveIntegerField(default=0, verbose_name='Cantidad de boletas')),
+                ('resTotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('resTicket', models.CharField(blank=True, max_length=50, verbose_name='Ticket SUNAT')),
+                ('resMensaje', models.TextField(blank=True)),
+                ('resIntentos', models.PositiveIntegerField(default=0)),
+                ('resFechaCreacion', models.DateTimeField(auto_now_add=True)),
+                ('resFechaEnvio', models.DateTimeField(blank=True, null=True)),
+                ('resFechaRespuesta', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario',
+                'verbose_name_plural': 'Resúmenes Diarios',
+                'db_table': 'resumen_diario',
+                'ordering': ['-resFechaEmision', 'resNumero'],
+                'indexes': [models.Index(fields=['resEstado'], name='resumen_dia_resEsta_3183d6_idx'), models.Index(fields=['resTicket'], name='resumen_dia_resTick_7e261e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('resFechaEmision', 'resNumero'), name='unique_resumen_por_dia')],
+            },
+        ),
+        migrations.AddField(
+            model_name='comprobante',
+            name='resCod',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='comprobantes', to='sales.resumendiario', verbose_name='Resumen diario'),
+        ),
+    ]
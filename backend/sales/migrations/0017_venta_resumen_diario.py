@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('sales', '0016_resumendiario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaResumenDiario',
+            fields=[
+                ('vresCod', models.BigAutoField(primary_key=True, serialize=False)),
+                ('vresFecha', models.DateField(verbose_name='Día de la venta (hora local)')),
+                ('vresFormaPago', models.CharField(choices=[('EFECTIVO', 'Efectivo'), ('TARJETA', 'Tarjeta'), ('TRANSFERENCIA', 'Transferencia'), ('YAPE', 'Yape'), ('PLIN', 'Plin'), ('MIXTO', 'Pago Mixto')], max_length=15)),
+                ('vresEstado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PAGADO', 'Pagado'), ('PARCIAL', 'Pago Parcial'), ('ANULADO', 'Anulado')], max_length=20)),
+                ('vresCantidad', models.IntegerField(default=0, verbose_name='Cantidad de ventas')),
+                ('vresSubTotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vresIGV', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vresTotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vresAdelanto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vresSaldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sucurCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Branch.branch', verbose_name='Sucursal')),
+                ('usuCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Ventas',
+                'verbose_name_plural': 'Resúmenes Diarios de Ventas',
+                'db_table': 'sales_daily_summary',
+                'ordering': ['-vresFecha'],
+                'indexes': [models.Index(fields=['sucurCod', 'vresFecha'], name='resumen_ventas_suc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vresFecha', 'sucurCod', 'usuCod', 'vresFormaPago', 'vresEstado'), name='unique_resumen_ventas_dia')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('inventory', '0010_stockmovement'),
+        ('sales', '0017_venta_resumen_diario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaProductoDiario',
+            fields=[
+                ('vprodCod', models.BigAutoField(primary_key=True, serialize=False)),
+                ('vprodFecha', models.DateField(verbose_name='Día de la venta (hora local)')),
+                ('vprodCantidad', models.IntegerField(default=0, verbose_name='Unidades vendidas')),
+                ('vprodSubTotal', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor sin IGV')),
+                ('vprodIGV', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vprodTotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vprodCosto', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Costo al vender')),
+                ('prodCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.product', verbose_name='Producto')),
+                ('sucurCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Branch.branch', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario por Producto',
+                'verbose_name_plural': 'Resúmenes Diarios por Producto',
+                'db_table': 'sales_product_daily',
+                'ordering': ['-vprodFecha'],
+                'indexes': [models.Index(fields=['sucurCod', 'vprodFecha'], name='resumen_producto_suc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vprodFecha', 'sucurCod', 'prodCod'), name='unique_resumen_producto_dia')],
+            },
+        ),
+    ]
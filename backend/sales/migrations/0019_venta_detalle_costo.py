@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0018_venta_producto_diario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventadetalle',
+            name='ventDetCostoUni',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+    ]
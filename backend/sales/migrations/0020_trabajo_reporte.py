@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:15
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0019_venta_detalle_costo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('trabCod', models.BigAutoField(primary_key=True, serialize=False)),
+                ('trabTipo', models.CharField(max_length=50, verbose_name='Reporte o exportación')),
+                ('trabParametros', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('trabAlcance', models.CharField(max_length=30, verbose_name='Alcance (gerente o sucursal)')),
+                ('trabHuella', models.CharField(max_length=64, verbose_name='SHA-256 de tipo, parámetros, alcance y día')),
+                ('trabEstado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('COMPLETADO', 'Completado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=10)),
+                ('trabIntentos', models.PositiveIntegerField(default=0)),
+                ('trabFilasProcesadas', models.PositiveIntegerField(default=0)),
+                ('trabFilasTotales', models.PositiveIntegerField(blank=True, null=True)),
+                ('trabBloqueadoHasta', models.DateTimeField(blank=True, null=True)),
+                ('trabUltimoError', models.TextField(blank=True)),
+                ('trabResultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('trabArchivoNombre', models.CharField(blank=True, max_length=150)),
+                ('trabArchivoTipo', models.CharField(blank=True, max_length=100, verbose_name='Content-Type del archivo')),
+                ('trabArchivoSha256', models.CharField(blank=True, max_length=64)),
+                ('trabFechaCreacion', models.DateTimeField(auto_now_add=True)),
+                ('trabFechaInicio', models.DateTimeField(blank=True, null=True)),
+                ('trabFechaFin', models.DateTimeField(blank=True, null=True)),
+                ('usuCod', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reportes',
+                'db_table': 'trabajo_reporte',
+                'ordering': ['trabCod'],
+                'indexes': [models.Index(fields=['trabHuella', 'trabFechaFin'], name='trabajo_reporte_huella_idx'), models.Index(fields=['trabEstado', 'trabCod'], name='trabajo_reporte_estado_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('trabEstado__in', ['PENDIENTE', 'PROCESANDO'])), fields=('trabHuella',), name='unique_trabajo_reporte_en_curso')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('cash', '0003_load_sample_cash_data'),
+        ('sales', '0020_trabajo_reporte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='venta',
+            name='venta_ventFec_a85570_idx',
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['-ventFecha', '-ventCod'], name='venta_fecha_cod_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['sucurCod', '-ventFecha', '-ventCod'], name='venta_suc_fecha_cod_idx'),
+        ),
+    ]
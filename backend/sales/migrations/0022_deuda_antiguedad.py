@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('sales', '0021_venta_indice_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AntiguedadDeuda',
+            fields=[
+                ('adeuCod', models.BigAutoField(primary_key=True, serialize=False)),
+                ('adeuCorte', models.DateField(verbose_name='Día de corte')),
+                ('cliNombreCom', models.CharField(max_length=200)),
+                ('cliDocNum', models.CharField(blank=True, max_length=15)),
+                ('adeuDiaVenta', models.DateField(verbose_name='Día de la venta (hora local)')),
+                ('adeuCantidad', models.IntegerField(default=0, verbose_name='Ventas con saldo')),
+                ('adeuTotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('adeuSaldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sucurCod', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='Branch.branch', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Antigüedad de Deuda',
+                'verbose_name_plural': 'Antigüedad de Deudas',
+                'db_table': 'deuda_antiguedad',
+                'ordering': ['-adeuCorte'],
+                'indexes': [models.Index(fields=['adeuCorte', 'sucurCod'], name='deuda_antiguedad_corte_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def unificar_contadores(apps, schema_editor):
+    """
+    Deja un solo contador por (tipo, serie). Si la serie tenía contador propio
+    de sucursal y compartido, continúa desde el mayor de ellos y del último
+    comprobante emitido con esa serie.
+    """
+    Comprobante = apps.get_model('sales', 'Comprobante')
+    SerieComprobante = apps.get_model('sales', 'SerieComprobante')
+
+    repetidas = (
+        SerieComprobante.objects.values('comprTipo', 'comprSerie')
+        .annotate(filas=Count('serCod'), ultimo=Max('serUltimoCorrelativo'))
+        .filter(filas__gt=1)
+    )
+    for fila in repetidas:
+        contadores = SerieComprobante.objects.filter(comprTipo=fila['comprTipo'], comprSerie=fila['comprSerie'])
+        emitido = Comprobante.objects.filter(comprSerie=fila['comprSerie']).aggregate(
+            ultimo=Max('comprCorrelativo')
+        )['ultimo'] or 0
+        conservar = contadores.order_by('serCod').first()
+        contadores.exclude(pk=conservar.pk).delete()
+        SerieComprobante.objects.filter(pk=conservar.pk).update(
+            serUltimoCorrelativo=max(fila['ultimo'] or 0, emitido)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Branch', '0005_load_sample_branches'),
+        ('sales', '0022_deuda_antiguedad'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='seriecomprobante',
+            name='unique_serie_por_sucursal',
+        ),
+        migrations.RemoveConstraint(
+            model_name='seriecomprobante',
+            name='unique_serie_compartida',
+        ),
+        migrations.AlterField(
+            model_name='seriecomprobante',
+            name='sucurCod',
+            field=models.ForeignKey(blank=True, help_text='Sucursal que abrió la serie (vacío = serie compartida). No forma parte de la clave', null=True, on_delete=django.db.models.deletion.PROTECT, to='Branch.branch', verbose_name='Sucursal'),
+        ),
+        migrations.RunPython(unificar_contadores, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='seriecomprobante',
+            constraint=models.UniqueConstraint(fields=('comprTipo', 'comprSerie'), name='unique_serie_comprobante'),
+        ),
+    ]
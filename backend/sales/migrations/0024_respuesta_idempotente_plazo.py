@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0023_serie_comprobante_por_serie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respuestaidempotente',
+            name='idemProcesandoHasta',
+            field=models.DateTimeField(blank=True, help_text='Vencido, un reintento con la misma petición retoma la clave', null=True, verbose_name='Plazo del intento en curso'),
+        ),
+    ]
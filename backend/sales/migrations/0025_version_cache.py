@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0024_respuesta_idempotente_plazo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCache',
+            fields=[
+                ('vcacClave', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Grupo de caché')),
+                ('vcacVersion', models.PositiveBigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Versión de Caché',
+                'verbose_name_plural': 'Versiones de Caché',
+                'db_table': 'version_cache',
+            },
+        ),
+    ]
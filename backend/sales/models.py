@@ -1,13 +1,19 @@
 from inventory.models import Product, BranchInventory
 from cash.models import CashOpening
+from cash.sesiones import confirmar_sesion_abierta, sesion_abierta_vigente
 from User.models import User
 from Branch.models import Branch
 from decimal import Decimal, ROUND_HALF_UP
-from django.db import models, transaction
+from django.db import models, transaction, connection
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from django.conf import settings
 from datetime import timedelta
+import base64
 import re
 
 ########################################################################## VENTA
@@ -125,7 +131,9 @@ class Venta(models.Model):
         db_table = 'venta'
         ordering = ['-ventFecha']
         indexes = [
-            models.Index(fields=['-ventFecha']),
+            # Paginación por cursor (sales/paginacion.py): orden total por fecha y código
+            models.Index(fields=['-ventFecha', '-ventCod'], name='venta_fecha_cod_idx'),
+            models.Index(fields=['sucurCod', '-ventFecha', '-ventCod'], name='venta_suc_fecha_cod_idx'),
             models.Index(fields=['ventEstado']),
         ]
 
@@ -215,27 +223,28 @@ class Venta(models.Model):
         self.calcular_totales()
         self.save()
 
-    @transaction.atomic
     def calcular_totales(self):
-        detalles = self.ventadetalle_set.filter(ventDetAnulado=False)
-        
-        if not detalles.exists():
+        # Una sola consulta: totales por tipo de afectación guardado en cada detalle
+        cero = Value(Decimal("0"), output_field=models.DecimalField(max_digits=10, decimal_places=2))
+        totales = self.ventadetalle_set.filter(ventDetAnulado=False).aggregate(
+            cantidad=Count('ventDetCod'),
+            gravada=Coalesce(Sum('ventDetSubtotal', filter=Q(ventDetTipoAfecIGV="10")), cero),
+            exonerada=Coalesce(Sum('ventDetSubtotal', filter=Q(ventDetTipoAfecIGV="20")), cero),
+            inafecta=Coalesce(Sum('ventDetSubtotal', filter=Q(ventDetTipoAfecIGV="30")), cero),
+            gratuita=Coalesce(Sum('ventDetSubtotal', filter=Q(ventDetTipoAfecIGV="31")), cero),
+            igv=Coalesce(Sum('ventDetIGV', filter=Q(ventDetTipoAfecIGV="10")), cero),
+        )
+
+        if not totales['cantidad']:
             self._reset_totales()
             return
 
-        # Inicializar totales
-        total_gravada = total_inafecta = total_exonerada = total_gratuita = igv_total = Decimal("0")
-
-        for detalle in detalles:
-            if detalle.prodCod.prodTipoAfecIGV == "10":  # Gravada
-                total_gravada += detalle.ventDetSubtotal
-                igv_total += detalle.ventDetIGV
-            elif detalle.prodCod.prodTipoAfecIGV == "20":  # Exonerada
-                total_exonerada += detalle.ventDetSubtotal
-            elif detalle.prodCod.prodTipoAfecIGV == "30":  # Inafecta
-                total_inafecta += detalle.ventDetSubtotal
-            elif detalle.prodCod.prodTipoAfecIGV == "31":  # Gratuita
-                total_gratuita += detalle.ventDetSubtotal
+        centimos = Decimal("0.01")
+        total_gravada = Decimal(totales['gravada']).quantize(centimos)
+        total_exonerada = Decimal(totales['exonerada']).quantize(centimos)
+        total_inafecta = Decimal(totales['inafecta']).quantize(centimos)
+        total_gratuita = Decimal(totales['gratuita']).quantize(centimos)
+        igv_total = Decimal(totales['igv']).quantize(centimos)
 
         subtotal = total_gravada + total_exonerada + total_inafecta + total_gratuita
 
@@ -277,7 +286,7 @@ class Venta(models.Model):
     def registrar_pago(self, monto, forma_pago, referencia_pago='', tarjeta_tipo=''):
         
         print(f"🔍 registrar_pago - Venta: {self.ventCod}, Monto: {monto}")
-        print(f"🔍 Caja asignada: {getattr(self.cajaAperCod, 'cajaAperCod', 'None')}, Estado: {getattr(self.cajaAperCod, 'cajaAperEstado', 'No asignada')}")
+        print(f"🔍 Caja asignada: {self.cajaAperCod_id}")
 
         if self.ventAnulada:
             raise ValidationError("No se puede registrar pago en una venta anulada.")
@@ -291,21 +300,18 @@ class Venta(models.Model):
             raise ValidationError(f"El monto (S/{monto}) excede el saldo pendiente (S/{self.ventSaldo})")
 
         # ✅ ACTUALIZAR CAJA PRIMERO - BUSCAR SESIÓN ABIERTA ACTUAL
-        sesion_caja_actual = CashOpening.objects.filter(
-            usuCod=self.usuCod,
-            cajCod__sucurCod=self.sucurCod,
-            cajaAperEstado='ABIERTA'
-        ).first()
+        # Confirmada y bloqueada en la base: un cierre concurrente espera al pago
+        sesion_caja_actual_id = confirmar_sesion_abierta(self.usuCod_id, self.sucurCod_id, bloquear=True)
         
-        if not sesion_caja_actual:
+        if not sesion_caja_actual_id:
             raise ValidationError("No hay una sesión de caja abierta para registrar el pago.")
         
-        print(f"✅ Sesión de caja actual encontrada: {sesion_caja_actual.cajaAperCod}")
+        print(f"✅ Sesión de caja actual encontrada: {sesion_caja_actual_id}")
         
         # Actualizar la caja de la venta con la sesión actual
-        if self.cajaAperCod != sesion_caja_actual:
-            print(f"🔄 Actualizando caja de venta: {getattr(self.cajaAperCod, 'cajaAperCod', 'None')} -> {sesion_caja_actual.cajaAperCod}")
-            self.cajaAperCod = sesion_caja_actual
+        if self.cajaAperCod_id != sesion_caja_actual_id:
+            print(f"🔄 Actualizando caja de venta: {self.cajaAperCod_id} -> {sesion_caja_actual_id}")
+            self.cajaAperCod_id = sesion_caja_actual_id
         
         
         # Actualizar campos de pago
@@ -317,15 +323,29 @@ class Venta(models.Model):
         # Recalcular y guardar
         self.calcular_totales()
         self.save()
+
+        # Registrar el pago en el libro de pagos de la sesión
+        Pago.objects.create(
+            ventCod=self,
+            cajaAperCod_id=sesion_caja_actual_id,
+            pagMonto=monto,
+            pagFormaPago=forma_pago,
+            pagReferencia=referencia_pago,
+            pagTarjetaTipo=self.ventTarjetaTipo
+        )
         
         # Generar comprobante si está totalmente pagado
         if self.ventSaldo == Decimal("0") and self.ventTotal > Decimal("0"):
             comprobante = self._generar_comprobante()
+            # El envío a SUNAT lo hace el worker del outbox (o el resumen diario); aquí queda PENDIENTE
+            if not comprobante.va_en_resumen:
+                EventoOutbox.encolar('ENVIAR_SUNAT', comprobante.pk)
             return {
                 "mensaje": f"Pago registrado: S/{monto}",
                 "saldo_actual": float(self.ventSaldo),
                 "estado": self.ventEstado,
-                "comprobante": comprobante.comprobante_completo
+                "comprobante": comprobante.comprobante_completo,
+                "estado_sunat": comprobante.comprEstadoSUNAT
             }
         
         return {
@@ -334,6 +354,55 @@ class Venta(models.Model):
             "estado": self.ventEstado
         }
 
+    @transaction.atomic
+    def agregar_detalles(self, detalles_data):
+        """
+        Registra varias líneas de la venta en un solo paso.
+        Descuenta el stock con un UPDATE condicional por producto
+        (BranchInventory.mover_stock_lote), inserta los detalles con
+        bulk_create y recalcula los totales una sola vez.
+        """
+        if not detalles_data:
+            raise ValidationError("La venta debe tener al menos un producto.")
+
+        # Cantidad total solicitada por producto (una línea puede repetir producto)
+        cantidades = {}
+        descripciones = {}
+        for data in detalles_data:
+            producto = data['prodCod']
+            cantidades[producto.pk] = cantidades.get(producto.pk, 0) + data['ventDetCantidad']
+            descripciones[producto.pk] = producto.prodDescr
+
+        # Si algún producto no alcanza, la transacción deshace los descuentos anteriores
+        BranchInventory.mover_stock_lote(
+            self.sucurCod_id,
+            {prod_id: -cantidad for prod_id, cantidad in cantidades.items()},
+            motivo='VENTA',
+            documento=f"VENTA-{self.ventCod}",
+            descripciones=descripciones
+        )
+
+        detalles = []
+        for data in detalles_data:
+            detalle = VentaDetalle(
+                ventCod=self,
+                prodCod=data['prodCod'],
+                ventDetCantidad=data['ventDetCantidad'],
+                ventDetDescuento=data.get('ventDetDescuento', 0) or 0
+            )
+            detalle._copiar_datos_producto()
+            detalle._calcular_totales()
+            detalles.append(detalle)
+
+        VentaDetalle.objects.bulk_create(detalles)
+
+        from .hechos import sumar_detalles
+        sumar_detalles(self, detalles)
+
+        self.calcular_totales()
+        self.save()
+        return detalles
+
     def _generar_comprobante(self):
         if hasattr(self, 'comprobante'):
             return self.comprobante
@@ -350,41 +419,54 @@ class Venta(models.Model):
         """
         
         # ✅ ASIGNAR SESIÓN si es venta nueva O si no tiene sesión asignada
-        if not self.cajaAperCod and self.usuCod and self.sucurCod:
-            print(f"🔍 Buscando sesión de caja abierta para usuario: {self.usuCod}")
+        if not self.cajaAperCod_id and self.usuCod_id and self.sucurCod_id:
+            print(f"🔍 Buscando sesión de caja abierta para usuario: {self.usuCod_id}")
             
             # Buscar sesión abierta del usuario en la sucursal
-            sesion_caja_abierta = CashOpening.objects.filter(
-                usuCod=self.usuCod,
-                cajCod__sucurCod=self.sucurCod,
-                cajaAperEstado='ABIERTA'
-            ).select_related('cajCod').first()
+            sesion_caja_abierta_id = confirmar_sesion_abierta(self.usuCod_id, self.sucurCod_id)
             
-            if sesion_caja_abierta:
-                print(f"✅ Sesión encontrada: {sesion_caja_abierta.cajaAperCod} - Caja: {sesion_caja_abierta.cajCod.cajNom}")
-                self.cajaAperCod = sesion_caja_abierta
+            if sesion_caja_abierta_id:
+                print(f"✅ Sesión encontrada: {sesion_caja_abierta_id}")
+                self.cajaAperCod_id = sesion_caja_abierta_id
             else:
                 # ⚠️ IMPORTANTE: Si no hay sesión abierta, NO podemos crear la venta
                 # (o permitirla solo si ventAdelanto == 0)
                 if self.ventAdelanto > 0:
                     raise ValidationError(
-                        f"El usuario {self.usuCod} no tiene una sesión de caja abierta. "
+                        f"El usuario {self.usuCod_id} no tiene una sesión de caja abierta. "
                         "Debe abrir caja antes de registrar ventas con pago."
                     )
                 else:
                     print("⚠️ No hay sesión de caja abierta, pero venta sin adelanto permitida")
         
         # DEBUG: Información de la sesión asignada
-        if self.cajaAperCod:
-            print(f"💰 Sesión asignada: {self.cajaAperCod.cajaAperCod}")
-            print(f"📊 Estado: {self.cajaAperCod.cajaAperEstado}")
-            print(f"🏪 Caja: {self.cajaAperCod.cajCod.cajNom}")
+        if self.cajaAperCod_id:
+            print(f"💰 Sesión asignada: {self.cajaAperCod_id}")
         else:
             print("⚠️ ADVERTENCIA: Venta sin sesión de caja asignada")
 
         # Validar y guardar
         self.full_clean()
-        super().save(*args, **kwargs)
+
+        # El resumen diario de ventas se ajusta en la misma transacción (ver sales/hechos.py)
+        from .hechos import CAMPOS_VENTA, registrar_venta, valores_venta
+
+        with transaction.atomic():
+            anterior = None
+            if self.pk:
+                anterior = Venta.objects.select_for_update().filter(pk=self.pk).values(*CAMPOS_VENTA).first()
+            super().save(*args, **kwargs)
+            registrar_venta(anterior, valores_venta(self))
+
+    @transaction.atomic
+    def delete(self, *args, **kwargs):
+        from .hechos import CAMPOS_VENTA, registrar_venta, restar_detalles
+
+        anterior = Venta.objects.select_for_update().filter(pk=self.pk).values(*CAMPOS_VENTA).first()
+        restar_detalles(self, list(self.ventadetalle_set.filter(ventDetAnulado=False)))
+        resultado = super().delete(*args, **kwargs)
+        registrar_venta(anterior, None)
+        return resultado
 
     def clean(self):
         super().clean()
@@ -402,33 +484,80 @@ class Venta(models.Model):
             raise ValidationError({'cliDocNum': 'El DNI debe tener 8 dígitos.'})
 
         # ✅ VALIDACIÓN MEJORADA: Solo si hay adelanto O si ya está asignada
-        if self.ventAdelanto > 0 or self.cajaAperCod:
+        if self.ventAdelanto > 0 or self.cajaAperCod_id:
             
             # Si hay adelanto pero no hay caja, error crítico
-            if self.ventAdelanto > 0 and not self.cajaAperCod:
+            if self.ventAdelanto > 0 and not self.cajaAperCod_id:
                 raise ValidationError({
                     'cajaAperCod': 'Se requiere una sesión de caja abierta para registrar pagos.'
                 })
             
-            # Si hay caja asignada, verificar que esté abierta
-            if self.cajaAperCod:
-                if self.cajaAperCod.cajaAperEstado != 'ABIERTA':
+            # Se confirma siempre en la base (la caché de sesiones es por proceso);
+            # la sesión solo se carga para explicar el error
+            if self.cajaAperCod_id and not sesion_abierta_vigente(self.cajaAperCod_id, self.usuCod_id, self.sucurCod_id):
+                sesion = CashOpening.objects.select_related('cajCod').get(pk=self.cajaAperCod_id)
+
+                if sesion.cajaAperEstado != 'ABIERTA':
                     raise ValidationError({
-                        'cajaAperCod': f'La sesión de caja #{self.cajaAperCod.cajaAperCod} no está abierta (Estado: {self.cajaAperCod.cajaAperEstado}).'
+                        'cajaAperCod': f'La sesión de caja #{sesion.cajaAperCod} no está abierta (Estado: {sesion.cajaAperEstado}).'
                     })
                 
                 # ✅ NUEVO: Verificar que el usuario tenga acceso a esa caja
-                if self.cajaAperCod.usuCod != self.usuCod:
+                if sesion.usuCod_id != self.usuCod_id:
                     raise ValidationError({
-                        'cajaAperCod': f'La sesión de caja pertenece a otro usuario ({self.cajaAperCod.usuCod}). No puedes usarla.'
+                        'cajaAperCod': f'La sesión de caja pertenece a otro usuario ({sesion.usuCod}). No puedes usarla.'
                     })
                 
                 # ✅ NUEVO: Verificar sucursal
-                if self.cajaAperCod.cajCod.sucurCod != self.sucurCod:
+                if sesion.cajCod.sucurCod_id != self.sucurCod_id:
                     raise ValidationError({
                         'cajaAperCod': 'La sesión de caja pertenece a otra sucursal.'
                     })
 
+################################################################################### PAGO
+
+class Pago(models.Model):
+    """
+    Una fila por cada pago registrado en una venta.
+    Venta.ventFormaPago solo guarda el último método; los cuadres de caja
+    por forma de pago se calculan desde esta tabla.
+    """
+
+    pagCod = models.AutoField(primary_key=True, verbose_name="Código Pago")
+    ventCod = models.ForeignKey(
+        Venta,
+        on_delete=models.CASCADE,
+        related_name='pagos',
+        verbose_name="Venta"
+    )
+    cajaAperCod = models.ForeignKey(
+        CashOpening,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='pagos',
+        verbose_name="Sesión de caja"
+    )
+    pagMonto = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Monto")
+    pagFormaPago = models.CharField(max_length=15, choices=Venta.FORMA_PAGO, verbose_name="Forma de Pago")
+    pagReferencia = models.CharField(max_length=50, blank=True, verbose_name="Referencia de Pago")
+    pagTarjetaTipo = models.CharField(max_length=10, choices=Venta.TIPO_TARJETA, blank=True, default='', verbose_name="Tipo de Tarjeta")
+    pagFecha = models.DateTimeField(default=timezone.now, verbose_name="Fecha de Pago")
+
+    class Meta:
+        db_table = 'pago'
+        ordering = ['pagCod']
+        verbose_name = 'Pago'
+        verbose_name_plural = 'Pagos'
+        indexes = [
+            models.Index(fields=['cajaAperCod', 'pagFormaPago'], name='pago_caja_forma_idx'),
+            models.Index(fields=['pagFecha'], name='pago_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Pago #{self.pagCod} - Venta {self.ventCod_id} - S/{self.pagMonto} ({self.pagFormaPago})"
+
+
 ################################################################################### VENTA_DETALLE
 
 class VentaDetalle(models.Model):
@@ -455,6 +584,8 @@ class VentaDetalle(models.Model):
     
     ventDetValorUni = models.DecimalField(max_digits=10, decimal_places=2)
     ventDetPrecioUni = models.DecimalField(max_digits=10, decimal_places=2)
+    # Costo unitario del producto al vender (nulo en ventas anteriores hasta correr completar_costo_detalles)
+    ventDetCostoUni = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
     ventDetSubtotal = models.DecimalField(max_digits=10, decimal_places=2)
     ventDetIGV = models.DecimalField(max_digits=10, decimal_places=2)
@@ -470,6 +601,20 @@ class VentaDetalle(models.Model):
     
     ventDetAnulado = models.BooleanField(default=False)
 
+    # Copiado del producto al vender; los totales de la venta se agregan por este campo
+    ventDetTipoAfecIGV = models.CharField(
+        max_length=2,
+        choices=[
+            ('10', 'Gravado - Operación Onerosa'),
+            ('20', 'Exonerado - Operación Onerosa'),
+            ('30', 'Inafecto - Operación Onerosa'),
+            ('40', 'Exportación'),
+            ('31', 'Gratuita'),
+        ],
+        default='10',
+        verbose_name="Tipo de Afectación IGV"
+    )
+
     ventDetDescripcion = models.CharField(max_length=500)
     ventDetMarca = models.CharField(max_length=100)
     
@@ -517,6 +662,7 @@ class VentaDetalle(models.Model):
         """Método save mejorado para VentaDetalle"""
         
         # Guardar cantidad original para comparar después
+        original = None
         if self.pk:
             # Si ya existe, guardar la cantidad original para comparar
             original = VentaDetalle.objects.get(pk=self.pk)
@@ -535,6 +681,8 @@ class VentaDetalle(models.Model):
         if needs_calculation and self.prodCod:
             self._copiar_datos_producto()
             self._calcular_totales()
+        elif self.ventDetCostoUni is None and self.prodCod_id and not self.pk:
+            self.ventDetCostoUni = Decimal(self.prodCod.prodCostoInv).quantize(Decimal("0.01"))
         
         # Validar
         self.full_clean()
@@ -546,23 +694,41 @@ class VentaDetalle(models.Model):
         if not self.ventDetAnulado:
             self._actualizar_stock()
         
+        # Resumen por producto: sale lo que había y entra lo nuevo (ver sales/hechos.py)
+        self._actualizar_resumen_producto(original)
+        
         # Actualizar venta
         if self.ventCod_id:
             self.ventCod.calcular_totales()
             self.ventCod.save()
     
+    def _actualizar_resumen_producto(self, original):
+        from .hechos import restar_detalles, sumar_detalles
+
+        campos = (
+            'prodCod_id', 'ventDetCantidad', 'ventDetSubtotal', 'ventDetIGV', 'ventDetTotal',
+            'ventDetCostoUni', 'ventDetAnulado',
+        )
+        if original and all(getattr(original, c) == getattr(self, c) for c in campos):
+            return
+        if original:
+            restar_detalles(self.ventCod, [original])
+        sumar_detalles(self.ventCod, [self])
+
     def _copiar_datos_producto(self):
         """Copia precios e info del producto al momento de la venta."""
         self.ventDetValorUni = Decimal(self.prodCod.prodValorUni).quantize(Decimal("0.01"))
         self.ventDetPrecioUni = Decimal(self.prodCod.precioVentaConIGV).quantize(Decimal("0.01"))
+        self.ventDetCostoUni = Decimal(self.prodCod.prodCostoInv).quantize(Decimal("0.01"))
         self.ventDetDescripcion = self.prodCod.prodDescr
         self.ventDetMarca = self.prodCod.prodMarca
+        self.ventDetTipoAfecIGV = self.prodCod.prodTipoAfecIGV
 
     def _calcular_totales(self):
         """Calcula subtotal, IGV y total."""
         subtotal = Decimal(self.ventDetValorUni) * self.ventDetCantidad
 
-        if self.prodCod.prodTipoAfecIGV == "10":
+        if self.ventDetTipoAfecIGV == "10":
             igv = subtotal * Decimal("0.18")
         else:
             igv = Decimal("0.00")
@@ -573,57 +739,104 @@ class VentaDetalle(models.Model):
 
     def _descontar_stock(self, cantidad):
         """Descuenta o devuelve stock (cantidad puede ser negativa)."""
-        inventario = BranchInventory.objects.select_for_update().get(
-            prodCod=self.prodCod,
-            sucurCod=self.ventCod.sucurCod
+        BranchInventory.mover_stock(
+            self.ventCod.sucurCod_id, self.prodCod_id, -cantidad,
+            motivo='VENTA' if cantidad > 0 else 'ANULACION',
+            documento=f"VENTA-{self.ventCod_id}"
         )
-        inventario.invStock -= cantidad
-        inventario.save(update_fields=["invStock"])
 
     @transaction.atomic
     def devolver_stock(self):
         """Devuelve stock al inventario cuando se anula un detalle."""
-        inventario = BranchInventory.objects.select_for_update().get(
-            prodCod=self.prodCod,
-            sucurCod=self.ventCod.sucurCod
+        BranchInventory.mover_stock(
+            self.ventCod.sucurCod_id, self.prodCod_id, self.ventDetCantidad,
+            motivo='ANULACION',
+            documento=f"VENTA-{self.ventCod_id}"
         )
-        inventario.invStock += self.ventDetCantidad
-        inventario.save(update_fields=["invStock"])
 
     
     def _actualizar_stock(self):
         """Actualiza el stock del producto en la sucursal"""
-        if not self.ventDetAnulado and self.prodCod and self.ventCod.sucurCod:
-            try:
-                # Obtener o crear el inventario para esta sucursal
-                inventario, created = BranchInventory.objects.get_or_create(
-                    prodCod=self.prodCod,
-                    sucurCod=self.ventCod.sucurCod,
-                    defaults={'invStock': 0}
-                )
-                
-                # Calcular la diferencia de stock
-                if self.pk:  # Si ya existe (está siendo actualizado)
-                    if hasattr(self, '_cantidad_original'):
-                        diferencia = self._cantidad_original - self.ventDetCantidad
-                    else:
-                        diferencia = -self.ventDetCantidad  # Por defecto, restar
-                else:  # Si es nuevo
-                    diferencia = -self.ventDetCantidad
-                
-                # Actualizar stock
-                inventario.invStock += diferencia
-                inventario.save()
-                
-                print(f"✅ Stock actualizado: {self.prodCod.prodDescr} - Diferencia: {diferencia}, Stock actual: {inventario.invStock}")
-                
-            except BranchInventory.DoesNotExist:
-                print(f"❌ No se encontró inventario para {self.prodCod.prodDescr} en la sucursal {self.ventCod.sucurCod}")
-            except Exception as e:
-                print(f"❌ Error actualizando stock: {e}")
+        if self.ventDetAnulado or not self.prodCod_id or not self.ventCod.sucurCod_id:
+            return
+
+        # _cantidad_original es 0 para detalles nuevos
+        diferencia = (self._cantidad_original or 0) - self.ventDetCantidad
+
+        BranchInventory.mover_stock(
+            self.ventCod.sucurCod_id, self.prodCod_id, diferencia,
+            motivo='VENTA' if not self._cantidad_original else 'MODIFICACION',
+            documento=f"VENTA-{self.ventCod_id}"
+        )
 
 ################################################################################### COMPROBANTE
 
+class ComprobanteManager(models.Manager):
+
+    @transaction.atomic
+    def emitir_lote(self, ventas_ids, sucursal_id=None):
+        """
+        Emite los comprobantes de varias ventas pagadas en una sola transacción:
+        un UPDATE por serie para los correlativos, bulk_create de cabeceras y
+        detalles, y un evento ENVIAR_SUNAT por comprobante.
+        Retorna (comprobantes, ids de ventas omitidas).
+        """
+        # Mismas condiciones que la emisión al completar el pago (registrar_pago)
+        aptas = Venta.objects.filter(
+            pk__in=ventas_ids, ventEstado='PAGADO', ventAnulada=False, ventTotal__gt=0,
+            comprobante__isnull=True
+        )
+        if sucursal_id:
+            aptas = aptas.filter(sucurCod_id=sucursal_id)
+
+        # Bloquear las ventas evita que dos lotes emitan la misma venta
+        ventas = list(aptas.select_for_update(of=('self',)).select_related('sucurCod').order_by('ventCod'))
+        if ventas:
+            # Ya con el bloqueo se vuelve a consultar: las filas de venta no cambian al
+            # emitir, así que un lote concurrente que terminó mientras se esperaba no
+            # se nota en el filtro anterior (READ COMMITTED) y el INSERT chocaría
+            emitidas = set(self.filter(ventCod_id__in=[v.pk for v in ventas]).values_list('ventCod_id', flat=True))
+            ventas = [venta for venta in ventas if venta.pk not in emitidas]
+        aptas = {venta.pk for venta in ventas}
+        omitidas = [pk for pk in dict.fromkeys(ventas_ids) if pk not in aptas]
+        if not ventas:
+            return [], omitidas
+
+        # Armar las cabeceras en memoria y agruparlas por serie
+        por_serie = {}
+        comprobantes = []
+        for venta in ventas:
+            comprobante = self.model(ventCod=venta)
+            comprobante._determinar_tipo_comprobante()
+            comprobante.comprSerie, sucursal_serie = comprobante._serie_y_sucursal()
+            comprobante._copiar_datos_venta()
+            por_serie.setdefault((comprobante.comprTipo, comprobante.comprSerie, sucursal_serie), []).append(comprobante)
+            comprobantes.append(comprobante)
+
+        # Un solo UPDATE ... RETURNING por serie reserva todo el rango
+        for (tipo, serie, sucursal_serie), grupo in por_serie.items():
+            primero = SerieComprobante.asignar_correlativos(tipo, serie, sucursal_serie, cantidad=len(grupo))
+            for i, comprobante in enumerate(grupo):
+                comprobante.comprCorrelativo = primero + i
+
+        self.bulk_create(comprobantes, batch_size=500)
+
+        por_venta = {comprobante.ventCod_id: comprobante for comprobante in comprobantes}
+        ComprobanteDetalle.objects.bulk_create([
+            ComprobanteDetalle.desde_venta_detalle(por_venta[detalle.ventCod_id], detalle)
+            for detalle in VentaDetalle.objects.filter(ventCod_id__in=aptas, ventDetAnulado=False)
+        ], batch_size=500)
+
+        EventoOutbox.objects.bulk_create([
+            EventoOutbox(outTipo='ENVIAR_SUNAT', outReferencia=comprobante.pk)
+            for comprobante in comprobantes
+            if not comprobante.va_en_resumen
+        ], batch_size=500)
+
+        print(f"✅ Lote emitido: {len(comprobantes)} comprobantes, {len(omitidas)} ventas omitidas")
+        return comprobantes, omitidas
+
+
 class Comprobante(models.Model):
     
     ESTADO_SUNAT = [
@@ -717,6 +930,33 @@ class Comprobante(models.Model):
         blank=True, 
         verbose_name="Fecha respuesta SUNAT"
     )
+    comprTicket = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name="Ticket SUNAT",
+        help_text="Envíos asíncronos: el estado final se concilia con consultar_ticket"
+    )
+    resCod = models.ForeignKey(
+        'ResumenDiario',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='comprobantes',
+        verbose_name="Resumen diario"
+    )
+
+    # Índice de artefactos (XML/CDR) en el almacén: se llena al guardarlos,
+    # así la serialización no consulta el sistema de archivos
+    comprTieneXML = models.BooleanField(default=False, verbose_name="Tiene XML")
+    comprXMLTamanio = models.PositiveIntegerField(null=True, blank=True, verbose_name="Tamaño XML (bytes)")
+    comprXMLSha256 = models.CharField(max_length=64, blank=True, verbose_name="SHA-256 XML")
+    comprXMLUbicacion = models.CharField(max_length=100, blank=True, verbose_name="Ubicación XML en el almacén")
+    comprTieneCDR = models.BooleanField(default=False, verbose_name="Tiene CDR")
+    comprCDRTamanio = models.PositiveIntegerField(null=True, blank=True, verbose_name="Tamaño CDR (bytes)")
+    comprCDRSha256 = models.CharField(max_length=64, blank=True, verbose_name="SHA-256 CDR")
+    comprCDRUbicacion = models.CharField(max_length=100, blank=True, verbose_name="Ubicación CDR en el almacén")
+
+    objects = ComprobanteManager()
 
     class Meta:
         db_table = 'comprobante'
@@ -724,6 +964,12 @@ class Comprobante(models.Model):
         indexes = [
             models.Index(fields=['comprSerie', 'comprCorrelativo']),
             models.Index(fields=['comprEstadoSUNAT']),
+            # Cola de conciliación: solo comprobantes con ticket sin respuesta final
+            models.Index(
+                fields=['comprEstadoSUNAT', 'comprCod'],
+                name='compr_por_conciliar_idx',
+                condition=~models.Q(comprTicket='') & models.Q(comprFechaRespuesta__isnull=True),
+            ),
         ]
 
     def __str__(self):
@@ -741,6 +987,8 @@ class Comprobante(models.Model):
         if self.comprEstadoSUNAT in ['ENVIADO', 'ACEPTADO']:
             raise ValidationError(f"El comprobante ya fue {self.get_comprEstadoSUNAT_display().lower()} a SUNAT")
         
+        self._validar_fuera_de_resumen()
+        
         if not self.ventCod or self.ventCod.ventAnulada:
             raise ValidationError("No se puede enviar un comprobante de venta anulada")
         
@@ -772,7 +1020,11 @@ class Comprobante(models.Model):
             self.comprMensajeSUNAT = resultado['mensaje']
             self.comprCodigoRespuesta = resultado['codigo_respuesta']
             self.comprHash = resultado.get('hash', '')
+            self.comprTicket = resultado.get('ticket', '')
             self.comprFechaEnvio = timezone.now()
+            if resultado['estado'] == 'ENVIADO':
+                # Pendiente de conciliar con consultar_ticket
+                self.comprFechaRespuesta = None
             
             if resultado['estado'] == 'ACEPTADO':
                 self.comprNombreCDR = resultado.get('cdr_nombre', '')
@@ -810,62 +1062,68 @@ class Comprobante(models.Model):
 
     def _guardar_archivo_cdr(self, cdr_base64):
         """
-        Guarda el CDR en el sistema de archivos
+        Guarda el CDR en el almacén de artefactos y lo registra en el comprobante
         """
+        from .almacen import almacen, nombre_cdr
+
         try:
-            from django.core.files.base import ContentFile
-            import os
-            
-            # Decodificar base64
-            cdr_content = base64.b64decode(cdr_base64)
-            
-            # Crear directorio si no existe
-            cdr_dir = 'cdr_files'
-            os.makedirs(cdr_dir, exist_ok=True)
-            
-            # Guardar archivo
-            filename = f"R-{self.comprSerie}-{self.comprCorrelativo}.zip"
-            filepath = os.path.join(cdr_dir, filename)
-            
-            with open(filepath, 'wb') as f:
-                f.write(cdr_content)
-                
-            print(f"✅ CDR guardado: {filepath}")
-            
+            contenido = base64.b64decode(cdr_base64)
+            sha256 = almacen().guardar('cdr', nombre_cdr(self), contenido)
+            self.registrar_artefacto('cdr', sha256, len(contenido))
+            print(f"✅ CDR guardado: {nombre_cdr(self)}")
         except Exception as e:
             print(f"⚠️ Error guardando CDR: {str(e)}")
     
     def _guardar_archivo_xml(self, xml_base64):
         """
-        Guarda el XML en el sistema de archivos
+        Guarda el XML en el almacén de artefactos y lo registra en el comprobante
         """
+        from .almacen import almacen, nombre_xml
+
         try:
-            from django.core.files.base import ContentFile
-            import os
-            
-            # Decodificar base64
-            xml_content = base64.b64decode(xml_base64)
-            
-            # Crear directorio si no existe
-            xml_dir = 'xml_files'
-            os.makedirs(xml_dir, exist_ok=True)
-            
-            # Guardar archivo
-            filename = f"{self.comprSerie}-{self.comprCorrelativo}.xml"
-            filepath = os.path.join(xml_dir, filename)
-            
-            with open(filepath, 'wb') as f:
-                f.write(xml_content)
-                
-            print(f"✅ XML guardado: {filepath}")
-            
+            contenido = base64.b64decode(xml_base64)
+            sha256 = almacen().guardar('xml', nombre_xml(self), contenido)
+            self.registrar_artefacto('xml', sha256, len(contenido))
+            print(f"✅ XML guardado: {nombre_xml(self)}")
         except Exception as e:
             print(f"⚠️ Error guardando XML: {str(e)}")
+
+    def registrar_artefacto(self, tipo, sha256, tamanio, guardar=False):
+        """
+        Registra presencia, tamaño, checksum y ubicación de un artefacto ('xml' o 'cdr').
+        Con sha256=None lo marca como ausente.
+        """
+        from .almacen import ubicacion_objeto
+
+        prefijo = tipo.upper()
+        setattr(self, f'comprTiene{prefijo}', sha256 is not None)
+        setattr(self, f'compr{prefijo}Tamanio', tamanio if sha256 else None)
+        setattr(self, f'compr{prefijo}Sha256', sha256 or '')
+        setattr(self, f'compr{prefijo}Ubicacion', ubicacion_objeto(sha256) if sha256 else '')
+        if guardar and self.pk:
+            self.save(update_fields=self.campos_artefacto(tipo))
+
+    @staticmethod
+    def campos_artefacto(tipo):
+        prefijo = tipo.upper()
+        return [
+            f'comprTiene{prefijo}', f'compr{prefijo}Tamanio',
+            f'compr{prefijo}Sha256', f'compr{prefijo}Ubicacion',
+        ]
     
+    def _validar_fuera_de_resumen(self):
+        """Una boleta incluida en un resumen diario solo se informa con ese resumen"""
+        if self.resCod_id:
+            raise ValidationError(
+                f"La boleta está incluida en el resumen {self.resCod.identificador}: se envía con ese resumen"
+            )
+
     def reenviar_a_sunat(self):
         """
         Reenvía el comprobante a SUNAT
         """
+        self._validar_fuera_de_resumen()
+
         # Resetear estado para permitir reenvío
         if self.comprEstadoSUNAT in ['ENVIADO', 'ACEPTADO']:
             self.comprEstadoSUNAT = 'PENDIENTE'
@@ -874,33 +1132,46 @@ class Comprobante(models.Model):
         
         return self.enviar_a_sunat()
     
-    def descargar_pdf(self):
+    def descargar_pdf(self, formato='A4'):
         """
-        Genera PDF del comprobante (puedes integrar con una librería de PDF)
+        PDF del comprobante ('A4' o ticket '80mm') como bytes. Se dibuja una sola vez
+        por contenido y queda en el almacén de artefactos (ver sales/pdf.py)
         """
-        # Aquí puedes integrar con reportlab, weasyprint, etc.
-        # Por ahora retornamos un mensaje
-        return f"PDF del comprobante {self.comprobante_completo}"
+        from .pdf import obtener_pdf
+
+        ruta, _ = obtener_pdf(self, formato)
+        with open(ruta, 'rb') as f:
+            return f.read()
     
     @property
     def puede_reenviar(self):
         """Indica si el comprobante puede ser reenviado a SUNAT"""
         return self.comprEstadoSUNAT in ['PENDIENTE', 'RECHAZADO', 'OBSERVADO']
     
+    @property
+    def va_en_resumen(self):
+        """Las boletas se informan por resumen diario si SUNAT_RESUMEN_DIARIO está activo"""
+        return self.comprTipo == '03' and getattr(settings, 'SUNAT_RESUMEN_DIARIO', False)
+
     @property
     def fue_aceptado(self):
         """Indica si el comprobante fue aceptado por SUNAT"""
         return self.comprEstadoSUNAT == 'ACEPTADO'
 
+    @property
+    def tiene_xml(self):
+        """Indica si el comprobante tiene XML guardado en el almacén"""
+        return self.comprTieneXML
+
     @property
     def tiene_cdr(self):
-        """Indica si el comprobante tiene CDR descargado"""
-        return bool(self.comprNombreCDR)
+        """Indica si el comprobante tiene CDR guardado en el almacén"""
+        return self.comprTieneCDR
 
     @property
     def url_descarga_cdr(self):
         """URL para descargar el CDR"""
-        if self.tiene_cdr:
+        if self.tiene_cdr or self.comprNombreCDR:
             return f'/api/sales/comprobantes/{self.comprCod}/descargar_cdr/'
         return None
 
@@ -939,20 +1210,26 @@ class Comprobante(models.Model):
         else:
             self.comprTipo = '03'  # Boleta
 
+    def _serie_y_sucursal(self):
+        """Serie según tipo (y sucursal si las series son por sucursal)"""
+        prefijo = 'F' if self.comprTipo == '01' else 'B'
+        sucursal_id = self.ventCod.sucurCod_id if getattr(settings, 'SUNAT_SERIES_POR_SUCURSAL', False) else None
+        # La serie SUNAT tiene 4 caracteres: letra + 3 dígitos
+        if sucursal_id is not None and not 1 <= sucursal_id <= 999:
+            raise ValidationError(
+                f"La sucursal {sucursal_id} no puede tener serie propia (F/B + 3 dígitos). "
+                "Desactive SUNAT_SERIES_POR_SUCURSAL para usar las series compartidas."
+            )
+        return f"{prefijo}{(sucursal_id or 1):03d}", sucursal_id
+
     def _asignar_serie_correlativo(self):
-        """Asigna serie y correlativo automáticamente"""
-        # Determinar serie según tipo
-        if self.comprTipo == '01':  # Factura
-            self.comprSerie = 'F001'
-        else:  # Boleta
-            self.comprSerie = 'B001'
-        
-        # Obtener siguiente correlativo
-        ultimo = Comprobante.objects.filter(
-            comprSerie=self.comprSerie
-        ).order_by('-comprCorrelativo').first()
-        
-        self.comprCorrelativo = (ultimo.comprCorrelativo + 1) if ultimo else 1
+        """Asigna serie y correlativo desde el contador de series"""
+        self.comprSerie, sucursal_id = self._serie_y_sucursal()
+
+        # Siguiente correlativo: un UPDATE ... RETURNING sobre la fila de la serie
+        self.comprCorrelativo = SerieComprobante.asignar_correlativos(
+            self.comprTipo, self.comprSerie, sucursal_id
+        )
 
     def _copiar_datos_venta(self):
         """Copia datos de la venta al comprobante"""
@@ -986,34 +1263,139 @@ class Comprobante(models.Model):
         from .models import ComprobanteDetalle  # Import aquí para evitar circular
         
         venta_detalles = self.ventCod.ventadetalle_set.filter(ventDetAnulado=False)
-        
-        for detalle_venta in venta_detalles:
-            ComprobanteDetalle.objects.create(
-                comprCod=self,
-                prodCod=detalle_venta.prodCod,
-                comprDetDescripcion=detalle_venta.ventDetDescripcion,
-                comprDetCantidad=detalle_venta.ventDetCantidad,
-                comprDetValorUni=detalle_venta.ventDetValorUni,
-                comprDetPrecioUni=detalle_venta.ventDetPrecioUni,
-                comprDetSubtotal=detalle_venta.ventDetSubtotal,
-                comprDetIGV=detalle_venta.ventDetIGV,
-                comprDetTotal=detalle_venta.ventDetTotal,
-                comprDetTipoIGV=detalle_venta.prodCod.prodTipoAfecIGV
+
+        ComprobanteDetalle.objects.bulk_create([
+            ComprobanteDetalle.desde_venta_detalle(self, detalle_venta)
+            for detalle_venta in venta_detalles
+        ])
+
+
+################################################################################### SERIE_COMPROBANTE
+
+class SerieComprobante(models.Model):
+    """
+    Contador de correlativos por (tipo, serie).
+    Cada asignación es un único UPDATE ... RETURNING sobre esta fila, así
+    los emisores concurrentes solo esperan el bloqueo de una fila y, como el
+    incremento vive en la transacción del llamador, no quedan huecos.
+    La numeración SUNAT depende solo de la serie: con series por sucursal la
+    sucursal 1 y la serie compartida emiten ambas F001/B001 y deben usar el
+    mismo contador. sucurCod solo indica qué sucursal abrió la serie.
+    """
+
+    serCod = models.AutoField(primary_key=True)
+    comprTipo = models.CharField(max_length=2, choices=Comprobante.TIPO_COMPROBANTE, verbose_name="Tipo de Comprobante")
+    comprSerie = models.CharField(max_length=4, verbose_name="Serie")
+    sucurCod = models.ForeignKey(
+        Branch,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        verbose_name="Sucursal",
+        help_text="Sucursal que abrió la serie (vacío = serie compartida). No forma parte de la clave"
+    )
+    serUltimoCorrelativo = models.IntegerField(default=0, verbose_name="Último correlativo")
+
+    class Meta:
+        db_table = 'serie_comprobante'
+        verbose_name = 'Serie de Comprobante'
+        verbose_name_plural = 'Series de Comprobante'
+        constraints = [
+            models.UniqueConstraint(fields=['comprTipo', 'comprSerie'], name='unique_serie_comprobante'),
+        ]
+
+    def __str__(self):
+        return f"{self.comprSerie} ({self.comprTipo}) - {self.serUltimoCorrelativo}"
+
+    @classmethod
+    def asignar_correlativos(cls, tipo, serie, sucursal_id=None, cantidad=1):
+        """
+        Reserva `cantidad` correlativos consecutivos y retorna el primero.
+        Debe llamarse dentro de la transacción que crea los comprobantes.
+        `sucursal_id` solo se guarda si la serie se crea en esta llamada.
+        """
+        correlativo = cls._incrementar(tipo, serie, cantidad)
+        if correlativo is None:
+            # Primera vez que se usa la serie: se inicializa con el último emitido
+            ultimo = Comprobante.objects.filter(comprSerie=serie).aggregate(
+                ultimo=models.Max('comprCorrelativo')
+            )['ultimo'] or 0
+            cls.objects.bulk_create(
+                [cls(comprTipo=tipo, comprSerie=serie, sucurCod_id=sucursal_id, serUltimoCorrelativo=ultimo)],
+                ignore_conflicts=True
+            )
+            correlativo = cls._incrementar(tipo, serie, cantidad)
+        return correlativo - cantidad + 1
+
+    @classmethod
+    def _incrementar(cls, tipo, serie, cantidad):
+        qn = connection.ops.quote_name
+        campos = {f.name: qn(f.column) for f in cls._meta.fields}
+        params = [cantidad, tipo, serie]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {qn(cls._meta.db_table)} "
+                f"SET {campos['serUltimoCorrelativo']} = {campos['serUltimoCorrelativo']} + %s "
+                f"WHERE {campos['comprTipo']} = %s AND {campos['comprSerie']} = %s "
+                f"RETURNING {campos['serUltimoCorrelativo']}",
+                params
             )
+            fila = cursor.fetchone()
+        return fila[0] if fila else None
 
-    @property
-    def tiene_xml(self):
-        """Indica si el comprobante tiene XML generado"""
-        import os
-        xml_path = f'xml_files/{self.comprSerie}-{self.comprCorrelativo}.xml'
-        return os.path.exists(xml_path)
+
+################################################################################### RESUMEN_DIARIO
+
+class ResumenDiario(models.Model):
+    """
+    Envío de boletas (serie B) de un día de emisión en un solo resumen a SUNAT.
+    Cada resumen lleva como máximo SUNAT_RESUMEN_MAX_COMPROBANTES boletas y
+    recibe un ticket; el resultado del ticket se aplica a todas sus boletas
+    (ver sales/resumen.py y sales/conciliacion.py).
+    """
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente de envío'),
+        ('ENVIADO', 'Enviado (ticket en proceso)'),
+        ('ACEPTADO', 'Aceptado por SUNAT'),
+        ('OBSERVADO', 'Observado por SUNAT'),
+        ('RECHAZADO', 'Rechazado por SUNAT'),
+        ('ERROR', 'Error de envío'),  # se reintenta en la siguiente corrida
+    ]
+
+    resCod = models.AutoField(primary_key=True)
+    resFechaEmision = models.DateField(verbose_name="Fecha de emisión de las boletas")
+    resNumero = models.PositiveIntegerField(verbose_name="Número del resumen en el día")
+    resEstado = models.CharField(max_length=10, choices=ESTADOS, default='PENDIENTE')
+    resCantidad = models.PositiveIntegerField(default=0, verbose_name="Cantidad de boletas")
+    resTotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    resTicket = models.CharField(max_length=50, blank=True, verbose_name="Ticket SUNAT")
+    resMensaje = models.TextField(blank=True)
+    resIntentos = models.PositiveIntegerField(default=0)
+    resFechaCreacion = models.DateTimeField(auto_now_add=True)
+    resFechaEnvio = models.DateTimeField(null=True, blank=True)
+    resFechaRespuesta = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'resumen_diario'
+        ordering = ['-resFechaEmision', 'resNumero']
+        verbose_name = 'Resumen Diario'
+        verbose_name_plural = 'Resúmenes Diarios'
+        constraints = [
+            models.UniqueConstraint(fields=['resFechaEmision', 'resNumero'], name='unique_resumen_por_dia'),
+        ]
+        indexes = [
+            models.Index(fields=['resEstado']),
+            models.Index(fields=['resTicket']),
+        ]
+
+    def __str__(self):
+        return f"{self.identificador} ({self.resEstado})"
 
     @property
-    def tiene_cdr(self):
-        """Indica si el comprobante tiene CDR descargado"""
-        import os
-        cdr_path = f'cdr_files/R-{self.comprSerie}-{self.comprCorrelativo}.zip'
-        return os.path.exists(cdr_path)
+    def identificador(self):
+        """Identificador SUNAT del resumen: RC-AAAAMMDD-N"""
+        return f"RC-{self.resFechaEmision:%Y%m%d}-{self.resNumero}"
 
 
 ################################################################################### COMPROBANTE_DETALLE
@@ -1087,3 +1469,311 @@ class ComprobanteDetalle(models.Model):
         """Retorna el valor unitario sin IGV"""
         return self.comprDetValorUni
 
+    @classmethod
+    def desde_venta_detalle(cls, comprobante, detalle_venta):
+        """Detalle (sin guardar) copiado de una línea de la venta"""
+        return cls(
+            comprCod=comprobante,
+            prodCod_id=detalle_venta.prodCod_id,
+            comprDetDescripcion=detalle_venta.ventDetDescripcion,
+            comprDetMarca=detalle_venta.ventDetMarca,
+            comprDetCantidad=detalle_venta.ventDetCantidad,
+            comprDetValorUni=detalle_venta.ventDetValorUni,
+            comprDetPrecioUni=detalle_venta.ventDetPrecioUni,
+            comprDetSubtotal=detalle_venta.ventDetSubtotal,
+            comprDetIGV=detalle_venta.ventDetIGV,
+            comprDetTotal=detalle_venta.ventDetTotal,
+            comprDetTipoIGV=detalle_venta.ventDetTipoAfecIGV
+        )
+
+
+
+################################################################################### IDEMPOTENCIA
+
+class RespuestaIdempotente(models.Model):
+    """
+    Respuesta guardada de un POST con cabecera Idempotency-Key.
+    Un reintento con la misma clave devuelve esta respuesta sin volver a
+    ejecutar la operación (ver sales/idempotencia.py).
+    """
+    ESTADOS = [
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADO', 'Completado'),
+    ]
+
+    idemCod = models.AutoField(primary_key=True)
+    usuCod = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuario")
+    idemClave = models.CharField(max_length=255, verbose_name="Idempotency-Key")
+    idemHuella = models.CharField(max_length=64, verbose_name="Huella de la petición")
+    idemEstado = models.CharField(max_length=10, choices=ESTADOS, default='PROCESANDO')
+    idemCodigoHttp = models.PositiveSmallIntegerField(null=True, blank=True)
+    idemRespuesta = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    idemFechaCreacion = models.DateTimeField(auto_now_add=True)
+    idemExpira = models.DateTimeField(db_index=True)
+    idemProcesandoHasta = models.DateTimeField(
+        null=True, blank=True,
+        verbose_name="Plazo del intento en curso",
+        help_text="Vencido, un reintento con la misma petición retoma la clave"
+    )
+
+    class Meta:
+        db_table = 'respuesta_idempotente'
+        verbose_name = 'Respuesta Idempotente'
+        verbose_name_plural = 'Respuestas Idempotentes'
+        constraints = [
+            models.UniqueConstraint(fields=['usuCod', 'idemClave'], name='unique_clave_idempotencia_usuario'),
+        ]
+
+    def __str__(self):
+        return f"{self.idemClave} ({self.idemEstado})"
+
+
+################################################################################### OUTBOX
+
+class EventoOutbox(models.Model):
+    """
+    Trabajo pendiente escrito en la misma transacción que lo origina
+    (p. ej. enviar a SUNAT el comprobante de un pago). Lo procesa fuera del
+    request el comando `manage.py procesar_outbox` (ver sales/outbox.py).
+    """
+    TIPOS = [
+        ('ENVIAR_SUNAT', 'Enviar comprobante a SUNAT'),
+    ]
+
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADO', 'Completado'),
+        ('FALLIDO', 'Fallido'),  # agotó los reintentos
+    ]
+
+    outCod = models.BigAutoField(primary_key=True)
+    outTipo = models.CharField(max_length=30, choices=TIPOS, verbose_name="Tipo de evento")
+    outReferencia = models.BigIntegerField(verbose_name="Código del objeto afectado")
+    outPayload = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    outEstado = models.CharField(max_length=10, choices=ESTADOS, default='PENDIENTE')
+    outIntentos = models.PositiveIntegerField(default=0)
+    outProximoIntento = models.DateTimeField(default=timezone.now)
+    outBloqueadoHasta = models.DateTimeField(null=True, blank=True)
+    outUltimoError = models.TextField(blank=True)
+    outFechaCreacion = models.DateTimeField(auto_now_add=True)
+    outFechaProcesado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'evento_outbox'
+        ordering = ['outCod']
+        verbose_name = 'Evento Outbox'
+        verbose_name_plural = 'Eventos Outbox'
+        indexes = [
+            models.Index(fields=['outEstado', 'outProximoIntento'], name='outbox_pendientes_idx'),
+            models.Index(fields=['outTipo', 'outReferencia'], name='outbox_referencia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.outTipo} #{self.outReferencia} ({self.outEstado})"
+
+    @classmethod
+    def encolar(cls, tipo, referencia, payload=None):
+        """Registra el evento; llamar dentro de la transacción del cambio que lo origina"""
+        return cls.objects.create(outTipo=tipo, outReferencia=referencia, outPayload=payload or {})
+
+
+################################################################################### VERSION_CACHE
+
+class VersionCache(models.Model):
+    """
+    Número de versión de un grupo de entradas de caché, compartido por todos
+    los procesos. Las claves cacheadas lo incluyen; al incrementarlo quedan sin
+    efecto en cualquier worker aunque la caché sea local a cada proceso
+    (ver sales/comparativa.py).
+    """
+    vcacClave = models.CharField(max_length=100, primary_key=True, verbose_name="Grupo de caché")
+    vcacVersion = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'version_cache'
+        verbose_name = 'Versión de Caché'
+        verbose_name_plural = 'Versiones de Caché'
+
+    def __str__(self):
+        return f"{self.vcacClave} v{self.vcacVersion}"
+
+
+################################################################################### VENTA_RESUMEN_DIARIO
+
+class VentaResumenDiario(models.Model):
+    """
+    Tabla de hechos de ventas por (día, sucursal, vendedor, forma de pago, estado).
+    Venta.save() le aplica la diferencia de cada cambio en la misma transacción
+    y `manage.py reconstruir_resumen_ventas` la rearma desde el histórico
+    (ver sales/hechos.py). Los reportes leen de aquí en lugar de agrupar ventas.
+    """
+    vresCod = models.BigAutoField(primary_key=True)
+    vresFecha = models.DateField(verbose_name="Día de la venta (hora local)")
+    sucurCod = models.ForeignKey(Branch, on_delete=models.CASCADE, verbose_name="Sucursal")
+    usuCod = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Vendedor")
+    vresFormaPago = models.CharField(max_length=15, choices=Venta.FORMA_PAGO)
+    vresEstado = models.CharField(max_length=20, choices=Venta.ESTADO_VENTA)
+    vresCantidad = models.IntegerField(default=0, verbose_name="Cantidad de ventas")
+    vresSubTotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vresIGV = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vresTotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vresAdelanto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vresSaldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'sales_daily_summary'
+        ordering = ['-vresFecha']
+        verbose_name = 'Resumen Diario de Ventas'
+        verbose_name_plural = 'Resúmenes Diarios de Ventas'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vresFecha', 'sucurCod', 'usuCod', 'vresFormaPago', 'vresEstado'],
+                name='unique_resumen_ventas_dia'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['sucurCod', 'vresFecha'], name='resumen_ventas_suc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vresFecha} suc {self.sucurCod_id} vend {self.usuCod_id} {self.vresEstado}: {self.vresCantidad}"
+
+
+################################################################################### VENTA_PRODUCTO_DIARIO
+
+class VentaProductoDiario(models.Model):
+    """
+    Tabla de hechos de productos vendidos por (día, sucursal, producto): unidades,
+    importes y costo al momento de la venta. Se mantiene al insertar y anular
+    detalles (ver sales/hechos.py); la usan los reportes de productos y márgenes.
+    """
+    vprodCod = models.BigAutoField(primary_key=True)
+    vprodFecha = models.DateField(verbose_name="Día de la venta (hora local)")
+    sucurCod = models.ForeignKey(Branch, on_delete=models.CASCADE, verbose_name="Sucursal")
+    prodCod = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Producto")
+    vprodCantidad = models.IntegerField(default=0, verbose_name="Unidades vendidas")
+    vprodSubTotal = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor sin IGV")
+    vprodIGV = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vprodTotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vprodCosto = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Costo al vender")
+
+    class Meta:
+        db_table = 'sales_product_daily'
+        ordering = ['-vprodFecha']
+        verbose_name = 'Resumen Diario por Producto'
+        verbose_name_plural = 'Resúmenes Diarios por Producto'
+        constraints = [
+            models.UniqueConstraint(fields=['vprodFecha', 'sucurCod', 'prodCod'], name='unique_resumen_producto_dia'),
+        ]
+        indexes = [
+            models.Index(fields=['sucurCod', 'vprodFecha'], name='resumen_producto_suc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vprodFecha} suc {self.sucurCod_id} prod {self.prodCod_id}: {self.vprodCantidad}"
+
+
+################################################################################### TRABAJO_REPORTE
+
+class TrabajoReporte(models.Model):
+    """
+    Reporte o exportación calculado fuera del request por el comando
+    `manage.py procesar_trabajos_reportes` (ver sales/trabajos.py). El resultado
+    queda en trabResultado (reportes JSON) o en el almacén de artefactos
+    (exportaciones). Pedidos iguales (tipo, parámetros, alcance y día) comparten
+    el mismo trabajo mientras está en curso o durante REPORTE_TRABAJO_TTL.
+    """
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADO', 'Completado'),
+        ('FALLIDO', 'Fallido'),
+    ]
+
+    trabCod = models.BigAutoField(primary_key=True)
+    trabTipo = models.CharField(max_length=50, verbose_name="Reporte o exportación")
+    trabParametros = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    trabAlcance = models.CharField(max_length=30, verbose_name="Alcance (gerente o sucursal)")
+    trabHuella = models.CharField(max_length=64, verbose_name="SHA-256 de tipo, parámetros, alcance y día")
+    usuCod = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Solicitado por")
+    trabEstado = models.CharField(max_length=10, choices=ESTADOS, default='PENDIENTE')
+    trabIntentos = models.PositiveIntegerField(default=0)
+    trabFilasProcesadas = models.PositiveIntegerField(default=0)
+    trabFilasTotales = models.PositiveIntegerField(null=True, blank=True)
+    trabBloqueadoHasta = models.DateTimeField(null=True, blank=True)
+    trabUltimoError = models.TextField(blank=True)
+    trabResultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    trabArchivoNombre = models.CharField(max_length=150, blank=True)
+    trabArchivoTipo = models.CharField(max_length=100, blank=True, verbose_name="Content-Type del archivo")
+    trabArchivoSha256 = models.CharField(max_length=64, blank=True)
+    trabFechaCreacion = models.DateTimeField(auto_now_add=True)
+    trabFechaInicio = models.DateTimeField(null=True, blank=True)
+    trabFechaFin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'trabajo_reporte'
+        ordering = ['trabCod']
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reportes'
+        constraints = [
+            # Un solo trabajo en curso por huella: los pedidos concurrentes lo comparten
+            models.UniqueConstraint(
+                fields=['trabHuella'],
+                condition=Q(trabEstado__in=['PENDIENTE', 'PROCESANDO']),
+                name='unique_trabajo_reporte_en_curso'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['trabHuella', 'trabFechaFin'], name='trabajo_reporte_huella_idx'),
+            models.Index(fields=['trabEstado', 'trabCod'], name='trabajo_reporte_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.trabTipo} #{self.trabCod} ({self.trabEstado})"
+
+    @property
+    def es_archivo(self):
+        return bool(self.trabArchivoSha256)
+
+    def eta_segundos(self):
+        """Segundos estimados para terminar según el avance por filas (None si no se puede estimar)"""
+        if self.trabEstado == 'COMPLETADO':
+            return 0
+        if self.trabEstado != 'PROCESANDO' or not self.trabFilasTotales or not self.trabFilasProcesadas:
+            return None
+        transcurrido = (timezone.now() - self.trabFechaInicio).total_seconds()
+        restantes = max(self.trabFilasTotales - self.trabFilasProcesadas, 0)
+        return round(transcurrido / self.trabFilasProcesadas * restantes, 1)
+
+
+################################################################################### ANTIGUEDAD_DEUDA
+
+class AntiguedadDeuda(models.Model):
+    """
+    Foto nocturna de la deuda pendiente por (día de corte, sucursal, cliente,
+    día de venta), armada por `manage.py generar_antiguedad_deuda`. Con
+    historiales grandes el reporte de clientes y la exportación de deudas
+    calculan los tramos desde aquí (ver sales/antiguedad.py).
+    """
+    adeuCod = models.BigAutoField(primary_key=True)
+    adeuCorte = models.DateField(verbose_name="Día de corte")
+    sucurCod = models.ForeignKey(Branch, on_delete=models.CASCADE, verbose_name="Sucursal")
+    cliNombreCom = models.CharField(max_length=200)
+    cliDocNum = models.CharField(max_length=15, blank=True)
+    adeuDiaVenta = models.DateField(verbose_name="Día de la venta (hora local)")
+    adeuCantidad = models.IntegerField(default=0, verbose_name="Ventas con saldo")
+    adeuTotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    adeuSaldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'deuda_antiguedad'
+        ordering = ['-adeuCorte']
+        verbose_name = 'Antigüedad de Deuda'
+        verbose_name_plural = 'Antigüedad de Deudas'
+        indexes = [
+            models.Index(fields=['adeuCorte', 'sucurCod'], name='deuda_antiguedad_corte_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.adeuCorte} suc {self.sucurCod_id} {self.cliNombreCom} ({self.adeuDiaVenta}): {self.adeuSaldo}"
@@ -0,0 +1,108 @@
+"""
+Procesamiento del outbox de ventas (EventoOutbox).
+
+Cada worker reclama un lote con SELECT ... FOR UPDATE SKIP LOCKED y lo marca
+PROCESANDO con un bloqueo temporal; si el worker muere, el bloqueo vence y otro
+lo retoma; el resultado del primero ya no se registra (PERDIDO). Los fallos se reintentan con backoff exponencial con jitter y, al
+agotar OUTBOX_MAX_INTENTOS, el evento queda FALLIDO (dead letter).
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Comprobante, EventoOutbox
+
+
+def _enviar_sunat(evento):
+    comprobante = Comprobante.objects.select_related('ventCod').get(pk=evento.outReferencia)
+    # Un reintento tras un envío exitoso no debe volver a enviar
+    if comprobante.comprEstadoSUNAT in ['ENVIADO', 'ACEPTADO']:
+        return
+    # Ya incluido en un resumen diario: lo envía ese resumen
+    if comprobante.resCod_id:
+        return
+    comprobante.enviar_a_sunat()
+
+
+MANEJADORES = {
+    'ENVIAR_SUNAT': _enviar_sunat,
+}
+
+
+def reclamar_lote(limite):
+    """Marca como PROCESANDO hasta `limite` eventos disponibles y los retorna"""
+    ahora = timezone.now()
+    bloqueo = timedelta(seconds=getattr(settings, 'OUTBOX_BLOQUEO_SEGUNDOS', 300))
+    disponibles = (
+        Q(outEstado='PENDIENTE', outProximoIntento__lte=ahora)
+        | Q(outEstado='PROCESANDO', outBloqueadoHasta__lte=ahora)
+    )
+
+    with transaction.atomic():
+        ids = list(
+            EventoOutbox.objects.select_for_update(skip_locked=True)
+            .filter(disponibles)
+            .order_by('outProximoIntento')
+            .values_list('outCod', flat=True)[:limite]
+        )
+        if not ids:
+            return []
+        EventoOutbox.objects.filter(pk__in=ids).update(
+            outEstado='PROCESANDO', outBloqueadoHasta=ahora + bloqueo
+        )
+    return list(EventoOutbox.objects.filter(pk__in=ids).order_by('outCod'))
+
+
+def calcular_espera(intentos):
+    """Segundos hasta el siguiente intento: base * 2^(n-1), con tope y jitter"""
+    base = getattr(settings, 'OUTBOX_BACKOFF_BASE', 30)
+    tope = getattr(settings, 'OUTBOX_BACKOFF_MAX', 3600)
+    espera = min(base * (2 ** (intentos - 1)), tope)
+    return random.uniform(espera / 2, espera)
+
+
+def _reclamado(evento):
+    """
+    El evento mientras lo tenga este worker: mismo intento, el bloqueo que le dio
+    reclamar_lote() y sin vencer (otro worker que lo retome pone otro bloqueo)
+    """
+    return EventoOutbox.objects.filter(
+        pk=evento.pk, outEstado='PROCESANDO', outIntentos=evento.outIntentos,
+        outBloqueadoHasta=evento.outBloqueadoHasta, outBloqueadoHasta__gt=timezone.now()
+    )
+
+
+def procesar_evento(evento):
+    """
+    Ejecuta el manejador del evento y registra el resultado. Retorna el estado
+    final, o 'PERDIDO' si el bloqueo venció y el resultado ya no le corresponde
+    """
+    manejador = MANEJADORES.get(evento.outTipo)
+    try:
+        if manejador is None:
+            raise ValueError(f"Tipo de evento sin manejador: {evento.outTipo}")
+        manejador(evento)
+    except Exception as e:
+        intentos = evento.outIntentos + 1
+        agotado = intentos >= getattr(settings, 'OUTBOX_MAX_INTENTOS', 8)
+        estado = 'FALLIDO' if agotado else 'PENDIENTE'
+        actualizados = _reclamado(evento).update(
+            outEstado=estado,
+            outIntentos=intentos,
+            outUltimoError=str(e)[:2000],
+            outBloqueadoHasta=None,
+            outProximoIntento=timezone.now() + timedelta(seconds=calcular_espera(intentos)),
+        )
+        return estado if actualizados else 'PERDIDO'
+
+    completado = _reclamado(evento).update(
+        outEstado='COMPLETADO',
+        outIntentos=evento.outIntentos + 1,
+        outBloqueadoHasta=None,
+        outFechaProcesado=timezone.now(),
+    )
+    return 'COMPLETADO' if completado else 'PERDIDO'
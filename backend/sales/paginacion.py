@@ -0,0 +1,118 @@
+"""
+Paginación por cursor (keyset) de listados de ventas sobre (ventFecha, ventCod).
+
+Cada página filtra desde la última fila vista en lugar de saltar filas con
+OFFSET, así la página 1000 cuesta lo mismo que la primera; el índice
+venta_fecha_cod_idx (y venta_suc_fecha_cod_idx por sucursal) resuelve el orden.
+
+El cursor es opaco (base64 de la fecha, el código y la dirección). Parámetros:
+- cursor: next_cursor o prev_cursor de la respuesta anterior (vacío = primera página)
+- page_size: filas por página (máximo PAGINACION_TAMANIO_MAXIMO)
+- include_total=true: agrega el total. Se cuenta hasta PAGINACION_CONTEO_MAXIMO
+  filas; por encima, en PostgreSQL se usa la estimación del planificador y
+  'total_exacto' es False.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+ORDEN = ('-ventFecha', '-ventCod')
+ORDEN_INVERSO = ('ventFecha', 'ventCod')
+
+
+def codificar_cursor(fila, direccion):
+    fecha, codigo = _posicion(fila)
+    datos = json.dumps([fecha.isoformat(), codigo, direccion]).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """(fecha, código, dirección); lanza ValueError si el cursor no es válido"""
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        fecha, codigo, direccion = json.loads(datos)
+        fecha = parse_datetime(fecha)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Cursor inválido')
+    if fecha is None or not isinstance(codigo, int) or direccion not in ('n', 'p'):
+        raise ValueError('Cursor inválido')
+    return fecha, codigo, direccion
+
+
+def _posicion(fila):
+    if isinstance(fila, dict):
+        return fila['ventFecha'], fila['ventCod']
+    return fila.ventFecha, fila.ventCod
+
+
+def _entero(valor, defecto):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return defecto
+
+
+def contar_aproximado(queryset):
+    """(total, exacto): cuenta hasta PAGINACION_CONTEO_MAXIMO filas y estima por encima"""
+    maximo = getattr(settings, 'PAGINACION_CONTEO_MAXIMO', 10000)
+    queryset = queryset.order_by()
+    total = queryset[:maximo + 1].count()
+    if total <= maximo:
+        return total, True
+
+    if connection.vendor == 'postgresql':
+        sql, parametros = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', parametros)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return max(int(plan[0]['Plan']['Plan Rows']), maximo + 1), False
+    return maximo + 1, False
+
+
+def paginar_ventas(params, queryset):
+    """
+    Página de `queryset` (ventas) según los parámetros del request (QueryDict).
+    Retorna (filas, paginacion); lanza ValueError si el cursor no es válido.
+    Sirve tanto para querysets de instancias como de values() (deben incluir
+    ventFecha y ventCod).
+    """
+    tamanio_maximo = getattr(settings, 'PAGINACION_TAMANIO_MAXIMO', 200)
+    tamanio = min(max(_entero(params.get('page_size'), 20), 1), tamanio_maximo)
+    cursor = params.get('cursor')
+
+    pagina = queryset
+    direccion = 'n'
+    if cursor:
+        fecha, codigo, direccion = decodificar_cursor(cursor)
+        if direccion == 'n':
+            pagina = pagina.filter(Q(ventFecha__lt=fecha) | Q(ventFecha=fecha, ventCod__lt=codigo))
+        else:
+            pagina = pagina.filter(Q(ventFecha__gt=fecha) | Q(ventFecha=fecha, ventCod__gt=codigo))
+
+    filas = list(pagina.order_by(*(ORDEN if direccion == 'n' else ORDEN_INVERSO))[:tamanio + 1])
+    hay_mas = len(filas) > tamanio
+    filas = filas[:tamanio]
+    if direccion == 'p':
+        filas.reverse()
+
+    # Hacia adelante: hay siguiente si sobró una fila y hay anterior si se llegó con cursor.
+    # Hacia atrás es al revés.
+    has_next = hay_mas if direccion == 'n' else bool(cursor)
+    has_prev = bool(cursor) if direccion == 'n' else hay_mas
+
+    paginacion = {
+        'page_size': tamanio,
+        'has_next': has_next and bool(filas),
+        'has_prev': has_prev and bool(filas),
+        'next_cursor': codificar_cursor(filas[-1], 'n') if has_next and filas else None,
+        'prev_cursor': codificar_cursor(filas[0], 'p') if has_prev and filas else None,
+    }
+    if str(params.get('include_total', '')).lower() in ('1', 'true', 'si', 'sí'):
+        paginacion['total'], paginacion['total_exacto'] = contar_aproximado(queryset)
+    return filas, paginacion
@@ -0,0 +1,429 @@
+"""
+Representación impresa (PDF) de comprobantes: A4 y ticket de 80 mm.
+
+- Las plantillas (tamaños, fuentes, columnas) se arman una vez por proceso.
+- renderizar_pdf() recibe solo datos planos (datos_comprobante()) y no toca la
+  base de datos.
+- El PDF se guarda en el almacén de artefactos con un nombre por comprobante y
+  formato, etiquetado con una clave que resume todos los datos impresos (incluye
+  el hash SUNAT y el estado): mientras el comprobante no cambie se sirve el mismo
+  archivo sin volver a dibujarlo. Al cambiar, el PDF nuevo reemplaza al anterior
+  y el objeto anterior se borra (ningún otro comprobante imprime el mismo PDF).
+"""
+import hashlib
+import io
+import json
+from decimal import Decimal
+from functools import lru_cache
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+# Cambiar al modificar el diseño: invalida los PDF guardados
+VERSION_PLANTILLA = 1
+
+FORMATOS = ('A4', '80mm')
+
+TIPOS_IMPRESOS = {
+    '01': 'FACTURA ELECTRÓNICA',
+    '03': 'BOLETA DE VENTA ELECTRÓNICA',
+    '07': 'NOTA DE CRÉDITO ELECTRÓNICA',
+    '08': 'NOTA DE DÉBITO ELECTRÓNICA',
+}
+
+MONEDAS = {'PEN': ('SOLES', 'S/'), 'USD': ('DÓLARES AMERICANOS', 'US$')}
+
+
+################################################################################### MONTO EN LETRAS
+
+_UNIDADES = [
+    '', 'UNO', 'DOS', 'TRES', 'CUATRO', 'CINCO', 'SEIS', 'SIETE', 'OCHO', 'NUEVE', 'DIEZ',
+    'ONCE', 'DOCE', 'TRECE', 'CATORCE', 'QUINCE', 'DIECISÉIS', 'DIECISIETE', 'DIECIOCHO',
+    'DIECINUEVE', 'VEINTE', 'VEINTIUNO', 'VEINTIDÓS', 'VEINTITRÉS', 'VEINTICUATRO',
+    'VEINTICINCO', 'VEINTISÉIS', 'VEINTISIETE', 'VEINTIOCHO', 'VEINTINUEVE',
+]
+_DECENAS = ['', '', '', 'TREINTA', 'CUARENTA', 'CINCUENTA', 'SESENTA', 'SETENTA', 'OCHENTA', 'NOVENTA']
+_CENTENAS = [
+    '', 'CIENTO', 'DOSCIENTOS', 'TRESCIENTOS', 'CUATROCIENTOS', 'QUINIENTOS',
+    'SEISCIENTOS', 'SETECIENTOS', 'OCHOCIENTOS', 'NOVECIENTOS',
+]
+
+
+def _hasta_999(n):
+    if n == 100:
+        return 'CIEN'
+    centena, resto = divmod(n, 100)
+    partes = [_CENTENAS[centena]] if centena else []
+    if resto < 30:
+        partes.append(_UNIDADES[resto])
+    else:
+        decena, unidad = divmod(resto, 10)
+        partes.append(_DECENAS[decena] + (f' Y {_UNIDADES[unidad]}' if unidad else ''))
+    return ' '.join(p for p in partes if p)
+
+
+def _apocopar(texto):
+    """Delante de MIL/MILLONES "UNO" pasa a "UN" ("VEINTIÚN MIL", "TREINTA Y UN MIL")"""
+    if texto.endswith('VEINTIUNO'):
+        return texto[:-len('VEINTIUNO')] + 'VEINTIÚN'
+    if texto.endswith('UNO'):
+        return texto[:-1]
+    return texto
+
+
+def numero_en_letras(n):
+    """Entero (0 a 999 999 999 999) en letras, en mayúsculas"""
+    if n == 0:
+        return 'CERO'
+    millones, resto = divmod(n, 1_000_000)
+    miles, unidades = divmod(resto, 1000)
+    partes = []
+    if millones:
+        partes.append('UN MILLÓN' if millones == 1 else f'{_apocopar(numero_en_letras(millones))} MILLONES')
+    if miles:
+        partes.append('MIL' if miles == 1 else f'{_apocopar(_hasta_999(miles))} MIL')
+    if unidades:
+        partes.append(_hasta_999(unidades))
+    return ' '.join(partes)
+
+
+def monto_en_letras(monto, moneda='PEN'):
+    """'SON: CIENTO DIECIOCHO CON 00/100 SOLES', como en la representación impresa SUNAT"""
+    monto = Decimal(monto).quantize(Decimal('0.01'))
+    entero = int(monto)
+    centimos = int((monto - entero) * 100)
+    return f"SON: {numero_en_letras(entero)} CON {centimos:02d}/100 {MONEDAS.get(moneda, MONEDAS['PEN'])[0]}"
+
+
+################################################################################### DATOS
+
+def datos_comprobante(comprobante):
+    """Datos planos (serializables y picklables) que se imprimen; usa comprobante.detalles.all()"""
+    from django.utils import timezone
+
+    fecha = timezone.localtime(comprobante.comprFechaEmision)
+    return {
+        'tipo': comprobante.comprTipo,
+        'serie': comprobante.comprSerie,
+        'correlativo': comprobante.comprCorrelativo,
+        'fecha': fecha.strftime('%d/%m/%Y %H:%M'),
+        'fecha_iso': fecha.strftime('%Y-%m-%d'),
+        'emisor': {
+            'ruc': comprobante.comprRUCEmisor,
+            'razon_social': comprobante.comprRazonSocialEmisor,
+            'direccion': comprobante.comprDireccionEmisor,
+        },
+        'receptor': {
+            'tipo_doc': comprobante.comprTipoDocReceptor,
+            'num_doc': comprobante.comprNumDocReceptor,
+            'nombre': comprobante.comprRazonSocialReceptor,
+            'direccion': comprobante.comprDireccionReceptor,
+        },
+        'moneda': comprobante.comprMoneda,
+        'gravadas': str(comprobante.comprTotalGravadas),
+        'exoneradas': str(comprobante.comprTotalExoneradas),
+        'inafectas': str(comprobante.comprTotalInafectas),
+        'igv': str(comprobante.comprTotalIGV),
+        'total': str(comprobante.comprTotalVenta),
+        'hash': comprobante.comprHash,
+        'estado': comprobante.comprEstadoSUNAT,
+        'items': [
+            {
+                'cantidad': detalle.comprDetCantidad,
+                'descripcion': detalle.comprDetDescripcion,
+                'marca': detalle.comprDetMarca,
+                'precio': str(detalle.comprDetPrecioUni),
+                'total': str(detalle.comprDetTotal),
+            }
+            for detalle in comprobante.detalles.all()
+        ],
+    }
+
+
+def clave_pdf(datos, formato):
+    """Clave del PDF en el almacén: cambia si cambia cualquier dato impreso o la plantilla"""
+    contenido = json.dumps([VERSION_PLANTILLA, formato, datos], sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def contenido_qr(datos):
+    """Formato del QR de la representación impresa: RUC|TIPO|SERIE|NUMERO|IGV|TOTAL|FECHA|TIPO DOC|NUM DOC|HASH|"""
+    return '|'.join([
+        datos['emisor']['ruc'], datos['tipo'], datos['serie'], str(datos['correlativo']),
+        datos['igv'], datos['total'], datos['fecha_iso'],
+        datos['receptor']['tipo_doc'], datos['receptor']['num_doc'], datos['hash'], '',
+    ])
+
+
+################################################################################### PLANTILLAS
+
+class _Plantilla:
+    """Medidas y columnas de un formato; se construye una vez por proceso"""
+
+    def __init__(self, formato):
+        self.formato = formato
+        if formato == 'A4':
+            self.ancho, self.alto = A4
+            self.margen = 15 * mm
+            self.fuente, self.negrita = 'Helvetica', 'Helvetica-Bold'
+            self.cuerpo, self.titulo = 9, 12
+            self.linea = 4.6 * mm
+            self.qr = 28 * mm
+            util = self.ancho - 2 * self.margen
+            # (campo, título, x, ancho, alineación)
+            self.columnas = [
+                ('cantidad', 'CANT.', self.margen, 15 * mm, 'right'),
+                ('descripcion', 'DESCRIPCIÓN', self.margen + 20 * mm, util - 75 * mm, 'left'),
+                ('precio', 'P. UNIT.', self.margen + util - 50 * mm, 25 * mm, 'right'),
+                ('total', 'IMPORTE', self.margen + util - 25 * mm, 25 * mm, 'right'),
+            ]
+        else:
+            self.ancho, self.alto = 80 * mm, None  # el alto depende de las líneas
+            self.margen = 4 * mm
+            self.fuente, self.negrita = 'Helvetica', 'Helvetica-Bold'
+            self.cuerpo, self.titulo = 7, 8.5
+            self.linea = 3.4 * mm
+            self.qr = 26 * mm
+            util = self.ancho - 2 * self.margen
+            self.columnas = [
+                ('cantidad', 'CANT', self.margen, 7 * mm, 'right'),
+                ('descripcion', 'DESCRIPCIÓN', self.margen + 9 * mm, util - 27 * mm, 'left'),
+                ('total', 'IMPORTE', self.margen + util - 18 * mm, 18 * mm, 'right'),
+            ]
+        self.ancho_descripcion = next(c[3] for c in self.columnas if c[0] == 'descripcion')
+
+
+@lru_cache(maxsize=None)
+def plantilla(formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de PDF no soportado: {formato}")
+    return _Plantilla(formato)
+
+
+################################################################################### RENDER
+
+def _lineas_items(p, datos):
+    """Cada ítem partido en las líneas que ocupa su descripción"""
+    filas = []
+    for item in datos['items']:
+        texto = item['descripcion'] + (f" - {item['marca']}" if item['marca'] else '')
+        filas.append((item, simpleSplit(texto, p.fuente, p.cuerpo, p.ancho_descripcion) or ['']))
+    return filas
+
+
+def renderizar_pdf(datos, formato='A4'):
+    """PDF (bytes) del comprobante a partir de datos_comprobante()"""
+    p = plantilla(formato)
+    filas = _lineas_items(p, datos)
+    lineas_items = sum(len(lineas) for _, lineas in filas)
+
+    alto = p.alto or (95 * mm + lineas_items * p.linea + p.qr + 40 * mm)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(p.ancho, alto), pageCompression=1)
+    c.setTitle(f"{datos['serie']}-{datos['correlativo']}")
+    c.setAuthor(datos['emisor']['razon_social'])
+
+    y = _encabezado(c, p, datos, alto - p.margen)
+    y = _items(c, p, datos, filas, y, alto)
+    _totales(c, p, datos, y)
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _texto(c, p, x, y, texto, negrita=False, tamanio=None, alineacion='left', ancho=0):
+    c.setFont(p.negrita if negrita else p.fuente, tamanio or p.cuerpo)
+    if alineacion == 'right':
+        c.drawRightString(x + ancho, y, texto)
+    elif alineacion == 'center':
+        c.drawCentredString(x + ancho / 2, y, texto)
+    else:
+        c.drawString(x, y, texto)
+
+
+def _encabezado(c, p, datos, y):
+    emisor, receptor = datos['emisor'], datos['receptor']
+    util = p.ancho - 2 * p.margen
+    titulo = TIPOS_IMPRESOS.get(datos['tipo'], 'COMPROBANTE ELECTRÓNICO')
+    numero = f"{datos['serie']}-{int(datos['correlativo']):08d}"
+
+    if p.formato == 'A4':
+        # Emisor a la izquierda, recuadro con RUC/tipo/número a la derecha
+        _texto(c, p, p.margen, y - 5 * mm, emisor['razon_social'], negrita=True, tamanio=p.titulo)
+        for i, linea in enumerate(simpleSplit(emisor['direccion'], p.fuente, p.cuerpo, util - 75 * mm)[:2]):
+            _texto(c, p, p.margen, y - 10 * mm - i * p.linea, linea)
+        caja_x, caja_ancho = p.ancho - p.margen - 70 * mm, 70 * mm
+        c.rect(caja_x, y - 24 * mm, caja_ancho, 24 * mm)
+        _texto(c, p, caja_x, y - 7 * mm, f"R.U.C. {emisor['ruc']}", True, p.titulo, 'center', caja_ancho)
+        _texto(c, p, caja_x, y - 13 * mm, titulo, True, p.cuerpo + 1, 'center', caja_ancho)
+        _texto(c, p, caja_x, y - 19 * mm, numero, True, p.titulo, 'center', caja_ancho)
+        y -= 32 * mm
+    else:
+        centro = lambda texto, yy, negrita=False, tamanio=None: _texto(
+            c, p, p.margen, yy, texto, negrita, tamanio, 'center', util
+        )
+        for linea in simpleSplit(emisor['razon_social'], p.negrita, p.titulo, util):
+            y -= p.linea + 0.6 * mm
+            centro(linea, y, True, p.titulo)
+        y -= p.linea
+        centro(f"RUC {emisor['ruc']}", y)
+        for linea in simpleSplit(emisor['direccion'], p.fuente, p.cuerpo, util)[:3]:
+            y -= p.linea
+            centro(linea, y)
+        y -= p.linea * 1.6
+        centro(titulo, y, True)
+        y -= p.linea
+        centro(numero, y, True)
+        y -= p.linea
+
+    etiquetas_doc = {'1': 'DNI', '6': 'RUC', '-': 'DOC.'}
+    cliente = [
+        ('FECHA EMISIÓN', datos['fecha']),
+        ('CLIENTE', receptor['nombre'] or 'CLIENTES VARIOS'),
+        (etiquetas_doc.get(receptor['tipo_doc'], 'DOC.'), receptor['num_doc'] or '-'),
+    ]
+    if receptor['direccion']:
+        cliente.append(('DIRECCIÓN', receptor['direccion']))
+    cliente.append(('MONEDA', MONEDAS.get(datos['moneda'], MONEDAS['PEN'])[0]))
+
+    sangria = 28 * mm if p.formato == 'A4' else 20 * mm
+    for etiqueta, valor in cliente:
+        y -= p.linea
+        _texto(c, p, p.margen, y, f"{etiqueta}:", negrita=True)
+        lineas = simpleSplit(str(valor), p.fuente, p.cuerpo, util - sangria) or ['']
+        for i, linea in enumerate(lineas[:2]):
+            if i:
+                y -= p.linea
+            _texto(c, p, p.margen + sangria, y, linea)
+    return y - p.linea
+
+
+def _items(c, p, datos, filas, y, alto):
+    util = p.ancho - 2 * p.margen
+    c.line(p.margen, y, p.margen + util, y)
+    y -= p.linea
+    for _, titulo, x, ancho, alineacion in p.columnas:
+        _texto(c, p, x, y, titulo, True, None, alineacion, ancho)
+    y -= p.linea * 0.5
+    c.line(p.margen, y, p.margen + util, y)
+
+    for item, lineas in filas:
+        if p.formato == 'A4' and y - len(lineas) * p.linea < 70 * mm:
+            # Salto de página en A4: los totales necesitan su espacio al final
+            c.showPage()
+            y = alto - p.margen
+        y -= p.linea
+        for campo, _, x, ancho, alineacion in p.columnas:
+            if campo == 'descripcion':
+                for i, linea in enumerate(lineas):
+                    _texto(c, p, x, y - i * p.linea, linea)
+            else:
+                _texto(c, p, x, y, str(item[campo]), False, None, alineacion, ancho)
+        y -= (len(lineas) - 1) * p.linea
+    y -= p.linea * 0.5
+    c.line(p.margen, y, p.margen + util, y)
+    return y
+
+
+def _totales(c, p, datos, y):
+    util = p.ancho - 2 * p.margen
+    simbolo = MONEDAS.get(datos['moneda'], MONEDAS['PEN'])[1]
+    filas = [
+        ('OP. GRAVADAS', datos['gravadas']),
+        ('OP. EXONERADAS', datos['exoneradas']),
+        ('OP. INAFECTAS', datos['inafectas']),
+        ('IGV 18%', datos['igv']),
+        ('IMPORTE TOTAL', datos['total']),
+    ]
+    etiqueta_x = p.margen + util - (75 * mm if p.formato == 'A4' else 52 * mm)
+    for etiqueta, valor in filas:
+        if etiqueta != 'IMPORTE TOTAL' and Decimal(valor) == 0 and etiqueta != 'IGV 18%':
+            continue
+        y -= p.linea
+        total = etiqueta == 'IMPORTE TOTAL'
+        _texto(c, p, etiqueta_x, y, f"{etiqueta}:", negrita=total)
+        _texto(c, p, p.margen, y, f"{simbolo} {valor}", total, None, 'right', util)
+
+    y -= p.linea * 1.5
+    for linea in simpleSplit(monto_en_letras(datos['total'], datos['moneda']), p.negrita, p.cuerpo, util):
+        _texto(c, p, p.margen, y, linea, negrita=True)
+        y -= p.linea
+
+    # Código QR (formato de la representación impresa SUNAT)
+    y -= p.linea * 0.5
+    widget = QrCodeWidget(contenido_qr(datos))
+    x0, y0, x1, y1 = widget.getBounds()
+    dibujo = Drawing(p.qr, p.qr, transform=[p.qr / (x1 - x0), 0, 0, p.qr / (y1 - y0), 0, 0])
+    dibujo.add(widget)
+    qr_x = p.margen if p.formato == 'A4' else (p.ancho - p.qr) / 2
+    renderPDF.draw(dibujo, c, qr_x, y - p.qr)
+
+    pie = [f"Representación impresa de la {TIPOS_IMPRESOS.get(datos['tipo'], 'comprobante').lower()}"]
+    if datos['hash']:
+        pie.append(f"Resumen: {datos['hash']}")
+    if datos['estado'] != 'ACEPTADO':
+        pie.append(f"Estado SUNAT: {datos['estado']}")
+    if p.formato == 'A4':
+        for i, linea in enumerate(pie):
+            _texto(c, p, p.margen + p.qr + 5 * mm, y - 6 * mm - i * p.linea, linea)
+    else:
+        y -= p.qr + p.linea
+        for linea in pie:
+            for parte in simpleSplit(linea, p.fuente, p.cuerpo - 1, util):
+                _texto(c, p, p.margen, y, parte, False, p.cuerpo - 1, 'center', util)
+                y -= p.linea
+
+
+################################################################################### CACHE Y LOTES
+
+def nombre_pdf(comprobante, formato):
+    return f"{comprobante.comprSerie}-{comprobante.comprCorrelativo}{'' if formato == 'A4' else '-' + formato}.pdf"
+
+
+def _pdf_actual(raiz, comprobante, formato):
+    """(ruta, sha256) del PDF guardado para los datos actuales del comprobante; lo dibuja si falta"""
+    datos = datos_comprobante(comprobante)
+    nombre = nombre_pdf(comprobante, formato)
+    clave = clave_pdf(datos, formato)
+    encontrado = raiz.ubicar('pdf', nombre, etiqueta=clave)
+    if encontrado:
+        return encontrado
+
+    anterior = raiz.ubicar('pdf', nombre)
+    sha256 = raiz.guardar('pdf', nombre, renderizar_pdf(datos, formato), etiqueta=clave)
+    if anterior and anterior[1] != sha256:
+        raiz.eliminar_objeto(anterior[1])
+    return raiz.ubicar('pdf', nombre)
+
+
+def obtener_pdf(comprobante, formato='A4'):
+    """(ruta, sha256) del PDF en el almacén; solo lo dibuja si no existe para estos datos"""
+    from .almacen import almacen
+
+    return _pdf_actual(almacen(), comprobante, formato)
+
+
+def entradas_zip(comprobantes, formato='A4'):
+    """
+    Entradas para almacen.zip_en_flujo() con el PDF de cada comprobante. Los que no
+    están en el almacén se dibujan en el mismo proceso a medida que se arma el ZIP;
+    `comprobantes` debe traer los detalles precargados.
+    """
+    from django.utils import timezone
+
+    from .almacen import almacen
+
+    raiz = almacen()
+    for comprobante in comprobantes:
+        yield (
+            nombre_pdf(comprobante, formato),
+            timezone.localtime(comprobante.comprFechaEmision),
+            _pdf_actual(raiz, comprobante, formato)[0],
+            False,  # el PDF ya va comprimido
+        )
@@ -2,86 +2,89 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Sum, Count, F, Avg
-from django.db.models.functions import TruncDate, TruncMonth
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from datetime import timedelta
 import csv
 from django.http import HttpResponse
 from io import BytesIO
 
-from .models import Venta, VentaDetalle
-from inventory.models import BranchInventory
-from Branch.models import Branch
+from .models import Venta, Pago, TrabajoReporte
+from .paginacion import paginar_ventas
+from .almacen import servir_artefacto
+from .antiguedad import (
+    antiguedad_deuda, antiguedad_por_cliente, etiqueta, filtro_sucursal, origen_deuda, tramos_configurados
+)
+from .comparativa import comparar_sucursales
+from .exportacion import FORMATOS, fecha_local, por_defecto, respuesta_exportacion
+from .hechos import clasificar_abc, resumen_diario, resumen_productos
+from .trabajos import alcance_usuario, ruta_resultado, solicitar_trabajo
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_sales_report(request):
-    """Reporte de ventas totales y tendencias"""
+    """Reporte de ventas totales y tendencias (lee el resumen diario de ventas)"""
     user = request.user
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     branch_id = request.GET.get('branch_id')
     
-    queryset = Venta.objects.exclude(ventEstado='ANULADO')
-    
-    if start_date:
-        queryset = queryset.filter(ventFecha__gte=start_date)
-    if end_date:
-        queryset = queryset.filter(ventFecha__lte=end_date)
+    resumen = resumen_diario(start_date, end_date)
+    productos = resumen_productos(start_date, end_date)
     
     is_manager = user.roles.filter(rolNivel=0).exists()
     
     if is_manager:
         if branch_id:
-            queryset = queryset.filter(sucurCod_id=branch_id)
+            resumen = resumen.filter(sucurCod_id=branch_id)
+            productos = productos.filter(sucurCod_id=branch_id)
     else:
-        queryset = queryset.filter(sucurCod_id=user.sucurCod)
+        resumen = resumen.filter(sucurCod_id=user.sucurCod_id)
+        productos = productos.filter(sucurCod_id=user.sucurCod_id)
     
-    total_sales = queryset.aggregate(
-        total=Sum('ventTotal'),
-        count=Count('ventCod')
+    total_sales = resumen.aggregate(
+        total=Sum('vresTotal'),
+        count=Sum('vresCantidad')
     )
     
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    daily_sales = queryset.filter(ventFecha__gte=thirty_days_ago).annotate(
-        date=TruncDate('ventFecha')
-    ).values('date').annotate(
-        total=Sum('ventTotal'),
-        count=Count('ventCod')
+    thirty_days_ago = timezone.localdate() - timedelta(days=30)
+    daily_sales = resumen.filter(vresFecha__gte=thirty_days_ago).values(
+        date=F('vresFecha')
+    ).annotate(
+        total=Sum('vresTotal'),
+        count=Sum('vresCantidad')
     ).order_by('date')
     
-    twelve_months_ago = timezone.now() - timedelta(days=365)
-    monthly_sales = queryset.filter(ventFecha__gte=twelve_months_ago).annotate(
-        month=TruncMonth('ventFecha')
+    twelve_months_ago = timezone.localdate() - timedelta(days=365)
+    monthly_sales = resumen.filter(vresFecha__gte=twelve_months_ago).annotate(
+        month=TruncMonth('vresFecha')
     ).values('month').annotate(
-        total=Sum('ventTotal'),
-        count=Count('ventCod')
+        total=Sum('vresTotal'),
+        count=Sum('vresCantidad')
     ).order_by('month')
     
     sales_by_branch = None
     if is_manager:
-        sales_by_branch = queryset.values(
+        sales_by_branch = resumen.values(
             'sucurCod__sucurNom', 'sucurCod_id'
         ).annotate(
-            total=Sum('ventTotal'),
-            count=Count('ventCod')
+            total=Sum('vresTotal'),
+            count=Sum('vresCantidad')
         ).order_by('-total')
     
-    top_products = VentaDetalle.objects.filter(
-        ventCod__in=queryset
-    ).values(
+    top_products = productos.values(
         'prodCod__prodDescr',
         'prodCod__prodCod'
     ).annotate(
-        quantity=Sum('ventDetCantidad'),
-        total=Sum(F('ventDetCantidad') * F('ventDetPrecioUni'))
-    ).order_by('-quantity')[:10]
+        quantity=Sum('vprodCantidad'),
+        total=Sum('vprodTotal')
+    ).filter(quantity__gt=0).order_by('-quantity')[:10]
     
-    payment_methods = queryset.values('ventFormaPago').annotate(
-        total=Sum('ventTotal'),
-        count=Count('ventCod')
-    )
+    payment_methods = resumen.values(ventFormaPago=F('vresFormaPago')).annotate(
+        total=Sum('vresTotal'),
+        count=Sum('vresCantidad')
+    ).order_by('ventFormaPago')
     
     return Response({
         'total_sales': float(total_sales['total'] or 0),
@@ -98,37 +101,33 @@ def get_sales_report(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_financial_report(request):
-    """Reporte de ingresos vs egresos"""
+    """Reporte de ingresos vs egresos (desde los resúmenes diarios de ventas y por producto)"""
     user = request.user
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     branch_id = request.GET.get('branch_id')
     
-    queryset = Venta.objects.exclude(ventEstado='ANULADO')
-    
-    if start_date:
-        queryset = queryset.filter(ventFecha__gte=start_date)
-    if end_date:
-        queryset = queryset.filter(ventFecha__lte=end_date)
+    resumen = resumen_diario(start_date, end_date)
+    productos = resumen_productos(start_date, end_date)
     
     is_manager = user.roles.filter(rolNivel=0).exists()
     
     if is_manager:
         if branch_id:
-            queryset = queryset.filter(sucurCod_id=branch_id)
+            resumen = resumen.filter(sucurCod_id=branch_id)
+            productos = productos.filter(sucurCod_id=branch_id)
     else:
-        queryset = queryset.filter(sucurCod_id=user.sucurCod)
+        resumen = resumen.filter(sucurCod_id=user.sucurCod_id)
+        productos = productos.filter(sucurCod_id=user.sucurCod_id)
     
-    ingresos = queryset.aggregate(
-        total=Sum('ventTotal'),
-        pagado=Sum('ventAdelanto'),
-        por_cobrar=Sum('ventSaldo')
+    ingresos = resumen.aggregate(
+        total=Sum('vresTotal'),
+        pagado=Sum('vresAdelanto'),
+        por_cobrar=Sum('vresSaldo')
     )
     
-    productos_vendidos = VentaDetalle.objects.filter(
-        ventCod__in=queryset
-    ).aggregate(
-        total_costo=Sum(F('ventDetCantidad') * F('prodCod__prodCostoInv'))
+    productos_vendidos = productos.aggregate(
+        total_costo=Sum('vprodCosto')
     )
     
     egresos_estimados = float(productos_vendidos['total_costo'] or 0)
@@ -136,11 +135,11 @@ def get_financial_report(request):
     utilidad_bruta = ingresos_total - egresos_estimados
     margen = (utilidad_bruta / ingresos_total * 100) if ingresos_total > 0 else 0
     
-    twelve_months_ago = timezone.now() - timedelta(days=365)
-    monthly_income = queryset.filter(ventFecha__gte=twelve_months_ago).annotate(
-        month=TruncMonth('ventFecha')
+    twelve_months_ago = timezone.localdate() - timedelta(days=365)
+    monthly_income = resumen.filter(vresFecha__gte=twelve_months_ago).annotate(
+        month=TruncMonth('vresFecha')
     ).values('month').annotate(
-        ingresos=Sum('ventTotal')
+        ingresos=Sum('vresTotal')
     ).order_by('month')
     
     return Response({
@@ -155,10 +154,119 @@ def get_financial_report(request):
     })
 
 
+def _productos_vendidos(request):
+    """Totales por producto del resumen por producto, con el alcance de sucursal del usuario"""
+    user = request.user
+    branch_id = request.GET.get('branch_id')
+    productos = resumen_productos(request.GET.get('start_date'), request.GET.get('end_date'))
+    
+    is_manager = user.roles.filter(rolNivel=0).exists()
+    
+    if is_manager:
+        if branch_id:
+            productos = productos.filter(sucurCod_id=branch_id)
+    else:
+        productos = productos.filter(sucurCod_id=user.sucurCod_id)
+    
+    por_producto = productos.values(
+        'prodCod_id', 'prodCod__prodDescr', 'prodCod__prodMarca'
+    ).annotate(
+        unidades=Sum('vprodCantidad'),
+        ingresos=Sum('vprodTotal'),
+        valor_venta=Sum('vprodSubTotal'),
+        costo=Sum('vprodCosto'),
+        margen=Sum('vprodSubTotal') - Sum('vprodCosto')
+    ).filter(unidades__gt=0)
+    return por_producto, is_manager
+
+
+def _fila_producto(fila):
+    valor = float(fila['valor_venta'] or 0)
+    margen = float(fila['margen'] or 0)
+    return {
+        'prodCod': fila['prodCod_id'],
+        'producto': fila['prodCod__prodDescr'],
+        'marca': fila['prodCod__prodMarca'],
+        'unidades': fila['unidades'],
+        'ingresos': float(fila['ingresos'] or 0),
+        'valor_venta': valor,
+        'costo': float(fila['costo'] or 0),
+        'margen': margen,
+        'margen_porcentaje': round(margen / valor * 100, 2) if valor else 0,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_top_products(request):
+    """Productos más vendidos (?order_by=unidades|ingresos|margen, ?limit=N)"""
+    criterios = {'unidades': '-unidades', 'ingresos': '-ingresos', 'margen': '-margen'}
+    criterio = request.GET.get('order_by', 'unidades')
+    if criterio not in criterios:
+        return Response({'detail': f"order_by debe ser uno de: {', '.join(criterios)}"}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+    except ValueError:
+        return Response({'detail': 'limit debe ser un número'}, status=400)
+    
+    por_producto, is_manager = _productos_vendidos(request)
+    filas = por_producto.order_by(criterios[criterio], 'prodCod_id')[:limit]
+    
+    return Response({
+        'order_by': criterio,
+        'products': [_fila_producto(fila) for fila in filas],
+        'is_manager': is_manager
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_products_abc(request):
+    """Clasificación ABC de productos (?criterio=ingresos|unidades|margen): A 80 %, B 15 %, C 5 %"""
+    criterio = request.GET.get('criterio', 'ingresos')
+    if criterio not in ('ingresos', 'unidades', 'margen'):
+        return Response({'detail': 'criterio debe ser ingresos, unidades o margen'}, status=400)
+    
+    por_producto, is_manager = _productos_vendidos(request)
+    filas = clasificar_abc([_fila_producto(fila) for fila in por_producto], campo=criterio)
+    
+    resumen = {clase: {'productos': 0, criterio: 0} for clase in 'ABC'}
+    for fila in filas:
+        resumen[fila['clase']]['productos'] += 1
+        resumen[fila['clase']][criterio] += fila[criterio]
+    
+    return Response({
+        'criterio': criterio,
+        'resumen': resumen,
+        'products': filas,
+        'is_manager': is_manager
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_products_margin(request):
+    """Margen bruto por producto (valor de venta sin IGV menos costo al vender)"""
+    por_producto, is_manager = _productos_vendidos(request)
+    filas = [_fila_producto(fila) for fila in por_producto.order_by('margen', 'prodCod_id')]
+    
+    valor = sum(fila['valor_venta'] for fila in filas)
+    costo = sum(fila['costo'] for fila in filas)
+    
+    return Response({
+        'valor_venta': valor,
+        'costo': costo,
+        'margen': valor - costo,
+        'margen_porcentaje': round((valor - costo) / valor * 100, 2) if valor else 0,
+        'products': filas,
+        'is_manager': is_manager
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_branch_comparison(request):
-    """Comparativa entre sucursales (solo gerente)"""
+    """Comparativa entre sucursales (solo gerente, ver sales/comparativa.py)"""
     user = request.user
     is_manager = user.roles.filter(rolNivel=0).exists()
     
@@ -167,38 +275,12 @@ def get_branch_comparison(request):
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
+    branch_id = request.GET.get('branch_id')
     
-    branches = Branch.objects.all()
-    comparison_data = []
-    
-    for branch in branches:
-        queryset = Venta.objects.filter(sucurCod=branch).exclude(ventEstado='ANULADO')
-        
-        if start_date:
-            queryset = queryset.filter(ventFecha__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(ventFecha__lte=end_date)
-        
-        stats = queryset.aggregate(
-            total_ventas=Sum('ventTotal'),
-            cantidad_ventas=Count('ventCod'),
-            promedio_venta=Avg('ventTotal'),
-            total_por_cobrar=Sum('ventSaldo')
-        )
-        
-        inventory_value = BranchInventory.objects.filter(sucurCod=branch).aggregate(
-            total=Sum(F('invStock') * F('prodCod__prodValorUni'))
-        )
-        
-        comparison_data.append({
-            'branch_id': branch.sucurCod,
-            'branch_name': branch.sucurNom,
-            'total_ventas': float(stats['total_ventas'] or 0),
-            'cantidad_ventas': stats['cantidad_ventas'] or 0,
-            'promedio_venta': float(stats['promedio_venta'] or 0),
-            'total_por_cobrar': float(stats['total_por_cobrar'] or 0),
-            'valor_inventario': float(inventory_value['total'] or 0)
-        })
+    try:
+        comparison_data = comparar_sucursales(start_date, end_date, [branch_id] if branch_id else None)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
     
     return Response({
         'branches': comparison_data,
@@ -232,40 +314,19 @@ def get_clients_report(request):
         total_deuda=Sum('ventSaldo')
     ).order_by('-total_compras')[:20]
     
-    total_debt = ventas_query.filter(
-        ventEstado__in=['PENDIENTE', 'PARCIAL']
-    ).aggregate(
-        total=Sum('ventSaldo'),
-        count=Count('ventCod')
-    )
-    
-    now = timezone.now()
-    debt_aging = {
-        'current': float(ventas_query.filter(
-            ventEstado__in=['PENDIENTE', 'PARCIAL'],
-            ventFecha__gte=now - timedelta(days=30)
-        ).aggregate(total=Sum('ventSaldo'))['total'] or 0),
-        '30_60': float(ventas_query.filter(
-            ventEstado__in=['PENDIENTE', 'PARCIAL'],
-            ventFecha__gte=now - timedelta(days=60),
-            ventFecha__lt=now - timedelta(days=30)
-        ).aggregate(total=Sum('ventSaldo'))['total'] or 0),
-        '60_90': float(ventas_query.filter(
-            ventEstado__in=['PENDIENTE', 'PARCIAL'],
-            ventFecha__gte=now - timedelta(days=90),
-            ventFecha__lt=now - timedelta(days=60)
-        ).aggregate(total=Sum('ventSaldo'))['total'] or 0),
-        'over_90': float(ventas_query.filter(
-            ventEstado__in=['PENDIENTE', 'PARCIAL'],
-            ventFecha__lt=now - timedelta(days=90)
-        ).aggregate(total=Sum('ventSaldo'))['total'] or 0),
-    }
+    try:
+        origen = origen_deuda(request.GET.get('fuente'), filtro_sucursal(user, is_manager, branch_id))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    deuda = antiguedad_deuda(origen)
     
     return Response({
         'top_clients': list(top_clients),
-        'total_debt': float(total_debt['total'] or 0),
-        'debt_count': total_debt['count'] or 0,
-        'debt_aging': debt_aging,
+        'total_debt': deuda['total'],
+        'debt_count': deuda['count'],
+        'debt_aging': deuda['tramos'],
+        'debt_aging_source': 'snapshot' if origen.corte else 'vivo',
+        'debt_aging_cutoff': origen.corte,
         'is_manager': is_manager
     })
 
@@ -289,18 +350,21 @@ def get_pending_sales(request):
     else:
         queryset = queryset.filter(sucurCod_id=user.sucurCod)
     
-    pending_sales = queryset.values(
-        'ventCod',
-        'cliNombreCom',
-        'cliDocNum',
-        'ventFecha',
-        'ventTotal',
-        'ventAdelanto',
-        'ventSaldo',
-        'ventEstado',
-        'ventEstadoRecoj',
-        'sucurCod__sucurNom'
-    ).order_by('-ventFecha')
+    try:
+        pending_sales, pagination = paginar_ventas(request.GET, queryset.values(
+            'ventCod',
+            'cliNombreCom',
+            'cliDocNum',
+            'ventFecha',
+            'ventTotal',
+            'ventAdelanto',
+            'ventSaldo',
+            'ventEstado',
+            'ventEstadoRecoj',
+            'sucurCod__sucurNom'
+        ))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
     
     summary = queryset.aggregate(
         total_pendiente=Sum('ventSaldo'),
@@ -313,7 +377,8 @@ def get_pending_sales(request):
     )
     
     return Response({
-        'pending_sales': list(pending_sales),
+        'pending_sales': pending_sales,
+        'pagination': pagination,
         'summary': {
             'total_pendiente': float(summary['total_pendiente'] or 0),
             'count': summary['count'] or 0
@@ -326,13 +391,11 @@ def get_pending_sales(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_sales_list(request):
-    """Obtener lista de ventas con paginación"""
+    """Obtener lista de ventas con paginación por cursor (ver sales/paginacion.py)"""
     user = request.user
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     branch_id = request.GET.get('branch_id')
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 20))
     
     queryset = Venta.objects.exclude(ventEstado='ANULADO')
     
@@ -349,41 +412,39 @@ def get_sales_list(request):
     else:
         queryset = queryset.filter(sucurCod_id=user.sucurCod)
     
-    total_count = queryset.count()
-    total_pages = (total_count + page_size - 1) // page_size
-    
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    
-    sales = queryset.select_related('sucurCod').order_by('-ventFecha')[start_idx:end_idx].values(
-        'ventCod',
-        'ventFecha',
-        'cliNombreCom',
-        'cliDocNum',
-        'sucurCod__sucurNom',
-        'ventTotal',
-        'ventAdelanto',
-        'ventSaldo',
-        'ventEstado',
-        'ventFormaPago'
-    )
+    try:
+        sales, pagination = paginar_ventas(request.GET, queryset.values(
+            'ventCod',
+            'ventFecha',
+            'cliNombreCom',
+            'cliDocNum',
+            'sucurCod__sucurNom',
+            'ventTotal',
+            'ventAdelanto',
+            'ventSaldo',
+            'ventEstado',
+            'ventFormaPago'
+        ))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
     
     return Response({
-        'sales': list(sales),
-        'pagination': {
-            'total': total_count,
-            'page': page,
-            'page_size': page_size,
-            'total_pages': total_pages,
-            'has_next': page < total_pages,
-            'has_prev': page > 1
-        },
+        'sales': sales,
+        'pagination': pagination,
         'is_manager': is_manager
     })
 
 
 # ========== EXPORTACIONES ==========
 
+def _exportar(request, queryset, columnas, nombre):
+    """Exportación en streaming en el formato pedido (?formato=csv|csv.gz|jsonl|xlsx, por defecto csv)"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return Response({'detail': f"Formato no soportado. Use: {', '.join(FORMATOS)}"}, status=400)
+    return respuesta_exportacion(queryset, columnas, formato, nombre)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_sales_csv(request):
@@ -408,27 +469,17 @@ def export_sales_csv(request):
     else:
         queryset = queryset.filter(sucurCod_id=user.sucurCod)
     
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_ventas.csv"'
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    writer.writerow(['Código', 'Fecha', 'Cliente', 'Documento', 'Sucursal', 'Total', 'Adelanto', 'Saldo', 'Estado'])
-    
-    for venta in queryset.select_related('sucurCod'):
-        writer.writerow([
-            venta.ventCod,
-            venta.ventFecha.strftime('%Y-%m-%d %H:%M'),
-            venta.cliNombreCom,
-            venta.cliDocNum,
-            venta.sucurCod.sucurNom,
-            venta.ventTotal,
-            venta.ventAdelanto,
-            venta.ventSaldo,
-            venta.ventEstado
-        ])
-    
-    return response
+    return _exportar(request, queryset, [
+        ('Código', 'ventCod'),
+        ('Fecha', 'ventFecha', fecha_local('%Y-%m-%d %H:%M')),
+        ('Cliente', 'cliNombreCom'),
+        ('Documento', 'cliDocNum'),
+        ('Sucursal', 'sucurCod__sucurNom'),
+        ('Total', 'ventTotal'),
+        ('Adelanto', 'ventAdelanto'),
+        ('Saldo', 'ventSaldo'),
+        ('Estado', 'ventEstado'),
+    ], 'reporte_ventas')
 
 
 @api_view(['GET'])
@@ -440,42 +491,20 @@ def export_clients_debt_csv(request):
     
     is_manager = user.roles.filter(rolNivel=0).exists()
     
-    ventas_query = Venta.objects.filter(ventEstado__in=['PENDIENTE', 'PARCIAL'])
-    
-    if is_manager:
-        if branch_id:
-            ventas_query = ventas_query.filter(sucurCod_id=branch_id)
-    else:
-        ventas_query = ventas_query.filter(sucurCod_id=user.sucurCod)
-    
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_deudas.csv"'
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    writer.writerow(['Cliente', 'Documento', 'Sucursal', 'Total Compras', 'Cantidad Ventas', 'Deuda Total'])
-    
-    clients_debt = ventas_query.values(
-        'cliNombreCom',
-        'cliDocNum',
-        'sucurCod__sucurNom'
-    ).annotate(
-        total_compras=Sum('ventTotal'),
-        cantidad_ventas=Count('ventCod'),
-        total_deuda=Sum('ventSaldo')
-    ).order_by('-total_deuda')
-    
-    for client in clients_debt:
-        writer.writerow([
-            client['cliNombreCom'],
-            client['cliDocNum'],
-            client['sucurCod__sucurNom'],
-            client['total_compras'],
-            client['cantidad_ventas'],
-            client['total_deuda']
-        ])
-    
-    return response
+    try:
+        origen = origen_deuda(request.GET.get('fuente'), filtro_sucursal(user, is_manager, branch_id))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    tramos = tramos_configurados()
+    
+    return _exportar(request, antiguedad_por_cliente(origen, tramos), [
+        ('Cliente', 'cliNombreCom'),
+        ('Documento', 'cliDocNum'),
+        ('Sucursal', 'sucurCod__sucurNom'),
+        ('Total Compras', 'total_compras'),
+        ('Cantidad Ventas', 'cantidad_ventas'),
+        ('Deuda Total', 'total_deuda'),
+    ] + [(f'Deuda {etiqueta(tramos, clave)}', f'deuda_{clave}') for clave, _ in tramos], 'reporte_deudas')
 
 
 @api_view(['GET'])
@@ -490,6 +519,12 @@ def export_branch_comparison_csv(request):
     
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
+    branch_id = request.GET.get('branch_id')
+    
+    try:
+        comparison_data = comparar_sucursales(start_date, end_date, [branch_id] if branch_id else None)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
     
     response = HttpResponse(content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = 'attachment; filename="comparativa_sucursales.csv"'
@@ -498,34 +533,14 @@ def export_branch_comparison_csv(request):
     writer = csv.writer(response)
     writer.writerow(['Sucursal', 'Total Ventas', 'Cantidad Ventas', 'Promedio Venta', 'Por Cobrar', 'Valor Inventario'])
     
-    branches = Branch.objects.all()
-    
-    for branch in branches:
-        queryset = Venta.objects.filter(sucurCod=branch).exclude(ventEstado='ANULADO')
-        
-        if start_date:
-            queryset = queryset.filter(ventFecha__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(ventFecha__lte=end_date)
-        
-        stats = queryset.aggregate(
-            total_ventas=Sum('ventTotal'),
-            cantidad_ventas=Count('ventCod'),
-            promedio_venta=Avg('ventTotal'),
-            total_por_cobrar=Sum('ventSaldo')
-        )
-        
-        inventory_value = BranchInventory.objects.filter(sucurCod=branch).aggregate(
-            total=Sum(F('invStock') * F('prodCod__prodValorUni'))
-        )
-        
+    for fila in comparison_data:
         writer.writerow([
-            branch.sucurNom,
-            stats['total_ventas'] or 0,
-            stats['cantidad_ventas'] or 0,
-            stats['promedio_venta'] or 0,
-            stats['total_por_cobrar'] or 0,
-            inventory_value['total'] or 0
+            fila['branch_name'],
+            fila['total_ventas'],
+            fila['cantidad_ventas'],
+            fila['promedio_venta'],
+            fila['total_por_cobrar'],
+            fila['valor_inventario']
         ])
     
     return response
@@ -586,10 +601,13 @@ def get_cash_report(request):
             cantidad_ventas=Count('ventCod')
         )
         
-        # Totales por forma de pago
-        por_forma_pago = ventas.values('ventFormaPago').annotate(
-            total=Sum('ventTotal'),
-            cantidad=Count('ventCod')
+        # Totales por forma de pago: lo cobrado en la sesión según el libro de pagos
+        por_forma_pago = Pago.objects.filter(
+            cajaAperCod=cash_opening,
+            ventCod__ventAnulada=False
+        ).values(ventFormaPago=F('pagFormaPago')).annotate(
+            total=Sum('pagMonto'),
+            cantidad=Count('ventCod', distinct=True)
         ).order_by('-total')
         
         # Listado de ventas
@@ -685,8 +703,6 @@ def get_seller_sales_history(request):
     seller_id = request.GET.get('seller_id')
     client_id = request.GET.get('client_id')
     sale_type = request.GET.get('sale_type')
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 20))
     
     queryset = Venta.objects.exclude(ventEstado='ANULADO')
     
@@ -709,15 +725,10 @@ def get_seller_sales_history(request):
     if sale_type:
         queryset = queryset.filter(ventFormaPago=sale_type)
     
-    total_count = queryset.count()
-    total_pages = (total_count + page_size - 1) // page_size
-    
-    start_idx = (page - 1) * page_size
-    end_idx = start_idx + page_size
-    
-    sales = queryset.select_related(
-        'usuCod', 'sucurCod'
-    ).order_by('-ventFecha')[start_idx:end_idx]
+    try:
+        sales, pagination = paginar_ventas(request.GET, queryset.select_related('usuCod', 'sucurCod'))
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
     
     sales_data = []
     for sale in sales:
@@ -751,14 +762,7 @@ def get_seller_sales_history(request):
     
     return Response({
         'sales': sales_data,
-        'pagination': {
-            'page': page,
-            'page_size': page_size,
-            'total': total_count,
-            'total_pages': total_pages,
-            'has_next': page < total_pages,
-            'has_prev': page > 1
-        },
+        'pagination': pagination,
         'summary': summary,
         'is_manager': is_manager
     })
@@ -797,38 +801,92 @@ def export_seller_sales_history_csv(request):
     if sale_type:
         queryset = queryset.filter(ventFormaPago=sale_type)
     
-    sales = queryset.select_related(
-        'usuCod', 'sucurCod'
-    ).order_by('-ventFecha')
-    
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response['Content-Disposition'] = 'attachment; filename="historial_ventas_vendedor.csv"'
-    response.write('\ufeff')
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'Código Venta',
-        'Fecha',
-        'Vendedor',
-        'Cliente',
-        'Documento Cliente',
-        'Sucursal',
-        'Tipo Venta',
-        'Total',
-        'Estado'
-    ])
-    
-    for sale in sales:
-        writer.writerow([
-            sale.ventCod,
-            sale.ventFecha.strftime('%Y-%m-%d'),
-            sale.usuCod.usuNombreCom if sale.usuCod else 'N/A',
-            sale.cliNombreCom or 'N/A',
-            sale.cliDocNum or 'N/A',
-            sale.sucurCod.sucurNom if sale.sucurCod else 'N/A',
-            sale.ventFormaPago,
-            float(sale.ventTotal),
-            sale.ventEstado
-        ])
-    
-    return response
+    return _exportar(request, queryset.order_by('-ventFecha'), [
+        ('Código Venta', 'ventCod'),
+        ('Fecha', 'ventFecha', fecha_local('%Y-%m-%d')),
+        ('Vendedor', 'usuCod__usuNombreCom', por_defecto('N/A')),
+        ('Cliente', 'cliNombreCom', por_defecto('N/A')),
+        ('Documento Cliente', 'cliDocNum', por_defecto('N/A')),
+        ('Sucursal', 'sucurCod__sucurNom', por_defecto('N/A')),
+        ('Tipo Venta', 'ventFormaPago'),
+        ('Total', 'ventTotal', float),
+        ('Estado', 'ventEstado'),
+    ], 'historial_ventas_vendedor')
+
+
+# ========== TRABAJOS EN SEGUNDO PLANO ==========
+
+def _trabajo_json(trabajo):
+    porcentaje = None
+    if trabajo.trabEstado == 'COMPLETADO':
+        porcentaje = 100.0
+    elif trabajo.trabFilasTotales:
+        porcentaje = round(100 * trabajo.trabFilasProcesadas / trabajo.trabFilasTotales, 1)
+    return {
+        'id': trabajo.trabCod,
+        'tipo': trabajo.trabTipo,
+        'parametros': trabajo.trabParametros,
+        'estado': trabajo.trabEstado,
+        'filas_procesadas': trabajo.trabFilasProcesadas,
+        'filas_totales': trabajo.trabFilasTotales,
+        'porcentaje': porcentaje,
+        'eta_segundos': trabajo.eta_segundos(),
+        'error': trabajo.trabUltimoError if trabajo.trabEstado == 'FALLIDO' else '',
+        'creado': trabajo.trabFechaCreacion,
+        'inicio': trabajo.trabFechaInicio,
+        'fin': trabajo.trabFechaFin,
+        'archivo': trabajo.trabArchivoNombre or None,
+    }
+
+
+def _trabajo_del_usuario(request, trabajo_id):
+    """El trabajo si el usuario tiene su mismo alcance (los trabajos iguales se comparten)"""
+    return TrabajoReporte.objects.filter(pk=trabajo_id, trabAlcance=alcance_usuario(request.user)).first()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def submit_report_job(request):
+    """
+    Encola un reporte o exportación: {"tipo": "<nombre de la URL>", "parametros": {...}}.
+    Pedidos iguales reutilizan el trabajo en curso o recién terminado (ver sales/trabajos.py)
+    """
+    parametros = request.data.get('parametros') or {}
+    if not isinstance(parametros, dict):
+        return Response({'detail': 'parametros debe ser un objeto'}, status=400)
+    try:
+        trabajo, creado = solicitar_trabajo(request.user, request.data.get('tipo'), parametros)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
+    return Response(_trabajo_json(trabajo), status=202 if creado else 200)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_report_job(request, trabajo_id):
+    """Estado y avance (filas procesadas, porcentaje, ETA) de un trabajo"""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    if trabajo is None:
+        return Response({'detail': 'Trabajo no encontrado'}, status=404)
+    return Response(_trabajo_json(trabajo))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_report_job_result(request, trabajo_id):
+    """Resultado de un trabajo terminado: el JSON del reporte o el archivo exportado"""
+    trabajo = _trabajo_del_usuario(request, trabajo_id)
+    if trabajo is None:
+        return Response({'detail': 'Trabajo no encontrado'}, status=404)
+    if trabajo.trabEstado != 'COMPLETADO':
+        return Response(_trabajo_json(trabajo), status=409)
+    if not trabajo.es_archivo:
+        return Response(trabajo.trabResultado)
+
+    ruta = ruta_resultado(trabajo)
+    if not ruta.is_file():
+        return Response({'detail': 'El archivo ya no está disponible, vuelva a solicitar el reporte'}, status=410)
+    respuesta = servir_artefacto(request, ruta, trabajo.trabArchivoSha256, trabajo.trabArchivoNombre, 'reporte')
+    if respuesta.status_code != 304:
+        respuesta['Content-Type'] = trabajo.trabArchivoTipo
+    return respuesta
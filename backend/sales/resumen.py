@@ -0,0 +1,135 @@
+"""
+Envío de boletas por resumen diario (SUNAT_RESUMEN_DIARIO).
+
+Con el resumen activo, las boletas no se encolan en el outbox: quedan PENDIENTE
+y, cerrado el día de emisión, armar_resumenes() las agrupa en resúmenes de hasta
+SUNAT_RESUMEN_MAX_COMPROBANTES. enviar_resumen() manda cada resumen con una sola
+llamada y deja el ticket en el resumen y en sus boletas (ENVIADO); el resultado
+lo aplica conciliar_sunat a todas las boletas del ticket.
+
+Si SUNAT_RESUMEN_DIARIO se desactiva, encolar_boletas_pendientes() pasa al
+outbox las boletas que quedaron PENDIENTE sin resumen ni evento de envío.
+"""
+from itertools import groupby, islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Comprobante, EventoOutbox, ResumenDiario
+
+
+def _en_bloques(iterable, tamanio):
+    iterador = iter(iterable)
+    while bloque := list(islice(iterador, tamanio)):
+        yield bloque
+
+
+def _crear_resumen(dia, cantidad, total, intentos=5):
+    """
+    Crea el siguiente resumen del día. Si otra corrida tomó el mismo número
+    (restricción unique_resumen_por_dia) se vuelve a calcular y se reintenta.
+    """
+    for intento in range(intentos):
+        numero = (ResumenDiario.objects.filter(resFechaEmision=dia).aggregate(n=Max('resNumero'))['n'] or 0) + 1
+        try:
+            with transaction.atomic():
+                return ResumenDiario.objects.create(
+                    resFechaEmision=dia, resNumero=numero, resCantidad=cantidad, resTotal=total
+                )
+        except IntegrityError:
+            if intento == intentos - 1:
+                raise
+
+
+@transaction.atomic
+def armar_resumenes(hasta=None, maximo=None):
+    """
+    Agrupa las boletas PENDIENTE sin resumen emitidas antes de `hasta` (por defecto hoy)
+    en resúmenes por día de emisión. Retorna los resúmenes creados.
+    """
+    hasta = hasta or timezone.localdate()
+    maximo = maximo or getattr(settings, 'SUNAT_RESUMEN_MAX_COMPROBANTES', 500)
+
+    boletas = (
+        Comprobante.objects.select_for_update(skip_locked=True)
+        .filter(comprTipo='03', comprEstadoSUNAT='PENDIENTE', resCod__isnull=True,
+                comprFechaEmision__date__lt=hasta)
+        .annotate(dia=TruncDate('comprFechaEmision'))
+        .order_by('dia', 'comprSerie', 'comprCorrelativo')
+        .values_list('dia', 'comprCod', 'comprTotalVenta')
+    )
+
+    creados = []
+    for dia, filas in groupby(boletas, key=lambda fila: fila[0]):
+        for bloque in _en_bloques(filas, maximo):
+            resumen = _crear_resumen(dia, len(bloque), sum(total for _, _, total in bloque))
+            Comprobante.objects.filter(pk__in=[pk for _, pk, _ in bloque]).update(resCod=resumen)
+            creados.append(resumen)
+            print(f"📋 {resumen.identificador}: {len(bloque)} boletas")
+    return creados
+
+
+def enviar_resumen(resumen, cliente=None):
+    """Envía un resumen y marca sus boletas con el ticket. Retorna el estado del resumen"""
+    from .sunat_client import SunatClient
+
+    cliente = cliente or SunatClient()
+    boletas = list(
+        resumen.comprobantes.order_by('comprSerie', 'comprCorrelativo')
+        .only('comprSerie', 'comprCorrelativo', 'comprTotalVenta', 'comprNumDocReceptor')
+    )
+    try:
+        respuesta = cliente.obtener_resumen_diario(resumen.resFechaEmision, boletas)
+        ticket = respuesta.get('ticket')
+        if not ticket:
+            raise Exception(respuesta.get('error') or 'El servicio no devolvió ticket')
+    except Exception as e:
+        ResumenDiario.objects.filter(pk=resumen.pk).update(
+            resEstado='ERROR', resIntentos=resumen.resIntentos + 1, resMensaje=str(e)[:2000]
+        )
+        print(f"❌ {resumen.identificador}: {e}")
+        return 'ERROR'
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        ResumenDiario.objects.filter(pk=resumen.pk).update(
+            resEstado='ENVIADO', resTicket=ticket, resIntentos=resumen.resIntentos + 1,
+            resMensaje='', resFechaEnvio=ahora, resFechaRespuesta=None
+        )
+        resumen.comprobantes.update(
+            comprEstadoSUNAT='ENVIADO',
+            comprTicket=ticket,
+            comprMensajeSUNAT=f"Incluida en {resumen.identificador} (ticket {ticket})",
+            comprFechaEnvio=ahora,
+            comprFechaRespuesta=None,
+        )
+    print(f"✅ {resumen.identificador} enviado: ticket {ticket}")
+    return 'ENVIADO'
+
+
+def por_enviar():
+    """Resúmenes nuevos o cuyo envío falló"""
+    return ResumenDiario.objects.filter(resEstado__in=['PENDIENTE', 'ERROR']).order_by('resFechaEmision', 'resNumero')
+
+
+@transaction.atomic
+def encolar_boletas_pendientes():
+    """
+    Encola ENVIAR_SUNAT para las boletas PENDIENTE sin resumen ni evento previo
+    (emitidas mientras SUNAT_RESUMEN_DIARIO estaba activo). Retorna cuántas encoló.
+    """
+    ya_encoladas = EventoOutbox.objects.filter(outTipo='ENVIAR_SUNAT').values('outReferencia')
+    ids = list(
+        Comprobante.objects.select_for_update(skip_locked=True)
+        .filter(comprTipo='03', comprEstadoSUNAT='PENDIENTE', resCod__isnull=True)
+        .exclude(pk__in=ya_encoladas)
+        .order_by('comprCod')
+        .values_list('comprCod', flat=True)
+    )
+    EventoOutbox.objects.bulk_create(
+        [EventoOutbox(outTipo='ENVIAR_SUNAT', outReferencia=pk) for pk in ids], batch_size=500
+    )
+    return len(ids)
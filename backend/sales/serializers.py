@@ -6,6 +6,7 @@ from cash.models import CashOpening
 from User.models import User
 from Branch.models import Branch
 from django.db import transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 ###################################################################################
 # SERIALIZERS PARA VENTA
@@ -89,21 +90,26 @@ class VentaCreateSerializer(serializers.ModelSerializer):
                 'detalles': 'La venta debe tener al menos un producto.'
             })
         
-        # Validar stock para cada producto
+        # Validar stock para cada producto (una sola consulta al inventario)
         sucurCod = data.get('sucurCod')
+        cantidades = {}
         for detalle in detalles:
             producto = detalle['prodCod']
-            cantidad = detalle['ventDetCantidad']
-            
-            # Verificar stock
-            inventario = BranchInventory.objects.filter(
-                prodCod=producto,
+            cantidades[producto.pk] = cantidades.get(producto.pk, 0) + detalle['ventDetCantidad']
+
+        stock_por_producto = dict(
+            BranchInventory.objects.filter(
+                prodCod_id__in=cantidades.keys(),
                 sucurCod=sucurCod
-            ).first()
-            
-            if not inventario or inventario.invStock < cantidad:
+            ).values_list('prodCod_id', 'invStock')
+        )
+
+        for detalle in detalles:
+            producto = detalle['prodCod']
+            disponible = stock_por_producto.get(producto.pk, 0)
+            if cantidades[producto.pk] > disponible:
                 raise serializers.ValidationError({
-                    'detalles': f'Stock insuficiente para {producto.prodDescr}. Disponible: {inventario.invStock if inventario else 0}'
+                    'detalles': f'Stock insuficiente para {producto.prodDescr}. Disponible: {disponible}'
                 })
         
         return data
@@ -115,24 +121,13 @@ class VentaCreateSerializer(serializers.ModelSerializer):
         with transaction.atomic():
             # Crear venta
             venta = Venta.objects.create(**validated_data)
-            
-            for detalle_data in detalles_data:
-                # Extraer solo los campos que no son read_only
-                campos_creacion = {
-                    'ventCod': venta,
-                    'prodCod': detalle_data['prodCod'],
-                    'ventDetCantidad': detalle_data['ventDetCantidad'],
-                    'ventDetDescuento': detalle_data.get('ventDetDescuento', 0)
-                }
-                
-                # Crear el detalle - los campos read_only se calcularán automáticamente
-                detalle = VentaDetalle(**campos_creacion)
-                detalle.save()  # Esto ejecutará _copiar_datos_producto() y _calcular_totales()
-            
-            # Calcular totales de la venta
-            venta.calcular_totales()
-            venta.save()
-            
+
+            # Registrar todas las líneas en lote (bloqueo, stock, detalles y totales)
+            try:
+                venta.agregar_detalles(detalles_data)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError({'detalles': e.messages})
+
             return venta
 
 class VentaUpdateSerializer(serializers.ModelSerializer):
@@ -287,13 +282,16 @@ class ComprobanteListSerializer(serializers.ModelSerializer):
     estado_display = serializers.CharField(source='get_comprEstadoSUNAT_display', read_only=True)
     venta_codigo = serializers.IntegerField(source='ventCod.ventCod', read_only=True)
     cliente_nombre = serializers.CharField(source='comprRazonSocialReceptor', read_only=True)
+    tiene_xml = serializers.BooleanField(source='comprTieneXML', read_only=True)
+    tiene_cdr = serializers.BooleanField(source='comprTieneCDR', read_only=True)
     
     class Meta:
         model = Comprobante
         fields = [
             'comprCod', 'comprobante_completo', 'comprTipo', 'tipo_display',
             'comprFechaEmision', 'comprTotalVenta', 'comprEstadoSUNAT', 'estado_display',
-            'venta_codigo', 'cliente_nombre', 'comprRUCEmisor', 'comprNumDocReceptor'
+            'venta_codigo', 'cliente_nombre', 'comprRUCEmisor', 'comprNumDocReceptor',
+            'tiene_xml', 'tiene_cdr'
         ]
 
 class ComprobanteDetailSerializer(serializers.ModelSerializer):
@@ -304,7 +302,8 @@ class ComprobanteDetailSerializer(serializers.ModelSerializer):
     estado_completo = serializers.CharField(source='get_estado_display_completo', read_only=True)
     moneda_display = serializers.CharField(source='get_comprMoneda_display', read_only=True)
     tipo_doc_display = serializers.CharField(source='get_comprTipoDocReceptor_display', read_only=True)
-    tiene_cdr = serializers.BooleanField(read_only=True)
+    tiene_xml = serializers.BooleanField(source='comprTieneXML', read_only=True)
+    tiene_cdr = serializers.BooleanField(source='comprTieneCDR', read_only=True)
     url_descarga_cdr = serializers.CharField(read_only=True)
     url_descarga_xml = serializers.CharField(read_only=True)
     
@@ -335,7 +334,8 @@ class ComprobanteDetailSerializer(serializers.ModelSerializer):
             'comprFechaEnvio', 'comprFechaRespuesta',
             
             # URLs de descarga
-            'tiene_cdr', 'url_descarga_cdr', 'url_descarga_xml',
+            'tiene_xml', 'tiene_cdr', 'url_descarga_cdr', 'url_descarga_xml',
+            'comprXMLTamanio', 'comprXMLSha256', 'comprCDRTamanio', 'comprCDRSha256',
             
             # Detalles y venta
             'detalles', 'venta_info'
@@ -361,6 +361,15 @@ class ComprobanteDetailSerializer(serializers.ModelSerializer):
             'estado_venta': venta.get_ventEstado_display()
         }
 
+class EmisionLoteSerializer(serializers.Serializer):
+    """Serializer para emitir comprobantes de varias ventas pagadas a la vez"""
+    ventas = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+        help_text="Códigos de ventas pagadas sin comprobante"
+    )
+
 class ComprobanteCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear comprobantes manualmente (si es necesario)"""
     ventCod = serializers.PrimaryKeyRelatedField(
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from Branch.models import Branch
+from inventory.models import BranchInventory, Product, StockMovement
+from .comparativa import programar_invalidacion
+
+# Las ventas invalidan desde el resumen diario (hechos.registrar_venta), solo
+# cuando cambia su total, saldo, día, sucursal o anulación. Invalidar al
+# confirmar evita que otra petición vuelva a cachear los datos anteriores.
+
+
+@receiver(post_save, sender=Branch)
+@receiver(post_delete, sender=Branch)
+def invalidar_comparativa_por_sucursal(sender, **kwargs):
+    """Altas, bajas y cambios de sucursales cambian todas las comparativas"""
+    programar_invalidacion()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidar_comparativa_por_precio(sender, created=False, update_fields=None, **kwargs):
+    """El valor de inventario usa prodValorUni; un producto nuevo aún no tiene stock"""
+    if created or (update_fields is not None and 'prodValorUni' not in update_fields):
+        return
+    programar_invalidacion()
+
+
+@receiver(post_save, sender=BranchInventory)
+@receiver(post_delete, sender=BranchInventory)
+def invalidar_comparativa_por_inventario(sender, instance, update_fields=None, **kwargs):
+    """Solo el stock de la fila cuenta para el valor de inventario de su sucursal"""
+    if update_fields is not None and 'invStock' not in update_fields:
+        return
+    programar_invalidacion(instance.sucurCod_id)
+
+
+@receiver(post_save, sender=StockMovement)
+def invalidar_comparativa_por_movimiento(sender, instance, **kwargs):
+    """
+    BranchInventory.mover_stock actualiza el stock con QuerySet.update() y deja un
+    StockMovement. mover_stock_lote (bulk_create, sin señales) solo se usa al
+    registrar los detalles de una venta, que ya invalida su sucursal.
+    """
+    programar_invalidacion(instance.sucurCod_id)
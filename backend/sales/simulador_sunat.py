@@ -0,0 +1,330 @@
+"""
+Simulador en Python del microservicio PHP de comprobantes (SUNAT_SERVICE_URL).
+
+Implementa las rutas que usa SunatClient y devuelve XML y CDR (zip) en base64
+con la misma forma que el servicio real. Sirve para pruebas de carga y de
+fallos sin Greenter ni SUNAT:
+- latencia fija + jitter por petición
+- tasa de errores HTTP 500
+- tasa de rechazos SUNAT con códigos configurables
+- modo asíncrono: /boleta responde un ticket y el resultado se obtiene con
+  /api/comprobantes/consultar/{ticket} (opcionalmente tras N consultas "en proceso")
+
+Como el Router de PHP, elimina '/public' de la ruta antes de enrutar.
+"""
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ConfiguracionSimulador:
+    def __init__(self, latencia_ms=0, jitter_ms=0, tasa_error=0.0, tasa_rechazo=0.0,
+                 codigos_rechazo=('2017', '3105'), semilla=None, asincrono=False, consultas_en_proceso=0):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.tasa_error = tasa_error
+        self.tasa_rechazo = tasa_rechazo
+        self.codigos_rechazo = list(codigos_rechazo)
+        self.asincrono = asincrono
+        self.consultas_en_proceso = consultas_en_proceso
+        self.aleatorio = random.Random(semilla)
+
+
+class EstadoSimulador:
+    """Archivos generados, tickets y contadores (compartido entre hilos)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.archivos = {}
+        self.tickets = {}
+        self.contadores = {}
+
+    def contar(self, clave):
+        with self.lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + 1
+
+
+def generar_xml(datos):
+    """XML UBL 2.1 simplificado de la boleta"""
+    identificador = f"{datos['serie']}-{datos['correlativo']}"
+    lineas = []
+    total = 0.0
+    for i, item in enumerate(datos.get('items', []), start=1):
+        valor = round(float(item.get('cantidad', 0)) * float(item.get('valor_unitario', 0)), 2)
+        total += valor
+        lineas.append(
+            f"<cac:InvoiceLine><cbc:ID>{i}</cbc:ID>"
+            f"<cbc:InvoicedQuantity unitCode=\"{item.get('unidad_medida', 'NIU')}\">{item.get('cantidad')}</cbc:InvoicedQuantity>"
+            f"<cbc:LineExtensionAmount currencyID=\"PEN\">{valor:.2f}</cbc:LineExtensionAmount>"
+            f"<cac:Item><cbc:Description><![CDATA[{item.get('descripcion', '')}]]></cbc:Description></cac:Item>"
+            f"</cac:InvoiceLine>"
+        )
+    cliente = datos.get('cliente', {})
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Invoice xmlns="urn:oasis:names:specification:ubl:schema:xsd:Invoice-2" '
+        'xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2" '
+        'xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">'
+        f"<cbc:UBLVersionID>2.1</cbc:UBLVersionID><cbc:ID>{identificador}</cbc:ID>"
+        f"<cbc:IssueDate>{datos.get('fecha_emision', datetime.now().strftime('%Y-%m-%d'))}</cbc:IssueDate>"
+        "<cbc:InvoiceTypeCode>03</cbc:InvoiceTypeCode>"
+        f"<cac:AccountingCustomerParty><cac:Party><cac:PartyIdentification>"
+        f"<cbc:ID schemeID=\"{cliente.get('tipo_doc', '1')}\">{cliente.get('num_doc', '')}</cbc:ID>"
+        f"</cac:PartyIdentification></cac:Party></cac:AccountingCustomerParty>"
+        f"<cac:LegalMonetaryTotal><cbc:LineExtensionAmount currencyID=\"PEN\">{total:.2f}</cbc:LineExtensionAmount>"
+        f"</cac:LegalMonetaryTotal>{''.join(lineas)}</Invoice>"
+    ).encode('utf-8')
+
+
+def generar_cdr(identificador, codigo='0', descripcion=None):
+    """Zip con el ApplicationResponse (R-<serie>-<numero>.xml), como el CDR real"""
+    descripcion = descripcion or f"La Boleta numero {identificador}, ha sido aceptada"
+    respuesta = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<ar:ApplicationResponse xmlns:ar="urn:oasis:names:specification:ubl:schema:xsd:ApplicationResponse-2" '
+        'xmlns:cac="urn:oasis:names:specification:ubl:schema:xsd:CommonAggregateComponents-2" '
+        'xmlns:cbc="urn:oasis:names:specification:ubl:schema:xsd:CommonBasicComponents-2">'
+        f"<cbc:ResponseDate>{datetime.now().strftime('%Y-%m-%d')}</cbc:ResponseDate>"
+        f"<cac:DocumentResponse><cac:Response><cbc:ReferenceID>{identificador}</cbc:ReferenceID>"
+        f"<cbc:ResponseCode>{codigo}</cbc:ResponseCode><cbc:Description>{descripcion}</cbc:Description>"
+        "</cac:Response></cac:DocumentResponse></ar:ApplicationResponse>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"R-{identificador}.xml", respuesta)
+    return buffer.getvalue()
+
+
+class ManejadorSimulador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo van en escrituras separadas; sin esto cada respuesta espera el ACK retardado
+    disable_nagle_algorithm = True
+    configuracion = ConfiguracionSimulador()
+    estado = EstadoSimulador()
+
+    RUTAS_GET = [
+        (re.compile(r'^/health$'), '_salud'),
+        (re.compile(r'^/api/comprobantes/consultar/(?P<ticket>[^/]+)$'), '_consultar_ticket'),
+        (re.compile(r'^/(?:storage/)?cdr/(?P<nombre>[^/]+)$'), '_archivo_cdr'),
+        (re.compile(r'^/(?:storage/)?xml/(?P<nombre>[^/]+)$'), '_archivo_xml'),
+    ]
+    RUTAS_POST = [
+        (re.compile(r'^/boleta$'), '_boleta'),
+        (re.compile(r'^/api/resumen-diario$'), '_resumen_diario'),
+    ]
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._despachar(self.RUTAS_GET)
+
+    def do_POST(self):
+        self._despachar(self.RUTAS_POST)
+
+    def _despachar(self, rutas):
+        # Consumir siempre el cuerpo: si queda en el socket rompe la conexión keep-alive
+        largo = int(self.headers.get('Content-Length') or 0)
+        self._cuerpo = self.rfile.read(largo) if largo else b''
+        ruta = self.path.split('?', 1)[0].replace('/public', '')
+        self.estado.contar(f"{self.command} {ruta}")
+        for patron, nombre in rutas:
+            coincidencia = patron.match(ruta)
+            if coincidencia:
+                self._simular_latencia()
+                if nombre != '_salud' and self._sortear(self.configuracion.tasa_error):
+                    self.estado.contar('errores')
+                    return self._json({'success': False, 'error': 'Error simulado del servicio'}, 500)
+                return getattr(self, nombre)(**coincidencia.groupdict())
+        self._json({'error': 'Ruta no encontrada'}, 404)
+
+    def _simular_latencia(self):
+        config = self.configuracion
+        if config.latencia_ms or config.jitter_ms:
+            with self.estado.lock:
+                extra = config.aleatorio.uniform(0, config.jitter_ms)
+            time.sleep((config.latencia_ms + extra) / 1000)
+
+    def _sortear(self, tasa):
+        with self.estado.lock:
+            return tasa > 0 and self.configuracion.aleatorio.random() < tasa
+
+    def _leer_json(self):
+        return json.loads(self._cuerpo or b'{}')
+
+    def _json(self, datos, codigo=200):
+        self._enviar(json.dumps(datos).encode('utf-8'), 'application/json', codigo)
+
+    def _enviar(self, cuerpo, tipo, codigo=200):
+        self.send_response(codigo)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    # Rutas
+
+    def _salud(self):
+        self._json({
+            'status': 'OK',
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'service': 'Simulador Microservicio Comprobantes'
+        })
+
+    def _boleta(self):
+        try:
+            datos = self._leer_json()
+        except ValueError as e:
+            return self._json({'success': False, 'error': f'JSON inválido: {e}'}, 500)
+        if not all(k in datos for k in ('serie', 'correlativo', 'cliente', 'items')):
+            return self._json({
+                'success': False,
+                'error': 'Datos incompletos: se requiere serie, correlativo, cliente e items'
+            }, 500)
+
+        identificador = f"{datos['serie']}-{datos['correlativo']}"
+        rechazo = None
+        if self._sortear(self.configuracion.tasa_rechazo):
+            with self.estado.lock:
+                rechazo = self.configuracion.aleatorio.choice(self.configuracion.codigos_rechazo)
+            self.estado.contar('rechazos')
+
+        if self.configuracion.asincrono:
+            return self._boleta_asincrona(identificador, datos, rechazo)
+
+        if rechazo:
+            return self._json({'success': False, 'error': f'{rechazo} - Comprobante {identificador} rechazado (simulado)'})
+
+        xml = generar_xml(datos)
+        cdr = generar_cdr(identificador)
+        nombre_cdr = f"R-{identificador}.zip"
+        with self.estado.lock:
+            self.estado.archivos[f"xml/{identificador}.xml"] = xml
+            self.estado.archivos[f"cdr/{nombre_cdr}"] = cdr
+        self.estado.contar('aceptados')
+
+        self._json({
+            'success': True,
+            'estado': 'ACEPTADO',
+            'descripcion': f"La Boleta numero {identificador}, ha sido aceptada",
+            'codigo': '0',
+            'nombre_cdr_zip': nombre_cdr,
+            'id': identificador,
+            'hash': hashlib.md5(cdr).hexdigest(),
+            'cdr_base64': base64.b64encode(cdr).decode('ascii'),
+            'xml_base64': base64.b64encode(xml).decode('ascii'),
+            'enlace_xml': f"/xml/{identificador}.xml",
+            'enlace_cdr': f"/cdr/{nombre_cdr}",
+        })
+
+    def _boleta_asincrona(self, identificador, datos, rechazo):
+        ticket = self._nuevo_ticket()
+        with self.estado.lock:
+            self.estado.tickets[ticket] = {'identificador': identificador, 'rechazo': rechazo, 'consultas': 0}
+            if not rechazo:
+                self.estado.archivos[f"xml/{identificador}.xml"] = generar_xml(datos)
+                self.estado.archivos[f"cdr/R-{identificador}.zip"] = generar_cdr(identificador)
+        if not rechazo:
+            self.estado.contar('aceptados')
+        self._json({
+            'ticket': ticket,
+            'estado': 'EN_PROCESO',
+            'codigo': '98',
+            'descripcion': f"Comprobante {identificador} en proceso (ticket {ticket})",
+        })
+
+    def _nuevo_ticket(self):
+        with self.estado.lock:
+            return f"{int(time.time() * 1000)}{self.configuracion.aleatorio.randint(100000, 999999)}"
+
+    def _resumen_diario(self):
+        datos = self._leer_json()
+        ticket = self._nuevo_ticket()
+        registro = {
+            'fecha': datos.get('fecha'),
+            'cantidad': len(datos.get('comprobantes', [])),
+            'consultas': 0,
+        }
+        if self._sortear(self.configuracion.tasa_rechazo):
+            with self.estado.lock:
+                registro['rechazo'] = self.configuracion.aleatorio.choice(self.configuracion.codigos_rechazo)
+            registro['identificador'] = f"RC-{ticket}"
+            self.estado.contar('rechazos')
+        with self.estado.lock:
+            self.estado.tickets[ticket] = registro
+        self._json({'success': True, 'ticket': ticket})
+
+    def _consultar_ticket(self, ticket):
+        with self.estado.lock:
+            registro = self.estado.tickets.get(ticket)
+            if registro is not None:
+                registro['consultas'] += 1
+        if registro is None:
+            return self._json({'success': False, 'error': f'Ticket {ticket} no encontrado'}, 404)
+
+        if registro['consultas'] <= self.configuracion.consultas_en_proceso:
+            return self._json({'success': True, 'ticket': ticket, 'estado': 'EN_PROCESO', 'codigo': '98'})
+
+        if registro.get('rechazo'):
+            return self._json({
+                'success': False,
+                'ticket': ticket,
+                'codigo': registro['rechazo'],
+                'error': f"{registro['rechazo']} - Comprobante {registro['identificador']} rechazado (simulado)",
+            })
+
+        if 'identificador' in registro:
+            identificador = registro['identificador']
+            descripcion = f"La Boleta numero {identificador}, ha sido aceptada"
+        else:
+            identificador = ticket
+            descripcion = f"El Resumen diario {ticket}, ha sido aceptado"
+        cdr = generar_cdr(identificador, descripcion=descripcion)
+        self._json({
+            'success': True,
+            'ticket': ticket,
+            'estado': 'ACEPTADO',
+            'codigo': '0',
+            'descripcion': descripcion,
+            'cdr_base64': base64.b64encode(cdr).decode('ascii'),
+        })
+
+    def _archivo_cdr(self, nombre):
+        self._archivo(f"cdr/{nombre}", 'application/zip', 'CDR no encontrado')
+
+    def _archivo_xml(self, nombre):
+        self._archivo(f"xml/{nombre}", 'application/xml', 'XML no encontrado')
+
+    def _archivo(self, clave, tipo, error):
+        with self.estado.lock:
+            contenido = self.estado.archivos.get(clave)
+        if contenido is None:
+            return self._json({'error': error}, 404)
+        self._enviar(contenido, tipo)
+
+
+def crear_simulador(host='127.0.0.1', puerto=8001, configuracion=None):
+    """Crea el servidor con su propia configuración y estado; llamar serve_forever() para atender"""
+    manejador = type('ManejadorSimuladorConfigurado', (ManejadorSimulador,), {
+        'configuracion': configuracion or ConfiguracionSimulador(),
+        'estado': EstadoSimulador(),
+    })
+    servidor = ThreadingHTTPServer((host, puerto), manejador)
+    servidor.daemon_threads = True
+    return servidor
+
+
+def iniciar_en_hilo(host='127.0.0.1', puerto=0, configuracion=None):
+    """Arranca el simulador en un hilo de fondo; retorna (servidor, url_base)"""
+    servidor = crear_simulador(host, puerto, configuracion)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    host, puerto = servidor.server_address[:2]
+    return servidor, f"http://{host}:{puerto}"
@@ -1,15 +1,231 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 import json
+import random
+import threading
+import time
 from django.conf import settings
 from decimal import Decimal
 import base64
 from datetime import datetime
 
+
+class ServicioSunatNoDisponible(Exception):
+    """El circuito está abierto: no se intenta la llamada al microservicio"""
+
+
+class CircuitoSunat:
+    """
+    Circuit breaker por URL del microservicio, compartido por el proceso.
+    - Tras SUNAT_CIRCUITO_UMBRAL fallos seguidos se abre y las llamadas fallan
+      al instante durante SUNAT_CIRCUITO_ESPERA segundos; luego se deja pasar
+      una llamada de prueba.
+    - Recuerda el último estado de salud durante SUNAT_SALUD_TTL segundos, así
+      un envío exitoso reciente evita el /health previo al siguiente envío.
+    """
+    _instancias = {}
+    _lock_instancias = threading.Lock()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fallos = 0
+        self.abierto_hasta = 0.0
+        self.prueba_en_curso = False
+        self.salud = None
+        self.salud_expira = 0.0
+
+    @classmethod
+    def para(cls, base_url):
+        with cls._lock_instancias:
+            if base_url not in cls._instancias:
+                cls._instancias[base_url] = cls()
+            return cls._instancias[base_url]
+
+    def permitir(self):
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self.abierto_hasta:
+                return False
+            if self.abierto_hasta and self.prueba_en_curso:
+                return False
+            if self.abierto_hasta:
+                self.prueba_en_curso = True  # semiabierto: una sola llamada de prueba
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.fallos = 0
+            self.abierto_hasta = 0.0
+            self.prueba_en_curso = False
+            self._guardar_salud(True)
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            self.prueba_en_curso = False
+            if self.fallos >= getattr(settings, 'SUNAT_CIRCUITO_UMBRAL', 5) or self.abierto_hasta:
+                self.abierto_hasta = time.monotonic() + getattr(settings, 'SUNAT_CIRCUITO_ESPERA', 30)
+                self._guardar_salud(False)
+
+    def salud_cacheada(self):
+        with self._lock:
+            if time.monotonic() < self.abierto_hasta:
+                return False
+            if self.salud is not None and time.monotonic() < self.salud_expira:
+                return self.salud
+            return None
+
+    def guardar_salud(self, disponible):
+        with self._lock:
+            self._guardar_salud(disponible)
+
+    def _guardar_salud(self, disponible):
+        self.salud = disponible
+        self.salud_expira = time.monotonic() + getattr(settings, 'SUNAT_SALUD_TTL', 60)
+
+
+class MetricasSunat:
+    """Latencia y errores por operación del cliente (por proceso)"""
+    _lock = threading.Lock()
+    _datos = {}
+
+    @classmethod
+    def registrar(cls, operacion, segundos, ok):
+        with cls._lock:
+            m = cls._datos.setdefault(operacion, {
+                'llamadas': 0, 'errores': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'ultimo_ms': 0.0
+            })
+            ms = segundos * 1000
+            m['llamadas'] += 1
+            m['errores'] += 0 if ok else 1
+            m['total_ms'] += ms
+            m['max_ms'] = max(m['max_ms'], ms)
+            m['ultimo_ms'] = ms
+
+    @classmethod
+    def resumen(cls):
+        with cls._lock:
+            return {
+                operacion: {
+                    'llamadas': m['llamadas'],
+                    'errores': m['errores'],
+                    'promedio_ms': round(m['total_ms'] / m['llamadas'], 2) if m['llamadas'] else 0,
+                    'max_ms': round(m['max_ms'], 2),
+                    'ultimo_ms': round(m['ultimo_ms'], 2),
+                }
+                for operacion, m in cls._datos.items()
+            }
+
+    @classmethod
+    def reiniciar(cls):
+        with cls._lock:
+            cls._datos.clear()
+
+
+_sesion = None
+_lock_sesion = threading.Lock()
+
+
+def _obtener_sesion():
+    """requests.Session compartida con pool de conexiones keep-alive"""
+    global _sesion
+    if _sesion is None:
+        with _lock_sesion:
+            if _sesion is None:
+                tamanio = getattr(settings, 'SUNAT_POOL_SIZE', 10)
+                sesion = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=tamanio, pool_maxsize=tamanio, max_retries=0)
+                sesion.mount('http://', adaptador)
+                sesion.mount('https://', adaptador)
+                _sesion = sesion
+    return _sesion
+
+
+def _sin_conexion(error):
+    """
+    True si la conexión nunca llegó a establecerse (timeout de conexión, conexión
+    rechazada o DNS): el servidor no recibió nada y se puede reintentar sin
+    duplicar. Una desconexión o un reset después de enviar no cuenta.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or isinstance(error, requests.exceptions.Timeout):
+        return False
+    causa = error.args[0] if error.args else None
+    return isinstance(getattr(causa, 'reason', causa), NewConnectionError)
+
+
 class SunatClient:
+    # Respuestas del servidor que justifican reintentar
+    ESTADOS_REINTENTABLES = {502, 503, 504}
+
     def __init__(self):
         self.base_url = getattr(settings, 'SUNAT_SERVICE_URL', 'http://localhost:8001')
         self.timeout = getattr(settings, 'SUNAT_TIMEOUT', 30)
+        self.sesion = _obtener_sesion()
+        self.circuito = CircuitoSunat.para(self.base_url)
+
+    @staticmethod
+    def metricas():
+        """Latencia por operación desde que arrancó el proceso"""
+        return MetricasSunat.resumen()
+
+    def _solicitar(self, operacion, metodo, ruta, idempotente=True, **kwargs):
+        """
+        Ejecuta la llamada HTTP con el pool, el circuit breaker y reintentos.
+        Los POST no idempotentes solo se reintentan si la conexión no llegó a
+        establecerse (el servidor no recibió nada). `ruta` puede ser una URL
+        completa del mismo microservicio (almacenamiento).
+        """
+        if not self.circuito.permitir():
+            MetricasSunat.registrar(operacion, 0, False)
+            raise ServicioSunatNoDisponible(
+                f"Servicio SUNAT no disponible (circuito abierto) en {self.base_url}"
+            )
+
+        url = ruta if ruta.startswith(('http://', 'https://')) else f"{self.base_url}{ruta}"
+        kwargs.setdefault('timeout', self.timeout)
+        reintentos = getattr(settings, 'SUNAT_REINTENTOS', 2)
+        base = getattr(settings, 'SUNAT_REINTENTO_BASE', 0.5)
+
+        for intento in range(reintentos + 1):
+            inicio = time.perf_counter()
+            try:
+                response = self.sesion.request(metodo, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                MetricasSunat.registrar(operacion, time.perf_counter() - inicio, False)
+                transitorio = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                if transitorio and intento < reintentos and (idempotente or _sin_conexion(e)):
+                    time.sleep(random.uniform(0, base * (2 ** intento)))
+                    continue
+                self.circuito.registrar_fallo()
+                raise
+            except Exception:
+                # Cualquier otro error también cuenta como fallo (y libera la llamada de prueba)
+                MetricasSunat.registrar(operacion, time.perf_counter() - inicio, False)
+                self.circuito.registrar_fallo()
+                raise
+
+            ok = response.status_code < 500
+            MetricasSunat.registrar(operacion, time.perf_counter() - inicio, ok)
+            if response.status_code in self.ESTADOS_REINTENTABLES and intento < reintentos and idempotente:
+                response.close()
+                time.sleep(random.uniform(0, base * (2 ** intento)))
+                continue
+
+            # Cualquier 5xx cuenta como fallo del servicio para el circuito
+            if ok:
+                self.circuito.registrar_exito()
+            else:
+                self.circuito.registrar_fallo()
+            return response
     
+    def descargar_artefacto(self, tipo, nombre):
+        """GET en streaming de un XML/CDR guardado en el microservicio (SUNAT_STORAGE_URL)"""
+        base = getattr(settings, 'SUNAT_STORAGE_URL', 'http://localhost:8001/storage').rstrip('/')
+        return self._solicitar('descargar_artefacto', 'GET', f"{base}/{tipo}/{nombre}", stream=True)
+
     def enviar_comprobante(self, comprobante):
         """
         Envía comprobante a SUNAT a través del microservicio PHP
@@ -22,11 +238,11 @@ class SunatClient:
             print(f"📊 Datos: {json.dumps(sunat_data, indent=2)}")
             
             # Cambia la URL del endpoint
-            response = requests.post(
-                f"{self.base_url}/public/boleta",
+            response = self._solicitar(
+                'enviar_comprobante', 'POST', '/public/boleta',
+                idempotente=False,
                 json=sunat_data,
-                headers={'Content-Type': 'application/json'},
-                timeout=self.timeout
+                headers={'Content-Type': 'application/json'}
             )
             
             print(f"📥 Respuesta SUNAT: {response.status_code} - {response.text}")
@@ -39,6 +255,8 @@ class SunatClient:
                 print(f"❌ {error_msg}")
                 raise Exception(error_msg)
                 
+        except ServicioSunatNoDisponible:
+            raise
         except requests.exceptions.Timeout:
             error_msg = "Timeout al conectar con servicio SUNAT"
             print(f"❌ {error_msg}")
@@ -124,6 +342,21 @@ class SunatClient:
                 'xml_base64': respuesta.get('xml_base64', ''),
                 'enlace_xml': respuesta.get('enlace_xml', ''),
                 'enlace_cdr': respuesta.get('enlace_cdr', ''),
+                'ticket': respuesta.get('ticket', ''),
+            }
+        elif respuesta.get('ticket'):
+            # Envío asíncrono: el resultado se obtiene luego con consultar_ticket
+            return {
+                'estado': 'ENVIADO',
+                'mensaje': respuesta.get('descripcion', f"En proceso (ticket {respuesta['ticket']})"),
+                'codigo_respuesta': respuesta.get('codigo', '98'),
+                'hash': '',
+                'cdr_nombre': '',
+                'cdr_base64': '',
+                'xml_base64': '',
+                'enlace_xml': '',
+                'enlace_cdr': '',
+                'ticket': respuesta['ticket'],
             }
         else:
             # Comprobante rechazado
@@ -144,9 +377,8 @@ class SunatClient:
         Consulta el estado de un ticket en SUNAT
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/api/comprobantes/consultar/{ticket_numero}",
-                timeout=self.timeout
+            response = self._solicitar(
+                'consultar_ticket', 'GET', f"/api/comprobantes/consultar/{ticket_numero}"
             )
             
             if response.status_code == 200:
@@ -156,6 +388,29 @@ class SunatClient:
                 
         except Exception as e:
             raise Exception(f"Error consultando ticket: {str(e)}")
+
+    def interpretar_ticket(self, respuesta):
+        """
+        Traduce la respuesta de consultar_ticket a un estado del comprobante.
+        Retorna None si SUNAT aún procesa el ticket (código 98).
+        """
+        codigo = str(respuesta.get('codigo', '') or '')
+        if codigo == '98' or respuesta.get('estado') in ('EN_PROCESO', 'ENVIADO'):
+            return None
+
+        if respuesta.get('success') and (respuesta.get('estado') == 'ACEPTADO' or codigo == '0'):
+            estado = 'ACEPTADO'
+        elif respuesta.get('success') and (respuesta.get('estado') == 'OBSERVADO' or codigo.startswith('4')):
+            estado = 'OBSERVADO'
+        else:
+            estado = 'RECHAZADO'
+
+        return {
+            'estado': estado,
+            'mensaje': respuesta.get('descripcion') or respuesta.get('error', ''),
+            'codigo_respuesta': codigo or ('0' if estado == 'ACEPTADO' else 'ERROR'),
+            'cdr_base64': respuesta.get('cdr_base64', ''),
+        }
     
     def descargar_cdr(self, comprobante):
         """
@@ -165,9 +420,8 @@ class SunatClient:
             if not comprobante.comprNombreCDR:
                 raise Exception("No hay CDR asociado a este comprobante")
             
-            response = requests.get(
-                f"{self.base_url}/public/cdr/{comprobante.comprNombreCDR}",
-                timeout=self.timeout
+            response = self._solicitar(
+                'descargar_cdr', 'GET', f"/public/cdr/{comprobante.comprNombreCDR}"
             )
             
             if response.status_code == 200:
@@ -182,27 +436,34 @@ class SunatClient:
         """
         Verifica si el servicio SUNAT está disponible
         """
+        # Estado reciente (o circuito abierto): no hace falta otro round trip
+        cacheado = self.circuito.salud_cacheada()
+        if cacheado is not None:
+            return cacheado
+
         try:
             print(f"🔍 Verificando servicio SUNAT en: {self.base_url}")
             
             # Cambia /api/health por /health
-            response = requests.get(
-                f"{self.base_url}/public/health",
-                timeout=10
-            )
+            response = self._solicitar('verificar_estado_servicio', 'GET', '/public/health', timeout=10)
             
             print(f"📡 Respuesta del servicio: {response.status_code} - {response.text}")
             
             # Verificar que la respuesta sea 200 y contenga un indicador de salud
+            disponible = False
             if response.status_code == 200:
                 try:
                     data = response.json()
-                    return data.get('status') == 'OK' or data.get('status') == 'ok'
-                except:
+                    disponible = data.get('status') == 'OK' or data.get('status') == 'ok'
+                except ValueError:
                     # Si no es JSON, pero responde 200, asumimos que está bien
-                    return True
-            return False
+                    disponible = True
+            self.circuito.guardar_salud(disponible)
+            return disponible
             
+        except ServicioSunatNoDisponible as e:
+            print(f"⛔ {e}")
+            return False
         except requests.exceptions.ConnectionError as e:
             print(f"❌ Error de conexión: {e}")
             return False
@@ -231,10 +492,10 @@ class SunatClient:
                     'cliente_ruc': comp.comprNumDocReceptor,
                 })
             
-            response = requests.post(
-                f"{self.base_url}/api/resumen-diario",
-                json=datos_resumen,
-                timeout=self.timeout
+            response = self._solicitar(
+                'obtener_resumen_diario', 'POST', '/api/resumen-diario',
+                idempotente=False,
+                json=datos_resumen
             )
             
             if response.status_code == 200:
@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from Branch.models import Branch
+from User.models import User, Role
+from cash.models import Cash, CashOpening
+from inventory.models import ProductCategory, Product, BranchInventory
+from suppliers.models import Supplier
+
+
+class DatosVentasMixin:
+    """
+    Datos comunes de las pruebas de ventas. setUp() limpia la caché y deja:
+    - self.sucursal y self.user (VENDEDOR de la sucursal)
+    - self.caja y self.apertura: la caja abierta del vendedor
+    - self.client autenticado como el vendedor
+    Cada suite llama a super().setUp() y agrega sus productos con crear_producto().
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.sucursal = self.crear_sucursal()
+        self.user = self.crear_vendedor(self.sucursal)
+        self.caja = Cash.objects.create(sucurCod=self.sucursal, usuCod=self.user, cajNom='Caja Test')
+        self.apertura = CashOpening.objects.create(cajCod=self.caja, usuCod=self.user, cajaAperMontInicial=Decimal('0'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def crear_sucursal(self, nombre='Sucursal Test'):
+        return Branch.objects.create(
+            sucurNom=nombre, sucurDep='AREQUIPA', sucurCiu='Arequipa',
+            sucurDis='Cercado', sucurDir='Av. Test 123', sucurTel='999888777'
+        )
+
+    def crear_vendedor(self, sucursal, usuario='vendedor_test', nombre='Vendedor Test'):
+        rol, _ = Role.objects.get_or_create(rolNom='VENDEDOR', defaults={'rolDes': 'Vendedor'})
+        vendedor = User.objects.create_user(
+            usuario, 'password123', f'{usuario}@test.com', usuNombreCom=nombre, sucurCod=sucursal
+        )
+        vendedor.roles.add(rol)
+        return vendedor
+
+    def crear_gerente(self, usuario='gerente_test'):
+        rol, _ = Role.objects.get_or_create(rolNom='GERENTE', rolNivel=0, defaults={'rolDes': 'Gerente'})
+        gerente = User.objects.create_user(
+            usuario, 'password123', f'{usuario}@test.com', usuNombreCom='Gerente Test'
+        )
+        gerente.roles.add(rol)
+        return gerente
+
+    def crear_producto(self, descripcion='Lente de prueba', costo='50.00', valor='100.00', stock=1000, **campos):
+        """Producto con `stock` unidades en self.sucursal (el resto de campos, como prodTipoAfecIGV, en `campos`)"""
+        if not hasattr(self, '_proveedor'):
+            self._categoria = ProductCategory.objects.create(catproNom='Categoria Test')
+            self._proveedor = Supplier.objects.create(
+                provRuc='20999999991', provRazSocial='Proveedor Test', provDirec='Calle 1',
+                provTele='987654321', provEmail='proveedor@test.com', provCiu='Arequipa'
+            )
+        campos.setdefault('prodMarca', 'Marca Test')
+        producto = Product.objects.create(
+            catproCod=self._categoria, provCod=self._proveedor, prodDescr=descripcion,
+            prodCostoInv=Decimal(costo), prodValorUni=Decimal(valor), **campos
+        )
+        BranchInventory.objects.filter(sucurCod=self.sucursal, prodCod=producto).update(invStock=stock)
+        return producto
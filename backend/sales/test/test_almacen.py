@@ -0,0 +1,176 @@
+import base64
+import csv
+import io
+import zipfile
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import requests
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sales.models import Venta, Comprobante
+from sales.almacen import almacen, nombre_xml, nombre_cdr
+from sales.simulador_sunat import ConfiguracionSimulador, iniciar_en_hilo
+from sales.sunat_client import CircuitoSunat
+from sales.test.datos import DatosVentasMixin
+
+
+class AlmacenArtefactosTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: comprobante aceptado y almacén en un directorio temporal"""
+        super().setUp()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, True)
+        ajustes = override_settings(SUNAT_ARTIFACTS_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        producto = self.crear_producto('Montura almacen', stock=5)
+
+        venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Almacen')
+        venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': 1}])
+        venta.registrar_pago(venta.ventSaldo, 'EFECTIVO')
+        self.comprobante = venta.comprobante
+        Comprobante.objects.filter(pk=self.comprobante.pk).update(comprEstadoSUNAT='ACEPTADO')
+        self.url = f'/api/sales/comprobantes/{self.comprobante.pk}/descargar_xml/'
+
+    def test_contenido_igual_se_guarda_una_vez(self):
+        """Test: dos nombres con el mismo contenido comparten el objeto"""
+        a = almacen().guardar('xml', 'B001-1.xml', b'<xml/>')
+        b = almacen().guardar('xml', 'B001-2.xml', b'<xml/>')
+        self.assertEqual(a, b)
+        self.assertEqual(almacen().ubicar('xml', 'B001-1.xml'), almacen().ubicar('xml', 'B001-2.xml'))
+
+    def test_descarga_con_etag_y_rango(self):
+        """Test: la descarga trae ETag, responde 304 al revalidar y 206 a un Range"""
+        contenido = b'<?xml version="1.0"?><Invoice>contenido</Invoice>'
+        self.comprobante._guardar_archivo_xml(base64.b64encode(contenido).decode())
+        self.comprobante.save(update_fields=Comprobante.campos_artefacto('xml'))
+        self.assertTrue(self.comprobante.tiene_xml)
+        self.assertEqual(self.comprobante.comprXMLTamanio, len(contenido))
+
+        completa = self.client.get(self.url)
+        self.assertEqual(completa.status_code, 200)
+        self.assertEqual(b''.join(completa.streaming_content), contenido)
+        etag = completa['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        parcial = self.client.get(self.url, HTTP_RANGE='bytes=0-4')
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(b''.join(parcial.streaming_content), contenido[:5])
+        self.assertEqual(parcial['Content-Range'], f'bytes 0-4/{len(contenido)}')
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=9999-').status_code, 416)
+
+        # Un rango mal formado se ignora
+        invalido = self.client.get(self.url, HTTP_RANGE='bytes=5-3')
+        self.assertEqual(invalido.status_code, 200)
+        self.assertEqual(b''.join(invalido.streaming_content), contenido)
+
+    def test_fallo_de_cache_descarga_del_microservicio_una_vez(self):
+        """Test: si el archivo no está se trae del microservicio y queda guardado"""
+        servidor, url = iniciar_en_hilo(configuracion=ConfiguracionSimulador())
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        requests.post(f'{url}/boleta', json={
+            'serie': self.comprobante.comprSerie, 'correlativo': str(self.comprobante.comprCorrelativo),
+            'cliente': {}, 'items': [],
+        })
+
+        with override_settings(SUNAT_STORAGE_URL=f'{url}/storage'):
+            cdr_url = f'/api/sales/comprobantes/{self.comprobante.pk}/descargar_cdr/'
+            self.assertEqual(self.client.get(cdr_url).status_code, 200)
+            self.assertEqual(self.client.get(cdr_url).status_code, 200)
+
+        contadores = servidor.RequestHandlerClass.estado.contadores
+        self.assertEqual(contadores[f'GET /storage/cdr/{nombre_cdr(self.comprobante)}'], 1)
+        self.comprobante.refresh_from_db()
+        self.assertTrue(self.comprobante.tiene_cdr)
+        self.assertFalse(self.comprobante.tiene_xml)
+        self.assertIsNone(almacen().ubicar('xml', nombre_xml(self.comprobante)))
+
+    def test_fallo_de_cache_respeta_el_circuito(self):
+        """Test: con el circuito del microservicio abierto la descarga falla sin llamarlo"""
+        servidor, url = iniciar_en_hilo(configuracion=ConfiguracionSimulador())
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+
+        with override_settings(SUNAT_SERVICE_URL=url, SUNAT_STORAGE_URL=f'{url}/storage', SUNAT_CIRCUITO_ESPERA=60):
+            circuito = CircuitoSunat.para(url)
+            circuito.abierto_hasta = time.monotonic() + 60
+            self.addCleanup(CircuitoSunat._instancias.pop, url, None)
+            respuesta = self.client.get(f'/api/sales/comprobantes/{self.comprobante.pk}/descargar_cdr/')
+
+        self.assertEqual(respuesta.status_code, 502)
+        self.assertNotIn(f'GET /storage/cdr/{nombre_cdr(self.comprobante)}', servidor.RequestHandlerClass.estado.contadores)
+
+    def test_serializar_no_consulta_el_disco(self):
+        """Test: el detalle del comprobante lee el índice de la base de datos"""
+        self.comprobante._guardar_archivo_xml(base64.b64encode(b'<xml/>').decode())
+        self.comprobante.save(update_fields=Comprobante.campos_artefacto('xml'))
+        shutil.rmtree(self.directorio)
+
+        respuesta = self.client.get(f'/api/sales/comprobantes/{self.comprobante.pk}/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.data['tiene_xml'])
+        self.assertFalse(respuesta.data['tiene_cdr'])
+        self.assertEqual(respuesta.data['comprXMLTamanio'], 6)
+
+    def test_reconciliar_reconstruye_el_indice(self):
+        """Test: el comando llena y limpia las columnas según lo que hay en disco"""
+        almacen().guardar('cdr', nombre_cdr(self.comprobante), b'PK-cdr')
+        Comprobante.objects.filter(pk=self.comprobante.pk).update(
+            comprTieneXML=True, comprXMLSha256='x' * 64, comprXMLUbicacion='objetos/xx/perdido'
+        )
+
+        call_command('reconciliar_artefactos', stdout=io.StringIO())
+
+        self.comprobante.refresh_from_db()
+        self.assertTrue(self.comprobante.comprTieneCDR)
+        self.assertEqual(self.comprobante.comprCDRTamanio, 6)
+        self.assertEqual(self.comprobante.comprCDRUbicacion, f'objetos/{self.comprobante.comprCDRSha256[:2]}/{self.comprobante.comprCDRSha256}')
+        self.assertFalse(self.comprobante.comprTieneXML)
+        self.assertEqual(self.comprobante.comprXMLUbicacion, '')
+
+    def test_exportar_zip_con_indice(self):
+        """Test: el ZIP trae el índice y los artefactos de los comprobantes filtrados"""
+        self.comprobante._guardar_archivo_xml(base64.b64encode(b'<Invoice/>').decode())
+        self.comprobante._guardar_archivo_cdr(base64.b64encode(b'PK-cdr').decode())
+        self.comprobante.save(update_fields=Comprobante.campos_artefacto('xml') + Comprobante.campos_artefacto('cdr'))
+
+        hoy = timezone.localdate().isoformat()
+        respuesta = self.client.get(
+            '/api/sales/comprobantes/exportar_artefactos/',
+            {'fecha_desde': hoy, 'fecha_hasta': hoy, 'sucursal': self.user.sucurCod_id}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/zip')
+
+        archivo = zipfile.ZipFile(io.BytesIO(b''.join(respuesta.streaming_content)))
+        base = self.comprobante.comprobante_completo
+        self.assertEqual(archivo.namelist(), [f'xml/{base}.xml', f'cdr/R-{base}.zip', 'indice.csv'])
+        self.assertEqual(archivo.read(f'xml/{base}.xml'), b'<Invoice/>')
+        self.assertEqual(archivo.read(f'cdr/R-{base}.zip'), b'PK-cdr')
+
+        indice = list(csv.reader(io.StringIO(archivo.read('indice.csv').decode('utf-8-sig'))))
+        self.assertEqual(len(indice), 2)
+        self.assertEqual(indice[1][:2], [self.comprobante.comprSerie, str(self.comprobante.comprCorrelativo)])
+        self.assertEqual(indice[1][12], 'ACEPTADO')
+        self.assertEqual((indice[1][14], indice[1][16]), (f'xml/{base}.xml', f'cdr/R-{base}.zip'))
+
+        # Una sola consulta y un solo stat por artefacto
+        with self.assertNumQueries(1), mock.patch.object(Path, 'is_file', autospec=True, side_effect=Path.is_file) as is_file:
+            b''.join(self.client.get(
+                '/api/sales/comprobantes/exportar_artefactos/', {'fecha_desde': hoy, 'fecha_hasta': hoy}
+            ).streaming_content)
+        self.assertEqual(is_file.call_count, 2)
+
+        vacio = self.client.get('/api/sales/comprobantes/exportar_artefactos/', {'estado_sunat': 'RECHAZADO'})
+        archivo = zipfile.ZipFile(io.BytesIO(b''.join(vacio.streaming_content)))
+        self.assertEqual(archivo.namelist(), ['indice.csv'])
@@ -0,0 +1,93 @@
+import csv
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sales.models import Venta, AntiguedadDeuda
+from sales.antiguedad import antiguedad_deuda, origen_vivo
+from sales.test.datos import DatosVentasMixin
+
+
+class AntiguedadDeudaTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta y ventas pendientes de 10, 45, 75 y 120 días"""
+        super().setUp()
+        producto = self.crear_producto('Lente antigüedad')
+
+        # (cliente, unidades de 118.00, días de antigüedad)
+        ahora = timezone.now()
+        self.ventas = []
+        for cliente, cantidad, dias in (
+            ('Cliente Uno', 1, 10), ('Cliente Uno', 2, 45), ('Cliente Dos', 3, 75),
+            ('Cliente Dos', 4, 120), ('Cliente Pagado', 5, 20),
+        ):
+            venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom=cliente)
+            venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': cantidad}])
+            Venta.objects.filter(pk=venta.pk).update(ventFecha=ahora - timedelta(days=dias))
+            self.ventas.append(venta)
+        Venta.objects.filter(pk=self.ventas[-1].pk).update(ventEstado='PAGADO', ventSaldo=0)
+
+    def _deudas_csv(self, **params):
+        respuesta = self.client.get('/api/sales/reports/export/clients-debt-csv/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        contenido = b''.join(respuesta.streaming_content).decode('utf-8-sig')
+        return list(csv.reader(io.StringIO(contenido)))
+
+    def test_tramos_en_una_consulta(self):
+        """Test: todos los tramos, el total y la cantidad salen de una sola consulta"""
+        origen = origen_vivo(Venta.objects.filter(sucurCod=self.sucursal))
+        with self.assertNumQueries(1):
+            deuda = antiguedad_deuda(origen)
+        self.assertEqual(deuda['tramos'], {'current': 118.0, '30_60': 236.0, '60_90': 354.0, 'over_90': 472.0})
+        self.assertEqual((deuda['total'], deuda['count']), (1180.0, 4))
+
+        reporte = self.client.get('/api/sales/reports/clients/').data
+        self.assertEqual(reporte['debt_aging'], deuda['tramos'])
+        self.assertEqual((reporte['total_debt'], reporte['debt_count']), (1180.0, 4))
+        self.assertEqual((reporte['debt_aging_source'], reporte['debt_aging_cutoff']), ('vivo', None))
+
+    def test_desglose_por_cliente(self):
+        """Test: la exportación de deudas lleva una columna por tramo para cada cliente"""
+        filas = self._deudas_csv()
+        self.assertEqual(filas[0][6:], ['Deuda 0-30 días', 'Deuda 31-60 días', 'Deuda 61-90 días', 'Deuda Más de 90 días'])
+        self.assertEqual([f[0] for f in filas[1:]], ['Cliente Dos', 'Cliente Uno'])
+        self.assertEqual([float(v) for v in filas[1][4:]], [2.0, 826.0, 0.0, 0.0, 354.0, 472.0])
+        self.assertEqual([float(v) for v in filas[2][4:]], [2.0, 354.0, 118.0, 236.0, 0.0, 0.0])
+
+        with override_settings(DEUDA_TRAMOS=[('hasta_60', 60), ('resto', None)]):
+            filas = self._deudas_csv()
+            reporte = self.client.get('/api/sales/reports/clients/').data
+        self.assertEqual(filas[0][6:], ['Deuda 0-60 días', 'Deuda Más de 60 días'])
+        self.assertEqual(reporte['debt_aging'], {'hasta_60': 354.0, 'resto': 826.0})
+
+    def test_foto_nocturna(self):
+        """Test: con fuente=snapshot se lee la foto del día; sin foto se calcula en vivo"""
+        sin_foto = self.client.get('/api/sales/reports/clients/', {'fuente': 'snapshot'}).data
+        self.assertEqual(sin_foto['debt_aging_source'], 'vivo')
+
+        call_command('generar_antiguedad_deuda', stdout=io.StringIO())
+        self.assertEqual(AntiguedadDeuda.objects.filter(sucurCod=self.sucursal).count(), 4)
+        vivo = self.client.get('/api/sales/reports/clients/').data
+
+        # Un pago posterior a la foto solo se ve en vivo
+        Venta.objects.filter(pk=self.ventas[0].pk).update(ventEstado='PAGADO', ventSaldo=0)
+        foto = self.client.get('/api/sales/reports/clients/', {'fuente': 'snapshot'}).data
+        self.assertEqual((foto['debt_aging_source'], foto['debt_aging_cutoff']), ('snapshot', timezone.localdate()))
+        self.assertEqual(foto['debt_aging'], vivo['debt_aging'])
+        self.assertEqual((foto['total_debt'], foto['debt_count']), (1180.0, 4))
+        self.assertEqual(self.client.get('/api/sales/reports/clients/').data['debt_aging']['current'], 0.0)
+
+        filas = self._deudas_csv(fuente='snapshot')
+        self.assertEqual([float(v) for v in filas[2][4:]], [2.0, 354.0, 118.0, 236.0, 0.0, 0.0])
+
+        self.assertEqual(self.client.get('/api/sales/reports/clients/', {'fuente': 'ayer'}).status_code, 400)
+
+    def test_vendedor_sin_sucursal(self):
+        """Test: un vendedor sin sucursal no ve la deuda de las sucursales"""
+        self.client.force_authenticate(self.crear_vendedor(None, 'vendedor_sin_sucursal'))
+        reporte = self.client.get('/api/sales/reports/clients/').data
+        self.assertEqual((reporte['total_debt'], reporte['debt_count']), (0.0, 0))
+        self.assertEqual(self._deudas_csv()[1:], [])
@@ -0,0 +1,145 @@
+import csv
+import io
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from Branch.models import Branch
+from inventory.models import BranchInventory
+from sales.models import Venta, VersionCache
+from sales.comparativa import comparar_sucursales
+from sales.test.datos import DatosVentasMixin
+
+
+class ComparativaSucursalesTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: sucursal con vendedor, caja abierta, producto con stock y un gerente"""
+        with self.captureOnCommitCallbacks(execute=True):
+            super().setUp()
+            self.producto = self.crear_producto('Lente comparativa', stock=10)
+        self.client.force_authenticate(self.crear_gerente())
+        self.hoy = timezone.localdate().isoformat()
+
+    def _venta(self, cantidad=1, confirmar=True):
+        if confirmar:
+            with self.captureOnCommitCallbacks(execute=True):
+                return self._venta(cantidad, confirmar=False)
+        venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Comparativa')
+        venta.agregar_detalles([{'prodCod': self.producto, 'ventDetCantidad': cantidad}])
+        return venta
+
+    def _fila(self, filas):
+        return next(f for f in filas if f['branch_id'] == self.sucursal.pk)
+
+    def test_consultas_constantes(self):
+        """Test: la comparativa usa las mismas consultas con una o con muchas sucursales"""
+        self._venta()
+        with CaptureQueriesContext(connection) as pocas:
+            comparar_sucursales(self.hoy, self.hoy)
+
+        for n in range(5):
+            self.crear_sucursal(f'Sucursal Extra {n}')
+        cache.clear()
+        with CaptureQueriesContext(connection) as muchas:
+            filas = comparar_sucursales(self.hoy, self.hoy)
+
+        # versión compartida + sucursales + resumen
+        self.assertEqual(len(pocas), 3)
+        self.assertEqual(len(muchas), 3)
+        self.assertEqual(len(filas), Branch.objects.count())
+
+    def test_cache_e_invalidacion(self):
+        """Test: la comparativa se cachea por rango y alcance y una venta la invalida"""
+        self._venta(cantidad=2)
+        fila = self._fila(comparar_sucursales(self.hoy, self.hoy))
+        self.assertEqual((fila['cantidad_ventas'], fila['total_ventas'], fila['valor_inventario']), (1, 236.0, 800.0))
+
+        # En caché solo se lee la versión compartida
+        with self.assertNumQueries(1):
+            comparar_sucursales(self.hoy, self.hoy)
+        with self.assertNumQueries(3):
+            comparar_sucursales(self.hoy, self.hoy, [self.sucursal.pk])
+
+        self._venta()
+        fila = self._fila(comparar_sucursales(self.hoy, self.hoy))
+        self.assertEqual((fila['cantidad_ventas'], fila['total_ventas'], fila['promedio_venta']), (2, 354.0, 177.0))
+        self.assertEqual(fila['valor_inventario'], 700.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BranchInventory.mover_stock(self.sucursal.pk, self.producto.pk, 5, 'ANULACION')
+        self.assertEqual(self._fila(comparar_sucursales(self.hoy, self.hoy))['valor_inventario'], 1200.0)
+
+    def test_csv_coincide_con_json(self):
+        """Test: el reporte JSON y el CSV salen del mismo cálculo"""
+        self._venta(cantidad=3)
+        rango = {'start_date': self.hoy, 'end_date': self.hoy}
+
+        datos = self.client.get('/api/sales/reports/branch-comparison/', rango).data['branches']
+        respuesta = self.client.get('/api/sales/reports/export/branch-comparison-csv/', rango)
+        self.assertEqual(respuesta.status_code, 200)
+        lineas = list(csv.reader(io.StringIO(respuesta.content.decode('utf-8-sig'))))
+
+        self.assertEqual(lineas[0][0], 'Sucursal')
+        self.assertEqual(
+            [linea[0] for linea in lineas[1:]], [fila['branch_name'] for fila in datos]
+        )
+        linea = next(l for l in lineas[1:] if l[0] == self.sucursal.sucurNom)
+        self.assertEqual([float(v) for v in linea[1:]], [354.0, 1.0, 354.0, 354.0, 700.0])
+
+    def test_invalidacion_desde_otro_proceso(self):
+        """Test: una venta confirmada en otro worker invalida la comparativa cacheada en este"""
+        self._venta()
+        self.assertEqual(self._fila(comparar_sucursales(self.hoy, self.hoy))['cantidad_ventas'], 1)
+
+        # Otro proceso escribe la venta e incrementa la versión en la base, sin tocar esta caché
+        Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Otro Worker')
+        VersionCache.objects.update(vcacVersion=F('vcacVersion') + 1)
+        self.assertEqual(self._fila(comparar_sucursales(self.hoy, self.hoy))['cantidad_ventas'], 2)
+
+    def test_una_invalidacion_por_transaccion(self):
+        """Test: una venta invalida una vez y solo su sucursal; los cambios que no se ven no invalidan"""
+        self._venta()
+        with self.captureOnCommitCallbacks(execute=True):
+            otra = self.crear_sucursal('Sucursal Otra')
+        comparar_sucursales(self.hoy, self.hoy, [otra.pk])
+        comparar_sucursales(self.hoy, self.hoy, [self.sucursal.pk])
+
+        with self.captureOnCommitCallbacks() as pendientes:
+            venta = self._venta(cantidad=2, confirmar=False)
+            venta.ventObservaciones = 'Sin cambios en montos'
+            venta.save()
+        self.assertEqual(len(pendientes), 1)
+        with CaptureQueriesContext(connection) as consultas:
+            pendientes[0]()
+        self.assertEqual(len(consultas), 1)
+
+        # En caché sigue la de la otra sucursal; la de la venta se recalcula
+        with self.assertNumQueries(1):
+            comparar_sucursales(self.hoy, self.hoy, [otra.pk])
+        with self.assertNumQueries(3):
+            comparar_sucursales(self.hoy, self.hoy, [self.sucursal.pk])
+
+        with self.captureOnCommitCallbacks() as pendientes:
+            venta.ventObservaciones = 'Otra nota'
+            venta.save()
+        self.assertEqual(pendientes, [])
+
+        # Una transacción deshecha no deja la invalidación por hecha
+        with self.captureOnCommitCallbacks() as pendientes:
+            try:
+                with transaction.atomic():
+                    self._venta(confirmar=False)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self._venta(confirmar=False)
+        self.assertEqual(len(pendientes), 1)
+
+    def test_sucursal_no_numerica(self):
+        """Test: un branch_id no numérico responde 400 en el reporte y en el CSV"""
+        for url in ('/api/sales/reports/branch-comparison/', '/api/sales/reports/export/branch-comparison-csv/'):
+            self.assertEqual(self.client.get(url, {'branch_id': 'abc'}).status_code, 400)
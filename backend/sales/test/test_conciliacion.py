@@ -0,0 +1,69 @@
+import io
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sales.models import Venta, Comprobante
+from sales.outbox import procesar_evento, reclamar_lote
+from sales.simulador_sunat import ConfiguracionSimulador, iniciar_en_hilo
+from sales.test.datos import DatosVentasMixin
+
+
+class ConciliacionSunatTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: simulador asíncrono y cuatro comprobantes enviados con ticket"""
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, True)
+
+        self.servidor, url = iniciar_en_hilo(configuracion=ConfiguracionSimulador(
+            asincrono=True, consultas_en_proceso=1, semilla=1
+        ))
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        ajustes = override_settings(SUNAT_SERVICE_URL=url, SUNAT_ARTIFACTS_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        producto = self.crear_producto('Lente conciliacion', stock=10)
+
+        for _ in range(4):
+            venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Conciliacion')
+            venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': 1}])
+            venta.registrar_pago(venta.ventSaldo, 'EFECTIVO')
+        for evento in reclamar_lote(10):
+            procesar_evento(evento)
+
+    def _consultas(self):
+        return sum(n for clave, n in self.servidor.RequestHandlerClass.estado.contadores.items()
+                   if clave.startswith('GET /api/comprobantes/consultar/'))
+
+    def test_concilia_tickets_en_lotes(self):
+        """Test: los tickets en proceso se reintentan y los resultados finales se guardan"""
+        comprobantes = list(Comprobante.objects.order_by('comprCod'))
+        self.assertEqual({c.comprEstadoSUNAT for c in comprobantes}, {'ENVIADO'})
+        self.assertTrue(all(c.comprTicket for c in comprobantes))
+
+        rechazado = comprobantes[0]
+        self.servidor.RequestHandlerClass.estado.tickets[rechazado.comprTicket]['rechazo'] = '2017'
+
+        # Primera pasada: SUNAT aún procesa, nada cambia
+        call_command('conciliar_sunat', '--una-vez', '--lote', '3', stdout=io.StringIO())
+        self.assertEqual(self._consultas(), 4)
+        self.assertEqual(Comprobante.objects.filter(comprEstadoSUNAT='ENVIADO').count(), 4)
+
+        # Segunda pasada: resultado final, con el CDR registrado
+        call_command('conciliar_sunat', '--una-vez', '--lote', '3', stdout=io.StringIO())
+        self.assertEqual(self._consultas(), 8)
+        rechazado.refresh_from_db()
+        self.assertEqual(rechazado.comprEstadoSUNAT, 'RECHAZADO')
+        self.assertEqual(rechazado.comprCodigoRespuesta, '2017')
+        aceptados = Comprobante.objects.filter(comprEstadoSUNAT='ACEPTADO')
+        self.assertEqual(aceptados.count(), 3)
+        self.assertTrue(all(c.comprTieneCDR and c.comprFechaRespuesta for c in aceptados))
+
+        # Tercera pasada: ya no queda nada por conciliar
+        call_command('conciliar_sunat', '--una-vez', stdout=io.StringIO())
+        self.assertEqual(self._consultas(), 8)
@@ -0,0 +1,115 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from unittest import mock
+from sales.models import Venta, Comprobante, ComprobanteDetalle, EventoOutbox, SerieComprobante
+from sales.test.datos import DatosVentasMixin
+
+
+class EmisionLoteTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta y un producto con stock"""
+        super().setUp()
+        self.producto = self.crear_producto('Lente lote')
+
+    def _ventas_pagadas(self, cantidad, **cliente):
+        """Ventas pagadas sin comprobante (por ejemplo, cobradas durante una caída de SUNAT)"""
+        ventas = []
+        for _ in range(cantidad):
+            venta = Venta.objects.create(
+                usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Lote', **cliente
+            )
+            venta.agregar_detalles([
+                {'prodCod': self.producto, 'ventDetCantidad': 1},
+                {'prodCod': self.producto, 'ventDetCantidad': 2},
+            ])
+            ventas.append(venta)
+        Venta.objects.filter(pk__in=[v.pk for v in ventas]).update(ventEstado='PAGADO', ventSaldo=0)
+        return ventas
+
+    def test_emite_correlativos_consecutivos_detalles_y_eventos(self):
+        """Test: un rango de correlativos por serie, detalles copiados y envío en cola"""
+        boletas = self._ventas_pagadas(3)
+        facturas = self._ventas_pagadas(2, cliDocTipo='RUC', cliDocNum='20123456789', cliDireccion='Av. Cliente 1')
+        anulada = self._ventas_pagadas(1)[0]
+        Venta.objects.filter(pk=anulada.pk).update(ventAnulada=True)
+        sin_importe = self._ventas_pagadas(1)[0]
+        Venta.objects.filter(pk=sin_importe.pk).update(ventTotal=0)
+
+        ids = [v.pk for v in boletas + facturas] + [anulada.pk, sin_importe.pk, 999999]
+        comprobantes, omitidas = Comprobante.objects.emitir_lote(ids)
+
+        self.assertEqual(len(comprobantes), 5)
+        self.assertEqual(omitidas, [anulada.pk, sin_importe.pk, 999999])
+
+        series = {}
+        for comprobante in Comprobante.objects.filter(ventCod__in=ids):
+            series.setdefault(comprobante.comprSerie, []).append(comprobante.comprCorrelativo)
+            self.assertEqual(comprobante.comprTotalVenta, Decimal('354.00'))
+        self.assertEqual(set(series), {'B001', 'F001'})
+        for serie, correlativos in series.items():
+            correlativos.sort()
+            self.assertEqual(correlativos, list(range(correlativos[0], correlativos[0] + len(correlativos))))
+            self.assertEqual(SerieComprobante.objects.get(comprSerie=serie).serUltimoCorrelativo, correlativos[-1])
+
+        self.assertEqual(ComprobanteDetalle.objects.filter(comprCod__in=comprobantes).count(), 10)
+        self.assertEqual(
+            set(EventoOutbox.objects.filter(outTipo='ENVIAR_SUNAT').values_list('outReferencia', flat=True)),
+            {c.pk for c in comprobantes}
+        )
+
+        # Reintentar el mismo lote no duplica nada
+        repetidos, omitidas = Comprobante.objects.emitir_lote(ids)
+        self.assertEqual(repetidos, [])
+        self.assertEqual(len(omitidas), len(ids))
+
+    def test_consultas_no_dependen_del_tamanio_del_lote(self):
+        """Test: emitir 2 o 12 ventas cuesta las mismas consultas"""
+        # La primera emisión inicializa el contador de la serie
+        Comprobante.objects.emitir_lote([v.pk for v in self._ventas_pagadas(1)])
+        consultas = []
+        for cantidad in (2, 12):
+            ids = [v.pk for v in self._ventas_pagadas(cantidad)]
+            with CaptureQueriesContext(connection) as contexto:
+                Comprobante.objects.emitir_lote(ids)
+            consultas.append(len(contexto))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_endpoint_respeta_la_sucursal_del_usuario(self):
+        """Test: el endpoint emite solo ventas de la sucursal del usuario"""
+        propias = self._ventas_pagadas(2)
+        otra = self.crear_sucursal('Sucursal Lote Ajena')
+        ajena = self._ventas_pagadas(1)[0]
+        Venta.objects.filter(pk=ajena.pk).update(sucurCod=otra)
+
+        respuesta = self.client.post(
+            '/api/sales/comprobantes/emitir_lote/',
+            {'ventas': [v.pk for v in propias] + [ajena.pk]}, format='json'
+        )
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['emitidos'], 2)
+        self.assertEqual(respuesta.data['omitidas'], [ajena.pk])
+        self.assertFalse(Comprobante.objects.filter(ventCod=ajena).exists())
+
+        vacio = self.client.post('/api/sales/comprobantes/emitir_lote/', {'ventas': []}, format='json')
+        self.assertEqual(vacio.status_code, 400)
+
+    def test_venta_emitida_por_otro_lote_mientras_se_esperaba(self):
+        """Test: una venta que otro lote emitió durante la espera del bloqueo se omite sin error"""
+        ventas = self._ventas_pagadas(2)
+        filtro_original = Comprobante.objects.filter
+
+        def lote_concurrente(*args, **kwargs):
+            # El otro lote confirma después de que este leyó las ventas aptas
+            filtro.side_effect = filtro_original
+            Comprobante.objects.model(ventCod=ventas[0]).save()
+            return filtro_original(*args, **kwargs)
+
+        with mock.patch.object(Comprobante.objects, 'filter', side_effect=lote_concurrente) as filtro:
+            comprobantes, omitidas = Comprobante.objects.emitir_lote([v.pk for v in ventas])
+
+        self.assertEqual([c.ventCod_id for c in comprobantes], [ventas[1].pk])
+        self.assertEqual(omitidas, [ventas[0].pk])
@@ -0,0 +1,96 @@
+import csv
+import gzip
+import io
+import json
+import zipfile
+from decimal import Decimal
+from xml.etree import ElementTree
+
+from django.test import TestCase
+from django.utils import timezone
+from sales.models import Venta
+from sales import exportacion
+from sales.test.datos import DatosVentasMixin
+
+HOJA = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+class ExportacionTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta, producto con stock y tres ventas"""
+        super().setUp()
+        producto = self.crear_producto('Lente exportación')
+
+        self.ventas = []
+        for nombre, cantidad in (('Cliente <Uno> & Cía', 1), ('Cliente Dos', 2), ('Cliente Tres', 3)):
+            venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom=nombre)
+            venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': cantidad}])
+            self.ventas.append(venta)
+
+    def _descargar(self, url, formato):
+        respuesta = self.client.get(url, {'formato': formato})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_formatos_equivalentes(self):
+        """Test: CSV, CSV gzip, JSON Lines y XLSX llevan las mismas filas"""
+        url = '/api/sales/reports/export/sales-csv/'
+        respuesta, contenido = self._descargar(url, 'csv')
+        self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="reporte_ventas.csv"')
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(filas[0][:3], ['Código', 'Fecha', 'Cliente'])
+        self.assertEqual(len(filas), 4)
+        venta = next(f for f in filas[1:] if f[0] == str(self.ventas[1].pk))
+        self.assertEqual(venta[1], timezone.localtime(self.ventas[1].ventFecha).strftime('%Y-%m-%d %H:%M'))
+        self.assertEqual((venta[2], venta[4], venta[5]), ('Cliente Dos', self.sucursal.sucurNom, '236.00'))
+
+        _, comprimido = self._descargar(url, 'csv.gz')
+        self.assertEqual(gzip.decompress(comprimido), contenido)
+
+        respuesta, lineas = self._descargar(url, 'jsonl')
+        objetos = [json.loads(linea) for linea in lineas.decode('utf-8').splitlines()]
+        self.assertEqual([str(o['ventCod']) for o in objetos], [f[0] for f in filas[1:]])
+        self.assertEqual(objetos[0]['sucurCod__sucurNom'], self.sucursal.sucurNom)
+
+        respuesta, libro = self._descargar(url, 'xlsx')
+        self.assertTrue(respuesta['Content-Disposition'].endswith('reporte_ventas.xlsx"'))
+        with zipfile.ZipFile(io.BytesIO(libro)) as archivo:
+            self.assertIn('[Content_Types].xml', archivo.namelist())
+            hoja = ElementTree.fromstring(archivo.read('xl/worksheets/sheet1.xml'))
+        celdas = [
+            [''.join(c.itertext()) for c in fila.iter(f'{HOJA}c')]
+            for fila in hoja.iter(f'{HOJA}row')
+        ]
+        self.assertEqual(len(celdas), 4)
+        self.assertIn('Cliente <Uno> & Cía', [fila[2] for fila in celdas])
+        self.assertEqual([fila[0] for fila in celdas[1:]], [f[0] for f in filas[1:]])
+
+        self.assertEqual(self.client.get(url, {'formato': 'pdf'}).status_code, 400)
+
+    def test_deudas_e_historial(self):
+        """Test: las exportaciones agregadas y con valores por defecto usan el mismo flujo"""
+        _, contenido = self._descargar('/api/sales/reports/export/clients-debt-csv/', 'csv')
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(filas[0], [
+            'Cliente', 'Documento', 'Sucursal', 'Total Compras', 'Cantidad Ventas', 'Deuda Total',
+            'Deuda 0-30 días', 'Deuda 31-60 días', 'Deuda 61-90 días', 'Deuda Más de 90 días',
+        ])
+        self.assertEqual(filas[1][:2], ['Cliente Tres', ''])
+        self.assertEqual([float(v) for v in filas[1][3:]], [354.0, 1.0, 354.0, 354.0, 0.0, 0.0, 0.0])
+
+        _, contenido = self._descargar('/api/sales/reports/export/seller-sales-history-csv/', 'csv')
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+        tercera = next(f for f in filas[1:] if f[0] == str(self.ventas[2].pk))
+        self.assertEqual((tercera[2], tercera[4], tercera[7]), (self.user.usuNombreCom, 'N/A', '354.0'))
+
+    def test_escritores_por_bloques(self):
+        """Test: los escritores entregan varios bloques y no acumulan todas las filas"""
+        filas = ((i, f'Cliente {i}', Decimal('10.50')) for i in range(exportacion.BLOQUE_FILAS * 3))
+        bloques = list(exportacion.escribir_csv(['Código', 'Cliente', 'Total'], filas))
+        self.assertEqual(len(bloques), 4)
+        self.assertTrue(all(len(b) < 20000 for b in bloques))
+
+        filas = ((i, f'Cliente {i}') for i in range(exportacion.BLOQUE_FILAS * 3))
+        self.assertGreater(len(list(exportacion.escribir_xlsx(['Código', 'Cliente'], filas))), 3)
@@ -0,0 +1,84 @@
+from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from django.utils import timezone
+from inventory.models import BranchInventory
+from sales.models import Venta, RespuestaIdempotente
+from sales.test.datos import DatosVentasMixin
+
+
+class IdempotenciaVentasTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor autenticado con caja abierta y un producto"""
+        super().setUp()
+        self.producto = self.crear_producto('Montura idem', stock=5)
+        self.venta_data = {
+            'usuCod': self.user.pk,
+            'sucurCod': self.sucursal.pk,
+            'cliNombreCom': 'Cliente Idem',
+            'detalles': [{'prodCod': self.producto.pk, 'ventDetCantidad': 2}],
+        }
+
+    def _crear(self, clave, data=None):
+        return self.client.post(
+            '/api/sales/ventas/', data or self.venta_data, format='json',
+            HTTP_IDEMPOTENCY_KEY=clave
+        )
+
+    def test_reintento_de_venta_no_duplica(self):
+        """Test: el reintento devuelve la primera respuesta sin crear otra venta"""
+        primera = self._crear('venta-1')
+        segunda = self._crear('venta-1')
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda.data, primera.data)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(Venta.objects.filter(usuCod=self.user).count(), 1)
+        self.assertEqual(
+            BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.producto).invStock, 3
+        )
+
+    def test_misma_clave_con_otra_peticion_es_rechazada(self):
+        """Test: reutilizar la clave con otro cuerpo responde 422"""
+        self._crear('venta-2')
+        otra = dict(self.venta_data, cliNombreCom='Otro Cliente')
+
+        self.assertEqual(self._crear('venta-2', otra).status_code, 422)
+        self.assertEqual(Venta.objects.filter(usuCod=self.user).count(), 1)
+
+    def test_reintento_de_pago_no_cobra_dos_veces(self):
+        """Test: un pago reintentado se registra una sola vez"""
+        venta_cod = self._crear('venta-3').data['ventCod']
+        url = f'/api/sales/ventas/{venta_cod}/registrar_pago/'
+        pago = {'monto': '50.00', 'forma_pago': 'EFECTIVO'}
+
+        for _ in range(2):
+            respuesta = self.client.post(url, pago, format='json', HTTP_IDEMPOTENCY_KEY='pago-1')
+            self.assertEqual(respuesta.status_code, 200)
+
+        self.assertEqual(Venta.objects.get(pk=venta_cod).ventAdelanto, Decimal('50.00'))
+
+    def test_intento_abandonado_se_retoma_al_vencer_el_plazo(self):
+        """Test: un intento que quedó PROCESANDO bloquea la clave solo hasta que vence su plazo"""
+        self._crear('venta-4')
+        # El worker murió a mitad del intento: la clave queda PROCESANDO
+        registro = RespuestaIdempotente.objects.get(idemClave='venta-4')
+        RespuestaIdempotente.objects.filter(pk=registro.pk).update(
+            idemEstado='PROCESANDO', idemRespuesta=None, idemCodigoHttp=None,
+            idemProcesandoHasta=timezone.now() + timedelta(seconds=60)
+        )
+        self.assertEqual(self._crear('venta-4').status_code, 409)
+
+        RespuestaIdempotente.objects.filter(pk=registro.pk).update(
+            idemProcesandoHasta=timezone.now() - timedelta(seconds=1)
+        )
+        otra = dict(self.venta_data, cliNombreCom='Otro Cliente')
+        self.assertEqual(self._crear('venta-4', otra).status_code, 422)
+
+        retomado = self._crear('venta-4')
+        self.assertEqual(retomado.status_code, 201)
+        registro.refresh_from_db()
+        self.assertEqual((registro.idemEstado, registro.idemProcesandoHasta), ('COMPLETADO', None))
+        self.assertEqual(self._crear('venta-4').data, retomado.data)
@@ -0,0 +1,77 @@
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from sales.models import Venta
+from sales.test.datos import DatosVentasMixin
+
+
+class PaginacionVentasTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta y siete ventas, cuatro con la misma fecha"""
+        super().setUp()
+        producto = self.crear_producto('Lente paginación')
+
+        ventas = []
+        for n in range(7):
+            venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom=f'Cliente {n}')
+            venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': 1}])
+            ventas.append(venta)
+        # Empates de fecha: el código desempata
+        ahora = timezone.now()
+        Venta.objects.filter(pk__in=[v.pk for v in ventas[2:6]]).update(ventFecha=ahora)
+        self.esperado = list(
+            Venta.objects.filter(sucurCod=self.sucursal).order_by('-ventFecha', '-ventCod').values_list('ventCod', flat=True)
+        )
+
+    def _recorrer(self, url, clave, **params):
+        """Códigos de todas las páginas hacia adelante y luego de vuelta hacia atrás"""
+        adelante, paginas = [], []
+        respuesta = self.client.get(url, {'page_size': 3, **params}).data
+        while True:
+            paginas.append(respuesta)
+            adelante += [fila['ventCod'] for fila in respuesta[clave]]
+            if not respuesta['pagination']['has_next']:
+                break
+            respuesta = self.client.get(url, {'page_size': 3, 'cursor': respuesta['pagination']['next_cursor'], **params}).data
+
+        atras = []
+        while respuesta['pagination']['has_prev']:
+            respuesta = self.client.get(url, {'page_size': 3, 'cursor': respuesta['pagination']['prev_cursor'], **params}).data
+            atras = [fila['ventCod'] for fila in respuesta[clave]] + atras
+        return adelante, atras, paginas
+
+    def test_listados_por_cursor(self):
+        """Test: los cuatro listados recorren todas las ventas sin repetir ni saltar, en ambos sentidos"""
+        for url, clave in (
+            ('/api/sales/reports/sales-list/', 'sales'),
+            ('/api/sales/reports/seller-sales-history/', 'sales'),
+            ('/api/sales/reports/pending-sales/', 'pending_sales'),
+            ('/api/sales/ventas/reportes/', 'results'),
+        ):
+            adelante, atras, paginas = self._recorrer(url, clave)
+            self.assertEqual(adelante, self.esperado, url)
+            self.assertEqual(atras, self.esperado[:6], url)
+            self.assertEqual([len(p[clave]) for p in paginas], [3, 3, 1], url)
+            self.assertFalse(paginas[0]['pagination']['has_prev'], url)
+
+    def test_sin_conteo_por_defecto(self):
+        """Test: la página no cuenta filas salvo que se pida include_total"""
+        with CaptureQueriesContext(connection) as consultas:
+            pagina = self.client.get('/api/sales/reports/sales-list/', {'page_size': 3}).data
+        self.assertNotIn('total', pagina['pagination'])
+        self.assertFalse(any('COUNT(' in c['sql'].upper() for c in consultas.captured_queries))
+
+        pagina = self.client.get('/api/sales/reports/sales-list/', {'page_size': 3, 'include_total': 'true'}).data
+        self.assertEqual((pagina['pagination']['total'], pagina['pagination']['total_exacto']), (7, True))
+
+        with override_settings(PAGINACION_CONTEO_MAXIMO=5):
+            pagina = self.client.get('/api/sales/reports/sales-list/', {'include_total': 'true'}).data
+        self.assertEqual((pagina['pagination']['total'], pagina['pagination']['total_exacto']), (6, False))
+
+    def test_cursor_invalido(self):
+        """Test: un cursor alterado se rechaza con 400"""
+        self.assertEqual(self.client.get('/api/sales/reports/sales-list/', {'cursor': 'no-es-un-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/sales/ventas/reportes/', {'cursor': 'WzEsMl0'}).status_code, 400)
@@ -0,0 +1,110 @@
+from unittest import mock
+from django.test import TestCase
+from django.utils import timezone
+from decimal import Decimal
+from sales.models import Venta, Pago, EventoOutbox
+from sales.outbox import MANEJADORES, reclamar_lote, procesar_evento
+from sales.test.datos import DatosVentasMixin
+
+
+class LibroPagosTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: venta de S/118 con caja abierta"""
+        super().setUp()
+        producto = self.crear_producto('Montura pagos', stock=5)
+
+        self.venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Pagos')
+        self.venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': 1}])
+
+    def test_cada_pago_queda_en_el_libro(self):
+        """Test: los pagos parciales conservan su forma de pago"""
+        self.venta.registrar_pago(Decimal('50.00'), 'EFECTIVO')
+        self.venta.registrar_pago(Decimal('30.00'), 'YAPE', referencia_pago='OP-123')
+
+        pagos = list(self.venta.pagos.values_list('pagFormaPago', 'pagMonto', 'cajaAperCod_id'))
+        self.assertEqual(pagos, [
+            ('EFECTIVO', Decimal('50.00'), self.apertura.pk),
+            ('YAPE', Decimal('30.00'), self.apertura.pk),
+        ])
+        self.venta.refresh_from_db()
+        self.assertEqual(self.venta.ventAdelanto, Decimal('80.00'))
+
+    def test_resumen_de_sesion_por_forma_de_pago(self):
+        """Test: session_sales reparte lo cobrado según cada pago"""
+        self.venta.registrar_pago(Decimal('50.00'), 'EFECTIVO')
+        self.venta.registrar_pago(Decimal('30.00'), 'YAPE', referencia_pago='OP-123')
+
+        respuesta = self.client.get('/api/cash/opening/session_sales/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['cantidad_ventas'], 1)
+        self.assertEqual(respuesta.data['ventas_por_forma_pago']['EFECTIVO'], 50.0)
+        self.assertEqual(respuesta.data['ventas_por_forma_pago']['YAPE'], 30.0)
+        self.assertEqual(Pago.objects.filter(cajaAperCod=self.apertura).count(), 2)
+
+    def test_pago_completo_encola_envio_a_sunat(self):
+        """Test: el pago total deja el comprobante PENDIENTE y un evento en el outbox"""
+        resultado = self.venta.registrar_pago(Decimal('118.00'), 'EFECTIVO')
+
+        self.assertEqual(resultado['estado_sunat'], 'PENDIENTE')
+        comprobante = self.venta.comprobante
+        evento = EventoOutbox.objects.get(outTipo='ENVIAR_SUNAT', outReferencia=comprobante.pk)
+        self.assertEqual(evento.outEstado, 'PENDIENTE')
+
+    def test_worker_reintenta_y_pasa_a_fallido(self):
+        """Test: un error reprograma el evento y al agotar intentos queda FALLIDO"""
+        self.venta.registrar_pago(Decimal('118.00'), 'EFECTIVO')
+
+        def fallar(evento):
+            raise ConnectionError('servicio caído')
+
+        with mock.patch.dict(MANEJADORES, {'ENVIAR_SUNAT': fallar}), \
+                self.settings(OUTBOX_MAX_INTENTOS=2):
+            [evento] = reclamar_lote(10)
+            self.assertEqual(procesar_evento(evento), 'PENDIENTE')
+            self.assertEqual(reclamar_lote(10), [])  # espera el backoff
+
+            EventoOutbox.objects.update(outProximoIntento=timezone.now())
+            [evento] = reclamar_lote(10)
+            self.assertEqual(procesar_evento(evento), 'FALLIDO')
+
+        evento.refresh_from_db()
+        self.assertEqual(evento.outIntentos, 2)
+        self.assertEqual(evento.outUltimoError, 'servicio caído')
+
+    def test_worker_completa_evento(self):
+        """Test: un manejador exitoso marca el evento COMPLETADO"""
+        self.venta.registrar_pago(Decimal('118.00'), 'EFECTIVO')
+
+        with mock.patch.dict(MANEJADORES, {'ENVIAR_SUNAT': lambda evento: None}):
+            [evento] = reclamar_lote(10)
+            self.assertEqual(procesar_evento(evento), 'COMPLETADO')
+        self.assertEqual(reclamar_lote(10), [])
+
+    def test_bloqueo_vencido_no_pisa_al_otro_worker(self):
+        """Test: si el bloqueo vence durante el envío y otro worker lo retoma, el primero no registra su resultado"""
+        self.venta.registrar_pago(Decimal('118.00'), 'EFECTIVO')
+        retomados = []
+
+        def lento(evento):
+            # El bloqueo vence durante la llamada y otro worker retoma el evento
+            EventoOutbox.objects.update(outBloqueadoHasta=timezone.now())
+            retomados.extend(reclamar_lote(10))
+
+        with mock.patch.dict(MANEJADORES, {'ENVIAR_SUNAT': lento}):
+            [evento] = reclamar_lote(10)
+            self.assertEqual(procesar_evento(evento), 'PERDIDO')
+
+        [retomado] = retomados
+        with mock.patch.dict(MANEJADORES, {'ENVIAR_SUNAT': lambda evento: None}):
+            self.assertEqual(procesar_evento(retomado), 'COMPLETADO')
+        retomado.refresh_from_db()
+        self.assertEqual(retomado.outIntentos, 1)
+
+        # Vencido sin que nadie lo retome: tampoco se registra
+        EventoOutbox.objects.update(outEstado='PENDIENTE', outProximoIntento=timezone.now())
+        [evento] = reclamar_lote(10)
+        EventoOutbox.objects.update(outBloqueadoHasta=timezone.now())
+        with mock.patch.dict(MANEJADORES, {'ENVIAR_SUNAT': lambda evento: None}):
+            self.assertEqual(procesar_evento(evento), 'PERDIDO')
@@ -0,0 +1,115 @@
+import io
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sales.models import Venta, Comprobante
+from sales import pdf
+from sales.almacen import almacen
+from sales.test.datos import DatosVentasMixin
+
+
+class MontoEnLetrasTests(TestCase):
+
+    def test_montos(self):
+        """Test: importes en letras como los imprime la representación impresa"""
+        self.assertEqual(pdf.monto_en_letras(Decimal('0.50')), 'SON: CERO CON 50/100 SOLES')
+        self.assertEqual(pdf.monto_en_letras(Decimal('21')), 'SON: VEINTIUNO CON 00/100 SOLES')
+        self.assertEqual(pdf.monto_en_letras(Decimal('354.00')), 'SON: TRESCIENTOS CINCUENTA Y CUATRO CON 00/100 SOLES')
+        self.assertEqual(pdf.monto_en_letras(Decimal('1100.10')), 'SON: MIL CIEN CON 10/100 SOLES')
+        self.assertEqual(pdf.monto_en_letras(Decimal('21000')), 'SON: VEINTIÚN MIL CON 00/100 SOLES')
+        self.assertEqual(
+            pdf.monto_en_letras(Decimal('2000000'), 'USD'), 'SON: DOS MILLONES CON 00/100 DÓLARES AMERICANOS'
+        )
+
+
+class PdfComprobanteTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: comprobantes emitidos y almacén en un directorio temporal"""
+        super().setUp()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, True)
+        ajustes = override_settings(SUNAT_ARTIFACTS_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.producto = self.crear_producto('Montura de prueba con nombre largo para el ticket')
+
+        ventas = []
+        for datos_cliente in ({}, {'cliDocTipo': 'RUC', 'cliDocNum': '20123456789', 'cliDireccion': 'Av. Cliente 1'}):
+            venta = Venta.objects.create(
+                usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente PDF', **datos_cliente
+            )
+            venta.agregar_detalles([{'prodCod': self.producto, 'ventDetCantidad': 3}])
+            ventas.append(venta)
+        Venta.objects.filter(pk__in=[v.pk for v in ventas]).update(ventEstado='PAGADO', ventSaldo=0)
+        Comprobante.objects.emitir_lote([v.pk for v in ventas])
+        self.boleta = Comprobante.objects.get(ventCod=ventas[0])
+        self.factura = Comprobante.objects.get(ventCod=ventas[1])
+
+    def test_renderiza_ambos_formatos(self):
+        """Test: A4 y ticket de 80mm producen un PDF con el QR y el importe en letras"""
+        datos = pdf.datos_comprobante(self.factura)
+        self.assertIn('20123456789', pdf.contenido_qr(datos))
+        for formato in pdf.FORMATOS:
+            contenido = pdf.renderizar_pdf(datos, formato)
+            self.assertTrue(contenido.startswith(b'%PDF'))
+        self.assertTrue(self.boleta.descargar_pdf('80mm').startswith(b'%PDF'))
+
+    def test_cache_por_contenido(self):
+        """Test: el segundo pedido reutiliza el PDF; un cambio en los datos impresos lo regenera"""
+        ruta, sha256 = pdf.obtener_pdf(self.boleta, 'A4')
+        with mock.patch('sales.pdf.renderizar_pdf', side_effect=AssertionError('no debe dibujar')):
+            self.assertEqual(pdf.obtener_pdf(self.boleta, 'A4'), (ruta, sha256))
+
+        self.boleta.comprHash = 'hash-firmado'
+        nueva_ruta, nuevo_sha = pdf.obtener_pdf(self.boleta, 'A4')
+        self.assertNotEqual(nuevo_sha, sha256)
+
+    def test_reemplaza_el_pdf_anterior(self):
+        """Test: al cambiar el estado el PDF anterior se borra y queda uno por comprobante y formato"""
+        ruta, _ = pdf.obtener_pdf(self.boleta, 'A4')
+        pdf.obtener_pdf(self.boleta, '80mm')
+        self.boleta.comprEstadoSUNAT = 'ACEPTADO'
+        nueva_ruta, _ = pdf.obtener_pdf(self.boleta, 'A4')
+
+        self.assertFalse(ruta.exists())
+        self.assertTrue(nueva_ruta.exists())
+        self.assertEqual(
+            sorted(nombre for nombre, _, _ in almacen().indice('pdf')),
+            sorted(pdf.nombre_pdf(self.boleta, formato) for formato in pdf.FORMATOS)
+        )
+
+    def test_endpoint_descarga(self):
+        """Test: el endpoint sirve el PDF con ETag y responde 304 al revalidar"""
+        url = f'/api/sales/comprobantes/{self.boleta.pk}/descargar_pdf/'
+        respuesta = self.client.get(url, {'formato': '80mm'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(respuesta.streaming_content).startswith(b'%PDF'))
+
+        revalidada = self.client.get(url, {'formato': '80mm'}, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(revalidada.status_code, 304)
+        self.assertEqual(self.client.get(url, {'formato': 'A5'}).status_code, 400)
+
+    def test_exportacion_zip(self):
+        """Test: el ZIP trae un PDF por comprobante del rango"""
+        hoy = timezone.localdate().isoformat()
+        self.assertEqual(self.client.get('/api/sales/comprobantes/exportar_pdf/').status_code, 400)
+
+        respuesta = self.client.get(
+            '/api/sales/comprobantes/exportar_pdf/', {'fecha_desde': hoy, 'fecha_hasta': hoy}
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        archivo = zipfile.ZipFile(io.BytesIO(b''.join(respuesta.streaming_content)))
+        self.assertEqual(
+            sorted(archivo.namelist()),
+            sorted(pdf.nombre_pdf(c, 'A4') for c in (self.boleta, self.factura))
+        )
+        for nombre in archivo.namelist():
+            self.assertTrue(archivo.read(nombre).startswith(b'%PDF'))
@@ -0,0 +1,145 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sales.models import Venta, Comprobante, EventoOutbox, ResumenDiario
+from sales.simulador_sunat import ConfiguracionSimulador, iniciar_en_hilo
+from sales.test.datos import DatosVentasMixin
+
+
+class ResumenDiarioTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: resumen diario activo con resúmenes de hasta 2 boletas"""
+        super().setUp()
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, True)
+
+        self.servidor, url = iniciar_en_hilo(configuracion=ConfiguracionSimulador(semilla=1))
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        ajustes = override_settings(
+            SUNAT_SERVICE_URL=url, SUNAT_ARTIFACTS_DIR=directorio,
+            SUNAT_RESUMEN_DIARIO=True, SUNAT_RESUMEN_MAX_COMPROBANTES=2
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.producto = self.crear_producto('Lente resumen', stock=20)
+
+    def _vender(self, **cliente):
+        venta = Venta.objects.create(
+            usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Resumen', **cliente
+        )
+        venta.agregar_detalles([{'prodCod': self.producto, 'ventDetCantidad': 1}])
+        venta.registrar_pago(venta.ventSaldo, 'EFECTIVO')
+        return venta.comprobante
+
+    def test_boletas_de_dias_cerrados_van_en_resumenes_por_bloques(self):
+        """Test: 5 boletas de ayer -> 3 resúmenes (2+2+1), un ticket cada uno y resultado para todas"""
+        ayer = timezone.now() - timedelta(days=1)
+        boletas = [self._vender() for _ in range(5)]
+        Comprobante.objects.filter(pk__in=[b.pk for b in boletas]).update(comprFechaEmision=ayer)
+        de_hoy = self._vender()
+        factura = self._vender(cliDocTipo='RUC', cliDocNum='20123456789', cliDireccion='Av. Cliente 1')
+
+        # Solo la factura pasa por el outbox
+        self.assertEqual(list(EventoOutbox.objects.values_list('outReferencia', flat=True)), [factura.pk])
+
+        call_command('enviar_resumenes', stdout=io.StringIO())
+
+        resumenes = list(ResumenDiario.objects.order_by('resNumero'))
+        self.assertEqual([r.resCantidad for r in resumenes], [2, 2, 1])
+        self.assertEqual({r.resEstado for r in resumenes}, {'ENVIADO'})
+        self.assertEqual(resumenes[0].identificador, f"RC-{timezone.localdate(ayer):%Y%m%d}-1")
+        contadores = self.servidor.RequestHandlerClass.estado.contadores
+        self.assertEqual(contadores['POST /api/resumen-diario'], 3)
+
+        for resumen in resumenes:
+            tickets = set(resumen.comprobantes.values_list('comprTicket', flat=True))
+            self.assertEqual(tickets, {resumen.resTicket})
+        de_hoy.refresh_from_db()
+        self.assertEqual(de_hoy.comprEstadoSUNAT, 'PENDIENTE')
+        self.assertIsNone(de_hoy.resCod_id)
+
+        # La conciliación consulta cada ticket una vez y marca todas las boletas
+        call_command('conciliar_sunat', '--una-vez', stdout=io.StringIO())
+        self.assertEqual(
+            sum(n for k, n in contadores.items() if k.startswith('GET /api/comprobantes/consultar/')), 3
+        )
+        self.assertEqual(
+            Comprobante.objects.filter(pk__in=[b.pk for b in boletas], comprEstadoSUNAT='ACEPTADO',
+                                       comprTieneCDR=True).count(), 5
+        )
+        self.assertEqual(set(ResumenDiario.objects.values_list('resEstado', flat=True)), {'ACEPTADO'})
+
+        # Una segunda corrida no vuelve a enviar nada
+        call_command('enviar_resumenes', stdout=io.StringIO())
+        self.assertEqual(contadores['POST /api/resumen-diario'], 3)
+
+    def test_envio_fallido_se_reintenta(self):
+        """Test: si el servicio falla el resumen queda en ERROR y se reenvía en la siguiente corrida"""
+        boleta = self._vender()
+        Comprobante.objects.filter(pk=boleta.pk).update(comprFechaEmision=timezone.now() - timedelta(days=1))
+
+        configuracion = self.servidor.RequestHandlerClass.configuracion
+        configuracion.tasa_error = 1.0
+        with override_settings(SUNAT_REINTENTOS=0):
+            call_command('enviar_resumenes', stdout=io.StringIO())
+        resumen = ResumenDiario.objects.get()
+        self.assertEqual(resumen.resEstado, 'ERROR')
+
+        configuracion.tasa_error = 0.0
+        call_command('enviar_resumenes', stdout=io.StringIO())
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.resEstado, 'ENVIADO')
+        self.assertEqual(resumen.resIntentos, 2)
+        boleta.refresh_from_db()
+        self.assertEqual(boleta.comprTicket, resumen.resTicket)
+
+    def test_boleta_en_resumen_no_se_envia_sola(self):
+        """Test: una boleta incluida en un resumen no se puede enviar ni reenviar individualmente"""
+        boleta = self._vender()
+        Comprobante.objects.filter(pk=boleta.pk).update(comprFechaEmision=timezone.now() - timedelta(days=1))
+        call_command('enviar_resumenes', stdout=io.StringIO())
+        boleta.refresh_from_db()
+        Comprobante.objects.filter(pk=boleta.pk).update(comprEstadoSUNAT='RECHAZADO')
+
+        for accion in ('enviar_sunat', 'reenviar_sunat'):
+            respuesta = self.client.post(f'/api/sales/comprobantes/{boleta.pk}/{accion}/')
+            self.assertEqual(respuesta.status_code, 400, accion)
+            self.assertIn(boleta.resCod.identificador, respuesta.data['error'])
+        contadores = self.servidor.RequestHandlerClass.estado.contadores
+        self.assertEqual([k for k in contadores if k.startswith('POST')], ['POST /api/resumen-diario'])
+
+    def test_resumen_rechazado_libera_sus_boletas(self):
+        """Test: si SUNAT rechaza el resumen sus boletas quedan RECHAZADO, sin resumen y reenviables"""
+        boletas = [self._vender() for _ in range(2)]
+        Comprobante.objects.filter(pk__in=[b.pk for b in boletas]).update(
+            comprFechaEmision=timezone.now() - timedelta(days=1)
+        )
+        self.servidor.RequestHandlerClass.configuracion.tasa_rechazo = 1.0
+        call_command('enviar_resumenes', stdout=io.StringIO())
+        call_command('conciliar_sunat', '--una-vez', stdout=io.StringIO())
+
+        self.assertEqual(ResumenDiario.objects.get().resEstado, 'RECHAZADO')
+        for boleta in boletas:
+            boleta.refresh_from_db()
+            self.assertEqual((boleta.comprEstadoSUNAT, boleta.resCod_id), ('RECHAZADO', None))
+            self.assertTrue(boleta.puede_reenviar)
+
+    def test_desactivar_resumen_encola_las_pendientes(self):
+        """Test: al desactivar el resumen, las boletas que esperaban uno pasan al outbox una sola vez"""
+        boletas = [self._vender() for _ in range(2)]
+        self.assertFalse(EventoOutbox.objects.exists())
+
+        with override_settings(SUNAT_RESUMEN_DIARIO=False):
+            call_command('enviar_resumenes', stdout=io.StringIO())
+            call_command('enviar_resumenes', stdout=io.StringIO())
+        self.assertEqual(
+            sorted(EventoOutbox.objects.values_list('outReferencia', flat=True)), sorted(b.pk for b in boletas)
+        )
@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from inventory.models import Product
+from sales.models import Venta, VentaDetalle, VentaProductoDiario
+from sales.hechos import clasificar_abc
+from sales.test.datos import DatosVentasMixin
+
+
+class ResumenProductosTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta y tres productos con costos distintos"""
+        super().setUp()
+        self.montura, self.luna, self.estuche = [
+            self.crear_producto(descripcion, costo, valor)
+            for descripcion, costo, valor in (
+                ('Montura ABC', '40.00', '100.00'), ('Luna ABC', '10.00', '50.00'), ('Estuche ABC', '1.00', '5.00'),
+            )
+        ]
+
+    def _venta(self, *lineas):
+        venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Productos')
+        venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': cantidad} for producto, cantidad in lineas])
+        return venta
+
+    def _fila(self, producto):
+        fila = VentaProductoDiario.objects.get(sucurCod=self.sucursal, prodCod=producto)
+        return fila.vprodCantidad, fila.vprodSubTotal, fila.vprodCosto
+
+    def test_insercion_modificacion_y_anulacion(self):
+        """Test: los detalles suman con el costo al vender y al anular se resta ese mismo costo"""
+        venta = self._venta((self.montura, 2), (self.luna, 1), (self.montura, 1))
+        self.assertEqual(self._fila(self.montura), (3, Decimal('300.00'), Decimal('120.00')))
+
+        # El costo cambia después de la venta: lo ya vendido conserva su costo
+        Product.objects.filter(pk=self.montura.pk).update(prodCostoInv=Decimal('70.00'))
+        self.montura.refresh_from_db()
+        segunda = self._venta((self.montura, 1))
+        self.assertEqual(self._fila(self.montura), (4, Decimal('400.00'), Decimal('190.00')))
+
+        detalle = VentaDetalle.objects.get(ventCod=segunda)
+        detalle.ventDetCantidad = 2
+        detalle.ventDetSubtotal = Decimal('200.00')
+        detalle.save()
+        self.assertEqual(self._fila(self.montura)[:2], (5, Decimal('500.00')))
+
+        venta.anular_venta('Cliente desistió')
+        self.assertEqual(self._fila(self.montura), (2, Decimal('200.00'), Decimal('140.00')))
+        self.assertEqual(self._fila(self.luna), (0, Decimal('0.00'), Decimal('0.00')))
+        self.assertEqual(detalle.ventDetCostoUni, Decimal('70.00'))
+
+    def test_completar_costo_de_detalles_antiguos(self):
+        """Test: el comando completa el costo de los detalles sin él y el resumen lo usa"""
+        antigua = self._venta((self.montura, 2))
+        reciente = self._venta((self.luna, 1))
+        VentaDetalle.objects.filter(ventCod=antigua).update(ventDetCostoUni=None)
+        Product.objects.filter(pk=self.montura.pk).update(prodCostoInv=Decimal('45.00'))
+
+        call_command('completar_costo_detalles', lote=1, stdout=open('/dev/null', 'w'))
+        self.assertEqual(VentaDetalle.objects.get(ventCod=antigua).ventDetCostoUni, Decimal('45.00'))
+        self.assertEqual(VentaDetalle.objects.get(ventCod=reciente).ventDetCostoUni, Decimal('10.00'))
+
+        call_command('reconstruir_resumen_ventas', stdout=open('/dev/null', 'w'))
+        self.assertEqual(self._fila(self.montura)[2], Decimal('90.00'))
+
+    def test_reconstruccion_coincide_con_incremental(self):
+        """Test: el comando rearma el resumen por producto igual al mantenido en línea"""
+        self._venta((self.montura, 2), (self.luna, 3))
+        self._venta((self.estuche, 4)).anular_venta('Prueba')
+        incremental = {p: self._fila(p) for p in (self.montura, self.luna)}
+
+        VentaProductoDiario.objects.all().delete()
+        call_command('reconstruir_resumen_ventas', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual({p: self._fila(p) for p in (self.montura, self.luna)}, incremental)
+        self.assertFalse(VentaProductoDiario.objects.filter(prodCod=self.estuche).exists())
+
+    def test_reportes_de_productos(self):
+        """Test: top, ABC, márgenes y costo del reporte financiero salen del resumen por producto"""
+        hoy = timezone.localdate().isoformat()
+        self._venta((self.montura, 4), (self.luna, 1), (self.estuche, 2))
+        rango = {'start_date': hoy, 'end_date': hoy}
+
+        top = self.client.get('/api/sales/reports/products/top/', {**rango, 'order_by': 'margen', 'limit': 2}).data
+        self.assertEqual([p['prodCod'] for p in top['products']], [self.montura.pk, self.luna.pk])
+        self.assertEqual(top['products'][0]['margen'], 240.0)
+        self.assertEqual(self.client.get('/api/sales/reports/products/top/', {'order_by': 'x'}).status_code, 400)
+
+        abc = self.client.get('/api/sales/reports/products/abc/', rango).data
+        self.assertEqual([(p['prodCod'], p['clase']) for p in abc['products']],
+                         [(self.montura.pk, 'A'), (self.luna.pk, 'B'), (self.estuche.pk, 'C')])
+
+        margen = self.client.get('/api/sales/reports/products/margin/', rango).data
+        self.assertEqual((margen['valor_venta'], margen['costo'], margen['margen']), (460.0, 172.0, 288.0))
+
+        ventas = self.client.get('/api/sales/reports/sales/', rango).data
+        self.assertEqual(
+            [p['prodCod__prodCod'] for p in ventas['top_products']], [self.montura.pk, self.estuche.pk, self.luna.pk]
+        )
+        financiero = self.client.get('/api/sales/reports/financial/', rango).data
+        self.assertEqual(financiero['egresos_estimado'], 172.0)
+
+    def test_clasificacion_abc(self):
+        """Test: los cortes usan el acumulado anterior a cada producto"""
+        filas = clasificar_abc([{'v': 70}, {'v': 20}, {'v': 6}, {'v': 4}], campo='v')
+        self.assertEqual([f['clase'] for f in filas], ['A', 'A', 'B', 'C'])
+        self.assertEqual(filas[-1]['acumulado'], 100.0)
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+from sales.models import Venta, VentaResumenDiario
+from inventory.consumers import DashboardConsumer
+from sales.test.datos import DatosVentasMixin
+
+
+class ResumenVentasTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta y un producto con stock"""
+        super().setUp()
+        self.producto = self.crear_producto('Lente resumen')
+
+    def _venta(self, cantidad=1, **datos):
+        venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Resumen', **datos)
+        venta.agregar_detalles([{'prodCod': self.producto, 'ventDetCantidad': cantidad}])
+        return venta
+
+    def _filas(self):
+        return {
+            (f.vresFecha, f.vresFormaPago, f.vresEstado): (f.vresCantidad, f.vresTotal, f.vresAdelanto, f.vresSaldo)
+            for f in VentaResumenDiario.objects.filter(sucurCod=self.sucursal).exclude(vresCantidad=0)
+        }
+
+    def test_se_actualiza_con_cada_escritura(self):
+        """Test: alta, pago parcial, pago total y anulación mueven la venta entre estados del resumen"""
+        hoy = timezone.localdate()
+        venta = self._venta(cantidad=2)
+        self.assertEqual(self._filas(), {
+            (hoy, 'EFECTIVO', 'PENDIENTE'): (1, Decimal('236.00'), Decimal('0.00'), Decimal('236.00')),
+        })
+
+        venta.registrar_pago(Decimal('36.00'), 'YAPE')
+        self.assertEqual(self._filas(), {
+            (hoy, 'YAPE', 'PARCIAL'): (1, Decimal('236.00'), Decimal('36.00'), Decimal('200.00')),
+        })
+
+        venta.registrar_pago(Decimal('200.00'), 'YAPE')
+        otra = self._venta()
+        self.assertEqual(self._filas(), {
+            (hoy, 'YAPE', 'PAGADO'): (1, Decimal('236.00'), Decimal('236.00'), Decimal('0.00')),
+            (hoy, 'EFECTIVO', 'PENDIENTE'): (1, Decimal('118.00'), Decimal('0.00'), Decimal('118.00')),
+        })
+
+        otra.anular_venta('Cliente desistió')
+        self.assertEqual(self._filas()[(hoy, 'EFECTIVO', 'ANULADO')], (1, Decimal('0'), Decimal('0'), Decimal('0')))
+        self.assertNotIn((hoy, 'EFECTIVO', 'PENDIENTE'), self._filas())
+
+    def test_reconstruccion_coincide_con_incremental(self):
+        """Test: el comando rearma el histórico y da lo mismo que el mantenimiento incremental"""
+        ventas = [self._venta(cantidad=n) for n in (1, 2, 3)]
+        ventas[0].registrar_pago(Decimal('118.00'), 'TARJETA', tarjeta_tipo='DEBITO')
+        ventas[1].registrar_pago(Decimal('50.00'), 'EFECTIVO')
+        # Una venta de otro día cargada sin pasar por save()
+        Venta.objects.filter(pk=ventas[2].pk).update(ventFecha=timezone.now() - timedelta(days=40))
+        VentaResumenDiario.objects.filter(vresEstado='PENDIENTE').delete()
+
+        call_command('reconstruir_resumen_ventas', dias=7, stdout=open('/dev/null', 'w'))
+
+        reconstruido = self._filas()
+        self.assertEqual(len(reconstruido), 3)
+        self.assertEqual(
+            sum(cantidad for cantidad, *_ in reconstruido.values()), Venta.objects.filter(sucurCod=self.sucursal).count()
+        )
+        self.assertEqual(
+            VentaResumenDiario.objects.filter(sucurCod=self.sucursal).aggregate(t=Sum('vresTotal'))['t'],
+            Venta.objects.filter(sucurCod=self.sucursal).aggregate(t=Sum('ventTotal'))['t'],
+        )
+
+    def test_reportes_leen_el_resumen(self):
+        """Test: los reportes y las estadísticas salen del resumen"""
+        hoy = timezone.localdate().isoformat()
+        pagada = self._venta(cantidad=2)
+        pagada.registrar_pago(Decimal('236.00'), 'EFECTIVO')
+        self._venta().anular_venta('Error de digitación')
+        self._venta()
+
+        reporte = self.client.get('/api/sales/reports/sales/', {'start_date': hoy, 'end_date': hoy}).data
+        self.assertEqual(reporte['sales_count'], 2)
+        self.assertEqual(reporte['total_sales'], 354.0)
+        self.assertEqual([(d['total'], d['count']) for d in reporte['daily_sales']], [(Decimal('354.00'), 2)])
+
+        financiero = self.client.get('/api/sales/reports/financial/', {'start_date': hoy, 'end_date': hoy}).data
+        self.assertEqual(financiero['ingresos_pagado'], 236.0)
+        self.assertEqual(financiero['ingresos_por_cobrar'], 118.0)
+
+        estadisticas = self.client.get('/api/sales/ventas/estadisticas/', {'fecha_inicio': hoy, 'fecha_fin': hoy}).data
+        self.assertEqual(estadisticas['cantidad_ventas'], 2)
+        self.assertEqual(estadisticas['ventas_por_estado']['Pagado'], 1)
+        self.assertEqual(estadisticas['ventas_por_estado']['Anulado'], 0)
+        self.assertEqual(estadisticas['ventas_por_sucursal'][self.sucursal.sucurNom], 2)
+
+        tablero = DashboardConsumer()
+        ventas = tablero._get_sales_stats({'sucurCod': self.sucursal.pk}, tablero._build_date_filter('today'), 0)
+        self.assertEqual((ventas['total'], ventas['revenue'], ventas['paid'], ventas['pending']), (2, 354.0, 1, 1))
+        ganancias = tablero._get_earnings_stats({'sucurCod': self.sucursal.pk}, tablero._build_date_filter('today'))
+        self.assertEqual((ganancias['total'], ganancias['daily'][-1]['amount']), (236.0, 236.0))
+
+        self.client.force_authenticate(self.crear_gerente())
+        comparativa = self.client.get('/api/sales/reports/branch-comparison/', {'start_date': hoy, 'end_date': hoy}).data
+        fila = next(b for b in comparativa['branches'] if b['branch_id'] == self.sucursal.pk)
+        self.assertEqual((fila['cantidad_ventas'], fila['total_ventas'], fila['promedio_venta']), (2, 354.0, 177.0))
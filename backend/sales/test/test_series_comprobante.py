@@ -0,0 +1,41 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from Branch.models import Branch
+from sales.models import Comprobante, SerieComprobante, Venta
+
+
+class SerieComprobanteTests(TestCase):
+
+    def setUp(self):
+        """Configuración inicial: una sucursal para las series propias"""
+        self.sucursal = Branch.objects.create(
+            sucurNom='Sucursal Series', sucurDep='AREQUIPA', sucurCiu='Arequipa',
+            sucurDis='Cercado', sucurDir='Av. Test 456', sucurTel='999888777'
+        )
+
+    def test_asigna_correlativos_consecutivos(self):
+        """Test: cada llamada retorna el siguiente número de la serie"""
+        numeros = [SerieComprobante.asignar_correlativos('03', 'B901') for _ in range(3)]
+        self.assertEqual(numeros, [1, 2, 3])
+
+    def test_reserva_rango_con_cantidad(self):
+        """Test: con cantidad se reserva un rango y se retorna su inicio"""
+        self.assertEqual(SerieComprobante.asignar_correlativos('01', 'F901', cantidad=10), 1)
+        self.assertEqual(SerieComprobante.asignar_correlativos('01', 'F901'), 11)
+
+    def test_misma_serie_un_solo_contador(self):
+        """Test: la serie compartida y la propia de una sucursal con el mismo código comparten contador"""
+        SerieComprobante.asignar_correlativos('03', 'B902')
+        SerieComprobante.asignar_correlativos('03', 'B902')
+        self.assertEqual(SerieComprobante.asignar_correlativos('03', 'B902', self.sucursal.pk), 3)
+        self.assertEqual(SerieComprobante.asignar_correlativos('03', 'B902'), 4)
+        self.assertEqual(SerieComprobante.objects.filter(comprSerie='B902').count(), 1)
+
+    def test_sucursal_sin_serie_propia(self):
+        """Test: una sucursal con código mayor a 999 no puede tener serie F/B de 3 dígitos"""
+        comprobante = Comprobante(comprTipo='01', ventCod=Venta(sucurCod_id=1000))
+        with override_settings(SUNAT_SERIES_POR_SUCURSAL=True):
+            with self.assertRaises(ValidationError):
+                comprobante._serie_y_sucursal()
+            comprobante.ventCod.sucurCod_id = 12
+            self.assertEqual(comprobante._serie_y_sucursal(), ('F012', 12))
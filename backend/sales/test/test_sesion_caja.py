@@ -0,0 +1,50 @@
+from django.test import TestCase
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from decimal import Decimal
+from cash.models import CashOpening
+from cash.sesiones import confirmar_sesion_abierta, obtener_sesion_abierta_id, invalidar_sesion_abierta
+from sales.models import Venta
+from sales.test.datos import DatosVentasMixin
+
+
+class SesionCajaAbiertaTests(DatosVentasMixin, TestCase):
+
+    def test_resuelve_y_reutiliza_la_sesion(self):
+        """Test: la segunda resolución sale de la caché sin consultar"""
+        self.assertEqual(obtener_sesion_abierta_id(self.user.pk, self.sucursal.pk), self.apertura.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_sesion_abierta_id(self.user.pk, self.sucursal.pk), self.apertura.pk)
+
+    def test_invalidar_tras_cerrar_caja(self):
+        """Test: tras cerrar e invalidar ya no se resuelve la sesión"""
+        obtener_sesion_abierta_id(self.user.pk, self.sucursal.pk)
+        CashOpening.objects.filter(pk=self.apertura.pk).update(cajaAperEstado='CERRADA')
+        invalidar_sesion_abierta(self.user.pk, self.sucursal.pk)
+
+        self.assertIsNone(obtener_sesion_abierta_id(self.user.pk, self.sucursal.pk))
+        with self.assertRaises(ValidationError):
+            Venta.objects.create(
+                usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente',
+                cajaAperCod=self.apertura
+            )
+
+    def test_venta_asigna_la_sesion_abierta(self):
+        """Test: la venta nueva toma la sesión abierta del vendedor en su sucursal"""
+        venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente')
+        self.assertEqual(venta.cajaAperCod_id, self.apertura.pk)
+
+    def test_cierre_en_otro_proceso(self):
+        """Test: una sesión cerrada por otro worker (caché sin invalidar) no recibe ventas ni pagos"""
+        venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente')
+        venta.ventTotal = venta.ventSaldo = Decimal('100.00')
+        CashOpening.objects.filter(pk=self.apertura.pk).update(cajaAperEstado='CERRADA')
+
+        # La caché aún sugiere la sesión, pero la base manda
+        self.assertEqual(cache.get(f'caja_sesion_abierta:{self.user.pk}:{self.sucursal.pk}'), self.apertura.pk)
+        self.assertIsNone(confirmar_sesion_abierta(self.user.pk, self.sucursal.pk))
+        with self.assertRaises(ValidationError):
+            venta.registrar_pago(Decimal('10.00'), 'EFECTIVO')
+
+        nueva = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente')
+        self.assertIsNone(nueva.cajaAperCod_id)
@@ -0,0 +1,170 @@
+import base64
+import io
+import json
+import socket
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from sales.simulador_sunat import ConfiguracionSimulador, iniciar_en_hilo
+from sales.sunat_client import SunatClient, ServicioSunatNoDisponible, _sin_conexion
+
+
+class _ServicioFalso(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    rutas = []
+
+    def do_GET(self):
+        self.rutas.append(self.path)
+        if self.path == '/public/error':
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._json({'status': 'OK'})
+
+    def do_POST(self):
+        # Recibe el cuerpo y corta la conexión sin responder
+        self.rutas.append(self.path)
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, datos):
+        cuerpo = json.dumps(datos).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class SunatClientTests(SimpleTestCase):
+
+    def setUp(self):
+        """Levanta un servicio HTTP local que registra las rutas llamadas"""
+        _ServicioFalso.rutas = []
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ServicioFalso)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.servidor.server_address[1]}'
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def test_salud_se_reutiliza_durante_la_ventana(self):
+        """Test: dos verificaciones seguidas hacen un solo /health"""
+        with override_settings(SUNAT_SERVICE_URL=self.url, SUNAT_SALUD_TTL=60):
+            cliente = SunatClient()
+            self.assertTrue(cliente.verificar_estado_servicio())
+            self.assertTrue(SunatClient().verificar_estado_servicio())
+
+        self.assertEqual(_ServicioFalso.rutas, ['/public/health'])
+        self.assertGreaterEqual(SunatClient.metricas()['verificar_estado_servicio']['llamadas'], 1)
+
+    def test_circuito_abierto_falla_sin_llamar(self):
+        """Test: tras el umbral de fallos las llamadas fallan al instante"""
+        url = f'http://127.0.0.1:{_puerto_libre()}'
+        with override_settings(SUNAT_SERVICE_URL=url, SUNAT_REINTENTOS=0,
+                               SUNAT_CIRCUITO_UMBRAL=2, SUNAT_CIRCUITO_ESPERA=60):
+            cliente = SunatClient()
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    cliente._solicitar('prueba', 'GET', '/public/health')
+
+            with self.assertRaises(ServicioSunatNoDisponible):
+                cliente._solicitar('prueba', 'GET', '/public/health')
+            self.assertFalse(cliente.verificar_estado_servicio())
+
+    def test_prueba_fallida_por_otro_error_libera_el_circuito(self):
+        """Test: si la llamada de prueba lanza un error que no es de requests se permite otra prueba"""
+        with override_settings(SUNAT_SERVICE_URL=self.url, SUNAT_CIRCUITO_ESPERA=0):
+            cliente = SunatClient()
+            cliente.circuito.abierto_hasta = time.monotonic() - 1
+
+            with mock.patch.object(cliente.sesion, 'request', side_effect=ValueError('respuesta corrupta')):
+                with self.assertRaises(ValueError):
+                    cliente._solicitar('prueba', 'GET', '/public/health')
+            self.assertFalse(cliente.circuito.prueba_en_curso)
+
+            self.assertEqual(cliente._solicitar('prueba', 'GET', '/public/health').status_code, 200)
+            self.assertEqual(cliente.circuito.abierto_hasta, 0.0)
+
+    def test_post_no_idempotente_no_se_reintenta_si_llego_al_servidor(self):
+        """Test: una desconexión después de enviar el POST no se reintenta; una conexión rechazada sí"""
+        with override_settings(SUNAT_SERVICE_URL=self.url, SUNAT_REINTENTOS=2, SUNAT_REINTENTO_BASE=0):
+            with self.assertRaises(requests.exceptions.ConnectionError) as error:
+                SunatClient()._solicitar('prueba', 'POST', '/public/boleta', idempotente=False, json={})
+        self.assertEqual(_ServicioFalso.rutas, ['/public/boleta'])
+        self.assertFalse(_sin_conexion(error.exception))
+
+        with self.assertRaises(requests.exceptions.ConnectionError) as rechazada:
+            requests.get(f'http://127.0.0.1:{_puerto_libre()}/', timeout=5)
+        self.assertTrue(_sin_conexion(rechazada.exception))
+
+    def test_errores_5xx_abren_el_circuito(self):
+        """Test: un servicio que responde 500 cuenta como fallo para el circuito"""
+        with override_settings(SUNAT_SERVICE_URL=self.url, SUNAT_CIRCUITO_UMBRAL=2, SUNAT_CIRCUITO_ESPERA=60):
+            cliente = SunatClient()
+            for _ in range(2):
+                self.assertEqual(cliente._solicitar('prueba', 'GET', '/public/error').status_code, 500)
+            with self.assertRaises(ServicioSunatNoDisponible):
+                cliente._solicitar('prueba', 'GET', '/public/error')
+        self.assertEqual(_ServicioFalso.rutas, ['/public/error'] * 2)
+
+
+class SimuladorSunatTests(SimpleTestCase):
+
+    def setUp(self):
+        """Levanta el simulador con rechazos deterministas"""
+        self.servidor, self.url = iniciar_en_hilo(configuracion=ConfiguracionSimulador(semilla=1))
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def test_boleta_aceptada_devuelve_xml_y_cdr(self):
+        """Test: la respuesta trae XML y un CDR zip con el ApplicationResponse"""
+        boleta = {
+            'serie': 'B001', 'correlativo': '7', 'fecha_emision': '2025-01-15',
+            'cliente': {'tipo_doc': '1', 'num_doc': '12345678', 'rzn_social': 'CLIENTE'},
+            'items': [{'descripcion': 'Montura', 'cantidad': 1, 'valor_unitario': 100, 'unidad_medida': 'NIU'}],
+        }
+        respuesta = requests.post(f'{self.url}/public/public/boleta', json=boleta).json()
+
+        self.assertEqual(respuesta['estado'], 'ACEPTADO')
+        self.assertIn(b'<cbc:ID>B001-7</cbc:ID>', base64.b64decode(respuesta['xml_base64']))
+        with zipfile.ZipFile(io.BytesIO(base64.b64decode(respuesta['cdr_base64']))) as cdr:
+            self.assertEqual(cdr.namelist(), ['R-B001-7.xml'])
+        self.assertEqual(requests.get(f'{self.url}/public/cdr/R-B001-7.zip').status_code, 200)
+
+    def test_resumen_diario_y_consulta_de_ticket(self):
+        """Test: el ticket del resumen se puede consultar después"""
+        ticket = requests.post(
+            f'{self.url}/api/resumen-diario', json={'fecha': '2025-01-15', 'comprobantes': []}
+        ).json()['ticket']
+        consulta = requests.get(f'{self.url}/api/comprobantes/consultar/{ticket}').json()
+        self.assertEqual(consulta['estado'], 'ACEPTADO')
+
+    def test_rechazo_configurable(self):
+        """Test: con tasa de rechazo 1 todas las boletas vuelven rechazadas con el código indicado"""
+        self.servidor.RequestHandlerClass.configuracion.tasa_rechazo = 1.0
+        self.servidor.RequestHandlerClass.configuracion.codigos_rechazo = ['2017']
+        respuesta = requests.post(
+            f'{self.url}/boleta', json={'serie': 'B001', 'correlativo': '8', 'cliente': {}, 'items': []}
+        ).json()
+        self.assertFalse(respuesta['success'])
+        self.assertTrue(respuesta['error'].startswith('2017'))
@@ -0,0 +1,110 @@
+import gzip
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from sales.models import Venta, TrabajoReporte
+from sales.trabajos import ejecutar_trabajo, reclamar_trabajo
+from sales.test.datos import DatosVentasMixin
+
+
+class TrabajosReportesTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: vendedor con caja abierta, tres ventas y almacén temporal"""
+        super().setUp()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, True)
+        ajustes = override_settings(SUNAT_ARTIFACTS_DIR=self.directorio, REPORTE_TRABAJO_AVANCE_SEGUNDOS=0)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        producto = self.crear_producto('Lente trabajos')
+        for cantidad in (1, 2, 3):
+            venta = Venta.objects.create(usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Trabajos')
+            venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': cantidad}])
+        self.hoy = timezone.localdate().isoformat()
+
+    def _solicitar(self, tipo, **parametros):
+        return self.client.post('/api/sales/reports/jobs/', {'tipo': tipo, 'parametros': parametros}, format='json')
+
+    def _procesar(self):
+        call_command('procesar_trabajos_reportes', una_vez=True, stdout=open('/dev/null', 'w'))
+
+    def test_pedidos_iguales_comparten_trabajo(self):
+        """Test: mismo tipo, parámetros y alcance reutilizan el trabajo; otro alcance no"""
+        primero = self._solicitar('report-sales', start_date=self.hoy, end_date=self.hoy)
+        segundo = self._solicitar('report-sales', end_date=self.hoy, start_date=self.hoy, branch_id='')
+        self.assertEqual((primero.status_code, segundo.status_code), (202, 200))
+        self.assertEqual(primero.data['id'], segundo.data['id'])
+        self.assertEqual(self._solicitar('report-sales', start_date=self.hoy).status_code, 202)
+
+        colega = self.crear_vendedor(self.crear_sucursal('Sucursal Dos'), 'vendedor_dos', 'Vendedor Dos')
+        self.client.force_authenticate(colega)
+        ajeno = self._solicitar('report-sales', start_date=self.hoy, end_date=self.hoy)
+        self.assertNotEqual(ajeno.data['id'], primero.data['id'])
+        self.assertEqual(self.client.get(f"/api/sales/reports/jobs/{primero.data['id']}/").status_code, 404)
+
+        self.assertEqual(self._solicitar('report-inexistente').status_code, 400)
+
+    def test_reporte_json(self):
+        """Test: el worker calcula el reporte y el resultado es el mismo que el del endpoint"""
+        trabajo = self._solicitar('report-sales', start_date=self.hoy, end_date=self.hoy).data
+        self.assertEqual(self.client.get(f"/api/sales/reports/jobs/{trabajo['id']}/result/").status_code, 409)
+
+        self._procesar()
+        estado = self.client.get(f"/api/sales/reports/jobs/{trabajo['id']}/").data
+        self.assertEqual((estado['estado'], estado['porcentaje'], estado['eta_segundos']), ('COMPLETADO', 100.0, 0))
+
+        resultado = self.client.get(f"/api/sales/reports/jobs/{trabajo['id']}/result/").data
+        directo = self.client.get('/api/sales/reports/sales/', {'start_date': self.hoy, 'end_date': self.hoy}).data
+        self.assertEqual((resultado['sales_count'], resultado['total_sales']), (3, 708.0))
+        self.assertEqual(resultado['sales_count'], directo['sales_count'])
+
+        # Terminado hace poco: un pedido igual se sirve sin recalcular
+        repetido = self._solicitar('report-sales', start_date=self.hoy, end_date=self.hoy)
+        self.assertEqual((repetido.status_code, repetido.data['id']), (200, trabajo['id']))
+
+    def test_exportacion_con_avance(self):
+        """Test: la exportación queda en el almacén con sus filas contadas y se descarga igual que en línea"""
+        trabajo = self._solicitar('export-sales-csv', formato='csv.gz').data
+        self._procesar()
+
+        estado = self.client.get(f"/api/sales/reports/jobs/{trabajo['id']}/").data
+        self.assertEqual((estado['estado'], estado['filas_procesadas'], estado['filas_totales']), ('COMPLETADO', 3, 3))
+        self.assertEqual(estado['archivo'], 'reporte_ventas.csv.gz')
+
+        descarga = self.client.get(f"/api/sales/reports/jobs/{trabajo['id']}/result/")
+        self.assertEqual(descarga.status_code, 200)
+        self.assertEqual(descarga['Content-Type'], 'application/gzip')
+        directo = self.client.get('/api/sales/reports/export/sales-csv/', {'formato': 'csv.gz'})
+        self.assertEqual(
+            gzip.decompress(b''.join(descarga.streaming_content)),
+            gzip.decompress(b''.join(directo.streaming_content))
+        )
+
+    def test_fallos_y_bloqueo_vencido(self):
+        """Test: un reporte con parámetros inválidos falla y un trabajo abandonado se retoma"""
+        malo = self._solicitar('report-products-top', order_by='x').data
+        self._procesar()
+        fallido = TrabajoReporte.objects.get(pk=malo['id'])
+        self.assertEqual(fallido.trabEstado, 'FALLIDO')
+        self.assertIn('400', fallido.trabUltimoError)
+
+        abandonado = self._solicitar('report-financial').data
+        primero = reclamar_trabajo()
+        self.assertEqual(primero.pk, abandonado['id'])
+        self.assertIsNone(reclamar_trabajo())
+        TrabajoReporte.objects.filter(pk=abandonado['id']).update(
+            trabBloqueadoHasta=timezone.now() - timedelta(seconds=1)
+        )
+        retomado = reclamar_trabajo()
+        self.assertEqual((retomado.pk, retomado.trabIntentos), (abandonado['id'], 2))
+
+        # El primer worker termina tarde: no pisa el trabajo que otro retomó
+        self.assertEqual(ejecutar_trabajo(primero), 'PERDIDO')
+        self.assertEqual(TrabajoReporte.objects.get(pk=abandonado['id']).trabEstado, 'PROCESANDO')
+        self.assertEqual(ejecutar_trabajo(retomado), 'COMPLETADO')
@@ -1,59 +1,31 @@
-from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from django.test import TestCase
 from django.urls import reverse
-from decimal import Decimal
-from django.contrib.auth import get_user_model
-from ..models import Venta, Branch, Caja
+from ..models import Venta
+from .datos import DatosVentasMixin
 
-User = get_user_model()
 
-class VentaFiltrosTests(APITestCase):
+class VentaFiltrosTests(DatosVentasMixin, TestCase):
     
     def setUp(self):
         """Configuración inicial"""
-        self.user = User.objects.create_user(
-            username='vendedor_test', 
-            password='password123'
-        )
-        self.sucursal = Branch.objects.create(sucurNom='Sucursal Test')
-        self.caja = Caja.objects.create(
-            usuCod=self.user,
-            sucurCod=self.sucursal,
-            cajaEstado='ABIERTA'
-        )
-        
+        super().setUp()
+        producto = self.crear_producto()
+
         # Crear ventas con diferentes formas de pago
-        self.venta_efectivo = Venta.objects.create(
-            usuCod=self.user,
-            sucurCod=self.sucursal,
-            cajaAperCod=self.caja,
-            ventFormaPago='EFECTIVO',
-            cliNombreCom='Cliente Efectivo',
-            ventTotal=Decimal('100.00')
-        )
-        
-        self.venta_tarjeta = Venta.objects.create(
-            usuCod=self.user,
-            sucurCod=self.sucursal,
-            cajaAperCod=self.caja,
-            ventFormaPago='TARJETA',
-            ventTarjetaTipo='CREDITO',
-            cliNombreCom='Cliente Tarjeta',
-            ventTotal=Decimal('200.00')
-        )
-        
-        self.venta_transferencia = Venta.objects.create(
-            usuCod=self.user,
-            sucurCod=self.sucursal,
-            cajaAperCod=self.caja,
-            ventFormaPago='TRANSFERENCIA',
-            ventReferenciaPago='TRF-123456',
-            cliNombreCom='Cliente Transferencia',
-            ventTotal=Decimal('300.00')
-        )
-        
-        self.client = APIClient()
-        self.client.force_authenticate(user=self.user)
+        for forma_pago, cliente, extra in (
+            ('EFECTIVO', 'Cliente Efectivo', {}),
+            ('TARJETA', 'Cliente Tarjeta', {'ventTarjetaTipo': 'CREDITO'}),
+            ('TRANSFERENCIA', 'Cliente Transferencia', {'ventReferenciaPago': 'TRF-123456'}),
+        ):
+            venta = Venta.objects.create(
+                usuCod=self.user,
+                sucurCod=self.sucursal,
+                ventFormaPago=forma_pago,
+                cliNombreCom=cliente,
+                **extra
+            )
+            venta.agregar_detalles([{'prodCod': producto, 'ventDetCantidad': 1}])
     
     def test_filtrar_por_forma_pago_efectivo(self):
         """Test: Filtrar ventas por forma de pago efectivo"""
@@ -81,4 +53,4 @@ class VentaFiltrosTests(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 3)  # Debería devolver las 3 ventas
\ No newline at end of file
+        self.assertEqual(len(response.data), 3)  # Debería devolver las 3 ventas
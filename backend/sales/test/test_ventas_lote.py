@@ -0,0 +1,125 @@
+from django.test import TestCase
+from django.core.exceptions import ValidationError
+from decimal import Decimal
+from unittest import mock
+from inventory.models import Product, BranchInventory, StockMovement
+from sales.models import Venta, VentaDetalle
+from sales.test.datos import DatosVentasMixin
+
+
+class VentaAgregarDetallesTests(DatosVentasMixin, TestCase):
+
+    def setUp(self):
+        """Configuración inicial: sucursal, vendedor con caja abierta y dos productos"""
+        super().setUp()
+        self.gravado = self.crear_producto('Montura gravada', stock=5)
+        self.exonerado = self.crear_producto('Estuche exonerado', '5.00', '10.00', stock=5, prodTipoAfecIGV='20')
+
+        self.venta = Venta.objects.create(
+            usuCod=self.user, sucurCod=self.sucursal, cliNombreCom='Cliente Test'
+        )
+
+    def test_registra_detalles_descuenta_stock_y_calcula_totales(self):
+        """Test: las líneas se insertan, el stock baja y los totales se calculan una vez"""
+        self.venta.agregar_detalles([
+            {'prodCod': self.gravado, 'ventDetCantidad': 2},
+            {'prodCod': self.exonerado, 'ventDetCantidad': 1},
+            {'prodCod': self.gravado, 'ventDetCantidad': 1},
+        ])
+
+        self.assertEqual(VentaDetalle.objects.filter(ventCod=self.venta).count(), 3)
+        stock = dict(BranchInventory.objects.filter(sucurCod=self.sucursal).values_list('prodCod_id', 'invStock'))
+        self.assertEqual(stock[self.gravado.pk], 2)
+        self.assertEqual(stock[self.exonerado.pk], 4)
+
+        self.venta.refresh_from_db()
+        self.assertEqual(self.venta.ventTotalGravada, Decimal('300.00'))
+        self.assertEqual(self.venta.ventTotalExonerada, Decimal('10.00'))
+        self.assertEqual(self.venta.ventIGV, Decimal('54.00'))
+        self.assertEqual(self.venta.ventTotal, Decimal('364.00'))
+
+    def test_stock_insuficiente_sumando_lineas_no_registra_nada(self):
+        """Test: la validación considera la suma de líneas del mismo producto"""
+        with self.assertRaises(ValidationError):
+            self.venta.agregar_detalles([
+                {'prodCod': self.gravado, 'ventDetCantidad': 3},
+                {'prodCod': self.gravado, 'ventDetCantidad': 3},
+            ])
+
+        self.assertFalse(VentaDetalle.objects.filter(ventCod=self.venta).exists())
+        self.assertEqual(
+            BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.gravado).invStock, 5
+        )
+
+    def test_kardex_registra_venta_y_anulacion(self):
+        """Test: cada cambio de stock deja su movimiento en el kardex"""
+        self.venta.agregar_detalles([{'prodCod': self.gravado, 'ventDetCantidad': 2}])
+        self.venta.anular_venta('Cliente desistió')
+
+        movimientos = list(
+            StockMovement.objects.filter(prodCod=self.gravado, sucurCod=self.sucursal)
+            .order_by('movCod').values_list('movMotivo', 'movCantidad', 'movDocumento')
+        )
+        documento = f'VENTA-{self.venta.ventCod}'
+        self.assertEqual(movimientos, [('VENTA', -2, documento), ('ANULACION', 2, documento)])
+        self.assertEqual(
+            BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.gravado).invStock, 5
+        )
+
+    def test_mover_stock_no_permite_stock_negativo(self):
+        """Test: el UPDATE condicional rechaza salidas mayores al stock"""
+        with self.assertRaises(ValidationError):
+            BranchInventory.mover_stock(self.sucursal.pk, self.gravado.pk, -6, motivo='AJUSTE')
+
+        self.assertEqual(
+            BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.gravado).invStock, 5
+        )
+        self.assertFalse(StockMovement.objects.filter(prodCod=self.gravado).exists())
+
+    def test_mover_stock_es_atomico(self):
+        """Test: si el kardex falla, el stock no queda modificado"""
+        with mock.patch.object(StockMovement.objects, 'create', side_effect=RuntimeError('kardex caído')):
+            with self.assertRaises(RuntimeError):
+                BranchInventory.mover_stock(self.sucursal.pk, self.gravado.pk, -2, motivo='AJUSTE')
+
+        self.assertEqual(
+            BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.gravado).invStock, 5
+        )
+
+    def test_lote_descuenta_con_update_condicional(self):
+        """Test: el lote descuenta con invStock = invStock - n sin leer ni reescribir el stock"""
+        # Otra venta descuenta entre la lectura de los productos y el registro
+        BranchInventory.objects.filter(sucurCod=self.sucursal, prodCod=self.gravado).update(invStock=3)
+        with mock.patch.object(BranchInventory.objects, 'bulk_update') as bulk_update:
+            self.venta.agregar_detalles([{'prodCod': self.gravado, 'ventDetCantidad': 2}])
+        bulk_update.assert_not_called()
+        self.assertEqual(
+            BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.gravado).invStock, 1
+        )
+
+        with self.assertRaisesMessage(ValidationError, 'Stock insuficiente para Montura gravada. Disponible: 1'):
+            self.venta.agregar_detalles([{'prodCod': self.gravado, 'ventDetCantidad': 2}])
+
+    def test_kardex_limite_invalido(self):
+        """Test: un limit no numérico en el kardex responde 400"""
+        inventario = BranchInventory.objects.get(sucurCod=self.sucursal, prodCod=self.gravado)
+        url = f'/api/inventory/inventory/{inventario.pk}/movements/'
+        self.assertEqual(self.client.get(url, {'limit': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': '0'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'limit': '5'}).status_code, 200)
+
+    def test_calcular_totales_usa_tipo_guardado_en_una_consulta(self):
+        """Test: los totales usan el tipo de afectación del detalle, no el del producto"""
+        self.venta.agregar_detalles([
+            {'prodCod': self.gravado, 'ventDetCantidad': 1},
+            {'prodCod': self.exonerado, 'ventDetCantidad': 1},
+        ])
+        Product.objects.filter(pk=self.gravado.pk).update(prodTipoAfecIGV='20')
+
+        venta = Venta.objects.get(pk=self.venta.pk)
+        with self.assertNumQueries(1):
+            venta.calcular_totales()
+
+        self.assertEqual(venta.ventTotalGravada, Decimal('100.00'))
+        self.assertEqual(venta.ventTotalExonerada, Decimal('10.00'))
+        self.assertEqual(venta.ventIGV, Decimal('18.00'))
@@ -0,0 +1,262 @@
+"""
+Trabajos de reportes y exportaciones (TrabajoReporte) fuera del request.
+
+- solicitar_trabajo() registra el pedido. La huella resume tipo, parámetros,
+  alcance del usuario (gerente o sucursal) y día: si ya hay un trabajo igual en
+  curso, o terminado hace menos de REPORTE_TRABAJO_TTL, se devuelve ese. Una
+  restricción única parcial evita dos trabajos en curso con la misma huella.
+- El comando `manage.py procesar_trabajos_reportes` reclama trabajos con
+  SELECT ... FOR UPDATE SKIP LOCKED y un bloqueo temporal que se renueva con
+  cada avance (como el outbox); si el worker muere, otro lo retoma.
+- ejecutar_trabajo() llama a la misma vista de sales/reports_views.py con los
+  parámetros guardados y UsuarioDelTrabajo como única autenticación, que
+  identifica a quien lo pidió. Solo guarda el resultado si el worker sigue
+  teniendo el trabajo (mismo intento y bloqueo vigente). Los reportes JSON se
+  guardan en trabResultado y las exportaciones en el almacén de artefactos.
+- El avance (filas procesadas y totales) lo informa filas_exportacion() a través
+  de progreso_actual(), un ContextVar que solo existe dentro del worker.
+"""
+import hashlib
+import json
+import re
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication
+
+from .almacen import almacen, ubicacion_objeto
+from .models import TrabajoReporte
+
+# Tipo de trabajo (nombre de la URL del reporte) -> vista de sales/reports_views.py
+TIPOS = {
+    'report-sales': 'get_sales_report',
+    'report-financial': 'get_financial_report',
+    'report-products-top': 'get_top_products',
+    'report-products-abc': 'get_products_abc',
+    'report-products-margin': 'get_products_margin',
+    'report-branch-comparison': 'get_branch_comparison',
+    'report-clients': 'get_clients_report',
+    'report-cash': 'get_cash_report',
+    'report-seller-sales-history': 'get_seller_sales_history',
+    'export-sales-csv': 'export_sales_csv',
+    'export-clients-debt-csv': 'export_clients_debt_csv',
+    'export-branch-comparison-csv': 'export_branch_comparison_csv',
+    'export-seller-sales-history-csv': 'export_seller_sales_history_csv',
+}
+
+EN_CURSO = ['PENDIENTE', 'PROCESANDO']
+
+_progreso = ContextVar('progreso_trabajo_reporte', default=None)
+
+
+def _bloqueo():
+    return timedelta(seconds=getattr(settings, 'REPORTE_TRABAJO_BLOQUEO_SEGUNDOS', 300))
+
+
+################################################################################### SOLICITUD
+
+def alcance_usuario(usuario):
+    """'gerente' (todas las sucursales) o 'sucursal:<código>': lo que limita los reportes"""
+    if usuario.roles.filter(rolNivel=0).exists():
+        return 'gerente'
+    return f'sucursal:{usuario.sucurCod_id}'
+
+
+def huella(tipo, parametros, alcance, dia):
+    datos = json.dumps([tipo, parametros, alcance, dia.isoformat()], sort_keys=True)
+    return hashlib.sha256(datos.encode('utf-8')).hexdigest()
+
+
+def _vigente(clave):
+    """Trabajo en curso o terminado dentro de REPORTE_TRABAJO_TTL con esa huella"""
+    desde = timezone.now() - timedelta(seconds=getattr(settings, 'REPORTE_TRABAJO_TTL', 600))
+    return TrabajoReporte.objects.filter(trabHuella=clave).filter(
+        Q(trabEstado__in=EN_CURSO) | Q(trabEstado='COMPLETADO', trabFechaFin__gte=desde)
+    ).order_by('-trabCod').first()
+
+
+def solicitar_trabajo(usuario, tipo, parametros):
+    """
+    Retorna (trabajo, creado). Si ya existe un trabajo con la misma huella
+    vigente se reutiliza. Lanza ValueError si el tipo no existe.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f"Tipo de trabajo no soportado. Use: {', '.join(TIPOS)}")
+    parametros = {clave: str(valor) for clave, valor in sorted(parametros.items()) if valor not in (None, '')}
+    alcance = alcance_usuario(usuario)
+    clave = huella(tipo, parametros, alcance, timezone.localdate())
+
+    for _ in range(2):
+        existente = _vigente(clave)
+        if existente:
+            return existente, False
+        try:
+            with transaction.atomic():
+                return TrabajoReporte.objects.create(
+                    trabTipo=tipo, trabParametros=parametros, trabAlcance=alcance,
+                    trabHuella=clave, usuCod=usuario
+                ), True
+        except IntegrityError:
+            # Otro request creó el mismo trabajo entre la consulta y el INSERT
+            continue
+    return _vigente(clave), False
+
+
+################################################################################### AVANCE
+
+def _reclamado(trabajo):
+    """El trabajo mientras lo tenga este worker: mismo intento y bloqueo sin vencer"""
+    return TrabajoReporte.objects.filter(
+        pk=trabajo.pk, trabEstado='PROCESANDO', trabIntentos=trabajo.trabIntentos,
+        trabBloqueadoHasta__gt=timezone.now()
+    )
+
+
+class Progreso:
+    """Avance del trabajo en curso; escribe como máximo cada REPORTE_TRABAJO_AVANCE_SEGUNDOS"""
+
+    def __init__(self, trabajo):
+        self.trabajo = trabajo
+        self.intervalo = getattr(settings, 'REPORTE_TRABAJO_AVANCE_SEGUNDOS', 1.0)
+        self._ultimo = 0.0
+
+    def _actualizar(self, **campos):
+        _reclamado(self.trabajo).update(trabBloqueadoHasta=timezone.now() + _bloqueo(), **campos)
+
+    def iniciar(self, filas_totales):
+        self._actualizar(trabFilasTotales=filas_totales, trabFilasProcesadas=0)
+
+    def avanzar(self, filas, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        self._actualizar(trabFilasProcesadas=filas)
+
+
+def progreso_actual():
+    """Progreso del trabajo que se ejecuta en este contexto (None fuera del worker)"""
+    return _progreso.get()
+
+
+################################################################################### WORKER
+
+def reclamar_trabajo():
+    """Marca como PROCESANDO el trabajo disponible más antiguo y lo retorna (o None)"""
+    ahora = timezone.now()
+    disponibles = Q(trabEstado='PENDIENTE') | Q(trabEstado='PROCESANDO', trabBloqueadoHasta__lte=ahora)
+    maximo = getattr(settings, 'REPORTE_TRABAJO_MAX_INTENTOS', 3)
+
+    while True:
+        with transaction.atomic():
+            trabajo = (
+                TrabajoReporte.objects.select_for_update(skip_locked=True)
+                .filter(disponibles).order_by('trabCod').first()
+            )
+            if trabajo is None:
+                return None
+            if trabajo.trabIntentos >= maximo:
+                # El worker murió en cada intento: no se vuelve a probar
+                TrabajoReporte.objects.filter(pk=trabajo.pk).update(
+                    trabEstado='FALLIDO', trabBloqueadoHasta=None, trabFechaFin=ahora,
+                    trabUltimoError=trabajo.trabUltimoError or 'Se agotaron los intentos'
+                )
+                continue
+            trabajo.trabEstado = 'PROCESANDO'
+            trabajo.trabIntentos += 1
+            trabajo.trabBloqueadoHasta = ahora + _bloqueo()
+            trabajo.trabFechaInicio = ahora
+            trabajo.trabFilasProcesadas = 0
+            trabajo.trabFilasTotales = None
+            trabajo.save(update_fields=[
+                'trabEstado', 'trabIntentos', 'trabBloqueadoHasta', 'trabFechaInicio',
+                'trabFilasProcesadas', 'trabFilasTotales',
+            ])
+            return trabajo
+
+
+class UsuarioDelTrabajo(BaseAuthentication):
+    """Autentica el request interno del worker como el usuario que pidió el trabajo"""
+
+    def authenticate(self, request):
+        usuario = getattr(request._request, 'usuario_trabajo', None)
+        return (usuario, None) if usuario is not None else None
+
+
+def _request(trabajo):
+    """GET equivalente al pedido original, con quien lo solicitó como contexto"""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.META['SERVER_NAME'] = 'trabajos'
+    request.META['SERVER_PORT'] = '80'
+    request.GET = QueryDict(mutable=True)
+    request.GET.update(trabajo.trabParametros)
+    request.usuario_trabajo = trabajo.usuCod
+    return request
+
+
+def _vista(nombre):
+    """Vista de reports_views que solo acepta la autenticación del worker"""
+    from . import reports_views
+
+    return getattr(reports_views, nombre).cls.as_view(authentication_classes=[UsuarioDelTrabajo])
+
+
+def _nombre_archivo(respuesta, trabajo):
+    encontrado = re.search(r'filename="([^"/]+)"', respuesta.get('Content-Disposition', ''))
+    return encontrado.group(1) if encontrado else f'trabajo_{trabajo.trabCod}'
+
+
+def ejecutar_trabajo(trabajo):
+    """
+    Calcula el reporte o la exportación y guarda el resultado. Retorna el estado
+    final, o 'PERDIDO' si otro worker retomó el trabajo mientras se calculaba
+    """
+    vista = _vista(TIPOS[trabajo.trabTipo])
+    progreso = Progreso(trabajo)
+    token = _progreso.set(progreso)
+    campos = {}
+    try:
+        if trabajo.usuCod_id is None:
+            raise ValueError('El usuario que solicitó el reporte ya no existe')
+        respuesta = vista(_request(trabajo))
+        if respuesta.status_code != 200:
+            raise ValueError(f"HTTP {respuesta.status_code}: {getattr(respuesta, 'data', '')}")
+
+        if hasattr(respuesta, 'data'):
+            # Se pasa por el encoder para guardar solo tipos JSON
+            campos['trabResultado'] = json.loads(json.dumps(respuesta.data, cls=DjangoJSONEncoder))
+        else:
+            nombre = _nombre_archivo(respuesta, trabajo)
+            bloques = respuesta.streaming_content if respuesta.streaming else [respuesta.content]
+            campos['trabArchivoSha256'] = almacen().guardar_flujo('reporte', f'{trabajo.trabCod}-{nombre}', bloques)
+            campos['trabArchivoNombre'] = nombre
+            campos['trabArchivoTipo'] = respuesta['Content-Type']
+    except Exception as e:
+        fallido = _reclamado(trabajo).update(
+            trabEstado='FALLIDO', trabUltimoError=str(e)[:2000],
+            trabBloqueadoHasta=None, trabFechaFin=timezone.now()
+        )
+        return 'FALLIDO' if fallido else 'PERDIDO'
+    finally:
+        _progreso.reset(token)
+
+    trabajo.refresh_from_db(fields=['trabFilasProcesadas', 'trabFilasTotales'])
+    completado = _reclamado(trabajo).update(
+        trabEstado='COMPLETADO', trabBloqueadoHasta=None, trabFechaFin=timezone.now(),
+        trabFilasTotales=trabajo.trabFilasTotales if trabajo.trabFilasTotales is not None else trabajo.trabFilasProcesadas,
+        **campos
+    )
+    return 'COMPLETADO' if completado else 'PERDIDO'
+
+
+def ruta_resultado(trabajo):
+    """Ruta del archivo de una exportación terminada"""
+    return almacen().resolver(ubicacion_objeto(trabajo.trabArchivoSha256))
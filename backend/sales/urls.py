@@ -4,6 +4,9 @@ from sales.views import VentaDetalleViewSet, VentaViewSet, ComprobanteViewSet,
 from sales.reports_views import (
     get_sales_report,
     get_financial_report,
+    get_top_products,
+    get_products_abc,
+    get_products_margin,
     get_branch_comparison,
     get_clients_report,
     get_pending_sales,
@@ -13,7 +16,10 @@ from sales.reports_views import (
     export_clients_debt_csv,
     export_branch_comparison_csv,
     get_seller_sales_history,
-    export_seller_sales_history_csv
+    export_seller_sales_history_csv,
+    submit_report_job,
+    get_report_job,
+    get_report_job_result
 )
 
 # Crear el router
@@ -32,6 +38,9 @@ urlpatterns = [
     # Endpoints de reportes
     path('reports/sales/', get_sales_report, name='report-sales'),
     path('reports/financial/', get_financial_report, name='report-financial'),
+    path('reports/products/top/', get_top_products, name='report-products-top'),
+    path('reports/products/abc/', get_products_abc, name='report-products-abc'),
+    path('reports/products/margin/', get_products_margin, name='report-products-margin'),
     path('reports/branch-comparison/', get_branch_comparison, name='report-branch-comparison'),
     path('reports/clients/', get_clients_report, name='report-clients'),
     path('reports/pending-sales/', get_pending_sales, name='report-pending-sales'),
@@ -46,4 +55,9 @@ urlpatterns = [
     
     # Historial de ventas por vendedor
     path('reports/seller-sales-history/', get_seller_sales_history, name='report-seller-sales-history'),
+    
+    # Reportes y exportaciones en segundo plano (manage.py procesar_trabajos_reportes)
+    path('reports/jobs/', submit_report_job, name='report-job-submit'),
+    path('reports/jobs/<int:trabajo_id>/', get_report_job, name='report-job'),
+    path('reports/jobs/<int:trabajo_id>/result/', get_report_job_result, name='report-job-result'),
 ]
\ No newline at end of file
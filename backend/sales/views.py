@@ -3,27 +3,38 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db.models import Q, Sum
 from django.utils import timezone
 from datetime import datetime, timedelta
+from decimal import Decimal
 import django_filters
 from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import StreamingHttpResponse
+import csv
+import io
+import tempfile
 
 from Branch.models import Branch
 from User.models import User
 from django.conf import settings
 
 import requests
-from django.http import HttpResponse
 
 from .models import Venta, VentaDetalle, Comprobante, ComprobanteDetalle
 from .serializers import (
     VentaListSerializer, VentaCreateSerializer, VentaDetailSerializer, 
     VentaUpdateSerializer, PagoSerializer, AnularVentaSerializer,
     ComprobanteListSerializer, ComprobanteDetailSerializer, ComprobanteCreateSerializer,
+    EmisionLoteSerializer,
     VentaReporteSerializer, EstadisticasVentasSerializer,
     VentaDetalleSerializer 
 )
+from .idempotencia import idempotente
+from .almacen import almacen, nombre_cdr, nombre_xml, servir_artefacto, zip_en_flujo
+from . import pdf
+from .hechos import resumen_diario
+from .paginacion import paginar_ventas
 
 ###################################################################################
 # FILTROS PARA VENTA
@@ -59,7 +70,7 @@ class VentaFilter(django_filters.FilterSet):
     caja = django_filters.NumberFilter(field_name='cajaAperCod__id')
     
     # Filtro por forma de pago
-    forma_pago = django_filters.ChoiceFilter(choices=Venta.FORMA_PAGO)
+    forma_pago = django_filters.ChoiceFilter(field_name='ventFormaPago', choices=Venta.FORMA_PAGO)
 
     class Meta:
         model = Venta
@@ -134,7 +145,13 @@ class VentaViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        """Crear venta; acepta Idempotency-Key para reintentos seguros"""
+        return super().create(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'])
+    @idempotente
     def registrar_pago(self, request, pk=None):
         """Registrar un pago para la venta"""
         venta = self.get_object()
@@ -231,7 +248,7 @@ class VentaViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def reportes(self, request):
-        """Endpoint para reportes de ventas"""
+        """Endpoint para reportes de ventas (paginado por cursor, ver sales/paginacion.py)"""
         queryset = self.get_queryset()
         
         # Aplicar filtros adicionales para reportes
@@ -254,8 +271,15 @@ class VentaViewSet(viewsets.ModelViewSet):
         if vendedor:
             queryset = queryset.filter(usuCod_id=vendedor)
         
-        serializer = VentaReporteSerializer(queryset, many=True)
-        return Response(serializer.data)
+        try:
+            ventas, paginacion = paginar_ventas(
+                request.query_params, queryset.prefetch_related(None).select_related('comprobante')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = VentaReporteSerializer(ventas, many=True)
+        return Response({'results': serializer.data, 'pagination': paginacion})
 
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
@@ -272,34 +296,31 @@ class VentaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Calcular estadísticas
-        ventas = Venta.objects.filter(
-            ventFecha__date__range=[fecha_inicio, fecha_fin],
-            ventAnulada=False
-        )
-        
-        total_ventas = sum(venta.ventTotal for venta in ventas)
-        cantidad_ventas = ventas.count()
+        # Calcular estadísticas con una sola consulta agrupada al resumen diario de ventas
+        grupos = resumen_diario(fecha_inicio, fecha_fin).values(
+            'vresEstado', 'vresFormaPago', 'sucurCod_id'
+        ).annotate(
+            total=Sum('vresTotal'),
+            cantidad=Sum('vresCantidad')
+        ).order_by()
+        
+        total_ventas = Decimal('0')
+        cantidad_ventas = 0
+        por_estado, por_forma_pago, por_sucursal = {}, {}, {}
+        for grupo in grupos:
+            total_ventas += grupo['total'] or 0
+            cantidad_ventas += grupo['cantidad']
+            por_estado[grupo['vresEstado']] = por_estado.get(grupo['vresEstado'], 0) + grupo['cantidad']
+            por_forma_pago[grupo['vresFormaPago']] = por_forma_pago.get(grupo['vresFormaPago'], 0) + grupo['cantidad']
+            por_sucursal[grupo['sucurCod_id']] = por_sucursal.get(grupo['sucurCod_id'], 0) + grupo['cantidad']
         promedio_venta = total_ventas / cantidad_ventas if cantidad_ventas > 0 else 0
         
-        # Ventas por estado
-        ventas_por_estado = {}
-        for estado in Venta.ESTADO_VENTA:
-            count = ventas.filter(ventEstado=estado[0]).count()
-            ventas_por_estado[estado[1]] = count
-        
-        # Ventas por forma de pago
-        ventas_por_forma_pago = {}
-        for forma_pago in Venta.FORMA_PAGO:
-            count = ventas.filter(ventFormaPago=forma_pago[0]).count()
-            ventas_por_forma_pago[forma_pago[1]] = count
-        
-        # Ventas por sucursal
-        ventas_por_sucursal = {}
-        sucursales = Branch.objects.all()
-        for sucursal in sucursales:
-            count = ventas.filter(sucurCod=sucursal).count()
-            ventas_por_sucursal[sucursal.sucurNom] = count
+        ventas_por_estado = {etiqueta: por_estado.get(codigo, 0) for codigo, etiqueta in Venta.ESTADO_VENTA}
+        ventas_por_forma_pago = {etiqueta: por_forma_pago.get(codigo, 0) for codigo, etiqueta in Venta.FORMA_PAGO}
+        ventas_por_sucursal = {
+            sucursal.sucurNom: por_sucursal.get(sucursal.sucurCod, 0)
+            for sucursal in Branch.objects.only('sucurCod', 'sucurNom')
+        }
         
         data = {
             'fecha_inicio': fecha_inicio,
@@ -323,10 +344,11 @@ class ComprobanteFilter(django_filters.FilterSet):
     """Filtros para comprobantes"""
     
     search = django_filters.CharFilter(method='filter_search')
-    fecha_desde = django_filters.DateFilter(field_name='comprFechaEmision', lookup_expr='gte')
-    fecha_hasta = django_filters.DateFilter(field_name='comprFechaEmision', lookup_expr='lte')
-    tipo = django_filters.ChoiceFilter(choices=Comprobante.TIPO_COMPROBANTE)
-    estado_sunat = django_filters.ChoiceFilter(choices=Comprobante.ESTADO_SUNAT)
+    fecha_desde = django_filters.DateFilter(field_name='comprFechaEmision', lookup_expr='date__gte')
+    fecha_hasta = django_filters.DateFilter(field_name='comprFechaEmision', lookup_expr='date__lte')
+    sucursal = django_filters.NumberFilter(field_name='ventCod__sucurCod')
+    tipo = django_filters.ChoiceFilter(field_name='comprTipo', choices=Comprobante.TIPO_COMPROBANTE)
+    estado_sunat = django_filters.ChoiceFilter(field_name='comprEstadoSUNAT', choices=Comprobante.ESTADO_SUNAT)
     serie = django_filters.CharFilter(field_name='comprSerie', lookup_expr='exact')
     correlativo = django_filters.NumberFilter(field_name='comprCorrelativo')
     cliente = django_filters.CharFilter(field_name='comprRazonSocialReceptor', lookup_expr='icontains')
@@ -335,7 +357,7 @@ class ComprobanteFilter(django_filters.FilterSet):
     class Meta:
         model = Comprobante
         fields = [
-            'search', 'fecha_desde', 'fecha_hasta', 'tipo', 'estado_sunat',
+            'search', 'fecha_desde', 'fecha_hasta', 'sucursal', 'tipo', 'estado_sunat',
             'serie', 'correlativo', 'cliente', 'ruc_cliente'
         ]
 
@@ -409,7 +431,7 @@ class ComprobanteViewSet(viewsets.ModelViewSet):
                 'detalles': resultado
             }, status=status.HTTP_200_OK)
             
-        except ValidationError as e:
+        except (ValidationError, DjangoValidationError) as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -431,7 +453,7 @@ class ComprobanteViewSet(viewsets.ModelViewSet):
                 'detalles': resultado
             }, status=status.HTTP_200_OK)
             
-        except ValidationError as e:
+        except (ValidationError, DjangoValidationError) as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
@@ -465,7 +487,8 @@ class ComprobanteViewSet(viewsets.ModelViewSet):
             
             return Response({
                 'servicio_disponible': disponible,
-                'servicio_url': getattr(settings, 'SUNAT_SERVICE_URL', 'No configurado')
+                'servicio_url': getattr(settings, 'SUNAT_SERVICE_URL', 'No configurado'),
+                'metricas': SunatClient.metricas()
             })
             
         except Exception as e:
@@ -476,89 +499,195 @@ class ComprobanteViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def descargar_xml(self, request, pk=None):
-        """Descargar XML directamente desde el microservicio"""
+        """Descargar XML desde el almacén local (el microservicio solo si falta)"""
         comprobante = self.get_object()
-        
-        try:
-            print(f"Descargando XML para {comprobante.comprobante_completo}")
-            
-            if comprobante.comprEstadoSUNAT != 'ACEPTADO':
-                return Response(
-                    {'error': 'Solo se puede descargar XML de comprobantes aceptados por SUNAT'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # 
-            xml_url = f"http://localhost:8001/storage/xml/{comprobante.comprobante_completo}.xml"
-            print(f"Descargando desde: {xml_url}")
-            
-            response = requests.get(xml_url, timeout=30)
-            
-            if response.status_code == 200:
-                print(f"✅ XML descargado - Tamaño: {len(response.content)} bytes")
-                
-                django_response = HttpResponse(
-                    response.content, 
-                    content_type='application/xml'
-                )
-                django_response['Content-Disposition'] = f'attachment; filename="{comprobante.comprobante_completo}.xml"'
-                return django_response
-            else:
-                print(f"❌ Error del microservicio: {response.status_code}")
-                return Response(
-                    {'error': f'Archivo XML no encontrado'}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-                
-        except Exception as e:
-            print(f"❌ Error: {str(e)}")
-            return Response(
-                {'error': f'Error descargando XML: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return self._descargar_artefacto(request, comprobante, 'xml', nombre_xml(comprobante))
 
     @action(detail=True, methods=['get'])
     def descargar_cdr(self, request, pk=None):
-        """Descargar CDR directamente desde el microservicio"""
+        """Descargar CDR desde el almacén local (el microservicio solo si falta)"""
         comprobante = self.get_object()
-        
+        return self._descargar_artefacto(request, comprobante, 'cdr', nombre_cdr(comprobante))
+
+    @action(detail=False, methods=['post'])
+    @idempotente
+    def emitir_lote(self, request):
+        """
+        Emite en una transacción los comprobantes de varias ventas pagadas y los deja
+        en cola para SUNAT. Las ventas no aptas (sin pagar, anuladas, de otra sucursal
+        o con comprobante) se devuelven en `omitidas`.
+        """
+        serializer = EmisionLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ventas_ids = serializer.validated_data['ventas']
+
+        # Solo ventas de la sucursal del usuario, si tiene una asignada
+        comprobantes, omitidas = Comprobante.objects.emitir_lote(
+            ventas_ids, sucursal_id=getattr(request.user, 'sucurCod_id', None)
+        )
+        return Response({
+            'emitidos': len(comprobantes),
+            'comprobantes': [
+                {'venta': c.ventCod_id, 'comprobante': c.comprobante_completo, 'comprCod': c.pk}
+                for c in comprobantes
+            ],
+            'omitidas': omitidas,
+        }, status=status.HTTP_201_CREATED if comprobantes else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def descargar_pdf(self, request, pk=None):
+        """Representación impresa en PDF (?formato=A4 o 80mm); se dibuja una vez y luego se reutiliza"""
+        formato = request.query_params.get('formato', 'A4')
+        if formato not in pdf.FORMATOS:
+            return Response(
+                {'error': f"Formato no soportado. Use: {', '.join(pdf.FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        comprobante = self.get_object()
+        ruta, sha256 = pdf.obtener_pdf(comprobante, formato)
+        return servir_artefacto(request, ruta, sha256, pdf.nombre_pdf(comprobante, formato), 'pdf')
+
+    @action(detail=False, methods=['get'])
+    def exportar_pdf(self, request):
+        """
+        ZIP con el PDF de cada comprobante filtrado (requiere fecha_desde y fecha_hasta).
+        Los PDF que faltan se dibujan a medida que se arma el ZIP, que sale en streaming.
+        """
+        formato = request.query_params.get('formato', 'A4')
+        if formato not in pdf.FORMATOS:
+            return Response(
+                {'error': f"Formato no soportado. Use: {', '.join(pdf.FORMATOS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (request.query_params.get('fecha_desde') and request.query_params.get('fecha_hasta')):
+            return Response(
+                {'error': 'Indique fecha_desde y fecha_hasta'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related('detalles')
+            .order_by('comprSerie', 'comprCorrelativo')
+            .iterator(chunk_size=200)
+        )
+        entradas = pdf.entradas_zip(queryset, formato)
+        respuesta = StreamingHttpResponse(zip_en_flujo(entradas), content_type='application/zip')
+        respuesta['Content-Disposition'] = (
+            f'attachment; filename="comprobantes_pdf_{request.query_params["fecha_desde"]}'
+            f'_{request.query_params["fecha_hasta"]}.zip"'
+        )
+        return respuesta
+
+    @action(detail=False, methods=['get'])
+    def exportar_artefactos(self, request):
+        """
+        ZIP con los XML/CDR de los comprobantes filtrados (mismos filtros que el listado)
+        más un indice.csv al final. Se arma en streaming: la memoria no depende de la cantidad.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).order_by('comprSerie', 'comprCorrelativo')
+        nombre = f"comprobantes_{timezone.localdate():%Y%m%d}.zip"
+
+        respuesta = StreamingHttpResponse(
+            zip_en_flujo(self._entradas_exportacion(queryset)), content_type='application/zip'
+        )
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        return respuesta
+
+    CAMPOS_EXPORTACION = [
+        'comprSerie', 'comprCorrelativo', 'comprTipo', 'comprFechaEmision',
+        'comprNumDocReceptor', 'comprRazonSocialReceptor', 'comprMoneda',
+        'comprTotalGravadas', 'comprTotalExoneradas', 'comprTotalInafectas',
+        'comprTotalIGV', 'comprTotalVenta', 'comprEstadoSUNAT', 'comprCodigoRespuesta',
+        'comprTieneXML', 'comprXMLUbicacion', 'comprXMLSha256',
+        'comprTieneCDR', 'comprCDRUbicacion', 'comprCDRSha256',
+    ]
+
+    def _entradas_exportacion(self, queryset):
+        """
+        Entradas para zip_en_flujo en una sola pasada: los artefactos y al final el
+        indice.csv con exactamente lo que entró al ZIP. El índice se acumula en un
+        temporal que pasa a disco si crece.
+        """
+        raiz = almacen()
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', encoding='utf-8', newline='') as indice:
+            writer = csv.writer(indice)
+            indice.write('\ufeff')
+            writer.writerow([
+                'Serie', 'Correlativo', 'Tipo', 'Fecha Emisión', 'Doc. Receptor', 'Receptor',
+                'Moneda', 'Gravadas', 'Exoneradas', 'Inafectas', 'IGV', 'Total',
+                'Estado SUNAT', 'Código Respuesta', 'XML', 'SHA-256 XML', 'CDR', 'SHA-256 CDR'
+            ])
+            for fila in queryset.values(*self.CAMPOS_EXPORTACION).iterator(chunk_size=500):
+                fecha = timezone.localtime(fila['comprFechaEmision'])
+                base = f"{fila['comprSerie']}-{fila['comprCorrelativo']}"
+                incluidos = {}
+                for tipo, nombre, comprimir in (('XML', f"xml/{base}.xml", True), ('CDR', f"cdr/R-{base}.zip", False)):
+                    ruta = self._ruta_exportable(raiz, fila, tipo)
+                    if ruta:
+                        incluidos[tipo] = nombre
+                        yield nombre, fecha, ruta, comprimir
+                writer.writerow(self._fila_indice(fila, fecha, incluidos))
+
+            indice.seek(0)
+            bloques = (bloque.encode('utf-8') for bloque in iter(lambda: indice.read(64 * 1024), ''))
+            yield 'indice.csv', timezone.localtime(), bloques, True
+
+    def _ruta_exportable(self, raiz, fila, tipo):
+        if not fila[f'comprTiene{tipo}']:
+            return None
+        ruta = raiz.resolver(fila[f'compr{tipo}Ubicacion'])
+        return ruta if ruta.is_file() else None
+
+    def _fila_indice(self, fila, fecha, incluidos):
+        """Fila del indice.csv; `incluidos` trae el nombre en el ZIP del XML/CDR que entró"""
+        return [
+            fila['comprSerie'], fila['comprCorrelativo'], fila['comprTipo'],
+            fecha.strftime('%Y-%m-%d %H:%M:%S'),
+            fila['comprNumDocReceptor'], fila['comprRazonSocialReceptor'], fila['comprMoneda'],
+            fila['comprTotalGravadas'], fila['comprTotalExoneradas'], fila['comprTotalInafectas'],
+            fila['comprTotalIGV'], fila['comprTotalVenta'],
+            fila['comprEstadoSUNAT'], fila['comprCodigoRespuesta'],
+            incluidos.get('XML', ''), fila['comprXMLSha256'],
+            incluidos.get('CDR', ''), fila['comprCDRSha256'],
+        ]
+
+    def _descargar_artefacto(self, request, comprobante, tipo, nombre):
+        etiqueta = tipo.upper()
+
+        if comprobante.comprEstadoSUNAT != 'ACEPTADO':
+            return Response(
+                {'error': f'Solo se puede descargar {etiqueta} de comprobantes aceptados por SUNAT'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Camino rápido: la ubicación ya está registrada en el comprobante
+        prefijo = tipo.upper()
+        if getattr(comprobante, f'comprTiene{prefijo}'):
+            ruta = almacen().resolver(getattr(comprobante, f'compr{prefijo}Ubicacion'))
+            if ruta.is_file():
+                return servir_artefacto(request, ruta, getattr(comprobante, f'compr{prefijo}Sha256'), nombre, tipo)
+
         try:
-            print(f"🔍 Descargando CDR para {comprobante.comprobante_completo}")
-            
-            if comprobante.comprEstadoSUNAT != 'ACEPTADO':
-                return Response(
-                    {'error': 'Solo se puede descargar CDR de comprobantes aceptados por SUNAT'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # URL CORREGIDA - sin /public/ al inicio
-            cdr_url = f"http://localhost:8001/storage/cdr/R-{comprobante.comprobante_completo}.zip"
-            print(f"Descargando desde: {cdr_url}")
-            
-            response = requests.get(cdr_url, timeout=30)
-            
-            if response.status_code == 200:
-                print(f"✅ CDR descargado - Tamaño: {len(response.content)} bytes")
-                
-                django_response = HttpResponse(
-                    response.content, 
-                    content_type='application/zip'
-                )
-                django_response['Content-Disposition'] = f'attachment; filename="R-{comprobante.comprobante_completo}.zip"'
-                return django_response
-            else:
-                print(f"❌ Error del microservicio: {response.status_code}")
-                return Response(
-                    {'error': f'Archivo CDR no encontrado'}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-                
+            encontrado = almacen().obtener(tipo, nombre)
         except Exception as e:
             print(f"❌ Error: {str(e)}")
             return Response(
-                {'error': f'Error descargando CDR: {str(e)}'}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': f'Error descargando {etiqueta}: {str(e)}'}, 
+                status=status.HTTP_502_BAD_GATEWAY
             )
+
+        if not encontrado:
+            if getattr(comprobante, f'comprTiene{prefijo}'):
+                comprobante.registrar_artefacto(tipo, None, None, guardar=True)
+            return Response(
+                {'error': f'Archivo {etiqueta} no encontrado'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        ruta, sha256 = encontrado
+        comprobante.registrar_artefacto(tipo, sha256, ruta.stat().st_size, guardar=True)
+        return servir_artefacto(request, ruta, sha256, nombre, tipo)
     
 
 ###################################################################################
@@ -107,14 +107,15 @@ export default function CentralReports() {
         }
     };
 
-    const loadSalesList = async (page: number) => {
+    const loadSalesList = async (page: number, cursor: string | null = null) => {
         try {
             const data = await reportsService.getSalesList({
                 start_date: startDate,
                 end_date: endDate,
                 branch_id: selectedBranch,
-                page,
-                page_size: 20
+                cursor,
+                page_size: 20,
+                include_total: true
             });
             setSalesList(data);
             setCurrentPage(page);
@@ -123,7 +124,7 @@ export default function CentralReports() {
         }
     };
 
-    const loadSellerSalesHistory = async (page: number) => {
+    const loadSellerSalesHistory = async (page: number, cursor: string | null = null) => {
         try {
             const data = await reportsService.getSellerSalesHistory({
                 start_date: startDate,
@@ -131,8 +132,9 @@ export default function CentralReports() {
                 branch_id: selectedBranch,
                 seller_id: selectedSeller,
                 sale_type: selectedSaleType || undefined,
-                page,
-                page_size: 20
+                cursor,
+                page_size: 20,
+                include_total: true
             });
             setSellerSalesHistory(data);
             setSellerHistoryPage(page);
@@ -551,19 +553,21 @@ export default function CentralReports() {
                                 {/* Paginación */}
                                 <div className="mt-4 flex items-center justify-between">
                                     <div className="text-sm text-gray-700">
-                                        Mostrando página {salesList.pagination.page} de {salesList.pagination.total_pages} 
-                                        ({salesList.pagination.total} ventas total)
+                                        Mostrando página {currentPage}
+                                        {salesList.pagination.total !== undefined && (
+                                            <> ({salesList.pagination.total_exacto ? '' : 'más de '}{salesList.pagination.total} ventas total)</>
+                                        )}
                                     </div>
                                     <div className="flex gap-2">
                                         <button
-                                            onClick={() => loadSalesList(currentPage - 1)}
+                                            onClick={() => loadSalesList(currentPage - 1, salesList.pagination.prev_cursor)}
                                             disabled={!salesList.pagination.has_prev}
                                             className="px-3 py-1 border rounded hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                                         >
                                             ← Anterior
                                         </button>
                                         <button
-                                            onClick={() => loadSalesList(currentPage + 1)}
+                                            onClick={() => loadSalesList(currentPage + 1, salesList.pagination.next_cursor)}
                                             disabled={!salesList.pagination.has_next}
                                             className="px-3 py-1 border rounded hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                                         >
@@ -714,19 +718,21 @@ export default function CentralReports() {
                                 {/* Paginación */}
                                 <div className="mt-4 flex items-center justify-between">
                                     <div className="text-sm text-gray-700">
-                                        Mostrando página {sellerSalesHistory.pagination.page} de {sellerSalesHistory.pagination.total_pages} 
-                                        ({sellerSalesHistory.pagination.total} ventas total)
+                                        Mostrando página {sellerHistoryPage}
+                                        {sellerSalesHistory.pagination.total !== undefined && (
+                                            <> ({sellerSalesHistory.pagination.total_exacto ? '' : 'más de '}{sellerSalesHistory.pagination.total} ventas total)</>
+                                        )}
                                     </div>
                                     <div className="flex gap-2">
                                         <button
-                                            onClick={() => loadSellerSalesHistory(sellerHistoryPage - 1)}
+                                            onClick={() => loadSellerSalesHistory(sellerHistoryPage - 1, sellerSalesHistory.pagination.prev_cursor)}
                                             disabled={!sellerSalesHistory.pagination.has_prev}
                                             className="px-3 py-1 border rounded hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                                         >
                                             ← Anterior
                                         </button>
                                         <button
-                                            onClick={() => loadSellerSalesHistory(sellerHistoryPage + 1)}
+                                            onClick={() => loadSellerSalesHistory(sellerHistoryPage + 1, sellerSalesHistory.pagination.next_cursor)}
                                             disabled={!sellerSalesHistory.pagination.has_next}
                                             className="px-3 py-1 border rounded hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                                         >
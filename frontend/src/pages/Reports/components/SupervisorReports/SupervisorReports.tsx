@@ -69,13 +69,14 @@ export default function SupervisorReports() {
         }
     };
 
-    const loadSalesList = async (page: number) => {
+    const loadSalesList = async (page: number, cursor: string | null = null) => {
         try {
             const data = await reportsService.getSalesList({
                 start_date: startDate,
                 end_date: endDate,
-                page,
-                page_size: 20
+                cursor,
+                page_size: 20,
+                include_total: true
             });
             setSalesList(data);
             setCurrentPage(page);
@@ -462,19 +463,21 @@ export default function SupervisorReports() {
                                 {/* Paginación */}
                                 <div className="mt-4 flex items-center justify-between">
                                     <div className="text-sm text-gray-700">
-                                        Mostrando página {salesList.pagination.page} de {salesList.pagination.total_pages} 
-                                        ({salesList.pagination.total} ventas total)
+                                        Mostrando página {currentPage}
+                                        {salesList.pagination.total !== undefined && (
+                                            <> ({salesList.pagination.total_exacto ? '' : 'más de '}{salesList.pagination.total} ventas total)</>
+                                        )}
                                     </div>
                                     <div className="flex gap-2">
                                         <button
-                                            onClick={() => loadSalesList(currentPage - 1)}
+                                            onClick={() => loadSalesList(currentPage - 1, salesList.pagination.prev_cursor)}
                                             disabled={!salesList.pagination.has_prev}
                                             className="px-3 py-1 border rounded hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                                         >
                                             ← Anterior
                                         </button>
                                         <button
-                                            onClick={() => loadSalesList(currentPage + 1)}
+                                            onClick={() => loadSalesList(currentPage + 1, salesList.pagination.next_cursor)}
                                             disabled={!salesList.pagination.has_next}
                                             className="px-3 py-1 border rounded hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
                                         >
@@ -51,6 +51,8 @@ export interface ClientsReportData {
     '60_90': number;
     over_90: number;
   };
+  debt_aging_source: 'vivo' | 'snapshot';
+  debt_aging_cutoff: string | null;
   is_manager: boolean;
 }
 
@@ -226,7 +228,7 @@ export const reportsService = {
     }
   },
 
-  getSalesList: async (filters?: ReportFilters & { page?: number; page_size?: number }) => {
+  getSalesList: async (filters?: ReportFilters & { cursor?: string | null; page_size?: number; include_total?: boolean }) => {
     const response = await api.get('/sales/reports/sales-list/', { params: filters });
     return response.data;
   },
@@ -235,8 +237,9 @@ export const reportsService = {
     seller_id?: number; 
     client_id?: number; 
     sale_type?: string;
-    page?: number; 
-    page_size?: number 
+    cursor?: string | null; 
+    page_size?: number;
+    include_total?: boolean
   }) => {
     const response = await api.get('/sales/reports/seller-sales-history/', { params: filters });
     return response.data;